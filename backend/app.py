@@ -1,4 +1,6 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory, redirect, url_for, session, make_response
+import startup
+from startup import lazy_import
+from flask import Flask, request, jsonify, render_template, send_from_directory, send_file, redirect, url_for, session, make_response
 import os
 import logging
 
@@ -8,7 +10,9 @@ from dotenv import load_dotenv
 from flask_cors import CORS, cross_origin
 import uuid
 import requests
+startup.mark("flask + stdlib")
 import stripe
+startup.mark("stripe")
 from urllib.parse import urlencode, quote, unquote, parse_qs, urlparse
 import json
 from supabase_storage import storage
@@ -18,6 +22,7 @@ try:
     _supabase_options = ClientOptions(postgrest_client_timeout=60)
 except Exception:
     _supabase_options = None
+startup.mark("supabase")
 # Twilio removed - using email notifications instead
 from pathlib import Path
 import sys
@@ -27,18 +32,14 @@ import re
 import secrets
 from datetime import datetime, timezone, timedelta
 
-# Google OAuth imports
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-import google.auth
+# Google OAuth imports - deferred until the first OAuth request (see startup.py)
+Flow = lazy_import("google_auth_oauthlib.flow", "Flow")
 
 # NEW: Import Printful integration
 from printful_integration import ScreenMerchPrintfulIntegration
 
-# NEW: Import video screenshot capture
-from video_screenshot import screenshot_capture
+# NEW: Import video screenshot capture (ffmpeg + PIL load on first capture)
+screenshot_capture = lazy_import("video_screenshot", "screenshot_capture")
 
 # NEW: Import worker portal and secure processing APIs
 try:
@@ -49,8 +50,8 @@ except ImportError as e:
     register_worker_portal_routes = None
     register_secure_processing_routes = None
 
-# Import screenshot_capture module for standalone functions
-import screenshot_capture as sc_module
+# Import screenshot_capture module for standalone functions (OpenCV/NumPy load on first use)
+sc_module = lazy_import("screenshot_capture")
 
 # NEW: Import security manager
 from security_config import security_manager, SECURITY_HEADERS, validate_file_upload
@@ -64,6 +65,7 @@ from routes import (
     register_videos_routes,
     register_analytics_routes
 )
+from routes.videos import invalidate_video_cache
 from services.order_email import (
     build_admin_order_email,
     build_customer_order_email,
@@ -71,6 +73,10 @@ from services.order_email import (
     resend_attachments_from_builder,
 )
 from services.order_email import _fetch_image_as_base64 as fetch_screenshot_url
+from services.google_oauth import PhaseTimer, fetch_google_profile
+from services import image_derivatives, uploads
+from utils.order_lookup import resolve_order
+from utils import logging_setup, metrics, processing_queue, profiling, storefront_cache
 from utils.stripe_checkout import (
     fetch_full_checkout_session,
     build_shipping_address_payload,
@@ -87,8 +93,11 @@ from utils.stripe_tax_checkout import (
     tax_line_item_price_data,
 )
 from utils.auth_sync import ensure_auth_user_for_public_user
+from utils.shared_store import SharedDict
+from utils.security import verified_master_admin
+startup.mark("app modules + route blueprints")
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logging_setup.configure_logging()
 logger = logging.getLogger(__name__)
 
 # Robust .env loading
@@ -108,16 +117,18 @@ for env_path in env_paths:
 supabase_url = os.getenv("VITE_SUPABASE_URL") or os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("VITE_SUPABASE_ANON_KEY") or os.getenv("SUPABASE_ANON_KEY")
 supabase_service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-print("SUPABASE_URL:", "OK" if supabase_url else "MISSING")
-print("SUPABASE_ANON_KEY:", "OK" if supabase_key else "MISSING")
-print("SUPABASE_SERVICE_ROLE_KEY:", "OK" if supabase_service_key else "MISSING (some admin features won't work)")
+logger.info(
+    "Env: SUPABASE_URL=%s SUPABASE_ANON_KEY=%s SUPABASE_SERVICE_ROLE_KEY=%s",
+    "OK" if supabase_url else "MISSING",
+    "OK" if supabase_key else "MISSING",
+    "OK" if supabase_service_key else "MISSING (some admin features won't work)",
+)
 if not supabase_url or not supabase_key:
     print("ERROR: Missing Supabase environment variables. Check your .env file location and content.", file=sys.stderr)
     sys.exit(1)
 
 # Email notification setup (replacing Twilio SMS)
 ADMIN_EMAIL = os.getenv("MAIL_TO") or os.getenv("ADMIN_EMAIL")
-print(f"ADMIN_EMAIL: {'OK' if ADMIN_EMAIL else 'MISSING'}")
 
 # Google OAuth configuration
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
@@ -125,9 +136,10 @@ GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI") or "https://screenmerch.fly.dev/api/auth/google/callback"
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
-print(f"GOOGLE_CLIENT_ID: {'OK' if GOOGLE_CLIENT_ID else 'MISSING'}")
-print(f"GOOGLE_CLIENT_SECRET: {'OK' if GOOGLE_CLIENT_SECRET else 'MISSING'}")
-print(f"YOUTUBE_API_KEY: {'OK' if YOUTUBE_API_KEY else 'MISSING'}")
+logger.info(
+    "Env: ADMIN_EMAIL=%s GOOGLE_CLIENT_ID=%s GOOGLE_CLIENT_SECRET=%s YOUTUBE_API_KEY=%s",
+    *("OK" if v else "MISSING" for v in (ADMIN_EMAIL, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, YOUTUBE_API_KEY)),
+)
 
 # Add session configuration (will be set after app creation)
 
@@ -323,6 +335,10 @@ except Exception as _proxy_err:
     logger.warning("ProxyFix not applied: %s", _proxy_err)
 # Allow large checkout payloads (base64 screenshots in cart) - default 1MB can truncate
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB
+# Request/outbound/cache metrics; registered first so its timing hooks wrap every other hook.
+metrics.init_app(app)
+# Opt-in cProfile (X-Profile: 1 from a master admin session or bearer token) and slow-request stack capture.
+profiling.init_app(app, authorize=lambda: verified_master_admin(supabase_admin or supabase))
 
 def _allow_origin_user_id():
     """If request is from our frontend and X-User-Id exists in DB, return user_id; else None. Use only when session auth failed."""
@@ -459,8 +475,12 @@ app.config.update(
 # Accept routes with or without trailing slashes
 app.url_map.strict_slashes = False
 
-# In-memory session token -> user_id for /api/users/me validation (single instance; cleared on restart)
-app.config.setdefault("session_token_store", {})
+# Session token -> user_id for /api/users/me validation; shared by all workers (utils.shared_store)
+app.config.setdefault("session_token_store", SharedDict("session_tokens", ttl=30 * 86400))
+
+
+def _session_token_store():
+    return app.config["session_token_store"]
 
 # Rate limiting for auth and sensitive endpoints
 try:
@@ -539,7 +559,7 @@ def _resolve_session_token(token):
     if not token or not str(token).strip():
         return None
     token = str(token).strip()
-    store = app.config.get("session_token_store") or {}
+    store = _session_token_store()
     user_id = store.get(token)
     if user_id:
         return str(user_id)
@@ -552,7 +572,6 @@ def _resolve_session_token(token):
                 uid = r.data[0].get("user_id")
                 if uid:
                     store[token] = str(uid)
-                    app.config["session_token_store"] = store
                     return str(uid)
     except Exception as e:
         logger.debug("Session resolve from DB: %s", e)
@@ -590,10 +609,9 @@ def _repair_session_user_id(old_user_id, new_user_id):
     new_s = str(new_user_id)
     if old_s == new_s:
         return
-    store = app.config.get("session_token_store") or {}
+    store = _session_token_store()
     if str(store.get(tok, "")) == old_s:
         store[tok] = new_s
-        app.config["session_token_store"] = store
     try:
         admin = globals().get("supabase_admin")
         if admin is not None:
@@ -633,9 +651,8 @@ def _oauth_redirect_with_session(redirect_url, user_id):
     """Build redirect response and set sm_session cookie so /api/users/me works after OAuth.
     Puts token inside the redirect URL's user= JSON so the frontend always receives it."""
     token = str(uuid.uuid4())
-    store = app.config.get("session_token_store") or {}
+    store = _session_token_store()
     store[token] = str(user_id)
-    app.config["session_token_store"] = store
     _persist_session_token(token, user_id)
     domain = _cookie_domain()
     # Inject token into user= JSON so frontend can read it (no reliance on query/fragment)
@@ -918,9 +935,9 @@ CORS(
 @app.before_request
 def security_check():
     """Security checks before each request"""
-    # Log all API requests for debugging
-    if request.path.startswith('/api/'):
-        logger.info(f"🔵 [BEFORE_REQUEST] {request.method} {request.path} from {request.headers.get('Origin', 'unknown')}")
+    logging_setup.sync_levels()
+    if request.path.startswith('/api/') and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("🔵 [BEFORE_REQUEST] %s %s from %s", request.method, request.path, request.headers.get('Origin', 'unknown'))
     
     # Get client IP
     client_ip = request.headers.get('X-Forwarded-For', request.remote_addr)
@@ -948,7 +965,9 @@ def add_security_headers(response):
             response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, PATCH, DELETE, OPTIONS"
             response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, Cache-Control, Pragma, Expires, X-User-Email, X-Session-Token, X-User-Id"
             response.headers["Vary"] = "Origin"
-            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
+            # Public read models (utils/storefront_cache.py) opt in to shared caching explicitly.
+            if not response.headers.get("Cache-Control", "").startswith("public"):
+                response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
             response.headers["X-ScreenMerch-CORS"] = "1"
         except Exception:
             response.headers["Access-Control-Allow-Origin"] = "https://screenmerch.com"
@@ -1002,8 +1021,15 @@ else:
 printful_integration = ScreenMerchPrintfulIntegration()
 
 # Keep in-memory storage as fallback, but prioritize database
-product_data_store = {}
-order_store = {}  # In-memory store for demo; use a database for production
+# Shared across gunicorn workers on this machine (SQLite by default, see utils/shared_store.py)
+product_data_store = SharedDict("product_data", ttl=7 * 86400)
+# Fallback only; Supabase `orders` is the source of truth. Indexed so analytics only loads one creator's
+# or one favorites page's entries (with their screenshots) instead of the whole store.
+order_store = SharedDict("orders", ttl=14 * 86400, index={
+    "user_id": lambda o: o.get("user_id") or "",
+    "creator_name": lambda o: str(o.get("creator_name") or "").strip().lower(),
+    "favorite_list_id": lambda o: o.get("favorite_list_id") or "",
+})
 
 # --- Resend Email Configuration ---
 # On Fly.io these come from Secrets (not .env). Set: flyctl secrets set RESEND_API_KEY=... RESEND_FROM=...
@@ -1062,6 +1088,8 @@ config = {
     'YOUTUBE_API_KEY': YOUTUBE_API_KEY
 }
 
+startup.mark("env, Supabase clients, Flask app + middleware")
+
 # Register Blueprints that don't depend on PRODUCTS
 print("[INFO] Registering Flask Blueprints...")
 try:
@@ -1108,18 +1136,14 @@ def get_browse_api():
         user_agent = request.headers.get('User-Agent', '')
         is_mobile = 'Mobile' in user_agent or 'Android' in user_agent or 'iPhone' in user_agent
         
-        logger.info(f"📂 API Browse request - Category: {category}")
-        logger.info(f"📱 Mobile detection: {is_mobile}")
-        logger.info(f"📱 User-Agent: {user_agent}")
+        logger.debug("📂 API Browse request - category=%s mobile=%s user_agent=%s", category, is_mobile, user_agent)
         
         # Filter products by category
         filtered_products = filter_products_by_category(category)
         
         # Ensure all products have a description field and full image URLs for cross-origin display
         # Force HTTPS and always set image_base so images persist across category switches
-        image_base = (os.environ.get('BACKEND_PUBLIC_URL') or request.url_root or 'https://screenmerch.fly.dev').rstrip('/')
-        if image_base.startswith('http://'):
-            image_base = 'https://' + image_base[7:]
+        image_base = _public_backend_base()
         for product in filtered_products:
             if 'description' not in product:
                 product['description'] = ""
@@ -1129,15 +1153,14 @@ def get_browse_api():
                 preview_fn = product.get('preview_image') or ''
                 product['main_image_url'] = f"{image_base}/static/images/{main_fn}" if main_fn else ''
                 product['preview_image_url'] = f"{image_base}/static/images/{preview_fn}" if preview_fn else ''
+                # Width-bucketed copies for browse grids (full-size URLs above stay for the product page)
+                product['main_image_srcset'] = _static_image_srcset(image_base, main_fn)
+                product['preview_image_srcset'] = _static_image_srcset(image_base, preview_fn)
         
-        # Log product details for mobile debugging
-        if is_mobile:
-            logger.info(f"📱 Mobile request - Found {len(filtered_products)} products for category '{category}'")
-            if filtered_products:
-                first_product = filtered_products[0]
-                logger.info(f"📱 First product: {first_product.get('name', 'Unknown')}")
-                logger.info(f"📱 First product main_image: {first_product.get('main_image', 'None')}")
-                logger.info(f"📱 First product preview_image: {first_product.get('preview_image', 'None')}")
+        if is_mobile and filtered_products and logger.isEnabledFor(logging.DEBUG):
+            first_product = filtered_products[0]
+            logger.debug("📱 First product: %s (main_image=%s, preview_image=%s)", first_product.get('name', 'Unknown'),
+                         first_product.get('main_image', 'None'), first_product.get('preview_image', 'None'))
         
         # Get screenshots from localStorage data (if available)
         # For browse mode, we'll use fallback screenshots
@@ -1166,15 +1189,12 @@ def get_browse_api():
             "timestamp": int(time.time())
         }
         
-        # Log response for mobile debugging
-        if is_mobile:
-            logger.info(f"📱 Sending response to mobile - {len(filtered_products)} products")
-            logger.info(f"📱 Response success: {response_data['success']}")
+        logger.debug("📂 Browse response - %d products for category '%s' (mobile=%s)", len(filtered_products), category, is_mobile)
         
         return jsonify(response_data)
         
     except Exception as e:
-        logger.error(f"❌ Browse API error: {str(e)}")
+        logger.error("❌ Browse API error: %s", e)
         return jsonify({
             "success": False,
             "error": str(e),
@@ -1393,6 +1413,8 @@ def test_order_notification():
         logger.error(f"Error in test_order_notification: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+startup.mark("blueprints + app-level routes")
+
 PRODUCTS = [
     # Products with both COLOR and SIZE options
     {
@@ -2138,17 +2160,15 @@ PRODUCTS = [
         "category": "womens"
     }
 ]
+startup.mark("PRODUCTS catalog")
 
 def filter_products_by_category(category):
     """Filter products based on category selection"""
-    print(f"🔍 FILTER DEBUG: Received category: '{category}'")
     if not category or category == "all" or category == "all-products":
-        print(f"🔍 FILTER DEBUG: No category or 'all'/'all-products', returning all products")
         return PRODUCTS  # Show all products when category is 'all' or 'all-products'
     
     # Special handling for thumbnails category - Coming Soon
     if category == "thumbnails":
-        print(f"🔍 FILTER DEBUG: Thumbnails category selected - returning Coming Soon")
         return [{
             "name": "Coming Soon",
             "price": 0,
@@ -2234,18 +2254,8 @@ def filter_products_by_category(category):
     category_products = category_mappings.get(category, [])
     
     # Filter PRODUCTS list to only include products from this category
-    filtered_products = []
-    print(f"🔍 FILTER DEBUG: Looking for products in category '{category}' with {len(category_products)} product names")
-    print(f"🔍 FILTER DEBUG: Category products: {category_products}")
-    
-    for product in PRODUCTS:
-        if product["name"] in category_products:
-            print(f"✅ FILTER DEBUG: Found matching product: {product['name']}")
-            filtered_products.append(product)
-        else:
-            print(f"❌ FILTER DEBUG: Skipping product: {product['name']}")
-    
-    print(f"🔍 FILTER DEBUG: Returning {len(filtered_products)} filtered products out of {len(PRODUCTS)} total")
+    filtered_products = [product for product in PRODUCTS if product["name"] in category_products]
+    logger.debug("🔍 Category '%s': %d of %d products", category, len(filtered_products), len(PRODUCTS))
     return filtered_products
 
 # Register Products and Orders Blueprints now that PRODUCTS is defined
@@ -2266,26 +2276,103 @@ except Exception as e:
 def index():
     return "Flask Backend is Running!"
 
+STATIC_IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images')
+
+
+def _public_backend_base():
+    """Public https base URL of this backend, for absolute image URLs in API responses."""
+    try:
+        base = os.environ.get('BACKEND_PUBLIC_URL') or request.url_root or 'https://screenmerch.fly.dev'
+    except RuntimeError:  # outside a request
+        base = os.environ.get('BACKEND_PUBLIC_URL') or 'https://screenmerch.fly.dev'
+    base = base.rstrip('/')
+    if base.startswith('http://'):
+        base = 'https://' + base[7:]
+    return base
+
+
+def _static_image_srcset(image_base, filename):
+    if not filename:
+        return ''
+    try:
+        version = image_derivatives.fingerprint_file(os.path.join(STATIC_IMAGES_DIR, filename))
+    except OSError:
+        return ''
+    return image_derivatives.srcset(
+        lambda w: image_derivatives.static_derived_url(image_base, filename, w, version)
+    )
+
+
+def _allow_image_origin(response):
+    # Allow cross-origin so screenmerch.com can load images from this backend
+    origin = request.headers.get('Origin')
+    response.headers['Access-Control-Allow-Origin'] = origin or '*'
+    return response
+
+
+def _send_derivative(derivative, immutable):
+    response = send_file(derivative.path, mimetype=derivative.mimetype, conditional=True, etag=True)
+    response.headers['Cache-Control'] = image_derivatives.IMMUTABLE if immutable else 'no-cache'
+    response.headers['Vary'] = 'Accept'
+    response.headers['X-Image-Bytes-Saved'] = str(derivative.bytes_saved)
+    image_derivatives.log_saving(request.full_path, derivative)
+    return _allow_image_origin(response)
+
+
 @app.route("/static/images/<filename>")
 def serve_static_image(filename):
-    """Serve static images with proper headers and CORS for cross-origin img tags"""
+    """
+    Serve static images with proper headers and CORS for cross-origin img tags.
+    ?w=<px> serves a width-bucketed AVIF/WebP/JPEG copy instead (cached; immutable when ?v= matches).
+    """
     # Use __file__ so path is correct whether run from repo root or backend/
     clean_filename = filename.split('?')[0]
-    static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images')
-    response = send_from_directory(static_dir, clean_filename)
+    width = image_derivatives.bucket_width(request.args.get('w'))
+    if width:
+        source = os.path.join(STATIC_IMAGES_DIR, clean_filename)
+        if os.path.dirname(os.path.abspath(source)) == STATIC_IMAGES_DIR and os.path.isfile(source):
+            try:
+                version = image_derivatives.fingerprint_file(source)
+
+                def load():
+                    with open(source, 'rb') as f:
+                        return f.read()
+
+                derivative = image_derivatives.get_derivative(
+                    f"static:{clean_filename}", version, width, request.headers.get('Accept'), load
+                )
+                return _send_derivative(derivative, immutable=request.args.get('v') == version)
+            except Exception as e:
+                logger.warning("Image derivative for %s failed, serving original: %s", clean_filename, e)
+    response = send_from_directory(STATIC_IMAGES_DIR, clean_filename)
     
     # Add cache-busting headers for mobile compatibility
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
-    # Allow cross-origin so screenmerch.com can load images from this backend
-    origin = request.headers.get('Origin')
-    if origin:
-        response.headers['Access-Control-Allow-Origin'] = origin
-    else:
-        response.headers['Access-Control-Allow-Origin'] = '*'
-    
-    return response
+    return _allow_image_origin(response)
+
+
+@app.route("/images/derived")
+def serve_derived_image():
+    """
+    Width-bucketed copy of a Supabase Storage public image: ?src=<public object url>&w=<px>.
+    Rendered on first request and cached on disk; only this project's public Storage URLs are accepted.
+    """
+    src = (request.args.get('src') or '').strip()
+    width = image_derivatives.bucket_width(request.args.get('w'))
+    prefix = image_derivatives.storage_public_prefix(supabase_url)
+    if not width or not supabase_url or not src.startswith(prefix) or '..' in src[len(prefix):]:
+        return jsonify({"error": "src must be a public Storage URL and w a positive width"}), 400
+    try:
+        derivative = image_derivatives.get_derivative(
+            f"storage:{src}", image_derivatives.fingerprint_url(src), width,
+            request.headers.get('Accept'), lambda: image_derivatives.fetch_source(src),
+        )
+    except Exception as e:
+        logger.warning("Image derivative for %s failed, redirecting to original: %s", src, e)
+        return redirect(src, code=302)
+    return _send_derivative(derivative, immutable=True)
 
 @app.route("/test")
 def test_page():
@@ -4122,13 +4209,13 @@ def stripe_webhook():
                                     order_data["selected_screenshot"] = s
                                     logger.info(f"📸 [WEBHOOK] Set order selected_screenshot from cart item for email")
                                     break
-                    # Log order data to debug screenshot retrieval
-                    logger.info(f"📸 [WEBHOOK] Order data keys: {list(order_data.keys())}")
-                    logger.info(f"📸 [WEBHOOK] Order-level screenshot fields: selected_screenshot={bool(order_data.get('selected_screenshot'))}, thumbnail={bool(order_data.get('thumbnail'))}, screenshot={bool(order_data.get('screenshot'))}")
-                    logger.info(f"📸 [WEBHOOK] Cart has {len(cart)} items")
-                    if cart:
-                        logger.info(f"📸 [WEBHOOK] First cart item keys: {list(cart[0].keys()) if cart else 'No cart'}")
-                        logger.info(f"📸 [WEBHOOK] First cart item screenshot fields: selected_screenshot={bool(cart[0].get('selected_screenshot'))}, screenshot={bool(cart[0].get('screenshot'))}, img={bool(cart[0].get('img'))}, thumbnail={bool(cart[0].get('thumbnail'))}")
+                    logger.info(
+                        "📸 [WEBHOOK] Order %s: %d cart item(s), order-level screenshot=%s",
+                        order_id, len(cart),
+                        bool(order_data.get('selected_screenshot') or order_data.get('thumbnail') or order_data.get('screenshot')),
+                    )
+                    if cart and isinstance(cart[0], dict) and logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("📸 [WEBHOOK] First cart item keys: %s", sorted(cart[0]))
                 else:
                     # Fallback to in-memory store
                     order_data = order_store[order_id]
@@ -4683,51 +4770,24 @@ def _creator_id_from_request_subdomain():
 
 # /api/videos: only the videos blueprint (routes/videos.py) must handle this. Do not add @app.route("/api/videos") here or CORS from screenmerch.com will fail.
 
-def _is_staff_or_excluded_creator(row):
-    """Staff/admin and platform test identities — not soft-launch public seats."""
-    if row.get("is_admin"):
-        return True
-    admin_role = (row.get("admin_role") or "").strip().lower()
-    if admin_role in ("master_admin", "admin", "order_processing_admin"):
-        return True
-    email = (row.get("email") or "").strip().lower()
-    username = (row.get("username") or "").strip().lower()
-    if email in ("alancraigdigital@gmail.com",) or username in ("alancraigdigital", "screenmerch"):
-        return True
-    return False
+_is_staff_or_excluded_creator = storefront_cache.is_staff_or_excluded_creator
+
+
+def _storefront_client():
+    return supabase_admin if supabase_admin else supabase
 
 
 @app.route("/api/creators/list", methods=["GET", "OPTIONS"])
 @cross_origin(origins=[], supports_credentials=True)
 def creators_list():
-    """List ScreenMerch creators for sidebar (main + subdomains). Public, no auth. Uses service role so list is same everywhere."""
+    """List ScreenMerch creators for sidebar (main + subdomains). Public, no auth. Served from the
+    storefront cache (utils/storefront_cache.py), built with the service role so the list is the same everywhere."""
     if request.method == "OPTIONS":
         return jsonify(success=True)
-    try:
-        client = supabase_admin if supabase_admin else supabase
-        if not client:
-            return jsonify({"success": False, "error": "Database unavailable", "creators": []}), 503
-        r = client.table("users").select(
-            "id, username, display_name, profile_image_url, subdomain, is_admin, admin_role, email"
-        ).eq("role", "creator").eq("status", "active").order("created_at", desc=True).limit(50).execute()
-        creators = []
-        for row in (r.data or []):
-            if _is_staff_or_excluded_creator(row):
-                continue
-            subdomain = (row.get("subdomain") or "").strip()
-            creators.append({
-                "id": row.get("id"),
-                "username": row.get("username") or "",
-                "name": (row.get("display_name") or row.get("username") or "Creator").strip() or "Creator",
-                "avatar": row.get("profile_image_url"),
-                "subdomain": subdomain,
-            })
-            if len(creators) >= 20:
-                break
-        return jsonify({"success": True, "creators": creators}), 200
-    except Exception as e:
-        logger.error(f"Error listing creators for sidebar: {e}")
-        return jsonify({"success": False, "error": str(e), "creators": []}), 500
+    response = storefront_cache.serve("creators_list", _storefront_client)
+    if response is None:
+        return jsonify({"success": False, "error": "Database unavailable", "creators": []}), 503
+    return response
 
 
 @app.route("/api/creators/soft-launch-spots", methods=["GET", "OPTIONS"])
@@ -4735,57 +4795,22 @@ def creators_list():
 def soft_launch_spots():
     """Public soft-launch seat count for homepage counter + taken reserve cards.
     Counts role=creator with status active or pending (same as signup limit), excluding staff/test accounts.
+    Served from the storefront cache (utils/storefront_cache.py).
     """
     if request.method == "OPTIONS":
         return jsonify(success=True)
-    TOTAL = 20
-    try:
-        client = supabase_admin if supabase_admin else supabase
-        if not client:
-            return jsonify({
-                "success": False,
-                "error": "Database unavailable",
-                "total": TOTAL,
-                "claimed": 0,
-                "available": TOTAL,
-                "taken_slots": [],
-            }), 503
-        r = client.table("users").select(
-            "id, username, display_name, subdomain, is_admin, admin_role, email, status, created_at"
-        ).eq("role", "creator").in_("status", ["active", "pending"]).order("created_at", desc=False).limit(100).execute()
-        taken_slots = []
-        for row in (r.data or []):
-            if _is_staff_or_excluded_creator(row):
-                continue
-            spot = len(taken_slots) + 1
-            if spot > TOTAL:
-                break
-            taken_slots.append({
-                "spot": spot,
-                "label": f"Store {spot}",
-                "status": row.get("status") or "pending",
-                "name": (row.get("display_name") or row.get("username") or "").strip(),
-                "subdomain": (row.get("subdomain") or "").strip(),
-            })
-        claimed = len(taken_slots)
-        available = max(0, TOTAL - claimed)
-        return jsonify({
-            "success": True,
-            "total": TOTAL,
-            "claimed": claimed,
-            "available": available,
-            "taken_slots": taken_slots,
-        }), 200
-    except Exception as e:
-        logger.error(f"Error listing soft-launch spots: {e}")
+    response = storefront_cache.serve("soft_launch_spots", _storefront_client)
+    if response is None:
+        total = storefront_cache.SOFT_LAUNCH_TOTAL
         return jsonify({
             "success": False,
-            "error": str(e),
-            "total": TOTAL,
+            "error": "Database unavailable",
+            "total": total,
             "claimed": 0,
-            "available": TOTAL,
+            "available": total,
             "taken_slots": [],
-        }), 500
+        }), 503
+    return response
 
 
 @app.route("/api/users/by-username/<username>", methods=["GET", "OPTIONS"])
@@ -5339,22 +5364,18 @@ def get_order_screenshot(order_id):
             logger.info(f"✅ Retrieved order {order_id} from in-memory store (screenshot available)")
         # Else load from database
         if not order_data:
-            result = supabase.table('orders').select('*').eq('order_id', order_id).execute()
-            if not result.data:
-                alt_result = supabase.table('orders').select('*').eq('id', order_id).execute()
-                if alt_result.data:
-                    result = alt_result
-                else:
-                    alt2_result = supabase.table('orders').select('*').eq('order_number', order_id).execute()
-                    if alt2_result.data:
-                        result = alt2_result
-            if not result.data:
+            # Public route: literal order_id / uuid / order_number only, never the suffix forms,
+            # so a short fragment cannot pull someone else's screenshot. Full row: the screenshot
+            # may sit in any column, see the deep scan below.
+            db_order, canonical_id = resolve_order(supabase, order_id, exact=True)
+            if not db_order:
                 response = jsonify({
                     "success": False,
                     "error": "Order not found"
                 })
                 return response, 404
-            order_data = result.data[0]
+            order_data = db_order
+            order_id = canonical_id or order_id
             from_db = True
             logger.info(f"✅ Retrieved order {order_id} from database")
         # If we loaded from DB but order is also in order_store, merge screenshot from store (same instance may have it)
@@ -5830,6 +5851,7 @@ def update_user_profile(user_id):
         
         if result.data and len(result.data) > 0:
             logger.info(f"Successfully updated profile for user {user_id}")
+            storefront_cache.invalidate(_storefront_client())
             response = jsonify({"success": True, "user": result.data[0]})
             return response, 200
         else:
@@ -5850,6 +5872,7 @@ def update_user_profile(user_id):
             
             if result.data and len(result.data) > 0:
                 logger.info(f"Successfully created/updated profile for user {user_id}")
+                storefront_cache.invalidate(_storefront_client())
                 response = jsonify({"success": True, "user": result.data[0]})
                 return response, 200
             else:
@@ -6239,6 +6262,7 @@ def admin_update_user_role(user_id):
         result = client.table("users").update(update_data).eq("id", user_id).execute()
         if not result.data or len(result.data) == 0:
             return jsonify({"success": False, "error": "User not found"}), 404
+        storefront_cache.invalidate(_storefront_client())
         return jsonify({"success": True, "user": result.data[0]}), 200
     except Exception as e:
         logger.exception("admin_update_user_role: %s", e)
@@ -6330,6 +6354,7 @@ def admin_approve_creator(user_id):
             except Exception as email_err:
                 logger.error(f"Failed to send acceptance email: {email_err}")
 
+        storefront_cache.invalidate(_storefront_client())
         return jsonify({"success": True})
     except Exception as e:
         logger.error(f"Error approving creator: {str(e)}")
@@ -6462,6 +6487,7 @@ def admin_set_creator_pending():
             return jsonify({"success": False, "error": "User is not a creator. Only creators can be added to Pending Approval."}), 400
         client.table("users").update({"status": "pending", "updated_at": "now()"}).eq("id", user["id"]).execute()
         logger.info(f"Creator set to pending by admin: {email}")
+        storefront_cache.invalidate(_storefront_client())
         return jsonify({"success": True, "message": "Creator added to Pending Approval list"})
     except Exception as e:
         logger.error(f"set-creator-pending error: {str(e)}")
@@ -6511,6 +6537,7 @@ def admin_disapprove_creator(user_id):
             except Exception as email_err:
                 logger.error(f"Failed to send decline email: {email_err}")
 
+        storefront_cache.invalidate(_storefront_client())
         return jsonify({"success": True})
     except Exception as e:
         logger.error(f"Error disapproving creator: {str(e)}")
@@ -6534,6 +6561,7 @@ def delete_user_account(user_id):
         # Delete user's videos
         try:
             client_to_use.table('videos2').delete().eq('user_id', user_id).execute()
+            invalidate_video_cache(user_id)
             logger.info(f"✅ Deleted videos for user {user_id}")
         except Exception as e:
             logger.error(f"❌ Error deleting videos: {str(e)}")
@@ -6588,6 +6616,7 @@ def delete_user_account(user_id):
             return jsonify({"success": False, "error": f"Failed to delete user profile: {str(e)}"}), 500
         
         logger.info(f"✅ Successfully deleted all data for user {user_id}")
+        storefront_cache.invalidate(_storefront_client())
         return jsonify({"success": True, "message": "Account deleted successfully"})
         
     except Exception as e:
@@ -7042,43 +7071,57 @@ def get_subdomain_creator(subdomain):
 # Creator logo upload - uses service role to bypass Storage RLS (works for Google OAuth users)
 CREATOR_LOGOS_BUCKET = "creator-logos"
 MAX_LOGO_SIZE = 2 * 1024 * 1024  # 2MB
+LOGO_EXTENSIONS = ("png", "jpg", "jpeg", "gif", "webp", "svg")
 
 @app.route("/api/upload-creator-logo", methods=["POST", "OPTIONS"])
 def upload_creator_logo():
     """
     Upload a logo image to the creator-logos bucket using service role.
     Frontend sends multipart form: file (image), user_id (UUID of the creator).
+    After a direct upload (/api/uploads/sign) it sends storage_path + upload_ticket instead of file,
+    with the same email + session_token the signing call needed.
     Returns { "success": True, "url": "https://..." } or error.
     """
     if request.method == "OPTIONS":
         return jsonify(success=True)
+    if uploads.request_too_large(request, MAX_LOGO_SIZE):
+        return jsonify({"success": False, "error": "Logo must be under 2MB"}), 413
     try:
         if not supabase_admin:
             return jsonify({"success": False, "error": "Server upload not configured (missing service role)"}), 503
         user_id = request.form.get("user_id", "").strip()
         if not user_id:
             return jsonify({"success": False, "error": "user_id is required"}), 400
+        storage_path = (request.form.get("storage_path") or "").strip()
+        if storage_path:
+            # Direct uploads are signed under the signed-in user's id (see sign_direct_upload).
+            owner_id, err = _authenticate_upload_user()
+            if err is not None:
+                return err[0], err[1]
+            if not storage_path.startswith(f"{owner_id}/"):
+                return jsonify({"success": False, "error": "Upload does not belong to this user"}), 400
+            claim_err = uploads.claim_direct_upload(
+                supabase_admin.storage, CREATOR_LOGOS_BUCKET, storage_path,
+                request.form.get("upload_ticket"), MAX_LOGO_SIZE, app.secret_key,
+            )
+            if claim_err:
+                return jsonify({"success": False, "error": claim_err}), 400
+            public_url = uploads.public_object_url(supabase_url, CREATOR_LOGOS_BUCKET, storage_path)
+            return jsonify({"success": True, "url": public_url}), 200
         file = request.files.get("file")
         if not file or file.filename == "":
             return jsonify({"success": False, "error": "No file provided"}), 400
         if not file.content_type or not file.content_type.startswith("image/"):
             return jsonify({"success": False, "error": "File must be an image (PNG, JPG, etc.)"}), 400
-        file.seek(0, 2)
-        size = file.tell()
-        file.seek(0)
-        if size > MAX_LOGO_SIZE:
-            return jsonify({"success": False, "error": "Logo must be under 2MB"}), 400
-        ext = (file.filename.split(".")[-1] or "png").lower().replace(" ", "")[:10]
-        if ext not in ("png", "jpg", "jpeg", "gif", "webp", "svg"):
-            ext = "png"
+        ext = uploads.image_extension(file.filename, LOGO_EXTENSIONS)
         path = f"{user_id}/logo-{int(time.time() * 1000)}.{ext}"
-        file_bytes = file.read()
         try:
-            supabase_admin.storage.from_(CREATOR_LOGOS_BUCKET).upload(
-                path=path,
-                file=file_bytes,
-                file_options={"content-type": file.content_type or "image/png", "upsert": "true"}
+            uploads.upload_stream(
+                supabase_admin.storage, CREATOR_LOGOS_BUCKET, path, file.stream,
+                file.content_type, MAX_LOGO_SIZE, upsert=True,
             )
+        except uploads.UploadTooLarge:
+            return jsonify({"success": False, "error": "Logo must be under 2MB"}), 400
         except Exception as upload_err:
             logger.error("Upload creator logo error: %s", upload_err)
             if "Bucket not found" in str(upload_err) or "not found" in str(upload_err).lower():
@@ -7087,7 +7130,7 @@ def upload_creator_logo():
                     "error": "Bucket 'creator-logos' not found. Create a public bucket named 'creator-logos' in Supabase Storage."
                 }), 400
             return jsonify({"success": False, "error": str(upload_err)}), 500
-        public_url = f"{supabase_url.rstrip('/')}/storage/v1/object/public/{CREATOR_LOGOS_BUCKET}/{path}"
+        public_url = uploads.public_object_url(supabase_url, CREATOR_LOGOS_BUCKET, path)
         return jsonify({"success": True, "url": public_url}), 200
     except Exception as e:
         logger.exception("upload_creator_logo: %s", e)
@@ -7097,6 +7140,7 @@ def upload_creator_logo():
 # Favorite image upload - uses service role so Google OAuth users (no Supabase session) can upload
 FAVORITES_BUCKET = "thumbnails"
 MAX_FAVORITE_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
+FAVORITE_EXTENSIONS = ("png", "jpg", "jpeg", "gif", "webp")
 
 
 def _validate_favorites_session():
@@ -7110,14 +7154,80 @@ def _validate_favorites_session():
     return user_id, None
 
 
+def _schedule_favorite_variants(path, favorite_id):
+    """
+    Write WebP variants in the background, then point the favorite's thumbnail_url at the 320px one.
+    The job reads the stored object itself, so no upload bytes are held by the request thread.
+    """
+    if not favorite_id:
+        return
+
+    def on_done(variant_paths):
+        thumb = variant_paths.get(min(variant_paths))
+        supabase_admin.table("creator_favorites").update(
+            {"thumbnail_url": uploads.public_object_url(supabase_url, FAVORITES_BUCKET, thumb)}
+        ).eq("id", favorite_id).execute()
+
+    uploads.schedule_variants(supabase_admin.storage, FAVORITES_BUCKET, path, on_done=on_done)
+
+
+@app.route("/api/uploads/sign", methods=["POST", "OPTIONS"])
+def sign_direct_upload():
+    """
+    Signed direct-to-Storage upload for kind=favorite or kind=logo. Both need session auth
+    (email + session_token, as /api/favorites/upload); objects go under the signed-in user's id.
+    Form: kind, filename, content_type, size. The browser uploads with the returned
+    signed_url/token, then posts storage_path + upload_ticket to the matching upload route.
+    The creator-logos bucket enforces its own size/type limits (sql/upload_bucket_limits.sql).
+    """
+    if request.method == "OPTIONS":
+        return jsonify(success=True)
+    try:
+        if not supabase_admin:
+            return jsonify({"success": False, "error": "Server upload not configured"}), 503
+        kind = (request.form.get("kind") or "").strip()
+        content_type = (request.form.get("content_type") or "").strip()
+        if not content_type.startswith("image/"):
+            return jsonify({"success": False, "error": "File must be an image"}), 400
+        try:
+            size = int(request.form.get("size") or 0)
+        except ValueError:
+            size = 0
+        if kind not in ("favorite", "logo"):
+            return jsonify({"success": False, "error": "kind must be 'favorite' or 'logo'"}), 400
+        user_id, err = _authenticate_upload_user()
+        if err is not None:
+            return err[0], err[1]
+        stamp = f"{int(time.time() * 1000)}-{secrets.token_hex(4)}"
+        if kind == "favorite":
+            bucket, max_bytes, too_big = FAVORITES_BUCKET, MAX_FAVORITE_IMAGE_SIZE, "Image must be under 5MB"
+            ext = uploads.image_extension(request.form.get("filename"), FAVORITE_EXTENSIONS)
+            path = f"{user_id}/favorites/incoming/{stamp}.{ext}"
+        else:
+            bucket, max_bytes, too_big = CREATOR_LOGOS_BUCKET, MAX_LOGO_SIZE, "Logo must be under 2MB"
+            ext = uploads.image_extension(request.form.get("filename"), LOGO_EXTENSIONS)
+            path = f"{user_id}/logo-{stamp}.{ext}"
+        if size <= 0 or size > max_bytes:
+            return jsonify({"success": False, "error": too_big}), 400
+        signed = uploads.sign_direct_upload(supabase_admin.storage, bucket, path, max_bytes, app.secret_key)
+        return jsonify({"success": True, **signed}), 200
+    except Exception as e:
+        logger.exception("sign_direct_upload: %s", e)
+        return jsonify({"success": False, "error": "Could not start upload"}), 500
+
+
 @app.route("/api/favorites/upload", methods=["POST", "OPTIONS"])
 def upload_favorite():
     """
     Upload a favorite image and create creator_favorites row. Uses service role so Google OAuth users work.
     Form: file (image), user_id, title, description (optional), channel_title (optional).
+    After a direct upload (/api/uploads/sign) send storage_path + upload_ticket instead of file.
+    thumbnail_url is switched to a 320px WebP once the background variants are written.
     """
     if request.method == "OPTIONS":
         return jsonify(success=True)
+    if uploads.request_too_large(request, MAX_FAVORITE_IMAGE_SIZE):
+        return jsonify({"success": False, "error": "Image must be under 5MB"}), 413
     try:
         session_user_id = (
             (request.headers.get("X-User-Id") or "").strip()
@@ -7235,33 +7345,42 @@ def upload_favorite():
         title = (request.form.get("title") or "").strip()
         if not title:
             return jsonify({"success": False, "error": "title is required"}), 400
+        storage_path = (request.form.get("storage_path") or "").strip()
         file = request.files.get("file")
-        if not file or file.filename == "":
-            return jsonify({"success": False, "error": "No file provided"}), 400
-        if not file.content_type or not file.content_type.startswith("image/"):
-            return jsonify({"success": False, "error": "File must be an image"}), 400
-        file.seek(0, 2)
-        size = file.tell()
-        file.seek(0)
-        if size > MAX_FAVORITE_IMAGE_SIZE:
-            return jsonify({"success": False, "error": "Image must be under 5MB"}), 400
+        if storage_path:
+            claim_err = uploads.claim_direct_upload(
+                supabase_admin.storage, FAVORITES_BUCKET, storage_path,
+                request.form.get("upload_ticket"), MAX_FAVORITE_IMAGE_SIZE, app.secret_key,
+            )
+            if claim_err:
+                return jsonify({"success": False, "error": claim_err}), 400
+        else:
+            if not file or file.filename == "":
+                return jsonify({"success": False, "error": "No file provided"}), 400
+            if not file.content_type or not file.content_type.startswith("image/"):
+                return jsonify({"success": False, "error": "File must be an image"}), 400
         description = (request.form.get("description") or "").strip() or None
         channel_title = (request.form.get("channel_title") or "").strip()
         if not channel_title:
             channel_title = (
                 fav_user.get("display_name") or fav_user.get("username") or "Unknown"
             )
-        ext = (file.filename.split(".")[-1] or "png").lower().replace(" ", "")[:10]
-        if ext not in ("png", "jpg", "jpeg", "gif", "webp"):
-            ext = "png"
-        path = f"{favorite_user_id}/favorites/{int(time.time() * 1000)}.{ext}"
-        file_bytes = file.read()
-        supabase_admin.storage.from_(FAVORITES_BUCKET).upload(
-            path=path,
-            file=file_bytes,
-            file_options={"content-type": file.content_type or "image/png", "upsert": "false"}
-        )
-        public_url = f"{supabase_url.rstrip('/')}/storage/v1/object/public/{FAVORITES_BUCKET}/{path}"
+        if storage_path:
+            # Direct uploads land under the uploader's folder; file them with the favorite page owner.
+            ext = uploads.image_extension(storage_path, FAVORITE_EXTENSIONS)
+            path = f"{favorite_user_id}/favorites/{int(time.time() * 1000)}.{ext}"
+            supabase_admin.storage.from_(FAVORITES_BUCKET).move(storage_path, path)
+        else:
+            ext = uploads.image_extension(file.filename, FAVORITE_EXTENSIONS)
+            path = f"{favorite_user_id}/favorites/{int(time.time() * 1000)}.{ext}"
+            try:
+                uploads.upload_stream(
+                    supabase_admin.storage, FAVORITES_BUCKET, path, file.stream,
+                    file.content_type, MAX_FAVORITE_IMAGE_SIZE,
+                )
+            except uploads.UploadTooLarge:
+                return jsonify({"success": False, "error": "Image must be under 5MB"}), 400
+        public_url = uploads.public_object_url(supabase_url, FAVORITES_BUCKET, path)
         insert_data = {
             "user_id": favorite_user_id,
             "channelTitle": channel_title,
@@ -7286,6 +7405,7 @@ def upload_favorite():
                 raise
         if not result.data or len(result.data) == 0:
             return jsonify({"success": False, "error": "Failed to save favorite"}), 500
+        _schedule_favorite_variants(path, result.data[0].get("id"))
         payload = {
             "success": True,
             "favorite": result.data[0],
@@ -8481,9 +8601,8 @@ def _umbrella_json_with_session(user, redirect_url=None, session_token=None):
     """JSON login response with sm_session cookie (umbrella email/password flows)."""
     token = (session_token or str(uuid.uuid4())).strip()
     user_id = str(user.get("id"))
-    store = app.config.get("session_token_store") or {}
+    store = _session_token_store()
     store[token] = user_id
-    app.config["session_token_store"] = store
     _persist_session_token(token, user_id)
     payload = {
         "success": True,
@@ -9056,6 +9175,23 @@ def favorite_lists_delete():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _favorite_image_fields(fav, image_base):
+    """
+    Give a favorite a real thumbnail_url (it used to equal the full-size image_url) and an
+    image_srcset of resized copies, both served by /images/derived.
+    """
+    image = (fav.get("image_url") or fav.get("thumbnail_url") or "").strip()
+    if not image or not image.startswith(image_derivatives.storage_public_prefix(supabase_url)):
+        return fav
+    thumb = (fav.get("thumbnail_url") or "").strip()
+    if not thumb or thumb == image:
+        fav["thumbnail_url"] = image_derivatives.derived_url(image_base, image, 320)
+    fav["image_srcset"] = image_derivatives.srcset(
+        lambda w: image_derivatives.derived_url(image_base, image, w)
+    )
+    return fav
+
+
 @app.route("/api/public/favorite-lists", methods=["GET", "OPTIONS"])
 def public_favorite_lists():
     if request.method == "OPTIONS":
@@ -9088,6 +9224,7 @@ def public_favorite_lists():
             )
             lists = lr.data or []
         lists.sort(key=lambda L: (0 if L.get("is_primary") else 1, L.get("sort_order") or 0, (L.get("display_name") or "").lower()))
+        image_base = _public_backend_base()
         safe_lists = []
         for L in lists:
             dn = (L.get("display_name") or L.get("slug") or "Favorites").strip()
@@ -9123,7 +9260,8 @@ def public_favorite_lists():
                     .execute()
                 )
                 for fav in fr.data or []:
-                    img = (fav.get("image_url") or fav.get("thumbnail_url") or "").strip()
+                    fav = _favorite_image_fields(fav, image_base)
+                    img = (fav.get("thumbnail_url") or fav.get("image_url") or "").strip()
                     if img and img not in preview_images:
                         preview_images.append(img)
             except Exception as preview_err:
@@ -9183,7 +9321,9 @@ def public_favorites_by_list():
             .order("created_at", desc=True)
             .execute()
         )
-        return jsonify({"success": True, "list": row, "favorites": fr.data or []}), 200
+        image_base = _public_backend_base()
+        favorites = [_favorite_image_fields(fav, image_base) for fav in fr.data or []]
+        return jsonify({"success": True, "list": row, "favorites": favorites}), 200
     except Exception as e:
         logger.exception("public_favorites_by_list: %s", e)
         return jsonify({"success": False, "error": str(e)}), 500
@@ -9843,9 +9983,7 @@ def _umbrella_page_orders_for_analytics(list_id, owner_id):
         seen_keys.add(fp)
         all_orders.append(order)
 
-    for order_id, order_data in order_store.items():
-        if str(order_data.get("favorite_list_id") or "") != list_id_str:
-            continue
+    for order_id, order_data in order_store.find(favorite_list_id=list_id_str):
         cart = order_data.get("cart") or []
         first_product = (cart[0].get("product") if cart and isinstance(cart[0], dict) else "") or ""
         total_value = order_data.get("total_value")
@@ -10752,32 +10890,22 @@ def get_analytics():
                 )
                 seen_keys.add(fp)
                 all_orders.append(order_data)
-                logger.info(
-                    f"✅ Added sale to analytics: {sale.get('product_name')} - ${sale.get('amount')} - created_at: {sale.get('created_at')}"
-                )
         except Exception as db_error:
             logger.error(f"Database error loading analytics: {str(db_error)}")
         
-        # In-memory checkouts not yet persisted (skip if fingerprint already in sales)
-        for order_id, order_data in order_store.items():
-            if user_id:
-                order_uid = str(order_data.get('user_id') or '')
-                if order_uid and order_uid != str(user_id):
-                    continue
-                if not order_uid:
-                    order_creator_name = order_data.get('creator_name', 'Unknown Creator')
-                    if order_creator_name != 'Unknown Creator':
-                        try:
-                            creator_match = supabase_admin.table('users').select('id').or_(
-                                f"display_name.ilike.{order_creator_name},username.ilike.{order_creator_name}"
-                            ).eq('id', user_id).limit(1).execute()
-                            if not creator_match.data or len(creator_match.data) == 0:
-                                continue
-                        except Exception:
-                            continue
-                    else:
-                        continue
-
+        # In-memory checkouts not yet persisted (skip if fingerprint already in sales): this creator's,
+        # plus ones without a user_id whose creator_name is the creator's display name or username.
+        store_orders = order_store.find(user_id=str(user_id))
+        try:
+            creator = supabase_admin.table('users').select('display_name,username').eq('id', user_id).limit(1).execute()
+            names = {str(creator.data[0].get(f) or '').strip().lower() for f in ('display_name', 'username')} if creator.data else set()
+            names.discard('')
+            names.discard('unknown creator')
+            if names:
+                store_orders += order_store.find(user_id='', creator_name=names)
+        except Exception as e:
+            logger.warning(f"Analytics creator name lookup failed: {str(e)}")
+        for order_id, order_data in store_orders:
             cart = order_data.get('cart') or []
             first_product = (cart[0].get('product') if cart and isinstance(cart[0], dict) else '') or ''
             total_value = order_data.get('total_value')
@@ -10807,9 +10935,8 @@ def get_analytics():
         total_revenue = sum(order.get('total_value', 0) for order in all_orders)
         avg_order_value = total_revenue / total_sales if total_sales > 0 else 0
         
-        logger.info(f"📈 Analytics calculated: {total_sales} sales, ${total_revenue} revenue")
-        logger.info(f"🔍 Debug: all_orders length = {len(all_orders)}")
-        logger.info(f"🔍 Debug: order_store length = {len(order_store)}")
+        logger.info("📈 Analytics calculated: %d sales (%d from sales table), $%s revenue",
+                    total_sales, len(sales_rows), total_revenue)
         
         # Get unique products sold
         products_sold = {}
@@ -10962,17 +11089,12 @@ def public_order_detail(order_id):
     """Public order link from email — redirect to Print Quality page (no login, order tools)."""
     try:
         # Try to confirm order exists so we can redirect; if not found, still send to print-quality so user can try Load Screenshot
+        # (exact keys only: this is public, and the redirect would reveal the canonical order id)
         order_data = order_store.get(order_id)
         if not order_data:
-            try:
-                db_result = supabase.table('orders').select('order_id').eq('order_id', order_id).limit(1).execute()
-                if not db_result.data:
-                    db_result = supabase.table('orders').select('order_id').eq('order_number', order_id).limit(1).execute()
-                if not db_result.data and order_id.replace('-', '').isdigit():
-                    alt = order_id.replace('ORD-', '')
-                    db_result = supabase.table('orders').select('order_id').ilike('order_id', f'%{alt}%').limit(1).execute()
-            except Exception as db_error:
-                logger.warning(f"Order lookup for {order_id}: {db_error}")
+            _row, canonical_id = resolve_order(supabase, order_id, columns="order_id", exact=True)
+            if canonical_id:
+                order_id = canonical_id
         # Always redirect to print-quality so "View Order Details" in email works (no login)
         print_quality_url = url_for('print_quality_page', order_id=order_id, _external=True)
         if not print_quality_url.startswith('http'):
@@ -11028,56 +11150,24 @@ def admin_processing_queue():
         return response
     
     try:
-        status = request.args.get('status', 'all')
-        
+        filters = processing_queue.parse_filters(request.args)
+    except processing_queue.QueueFilterError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
         # Use admin client to bypass RLS
         client = supabase_admin if supabase_admin else supabase
-        
-        # Query queue items - handle foreign key relationships carefully
-        query = client.table('order_processing_queue').select('*').order('priority', desc=True).order('created_at')
-        
-        if status != 'all':
-            query = query.eq('status', status)
-        
-        result = query.execute()
-        
-        # Enrich queue items with order data and user data
-        enriched_data = []
-        for queue_item in (result.data or []):
-            enriched_item = dict(queue_item)
-            
-            # Get order data
-            try:
-                order_id = queue_item.get('order_id')
-                if order_id:
-                    order_result = client.table('orders').select('*').eq('order_id', order_id).execute()
-                    if order_result.data:
-                        enriched_item['orders'] = order_result.data[0]
-            except Exception as e:
-                logger.warning(f"Could not fetch order for queue item {queue_item.get('id')}: {str(e)}")
-            
-            # Get assigned user data
-            try:
-                assigned_to = queue_item.get('assigned_to')
-                if assigned_to:
-                    user_result = client.table('users').select('id, display_name, email').eq('id', assigned_to).execute()
-                    if user_result.data:
-                        enriched_item['assigned_to_user'] = user_result.data[0]
-            except Exception as e:
-                logger.warning(f"Could not fetch user for queue item {queue_item.get('id')}: {str(e)}")
-            
-            enriched_data.append(enriched_item)
-        
-        response = jsonify({
+        rows, total = processing_queue.fetch_queue_page(client, filters)
+        return jsonify({
             "success": True,
-            "data": enriched_data
+            "data": rows,
+            "total": total,
+            "page": filters["page"],
+            "limit": filters["limit"],
         })
-        origin = request.headers.get('Origin', '*')
-        return response
     except Exception as e:
         logger.error(f"❌ [ADMIN] Error fetching processing queue: {str(e)}")
         response = jsonify({"success": False, "error": str(e)})
-        origin = request.headers.get('Origin', '*')
         return response, 500
 
 @app.route("/api/admin/processing-history", methods=["GET", "OPTIONS"])
@@ -11811,6 +11901,7 @@ def register_pending_creator():
             if row.get("role") == "creator" and row.get("status") != "pending":
                 client.table("users").update({"status": "pending", "updated_at": "now()"}).eq("id", row["id"]).execute()
                 logger.info(f"✅ [REGISTER-PENDING] Updated existing creator to pending: {email}")
+                storefront_cache.invalidate(_storefront_client())
             return jsonify({"success": True, "message": "Already registered or updated"})
         new_user = {
             "id": str(uuid.uuid4()),
@@ -11822,6 +11913,7 @@ def register_pending_creator():
         }
         client.table("users").insert(new_user).execute()
         logger.info(f"✅ [REGISTER-PENDING] Recorded pending creator (will be updated after Google): {email}")
+        storefront_cache.invalidate(_storefront_client())
         return jsonify({"success": True, "message": "Registered for approval"})
     except Exception as e:
         logger.error(f"register-pending-creator error: {e}")
@@ -11913,6 +12005,21 @@ def google_login():
         logger.error(f"Google OAuth login error: {str(e)}")
         return jsonify({"success": False, "error": "Failed to initiate Google login"}), 500
 
+def _write_oauth_user_update(user, update_data):
+    """Apply the sign-in's accumulated users-row changes in one UPDATE; merges the returned row into ``user``."""
+    if not update_data:
+        return user
+    update_client = supabase_admin if supabase_admin else supabase
+    try:
+        update_result = update_client.table('users').update(update_data).eq('id', user['id']).execute()
+        if update_result.data:
+            user.update(update_result.data[0])
+        logger.info(f"✅ [GOOGLE OAUTH] Updated user {user.get('id')}: {sorted(update_data)}")
+    except Exception as e:
+        logger.warning(f"⚠️ [GOOGLE OAUTH] Could not update user {user.get('id')} ({sorted(update_data)}): {e}")
+    update_data.clear()
+    return user
+
 @app.route("/api/auth/google/callback", methods=["GET", "OPTIONS"])
 def google_callback():
     """Handle Google OAuth callback.
@@ -11926,11 +12033,16 @@ def google_callback():
     - If user EXISTS and flow=creator_signup: set status to pending when status was null/empty,
       or when status is 'active' but user was created in the last 24 hours (e.g. created by
       another flow with default active). Ensures they show in Pending Approval.
+
+    Changes to an existing users row (profile, status, subdomain) are collected in
+    ``user_update`` and written once by ``_write_oauth_user_update`` before redirecting.
     """
     if request.method == "OPTIONS":
         # Flask-CORS handles OPTIONS requests automatically
         return jsonify(success=True)
     
+    timer = PhaseTimer()
+    user_update = {}
     try:
         # Get authorization code from callback
         code = request.args.get('code')
@@ -11989,19 +12101,13 @@ def google_callback():
         flow.redirect_uri = GOOGLE_REDIRECT_URI
         
         # Exchange code for tokens
-        flow.fetch_token(code=code)
+        with timer.phase("token_exchange"):
+            flow.fetch_token(code=code)
         credentials = flow.credentials
         
-        # Get user info from Google
-        service = build('oauth2', 'v2', credentials=credentials)
-        user_info = service.userinfo().get().execute()
-        
-        # Get YouTube channel info
-        youtube_service = build('youtube', 'v3', credentials=credentials)
-        channel_response = youtube_service.channels().list(
-            part='snippet,statistics',
-            mine=True
-        ).execute()
+        # Google profile + YouTube channel, fetched concurrently with the process-wide discovery clients
+        with timer.phase("google_profile"):
+            user_info, channel_response = fetch_google_profile(credentials)
         
         google_email_raw = user_info.get('email')
         google_email = (google_email_raw or '').strip().lower()
@@ -12009,11 +12115,9 @@ def google_callback():
         google_id = user_info.get('id')
         google_picture = user_info.get('picture')
         
-        # So we can see in Fly logs that the callback ran and for which email
-        logger.info(f"🔍 [GOOGLE OAUTH CALLBACK] Processing sign-in for email: {google_email} (supabase_admin={'SET' if supabase_admin else 'NOT SET'})")
-        # Debug: Log the user_info to see what Google is returning
-        logger.info(f"🔍 Google user_info: {user_info}")
-        logger.info(f"🔍 Google picture URL: {google_picture}")
+        # So we can see in Fly logs that the callback ran and for which email (never the full profile)
+        logger.info("🔍 [GOOGLE OAUTH CALLBACK] Processing sign-in for email: %s (supabase_admin=%s, picture=%s)",
+                    google_email, 'SET' if supabase_admin else 'NOT SET', bool(google_picture))
         
         # Check if user exists in database - use admin client to bypass RLS
         # Normalize email to lowercase so we never create duplicates (same email, different case)
@@ -12022,7 +12126,8 @@ def google_callback():
             raise Exception("Supabase client not initialized")
         
         logger.info(f"🔍 [GOOGLE OAUTH] Checking if user exists (normalized): {google_email}")
-        result = lookup_client.table('users').select('*').eq('email', google_email).execute()
+        with timer.phase("user_lookup"):
+            result = lookup_client.table('users').select('*').eq('email', google_email).execute()
         if result.data:
             # User exists - do not create duplicate. Record only once in admin dashboard.
             user = result.data[0]
@@ -12047,23 +12152,21 @@ def google_callback():
                     except Exception:
                         pass
                 if current_status in (None, '') or (current_status == 'active' and is_recent):
-                    try:
-                        update_client = supabase_admin if supabase_admin else supabase
-                        update_client.table('users').update({
-                            'status': 'pending',
-                            'updated_at': 'now()',
-                            'role': user.get('role') or 'creator'  # ensure role is set for pending list
-                        }).eq('id', user['id']).execute()
-                        user_status = 'pending'
-                        user['status'] = 'pending'
-                        user['role'] = user.get('role') or 'creator'
-                        logger.info(f"✅ [GOOGLE OAUTH] Existing creator set to pending for Pending Approval list: {google_email} (status was {current_status!r}, recent={is_recent})")
-                    except Exception as e:
-                        logger.warning(f"Could not set existing creator to pending: {e}")
+                    user_update.update({
+                        'status': 'pending',
+                        'updated_at': 'now()',
+                        'role': user.get('role') or 'creator'  # ensure role is set for pending list
+                    })
+                    user_status = 'pending'
+                    user['status'] = 'pending'
+                    user['role'] = user.get('role') or 'creator'
+                    logger.info(f"✅ [GOOGLE OAUTH] Existing creator set to pending for Pending Approval list: {google_email} (status was {current_status!r}, recent={is_recent})")
             logger.info(f"🔍 [GOOGLE OAUTH] User already exists: {google_email} status={user_status} id={user.get('id')} (no new insert; they already count in dashboard)")
             
             # Pending creators: send to thank-you with existing_pending=1 so frontend shows "awaiting approval" popup
             if user_status == 'pending':
+                with timer.phase("user_write"):
+                    _write_oauth_user_update(user, user_update)
                 frontend_url = "https://screenmerch.com/creator-thank-you"
                 user_data = {
                     "id": user.get('id'),
@@ -12090,9 +12193,8 @@ def google_callback():
                 logger.warning(f"⚠️ Blocked login attempt for {user_status} user: {google_email}, redirecting to: {frontend_url}")
                 return redirect(redirect_url)
             
-            # User is active, update their Google info
-            # Use admin client to bypass RLS for updates
-            update_client = supabase_admin if supabase_admin else supabase
+            # User is active, update their Google info (written together with any later
+            # status/subdomain change, see _write_oauth_user_update)
             update_data = {
                 'display_name': google_name
             }
@@ -12110,12 +12212,8 @@ def google_callback():
                     logger.info(f"✅ [GOOGLE OAUTH] Preserving custom profile_image_url: {current_profile_image}")
             
             logger.info(f"✅ [GOOGLE OAUTH] Updating existing user: {google_email}")
-            update_result = update_client.table('users').update(update_data).eq('id', user['id']).execute()
-            
-            # Update the user object with the latest data from database
-            if update_result.data and len(update_result.data) > 0:
-                user = update_result.data[0]
-                logger.info(f"✅ [GOOGLE OAUTH] User updated, profile_image_url: {user.get('profile_image_url')}")
+            user_update.update(update_data)
+            user.update(update_data)
         else:
             # Create new user - Google OAuth users are treated as creators
             logger.info(f"📝 [GOOGLE OAUTH] New creator signup (email not in DB): {google_email} - will insert if SUPABASE_SERVICE_ROLE_KEY is set")
@@ -12159,7 +12257,8 @@ def google_callback():
             }
             user = None
             try:
-                result = supabase_admin.table('users').insert(new_user).execute()
+                with timer.phase("user_insert"):
+                    result = supabase_admin.table('users').insert(new_user).execute()
                 user = result.data[0] if result.data else None
                 if not user:
                     logger.error(f"❌ [OAUTH CREATOR SIGNUP] Insert returned no row for {google_email}. result.data={getattr(result, 'data', None)}")
@@ -12333,20 +12432,21 @@ def google_callback():
         
         # Umbrella invite: auto-approve membership and send to favorites dashboard on subdomain
         if flow_from_state == 'umbrella_invite' and invite_token_from_state:
-            ok, err, owner_sub = _umbrella_process_invite_token(invite_token_from_state, google_email, user)
+            with timer.phase("umbrella_invite"):
+                ok, err, owner_sub = _umbrella_process_invite_token(invite_token_from_state, google_email, user)
             if not ok:
+                with timer.phase("user_write"):
+                    _write_oauth_user_update(user, user_update)
                 err_base = frontend_origin_from_state or session.get('oauth_return_url') or "https://screenmerch.com"
                 if not err_base.startswith('http'):
                     err_base = f"https://{err_base}"
                 return redirect(f"{err_base}?login=error&message={quote(err or 'Invite could not be completed')}")
-            try:
-                supabase_admin.table('users').update(
-                    {'status': 'active', 'role': 'creator', 'updated_at': 'now()'}
-                ).eq('id', user.get('id')).execute()
+            if user.get('status') != 'active' or user.get('role') != 'creator':
+                user_update.update({'status': 'active', 'role': 'creator', 'updated_at': 'now()'})
                 user['status'] = 'active'
                 user['role'] = 'creator'
-            except Exception:
-                pass
+            with timer.phase("user_write"):
+                _write_oauth_user_update(user, user_update)
             user_data['status'] = 'active'
             user_data['role'] = 'creator'
             user_data_encoded = quote(json.dumps(user_data))
@@ -12365,6 +12465,8 @@ def google_callback():
             if user_email_check != (google_email or "").strip().lower():
                 logger.error(f"❌ [GOOGLE OAUTH CALLBACK] SECURITY: pending user email mismatch — authenticated={google_email!r} vs user={user_email_check!r}")
                 return redirect(f"https://screenmerch.com?login=error&message={quote('Authentication error. Please try again.')}")
+            with timer.phase("user_write"):
+                _write_oauth_user_update(user, user_update)
             thank_you_url = f"https://screenmerch.com/creator-thank-you?login=success&user={user_data_encoded}"
             logger.info(f"✅ [GOOGLE OAUTH CALLBACK] New creator signup → redirecting to thank-you page (screenmerch.com), skipping subdomain logic")
             return _oauth_redirect_with_session(thank_you_url, user.get('id'))
@@ -12437,23 +12539,13 @@ def google_callback():
             except Exception:
                 is_registered_owner = _cf_is_storefront_owner(user.get('id'), session_subdomain)
             if is_registered_owner and user_subdomain != session_subdomain:
-                try:
-                    update_client = supabase_admin if supabase_admin else supabase
-                    update_result = update_client.table('users').update({'subdomain': session_subdomain}).eq('id', user.get('id')).execute()
-                    if update_result.data:
-                        user['subdomain'] = session_subdomain  # Update local user object
-                        # Also update user_data to include the subdomain
-                        user_data['subdomain'] = session_subdomain
-                        # Re-encode user data with updated subdomain
-                        user_data_json = json.dumps(user_data)
-                        user_data_encoded = quote(user_data_json)
-                    logger.info(f"✅ [GOOGLE OAUTH CALLBACK] Updated user subdomain in database: {session_subdomain}")
-                except Exception as update_error:
-                    logger.warning(f"⚠️ [GOOGLE OAUTH CALLBACK] Failed to update user subdomain: {update_error}")
-                    # Still include subdomain in user_data even if DB update fails
-                    user_data['subdomain'] = session_subdomain
-                    user_data_json = json.dumps(user_data)
-                    user_data_encoded = quote(user_data_json)
+                # Written with the rest of the sign-in changes below
+                user_update['subdomain'] = session_subdomain
+                user['subdomain'] = session_subdomain
+                user_data['subdomain'] = session_subdomain
+                user_data_json = json.dumps(user_data)
+                user_data_encoded = quote(user_data_json)
+                logger.info(f"✅ [GOOGLE OAUTH CALLBACK] Updating user subdomain in database: {session_subdomain}")
         
         # PRIORITY 2: Use session return_url as-is if it's not the main domain (fallback if subdomain extraction failed)
         if not frontend_url_set:
@@ -12507,6 +12599,9 @@ def google_callback():
         if not frontend_url.startswith('http'):
             frontend_url = f"https://{frontend_url}" if not frontend_url.startswith('//') else f"https:{frontend_url}"
         
+        with timer.phase("user_write"):
+            _write_oauth_user_update(user, user_update)
+        
         # Construct redirect URL with login success and user data
         redirect_url = f"{frontend_url}?login=success&user={user_data_encoded}"
         
@@ -12528,6 +12623,8 @@ def google_callback():
         
         logger.info(f"⚠️ Redirecting to error page: {redirect_url}")
         return redirect(redirect_url)
+    finally:
+        logger.info(f"⏱️ [GOOGLE OAUTH CALLBACK] timing {timer.summary()}")
 
 # Register worker portal and secure processing routes
 if register_secure_processing_routes:
@@ -12544,6 +12641,14 @@ if register_worker_portal_routes:
     except Exception as e:
         logger.error(f"❌ Failed to register worker portal routes: {e}")
 
+startup.mark("remaining routes + worker portal")
+if startup.profile_requested():
+    logger.info("\n%s", startup.report(measure_deferred=__name__ == "__main__"))
+    if __name__ == "__main__":
+        sys.exit(0)
+else:
+    logger.info("App ready in %.2fs (python app.py --profile-startup for details)", startup.total_seconds())
+
 if __name__ == "__main__":
     import os
     port = int(os.environ.get("PORT", 5000))
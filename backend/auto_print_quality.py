@@ -8,7 +8,7 @@ It can be run manually or integrated into your workflow.
 
 Usage:
     python auto_print_quality.py --order-id ORDER_ID
-    python auto_print_quality.py --all-pending
+    python auto_print_quality.py --all-pending [--chunk-size 25] [--processes 4] [--checkpoint FILE]
 """
 
 import requests
@@ -162,19 +162,50 @@ def process_order(order_id):
     print(f"📋 Summary saved: {summary_path}")
     return True
 
-def process_all_pending_orders():
-    """Process all pending orders"""
+def process_all_pending_orders(chunk_size=25, processes=None, checkpoint_path=None, limit=None, bucket=None,
+                               worker_id=None):
+    """Render print files for every pending queue row in a local process pool (no HTTP round trips)"""
+    from dotenv import load_dotenv
+    from supabase import create_client
+    from services.fulfillment_batch import DEFAULT_BUCKET, BatchRunner, Checkpoint
+
+    load_dotenv()
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not supabase_url or not supabase_key:
+        print("❌ SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+        return None
+    worker_id = worker_id or os.getenv("FULFILLMENT_WORKER_ID")
+    if not worker_id:
+        print("❌ --worker-id (or FULFILLMENT_WORKER_ID) must be the users.id the queue rows are leased to")
+        return None
+
     print("🔄 Processing all pending orders...")
-    
-    # This would need to be implemented based on your order system
-    # For now, this is a placeholder
-    print("⚠️ Auto-processing all orders not yet implemented")
-    print("   Use --order-id to process specific orders")
+    runner = BatchRunner(
+        create_client(supabase_url, supabase_key),
+        supabase_url,
+        worker_id,
+        bucket=bucket or DEFAULT_BUCKET,
+        chunk_size=chunk_size,
+        processes=processes,
+        checkpoint=Checkpoint(checkpoint_path),
+    )
+    stats = runner.run(limit=limit)
+    print(f"✅ Completed {stats.completed} orders, ❌ failed {stats.failed}")
+    print(f"   Throughput: {stats.orders_per_minute:.1f} orders/min over {stats.elapsed:.1f}s")
+    print("   Stages: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in stats.seconds.items()))
+    return stats
 
 def main():
     parser = argparse.ArgumentParser(description='Generate print quality images for orders')
     parser.add_argument('--order-id', help='Process specific order ID')
     parser.add_argument('--all-pending', action='store_true', help='Process all pending orders')
+    parser.add_argument('--chunk-size', type=int, default=25, help='Queue rows fetched and claimed per round (--all-pending)')
+    parser.add_argument('--processes', type=int, default=None, help='Render processes (default: CPU count, 0 = in-process)')
+    parser.add_argument('--checkpoint', default='print_quality/batch_checkpoint.json', help='Progress file used to resume an interrupted run')
+    parser.add_argument('--limit', type=int, default=None, help='Stop after this many orders')
+    parser.add_argument('--bucket', default=None, help='Storage bucket for print files')
+    parser.add_argument('--worker-id', default=None, help='users.id that leases the queue rows (--all-pending; default: FULFILLMENT_WORKER_ID)')
     
     args = parser.parse_args()
     
@@ -185,7 +216,14 @@ def main():
         else:
             print("\n❌ Order processing failed")
     elif args.all_pending:
-        process_all_pending_orders()
+        process_all_pending_orders(
+            chunk_size=args.chunk_size,
+            processes=args.processes,
+            checkpoint_path=args.checkpoint,
+            limit=args.limit,
+            bucket=args.bucket,
+            worker_id=args.worker_id,
+        )
     else:
         print("❌ Please specify --order-id or --all-pending")
         print("Example: python auto_print_quality.py --order-id abc123")
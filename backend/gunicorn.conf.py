@@ -0,0 +1,67 @@
+"""
+Gunicorn settings for the Fly deployment (``gunicorn -c gunicorn.conf.py app:app``).
+
+Multi-worker mode is safe because per-request state that used to live in module dicts
+(order_store, product_data_store, session tokens, rate limits) is kept in utils/shared_store.py /
+utils/rate_limit.py, which every worker on the machine shares. Read-mostly lookup tables (PRODUCTS,
+the Printful catalog variant maps) stay plain module dicts: whatever the master loads before
+forking is shared copy-on-write, anything fetched later is cached per worker.
+
+Environment:
+  WEB_CONCURRENCY          worker processes (default: CPU count). CPU-heavy routes (OpenCV/PIL
+                           renders, bcrypt) scale with this, not with threads.
+  GUNICORN_THREADS         threads per worker for the gthread class (default 4)
+  GUNICORN_WORKER_CLASS    "gthread" (default) or "gevent". gevent suits I/O-bound traffic
+                           (Supabase/Printful/Stripe calls) but needs `pip install gevent` and
+                           gives no help to CPU-bound image work - keep gthread unless profiling
+                           shows workers idle on network waits.
+  GUNICORN_TIMEOUT         worker timeout in seconds (default 120, print renders are slow)
+  PRELOAD_WARM_IMPORTS=1   import the deferred OpenCV/PIL/Google modules in the master before
+                           forking so workers share those pages copy-on-write
+  PRELOAD_PRINTFUL_CATALOG=1  fetch the Printful catalog variant maps in the master before forking
+                           (needs PRINTFUL_API_KEY) instead of once per worker on first use
+  METRICS_TOKEN            bearer token for /metrics (utils/metrics.py); unset = no endpoint
+"""
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Import app.py once in the master; workers fork from it and share the loaded code and the
+# PRODUCTS table copy-on-write (plus the Printful catalog maps with PRELOAD_PRINTFUL_CATALOG=1).
+preload_app = True
+# Recycle workers slowly so any leak in the image pipeline can't grow unbounded.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = 200
+
+
+def when_ready(server):
+    if os.getenv("PRELOAD_WARM_IMPORTS") == "1":
+        import startup
+        try:
+            startup.warm()
+        except Exception as e:
+            server.log.warning("Warming deferred imports failed: %s", e)
+    if os.getenv("PRELOAD_PRINTFUL_CATALOG") == "1":
+        import printful_catalog
+        server.log.info("Preloaded %s Printful catalog maps", printful_catalog.warm_catalog_maps())
+    # Move everything imported so far out of the GC's generations: collections in the
+    # workers then don't touch (and un-share) those pages.
+    gc.freeze()
+    server.log.info("ScreenMerch ready: %s x %s worker(s), %s thread(s) each", workers, worker_class, threads)
+
+
+def worker_exit(server, worker):
+    # Keep a recycled worker's request counters in the machine-wide /metrics totals.
+    try:
+        from utils import metrics
+        metrics.retire()
+    except Exception as e:
+        server.log.warning("Saving metrics for exiting worker failed: %s", e)
@@ -1,112 +1,219 @@
 # Monitoring and Alerting for ScreenMerch
+import html as html_lib
 import logging
-import requests
-from datetime import datetime
 import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+import requests
 
 logger = logging.getLogger(__name__)
 
+
 class SecurityMonitor:
-    """Monitor security events and system health"""
-    
-    def __init__(self):
-        self.security_events = []
+    """
+    Monitor security events and system health.
+
+    Logging an event only appends to a fixed-size ring buffer, bumps a per-type counter and
+    enqueues it for the alert thread. The pending queue holds at most ``buffer_size`` events;
+    past that, events are counted in ``events_dropped`` instead of queued. A background thread
+    aggregates events per window and sends at most one deduplicated digest email every
+    ``min_alert_interval`` seconds; a failed send keeps its events for the next window.
+    """
+
+    def __init__(self, buffer_size=1000, alert_threshold=10, window_seconds=300,
+                 min_alert_interval=900, send_func=None):
+        self.security_events = deque(maxlen=buffer_size)
+        self.recent_errors = deque(maxlen=buffer_size)
+        self.event_counts = Counter()
+        self.error_counts = Counter()
         self.error_count = 0
-        self.alert_threshold = 10
-        
+        self.alert_threshold = alert_threshold
+        self.window_seconds = window_seconds
+        self.min_alert_interval = min_alert_interval
+        self.alerts_sent = 0
+        self.alerts_suppressed = 0
+        self.events_dropped = 0
+        self._dropped_since_digest = 0
+        self._send = send_func or _send_resend_email
+        self._pending = queue.Queue(maxsize=buffer_size)
+        self._last_alert_at = 0.0
+        self._last_digest_signature = None
+        self._worker = None
+        self._worker_pid = None
+        self._worker_lock = threading.Lock()
+        self._stop = threading.Event()
+
     def log_security_event(self, event_type, details, ip_address=None):
         """Log security events"""
         event = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': time.time(),
             'type': event_type,
             'details': details,
             'ip_address': ip_address
         }
-        
+
         self.security_events.append(event)
-        logger.warning(f"SECURITY EVENT: {event_type} - {details} - IP: {ip_address}")
-        
-        # Send alert if threshold exceeded
-        if len(self.security_events) > self.alert_threshold:
-            self.send_security_alert()
-    
-    def send_security_alert(self):
-        """Send security alert via email"""
-        try:
-            # Use Resend to send security alert
-            alert_data = {
-                "from": "onboarding@resend.dev",
-                "to": [os.getenv("MAIL_TO", "alancraigdigital@gmail.com")],
-                "subject": "🚨 ScreenMerch Security Alert",
-                "html": f"""
-                <h1>Security Alert</h1>
-                <p>Multiple security events detected on ScreenMerch:</p>
-                <ul>
-                    {''.join([f'<li>{event["type"]}: {event["details"]}</li>' for event in self.security_events[-5:]])}
-                </ul>
-                <p>Total events: {len(self.security_events)}</p>
-                <p>Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                """
-            }
-            
-            response = requests.post(
-                "https://api.resend.com/emails",
-                headers={
-                    "Authorization": f"Bearer {os.getenv('RESEND_API_KEY')}",
-                    "Content-Type": "application/json"
-                },
-                json=alert_data
-            )
-            
-            if response.status_code == 200:
-                logger.info("Security alert sent successfully")
-            else:
-                logger.error(f"Failed to send security alert: {response.text}")
-                
-        except Exception as e:
-            logger.error(f"Error sending security alert: {str(e)}")
-    
+        self.event_counts[event_type] += 1
+        logger.warning("SECURITY EVENT: %s - %s - IP: %s", event_type, details, ip_address)
+        self._enqueue('security', event)
+        self._ensure_worker()
+
     def log_error(self, error_type, error_message, context=None):
         """Log application errors"""
         self.error_count += 1
-        logger.error(f"ERROR: {error_type} - {error_message} - Context: {context}")
-        
-        # Send alert if too many errors
-        if self.error_count > self.alert_threshold:
-            self.send_error_alert()
-    
-    def send_error_alert(self):
-        """Send error alert"""
+        self.error_counts[error_type] += 1
+        event = {
+            'timestamp': time.time(),
+            'type': error_type,
+            'details': error_message,
+            'context': context
+        }
+        self.recent_errors.append(event)
+        logger.error("ERROR: %s - %s - Context: %s", error_type, error_message, context)
+        self._enqueue('error', event)
+        self._ensure_worker()
+
+    def get_stats(self):
+        """Counters for dashboards / health checks."""
+        return {
+            'security_events_total': sum(self.event_counts.values()),
+            'security_events_by_type': dict(self.event_counts),
+            'errors_total': self.error_count,
+            'errors_by_type': dict(self.error_counts),
+            'alerts_sent': self.alerts_sent,
+            'alerts_suppressed': self.alerts_suppressed,
+            'events_dropped': self.events_dropped,
+        }
+
+    def flush(self, now=None):
+        """
+        Drain pending events into one digest and send it if the window crossed the threshold.
+        Called by the alert thread every ``window_seconds``; safe to call directly (tests, shutdown).
+        Returns True when a digest was sent.
+        """
+        security, errors = [], []
+        while True:
+            try:
+                kind, event = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            (security if kind == 'security' else errors).append(event)
+        if len(security) <= self.alert_threshold and len(errors) <= self.alert_threshold:
+            return False
+
+        now = time.time() if now is None else now
+        if now - self._last_alert_at < self.min_alert_interval:
+            self.alerts_suppressed += 1
+            return False
+
+        security_groups = _group_events(security)
+        error_groups = _group_events(errors)
+        signature = (frozenset(security_groups), frozenset(error_groups))
+        if signature == self._last_digest_signature and now - self._last_alert_at < 4 * self.min_alert_interval:
+            # Same offenders as the last digest: don't re-send the same email.
+            self.alerts_suppressed += 1
+            return False
+
         try:
-            alert_data = {
-                "from": "onboarding@resend.dev",
-                "to": [os.getenv("MAIL_TO", "alancraigdigital@gmail.com")],
-                "subject": "⚠️ ScreenMerch Error Alert",
-                "html": f"""
-                <h1>Error Alert</h1>
-                <p>Multiple errors detected on ScreenMerch:</p>
-                <p>Error count: {self.error_count}</p>
-                <p>Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                <p>Check your application logs for details.</p>
-                """
-            }
-            
-            response = requests.post(
-                "https://api.resend.com/emails",
-                headers={
-                    "Authorization": f"Bearer {os.getenv('RESEND_API_KEY')}",
-                    "Content-Type": "application/json"
-                },
-                json=alert_data
-            )
-            
-            if response.status_code == 200:
-                logger.info("Error alert sent successfully")
-            else:
-                logger.error(f"Failed to send error alert: {response.text}")
-                
+            self._send(_digest_subject(security, errors),
+                       _digest_html(security_groups, error_groups, len(security), len(errors), self._dropped_since_digest))
         except Exception as e:
-            logger.error(f"Error sending error alert: {str(e)}")
+            logger.error(f"Error sending monitoring digest: {str(e)}")
+            # Retry these events with the next window (whatever still fits in the queue).
+            for event in security:
+                self._enqueue('security', event)
+            for event in errors:
+                self._enqueue('error', event)
+            return False
+        self.alerts_sent += 1
+        self._last_alert_at = now
+        self._last_digest_signature = signature
+        self._dropped_since_digest = 0
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _enqueue(self, kind, event):
+        try:
+            self._pending.put_nowait((kind, event))
+        except queue.Full:
+            self.events_dropped += 1
+            self._dropped_since_digest += 1
+
+    def _ensure_worker(self):
+        # Started lazily (and again after a fork) so importing the module never spawns a thread.
+        if self._worker is not None and self._worker_pid == os.getpid():
+            return
+        with self._worker_lock:
+            if self._worker is not None and self._worker_pid == os.getpid():
+                return
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name='security-monitor-alerts', daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+
+    def _run(self):
+        while not self._stop.wait(self.window_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Monitoring alert thread error: {str(e)}")
+
+
+def _group_events(events):
+    """Collapse identical (type, details) events into counts."""
+    return Counter((e['type'], str(e['details'])[:200]) for e in events)
+
+
+def _digest_subject(security, errors):
+    if security:
+        return "🚨 ScreenMerch Security Alert"
+    return "⚠️ ScreenMerch Error Alert"
+
+
+def _digest_html(security_groups, error_groups, security_total, error_total, dropped=0):
+    def rows(groups):
+        return ''.join(
+            f'<li>{html_lib.escape(str(event_type))}: {html_lib.escape(details)} (x{count})</li>'
+            for (event_type, details), count in groups.most_common(20)
+        )
+    html = "<h1>ScreenMerch Monitoring Digest</h1>"
+    if security_total:
+        html += f"<h2>Security events: {security_total}</h2><ul>{rows(security_groups)}</ul>"
+    if error_total:
+        html += f"<h2>Errors: {error_total}</h2><ul>{rows(error_groups)}</ul>"
+    if dropped:
+        html += f"<p>{dropped} more event(s) were dropped because the alert queue was full.</p>"
+    html += f"<p>Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>"
+    html += "<p>Check your application logs for details.</p>"
+    return html
+
+
+def _send_resend_email(subject, html):
+    """Send an alert email via Resend (runs on the alert thread, never on a request thread); raises on failure."""
+    response = requests.post(
+        "https://api.resend.com/emails",
+        headers={
+            "Authorization": f"Bearer {os.getenv('RESEND_API_KEY')}",
+            "Content-Type": "application/json"
+        },
+        json={
+            "from": "onboarding@resend.dev",
+            "to": [os.getenv("MAIL_TO", "alancraigdigital@gmail.com")],
+            "subject": subject,
+            "html": html,
+        },
+        timeout=15,
+    )
+    if not 200 <= response.status_code < 300:
+        raise RuntimeError(f"Resend returned {response.status_code}: {response.text[:200]}")
+    logger.info("Monitoring digest sent successfully")
+
 
 # Initialize security monitor
-security_monitor = SecurityMonitor() 
\ No newline at end of file
+security_monitor = SecurityMonitor()
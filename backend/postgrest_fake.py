@@ -0,0 +1,183 @@
+"""
+In-process Supabase/PostgREST fake for the unit tests.
+
+``FakeSupabase.table()`` returns a postgrest-py style builder; ``execute()`` runs it against the
+in-memory ``PostgrestFake`` from ``scripts/standins.py`` (the load-test stand-in), so filters,
+``or_`` groups, ordering, ``range``/``limit`` windows and projections behave the same in both.
+
+    db = FakeSupabase(orders=[{"order_id": "o1", "status": "paid"}])
+    db.table("orders").select("order_id").eq("status", "paid").execute().data
+
+Tables are the lists passed in (not copies), so tests can inspect and edit rows directly. Every
+executed query is appended to ``db.queries``; callables in ``db.errors`` (query -> exception or
+None) inject failures; subclasses override ``embed`` to fill embedded resources. ``rpc`` answers
+PGRST202 (function not found) and ``auth.get_user`` accepts the tokens in ``db.auth.tokens``.
+"""
+import threading
+
+from werkzeug.datastructures import MultiDict
+
+from scripts.standins import PostgrestError, PostgrestFake, _text
+
+
+class Result:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _list_value(value):
+    # postgrest-py sanitize_param: quote values containing PostgREST list syntax.
+    text = _text(value)
+    return f'"{text}"' if any(ch in text for ch in ',:()') else text
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.method = "select"
+        self.columns = "*"
+        self.body = None
+        self.count = None
+        self.returning = None
+        self.args = MultiDict()
+        self.sort = []
+        self.affected = None
+
+    def select(self, *columns, count=None):
+        self.columns = ",".join(columns) or "*"
+        self.count = count
+        self.args["select"] = self.columns
+        return self
+
+    def insert(self, rows, count=None, returning=None, upsert=False):
+        self.method, self.body, self.count, self.returning = ("upsert" if upsert else "insert"), rows, count, returning
+        return self
+
+    def upsert(self, rows, count=None, returning=None, on_conflict=""):
+        if on_conflict:
+            self.args["on_conflict"] = on_conflict
+        return self.insert(rows, count=count, returning=returning, upsert=True)
+
+    def update(self, values, count=None, returning=None):
+        self.method, self.body, self.count, self.returning = "update", values, count, returning
+        return self
+
+    def delete(self, count=None, returning=None):
+        self.method, self.count, self.returning = "delete", count, returning
+        return self
+
+    def _filter(self, column, op, value):
+        self.args.add(column, f"{op}.{value}")
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", _text(value))
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", _text(value))
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", _text(value))
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", _text(value))
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", _text(value))
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", _text(value))
+
+    def like(self, column, pattern):
+        return self._filter(column, "like", pattern)
+
+    def ilike(self, column, pattern):
+        return self._filter(column, "ilike", pattern)
+
+    def is_(self, column, value):
+        return self._filter(column, "is", _text(value))
+
+    def in_(self, column, values):
+        return self._filter(column, "in", f"({','.join(_list_value(v) for v in values)})")
+
+    def or_(self, filters):
+        self.args.add("or", f"({filters})")
+        return self
+
+    def order(self, column, desc=False, nullsfirst=False):
+        self.sort.append(f"{column}{'.desc' if desc else ''}{'.nullsfirst' if nullsfirst else ''}")
+        self.args["order"] = ",".join(self.sort)
+        return self
+
+    def limit(self, n):
+        self.args["limit"] = str(n)
+        return self
+
+    def range(self, start, end):
+        self.args["offset"] = str(start)
+        self.args["limit"] = str(end - start + 1)
+        return self
+
+    def execute(self):
+        return self.db.execute(self)
+
+
+class FakeAuth:
+    """``supabase.auth`` stand-in: known tokens map to user ids, anything else is rejected."""
+
+    def __init__(self, tokens=None):
+        self.tokens = dict(tokens or {})
+
+    def get_user(self, token):
+        if token not in self.tokens:
+            raise RuntimeError("invalid JWT")
+        return type("UserResponse", (), {"user": type("User", (), {"id": self.tokens[token]})()})()
+
+
+class FakeSupabase:
+    def __init__(self, **tables):
+        self.store = PostgrestFake()
+        self.store.tables.update(tables)
+        self.tables = self.store.tables
+        self.queries = []
+        self.errors = []
+        self.rpc_calls = []
+        self.auth = FakeAuth()
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        self.rpc_calls.append((name, params))
+        raise PostgrestError(404, "PGRST202", f"Could not find the function public.{name} in the schema cache")
+
+    def embed(self, query, rows):
+        """Hook for embedded resources (``orders(...)`` in a select); the stand-in embeds nothing."""
+        return rows
+
+    def execute(self, query):
+        with self._lock:
+            self.queries.append(query)
+        for check in self.errors:
+            error = check(query)
+            if error is not None:
+                raise error
+        minimal = _text(getattr(query.returning, "value", query.returning)) == "minimal"
+        if query.method == "select":
+            rows, _, total = self.store.select(query.table, query.args, {})
+            return Result(self.embed(query, rows), total if query.count else None)
+        if query.method in ("insert", "upsert"):
+            prefer = "resolution=merge-duplicates" if query.method == "upsert" else ""
+            rows = self.store.insert(query.table, query.body, query.args, prefer)
+        elif query.method == "update":
+            rows = self.store.update(query.table, query.body, query.args)
+        else:
+            rows = self.store.delete(query.table, query.args)
+        query.affected = len(rows)
+        # return=minimal: empty body, and postgrest-py then reports count=0.
+        if minimal:
+            return Result([], 0 if query.count else None)
+        return Result(rows, len(rows) if query.count else None)
@@ -21,6 +21,8 @@ import requests
 
 logger = logging.getLogger(__name__)
 
+# Plain module dicts: read on every variant lookup, so they stay in-process. Under gunicorn
+# (preload_app) warm_catalog_maps() fills them in the master so workers inherit them copy-on-write.
 _maps_lock = threading.Lock()
 _nested_maps: Dict[int, Dict[str, Dict[str, int]]] = {}
 
@@ -388,6 +390,18 @@ def get_nested_variant_map(catalog_product_id: int) -> Dict[str, Dict[str, int]]
     return nested
 
 
+def warm_catalog_maps() -> int:
+    """Fetch the variant map of every mapped catalog product (before fork); returns how many loaded."""
+    loaded = 0
+    for catalog_product_id in sorted(set(PRINTFUL_CATALOG_PRODUCT_IDS_BY_NAME.values())):
+        try:
+            get_nested_variant_map(catalog_product_id)
+            loaded += 1
+        except Exception as e:
+            logger.warning("Printful catalog %s not preloaded: %s", catalog_product_id, e)
+    return loaded
+
+
 def lookup_catalog_variant_id(
     catalog_product_id: int,
     color: str,
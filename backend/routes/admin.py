@@ -1,5 +1,5 @@
 """Admin routes Blueprint for ScreenMerch"""
-from flask import Blueprint, request, jsonify, render_template, redirect, url_for, session
+from flask import Blueprint, request, jsonify, render_template, redirect, url_for, session, send_file
 from flask_cors import cross_origin
 import json
 import logging
@@ -14,7 +14,9 @@ from urllib.parse import quote
 
 # Import utilities
 from utils.helpers import _data_from_request, _allow_origin, build_platform_revenue_attribution_maps, platform_revenue_attribution_for_earning
-from utils.security import admin_required
+from utils.order_lookup import ORDER_DETAIL_COLUMNS, resolve_order
+from utils import bulk_maintenance, logging_setup, processing_queue, profiling, storefront_cache
+from utils.security import admin_required, verified_master_admin
 
 logger = logging.getLogger(__name__)
 
@@ -76,89 +78,6 @@ def _parse_created_sort_value(created_at):
     return 0.0
 
 
-_UUID_RE = re.compile(
-    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$",
-    re.IGNORECASE,
-)
-
-
-def _ord_candidates_from_order_key(oid: str):
-    """Build possible ORD-XXXXXXXX keys from a path segment (ORD-xxx, 8-char hex, full UUID, etc.)."""
-    out = []
-    if not oid:
-        return out
-    s = str(oid).strip()
-    if not s:
-        return out
-    # Full UUID (e.g. from Stripe): map to ORD-{first8} and ORD-{last8} of the 32 hex chars
-    if _UUID_RE.match(s):
-        hex32 = s.replace("-", "").lower()
-        if len(hex32) == 32:
-            out.append(f"ORD-{hex32[:8].upper()}")
-            out.append(f"ORD-{hex32[-8:].upper()}")
-    frag = re.sub(r"[^0-9a-fA-F]", "", s.replace("ORD-", "").replace("ord-", ""))
-    if len(frag) >= 8:
-        out.append(f"ORD-{frag[:8].upper()}")
-        out.append(f"ORD-{frag[-8:].upper()}")
-    # de-dupe preserving order
-    seen = set()
-    uniq = []
-    for x in out:
-        if x and x not in seen:
-            seen.add(x)
-            uniq.append(x)
-    return uniq
-
-
-def _fetch_order_row_by_lookup(client, order_id):
-    """
-    Resolve a row from `orders` when the URL/email uses ORD-XXXX, order_number, full UUID, or 8-char suffix.
-    Returns (db_order dict or None, canonical_order_id str or None).
-    """
-    if not client or not order_id:
-        return None, None
-    oid = str(order_id).strip()
-    try:
-        r = client.table("orders").select("*").eq("order_id", oid).limit(1).execute()
-        if r.data:
-            row = r.data[0]
-            return row, row.get("order_id") or oid
-        # Postgres uuid primary key (if present)
-        if _UUID_RE.match(oid):
-            try:
-                r = client.table("orders").select("*").eq("id", oid).limit(1).execute()
-                if r.data:
-                    row = r.data[0]
-                    return row, row.get("order_id") or oid
-            except Exception:
-                pass
-        r = client.table("orders").select("*").eq("order_number", oid).limit(1).execute()
-        if r.data:
-            row = r.data[0]
-            return row, row.get("order_id") or oid
-        r = client.table("orders").select("*").eq("order_number", oid.replace("ORD-", "")).limit(1).execute()
-        if r.data:
-            row = r.data[0]
-            return row, row.get("order_id") or oid
-        for cand in _ord_candidates_from_order_key(oid):
-            if cand == oid:
-                continue  # already tried eq("order_id", oid) above
-            r = client.table("orders").select("*").eq("order_id", cand).limit(1).execute()
-            if r.data:
-                row = r.data[0]
-                return row, row.get("order_id") or cand
-        suffix = oid.replace("ORD-", "").replace("-", "")
-        suffix = re.sub(r"[^0-9a-fA-F]", "", suffix)
-        if len(suffix) >= 4:
-            r = client.table("orders").select("*").ilike("order_id", f"%{suffix}%").limit(5).execute()
-            if r.data:
-                row = r.data[0]
-                return row, row.get("order_id") or oid
-    except Exception as e:
-        logger.warning("Order lookup failed for %s: %s", order_id, e)
-    return None, None
-
-
 def _is_master_admin(user_email):
     """Check if user is a master admin"""
     try:
@@ -787,6 +706,7 @@ def admin_approve_signup_request():
                 "role": "customer",
                 "status": "active",
             }).execute()
+        storefront_cache.invalidate(client)
         response = jsonify({"success": True, "message": f"Approved {email} as {admin_role}"})
         return _allow_origin(response), 200
     except Exception as e:
@@ -1173,6 +1093,7 @@ def admin_approve_creator(user_id):
             except Exception:
                 pass
         logger.info(f"Creator approved: {user_id} by {admin_email}")
+        storefront_cache.invalidate(client)
         response = jsonify({"success": True, "message": "Creator approved"})
         return _allow_origin(response), 200
     except Exception as e:
@@ -1224,6 +1145,7 @@ def admin_activate_user(user_id):
                         pass
                 # If send failed we still activated; don't block
         logger.info(f"User activated: {user_id} by {admin_email}")
+        storefront_cache.invalidate(client)
         response = jsonify({"success": True, "message": "User activated"})
         return _allow_origin(response), 200
     except Exception as e:
@@ -1259,6 +1181,7 @@ def admin_suspend_user(user_id):
             return _allow_origin(response), 404
         client.table("users").update({"status": "suspended"}).eq("id", user_id).execute()
         logger.info(f"User suspended: {user_id} by {admin_email}")
+        storefront_cache.invalidate(client)
         response = jsonify({"success": True, "message": "User suspended"})
         return _allow_origin(response), 200
     except Exception as e:
@@ -1293,6 +1216,7 @@ def admin_disapprove_creator(user_id):
             response = jsonify({"success": False, "error": "User not found or not pending creator"})
             return _allow_origin(response), 404
         logger.info(f"Creator disapproved (suspended): {user_id} by {admin_email}")
+        storefront_cache.invalidate(client)
         response = jsonify({"success": True, "message": "Creator disapproved"})
         return _allow_origin(response), 200
     except Exception as e:
@@ -1425,7 +1349,7 @@ def admin_orders():
                 return redirect(url_for("admin.admin_order_detail", order_id=raw_q))
             client_early = _get_supabase_client()
             if client_early:
-                _row, canonical = _fetch_order_row_by_lookup(client_early, raw_q)
+                _row, canonical = resolve_order(client_early, raw_q, columns="order_id")
                 if canonical:
                     return redirect(url_for("admin.admin_order_detail", order_id=canonical))
         
@@ -1534,7 +1458,7 @@ def admin_order_detail(order_id):
         # order_store alone omits shipping_cost / customer_email and stays "pending".
         if client:
             try:
-                db_order, canonical_id = _fetch_order_row_by_lookup(client, order_id)
+                db_order, canonical_id = resolve_order(client, order_id, columns=ORDER_DETAIL_COLUMNS)
                 if db_order:
                     order_id = canonical_id or order_id
                     order_data = {
@@ -1685,46 +1609,20 @@ def admin_processing_queue():
         return _handle_cors_preflight()
     
     try:
-        status = request.args.get('status', 'all')
+        filters = processing_queue.parse_filters(request.args)
+    except processing_queue.QueueFilterError as e:
+        response = jsonify({"success": False, "error": str(e)})
+        return _allow_origin(response), 400
+
+    try:
         client = _get_supabase_client()
-        
-        query = client.table('order_processing_queue').select('*').order('priority', desc=True).order('created_at')
-        
-        if status != 'all':
-            query = query.eq('status', status)
-        
-        result = query.execute()
-        
-        # Enrich queue items with order data and user data
-        enriched_data = []
-        for queue_item in (result.data or []):
-            enriched_item = dict(queue_item)
-            
-            # Get order data
-            try:
-                order_id = queue_item.get('order_id')
-                if order_id:
-                    order_result = client.table('orders').select('*').eq('order_id', order_id).execute()
-                    if order_result.data:
-                        enriched_item['orders'] = order_result.data[0]
-            except Exception:
-                pass
-            
-            # Get assigned user data
-            try:
-                assigned_to = queue_item.get('assigned_to')
-                if assigned_to:
-                    user_result = client.table('users').select('id, display_name, email').eq('id', assigned_to).execute()
-                    if user_result.data:
-                        enriched_item['assigned_to_user'] = user_result.data[0]
-            except Exception:
-                pass
-            
-            enriched_data.append(enriched_item)
-        
+        rows, total = processing_queue.fetch_queue_page(client, filters)
         response = jsonify({
             "success": True,
-            "data": enriched_data
+            "data": rows,
+            "total": total,
+            "page": filters["page"],
+            "limit": filters["limit"],
         })
         return _allow_origin(response), 200
     except Exception as e:
@@ -1733,6 +1631,26 @@ def admin_processing_queue():
         return _allow_origin(response), 500
 
 
+@admin_bp.route("/api/admin/processing-queue/<queue_id>", methods=["GET", "OPTIONS"])
+@admin_required()
+def admin_processing_queue_item(queue_id):
+    """One queue item with its full order (cart, shipping address) for the detail panel"""
+    if request.method == "OPTIONS":
+        return _handle_cors_preflight()
+
+    try:
+        item = processing_queue.fetch_queue_item(_get_supabase_client(), queue_id)
+        if item is None:
+            response = jsonify({"success": False, "error": "Order not found in queue"})
+            return _allow_origin(response), 404
+        response = jsonify({"success": True, "data": item})
+        return _allow_origin(response), 200
+    except Exception as e:
+        logger.error(f"❌ [ADMIN] Error fetching queue item {queue_id}: {str(e)}")
+        response = jsonify({"success": False, "error": str(e)})
+        return _allow_origin(response), 500
+
+
 @admin_bp.route("/api/admin/processing-history", methods=["GET", "OPTIONS"])
 @admin_required()
 def admin_processing_history():
@@ -2029,7 +1947,9 @@ def reset_sales():
         client = _get_supabase_client()
         from utils.helpers import reset_creator_sales_records
 
-        reset_result = reset_creator_sales_records(client, user_id, _get_order_store(), logger)
+        reset_result = reset_creator_sales_records(
+            client, user_id, _get_order_store(), logger, bulk_maintenance.batch_size_from(data.get("batch_size"))
+        )
         deleted_count = reset_result["deleted_sales_count"]
         purged_store = reset_result["purged_order_store_count"]
 
@@ -2078,7 +1998,21 @@ def reset_platform_revenue_data():
         client = _get_supabase_client()
         from utils.helpers import reset_all_platform_sales_records
 
-        reset_result = reset_all_platform_sales_records(client, _get_order_store(), logger)
+        data = request.get_json(silent=True) or {}
+        batch_size = bulk_maintenance.batch_size_from(data.get("batch_size"))
+        order_store = _get_order_store()
+        if data.get("background"):
+            # Large tables: run chunked in the background; the UI polls /api/admin/maintenance-jobs/<id>.
+            job_id = bulk_maintenance.start_job(
+                "reset_platform_revenue_data",
+                lambda progress: reset_all_platform_sales_records(client, order_store, logger, batch_size, progress),
+                started_by=user_email,
+            )
+            logger.info("✅ [MASTER ADMIN] Platform revenue reset job %s started by %s", job_id, user_email)
+            response = jsonify({"success": True, "job_id": job_id, "status": "running"})
+            return _allow_origin(response), 202
+
+        reset_result = reset_all_platform_sales_records(client, order_store, logger, batch_size)
         logger.info(
             "✅ [MASTER ADMIN] Cleared all platform revenue test data by %s: %s",
             user_email,
@@ -2101,6 +2035,91 @@ def reset_platform_revenue_data():
         return _allow_origin(response), 500
 
 
+@admin_bp.route("/api/admin/maintenance-jobs/<job_id>", methods=["GET", "OPTIONS"])
+@admin_required()
+def get_maintenance_job(job_id):
+    """Status and per-table progress of a background maintenance job (master admin)."""
+    if request.method == "OPTIONS":
+        return _handle_cors_preflight()
+
+    user_email = request.headers.get("X-User-Email") or request.args.get("user_email")
+    if not _is_master_admin(user_email):
+        response = jsonify({"success": False, "error": "Master admin access required"})
+        return _allow_origin(response), 403
+    job = bulk_maintenance.get_job(job_id)
+    if not job:
+        response = jsonify({"success": False, "error": "Job not found"})
+        return _allow_origin(response), 404
+    response = jsonify({"success": True, "job": job})
+    return _allow_origin(response), 200
+
+
+@admin_bp.route("/api/admin/log-levels", methods=["GET", "PUT", "OPTIONS"])
+@admin_required()
+def log_levels():
+    """Read or change logger levels at runtime (master admin).
+
+    PUT ``{"logger": "routes.products", "level": "DEBUG"}``; ``"root"`` is the root logger.
+    The change reaches every worker on the machine within a few seconds.
+    """
+    if request.method == "OPTIONS":
+        return _handle_cors_preflight()
+
+    user_email = request.headers.get("X-User-Email") or request.args.get("user_email")
+    if not _is_master_admin(user_email):
+        response = jsonify({"success": False, "error": "Master admin access required"})
+        return _allow_origin(response), 403
+    if request.method == "PUT":
+        data = _data_from_request()
+        name = (data.get("logger") or "").strip()
+        if not name:
+            response = jsonify({"success": False, "error": "logger is required"})
+            return _allow_origin(response), 400
+        try:
+            level = logging_setup.set_level(name, data.get("level"))
+        except ValueError as e:
+            response = jsonify({"success": False, "error": str(e)})
+            return _allow_origin(response), 400
+        logger.warning("🔧 [MASTER ADMIN] %s set log level %s=%s", user_email, name, level)
+    else:
+        logging_setup.sync_levels(force=True)
+    response = jsonify({"success": True, "levels": logging_setup.levels(), "handler": logging_setup.stats()})
+    return _allow_origin(response), 200
+
+
+@admin_bp.route("/api/admin/profiles", methods=["GET", "OPTIONS"])
+@admin_required()
+def list_request_profiles():
+    """Stored request profiles on this machine, newest first (master admin)."""
+    if request.method == "OPTIONS":
+        return _handle_cors_preflight()
+
+    if not verified_master_admin(_get_supabase_client()):
+        response = jsonify({"success": False, "error": "Master admin access required"})
+        return _allow_origin(response), 403
+    response = jsonify({"success": True, "profiles": profiling.list_profiles()})
+    return _allow_origin(response), 200
+
+
+@admin_bp.route("/api/admin/profiles/<profile_id>.<kind>", methods=["GET", "OPTIONS"])
+@admin_required()
+def download_request_profile(profile_id, kind):
+    """One profile artifact: .prof (pstats), .txt, .collapsed (flamegraph input) or .json (master admin)."""
+    if request.method == "OPTIONS":
+        return _handle_cors_preflight()
+
+    if not verified_master_admin(_get_supabase_client()):
+        response = jsonify({"success": False, "error": "Master admin access required"})
+        return _allow_origin(response), 403
+    path = profiling.path_for(profile_id, kind)
+    if not path:
+        response = jsonify({"success": False, "error": "Profile not found"})
+        return _allow_origin(response), 404
+    response = send_file(path, mimetype=profiling.KINDS[kind], as_attachment=True,
+                         download_name=f"{profile_id}.{kind}")
+    return _allow_origin(response), 200
+
+
 def _earning_financials(earning):
     """Always recompute $6/$6 (or product-specific) split — do not trust stale stored fees."""
     from utils.payout import earning_payout_financials
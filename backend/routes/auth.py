@@ -12,10 +12,6 @@ import json
 from urllib.parse import quote, urlparse
 from datetime import datetime, timedelta, timezone
 
-# Google OAuth imports
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-
 # Import utilities
 from utils.helpers import (
     _data_from_request, _return_url, _cookie_domain, 
@@ -177,8 +177,7 @@ def get_browse_api():
         user_agent = request.headers.get('User-Agent', '')
         is_mobile = 'Mobile' in user_agent or 'Android' in user_agent or 'iPhone' in user_agent
         
-        logger.info(f"📂 API Browse request - Category: {category}")
-        logger.info(f"📱 Mobile detection: {is_mobile}")
+        logger.debug("📂 API Browse request - category=%s mobile=%s", category, is_mobile)
         
         filtered_products = _filter_products_by_category(category)
 
@@ -193,9 +192,6 @@ def get_browse_api():
             if 'description' not in product:
                 product['description'] = ""
         
-        if is_mobile:
-            logger.info(f"📱 Mobile request - Found {len(filtered_products)} products for category '{category}'")
-        
         screenshots = []
         thumbnail_url = ""
         
@@ -210,13 +206,12 @@ def get_browse_api():
             "timestamp": int(time.time())
         }
         
-        if is_mobile:
-            logger.info(f"📱 Sending response to mobile - {len(filtered_products)} products")
+        logger.debug("📂 Browse response - %d products for category '%s'", len(filtered_products), category)
         
         return jsonify(response_data)
         
     except Exception as e:
-        logger.error(f"❌ Browse API error: {str(e)}")
+        logger.error("❌ Browse API error: %s", e)
         category = request.args.get('category', 'all')
         return jsonify({
             "success": False,
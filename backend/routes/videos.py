@@ -1,7 +1,17 @@
 """Video routes Blueprint for ScreenMerch"""
 from flask import Blueprint, request, jsonify, render_template, make_response
 from flask_cors import cross_origin
+import base64
 import logging
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+
+from utils.cache import TTLCache
+from utils.security import admin_required
+from utils.shared_store import SharedDict
 
 logger = logging.getLogger(__name__)
 
@@ -55,9 +65,85 @@ def _handle_cors_preflight():
     return make_response("", 204)
 
 
+# Columns the storefront feed cards actually render; ?fields=full restores select('*').
+VIDEO_LIST_COLUMNS = "id, title, thumbnail, channelTitle, user_id, video_url, created_at"
+INTRO_VIDEO_COLUMNS = "id, title, video_url, thumbnail, channelTitle, created_at"
+
+# Short-TTL response cache keyed by (category, user_id, cursor, limit, fields, stamps).
+# Each worker keeps its own pages, but the invalidation stamps live in the shared store: a bump
+# from any worker changes the key every worker looks up, so their old pages are never served
+# again. Rows the frontend writes straight to Supabase show up once the TTL lapses.
+_VIDEO_FEED_TTL = float(os.getenv("VIDEO_FEED_CACHE_TTL", "30"))
+_video_feed_cache = TTLCache(ttl=_VIDEO_FEED_TTL, maxsize=512, name="video_feed")
+_video_feed_stamps = SharedDict("video_feed_stamp", ttl=max(86400.0, _VIDEO_FEED_TTL * 2))
+# Intro video record in the shared store, so an invalidation reaches every worker; the TTL bounds
+# staleness if one is missed. A miss is remembered for a few minutes only.
+_INTRO_TTL = float(os.getenv("INTRO_VIDEO_CACHE_TTL", "3600"))
+_intro_video_cache = SharedDict("intro_video", ttl=_INTRO_TTL)
+_INTRO_CACHE_KEY = "intro_video"
+_INTRO_MISS_TTL = 300
+
+_CURSOR_ID_RE = re.compile(
+    r"^(\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$", re.IGNORECASE
+)
+
+
+def invalidate_video_cache(user_id=None):
+    """
+    Drop cached /api/videos pages (and the pinned intro video).
+
+    With ``user_id`` only that creator's pages plus unfiltered/category pages are dropped;
+    category pages are shared across creators so they always go.
+    """
+    stamp = uuid.uuid4().hex
+    if user_id:
+        _video_feed_stamps["unfiltered"] = stamp
+        _video_feed_stamps[f"user:{user_id}"] = stamp
+        dropped = _video_feed_cache.invalidate(lambda k: k[1] in (None, str(user_id)))
+    else:
+        _video_feed_stamps["all"] = stamp
+        dropped = _video_feed_cache.invalidate()
+    _intro_video_cache.pop(_INTRO_CACHE_KEY, None)
+    logger.info("Video feed cache invalidated (user_id=%s, entries=%s)", user_id, dropped)
+    return dropped
+
+
+def _video_feed_stamp(user_id):
+    """Current shared invalidation stamps for pages filtered by ``user_id`` (or unfiltered pages)."""
+    scope = f"user:{user_id}" if user_id else "unfiltered"
+    return _video_feed_stamps.get("all", ""), _video_feed_stamps.get(scope, "")
+
+
+def _encode_video_cursor(row):
+    """Opaque keyset cursor for the last row of a page: (created_at, id)."""
+    raw = f"{row.get('created_at') or ''}|{row.get('id') or ''}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_video_cursor(cursor):
+    """
+    Return (created_at, id) or None when the cursor is malformed. Both values end up inside a
+    PostgREST or=() filter, so only an ISO timestamp and an integer/uuid id are accepted.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, _, video_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").partition("|")
+        datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    except Exception:
+        return None
+    if not _CURSOR_ID_RE.match(video_id):
+        return None
+    return created_at, video_id
+
+
 @videos_bp.route("/api/videos", methods=["GET", "OPTIONS"])
 def get_videos():
-    """Get list of videos. CORS is set by app's add_security_headers (app.py)."""
+    """
+    Get list of videos, newest first. CORS is set by app's add_security_headers (app.py).
+
+    Query params: category, user_id, limit (1-500), cursor (from the previous page's
+    X-Next-Cursor header) and fields=full for every column. The body stays a plain list.
+    """
     if request.method == "OPTIONS":
         return _handle_cors_preflight()
     try:
@@ -67,19 +153,51 @@ def get_videos():
             return jsonify([]), 200
         category = request.args.get("category", "").strip() or None
         user_id = request.args.get("user_id", "").strip() or None
+        cursor = request.args.get("cursor", "").strip() or None
+        fields = "full" if request.args.get("fields", "").strip().lower() == "full" else "list"
         limit = request.args.get("limit", "100").strip()
         try:
-            limit = min(int(limit), 500) if limit.isdigit() else 100
+            limit = max(1, min(int(limit), 500)) if limit.isdigit() else 100
         except ValueError:
             limit = 100
-        query = client.table("videos2").select("*").order("created_at", desc=True).limit(limit)
+        keyset = None
+        if cursor:
+            keyset = _decode_video_cursor(cursor)
+            if keyset is None:
+                return jsonify({"error": "Invalid cursor"}), 400
+
+        cache_key = (category, user_id, cursor, limit, fields, _video_feed_stamp(user_id))
+        cached = _video_feed_cache.get(cache_key)
+        if cached is not None:
+            data, next_cursor = cached
+            return _video_page_response(data, next_cursor, cache_hit=True)
+
+        columns = "*" if fields == "full" else VIDEO_LIST_COLUMNS
+        # Fetch one extra row to know whether another page exists.
+        query = (
+            client.table("videos2")
+            .select(columns)
+            .order("created_at", desc=True)
+            .order("id", desc=True)
+            .limit(limit + 1)
+        )
         if category:
             query = query.eq("category", category)
         if user_id:
             query = query.eq("user_id", user_id)
+        if keyset:
+            created_at, last_id = keyset
+            query = query.or_(
+                f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{last_id})'
+            )
         response = query.execute()
         data = response.data if response.data is not None else []
-        return jsonify(data), 200
+        next_cursor = None
+        if len(data) > limit:
+            data = data[:limit]
+            next_cursor = _encode_video_cursor(data[-1])
+        _video_feed_cache.set(cache_key, (data, next_cursor))
+        return _video_page_response(data, next_cursor, cache_hit=False)
     except Exception as e:
         import traceback
         logger.error(f"Error fetching videos: {e}")
@@ -87,40 +205,74 @@ def get_videos():
         return jsonify([]), 200
 
 
+def _video_page_response(data, next_cursor, cache_hit):
+    resp = make_response(jsonify(data), 200)
+    if next_cursor:
+        resp.headers["X-Next-Cursor"] = next_cursor
+    resp.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+    resp.headers["Access-Control-Expose-Headers"] = "X-Next-Cursor"
+    return resp
+
+
+@videos_bp.route("/api/videos/cache/invalidate", methods=["POST", "OPTIONS"])
+@admin_required()
+def invalidate_videos_cache():
+    """
+    Admin: drop cached feed pages on every worker now (they expire on their own after
+    VIDEO_FEED_CACHE_TTL).
+    """
+    if request.method == "OPTIONS":
+        return _handle_cors_preflight()
+    data = request.get_json(silent=True) or {}
+    user_id = (data.get("user_id") or "").strip() or None
+    invalidate_video_cache(user_id)
+    return jsonify({"success": True}), 200
+
+
 def _is_screenmerch_intro_video(row):
     title = (row.get("title") or "").strip().lower()
     return title == "screenmerch introduction video" or "screenmerch introduction" in title
 
 
+def _resolve_intro_video(client):
+    """Look up the intro video by title on the server side (single row, no Python scan)."""
+    response = (
+        client.table("videos2")
+        .select(INTRO_VIDEO_COLUMNS)
+        .ilike("title", "%screenmerch introduction%")
+        .order("created_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    rows = response.data or []
+    match = next((r for r in rows if _is_screenmerch_intro_video(r)), None)
+    if not match:
+        return None
+    thumb = (match.get("thumbnail") or "").strip() or None
+    return {
+        "id": match.get("id"),
+        "title": match.get("title"),
+        "video_url": match.get("video_url"),
+        "thumbnail": thumb,
+        "channelTitle": match.get("channelTitle") or "ScreenMerch",
+    }
+
+
 @videos_bp.route("/api/public/intro-video", methods=["GET", "OPTIONS"])
 def get_intro_video():
     """Return the ScreenMerch introduction video only (How It Works / homepage)."""
     if request.method == "OPTIONS":
         return _handle_cors_preflight()
     try:
+        cached = _intro_video_cache.get(_INTRO_CACHE_KEY)
+        if cached is not None and (cached.get("video") or cached.get("retry_at", 0) > time.time()):
+            return jsonify({"success": True, "video": cached.get("video")}), 200
         client = _get_supabase_client()
         if not client:
             return jsonify({"success": False, "error": "Database not available", "video": None}), 503
-        # Prefer recent rows; scan a bounded set instead of the full catalog.
-        response = (
-            client.table("videos2")
-            .select("id, title, video_url, thumbnail, channelTitle, created_at")
-            .order("created_at", desc=True)
-            .limit(200)
-            .execute()
-        )
-        rows = response.data or []
-        match = next((r for r in rows if _is_screenmerch_intro_video(r)), None)
-        if not match:
-            return jsonify({"success": True, "video": None}), 200
-        thumb = (match.get("thumbnail") or "").strip() or None
-        video = {
-            "id": match.get("id"),
-            "title": match.get("title"),
-            "video_url": match.get("video_url"),
-            "thumbnail": thumb,
-            "channelTitle": match.get("channelTitle") or "ScreenMerch",
-        }
+        video = _resolve_intro_video(client)
+        # Found: keep for _INTRO_TTL or until invalidated. Not found: retry after a few minutes.
+        _intro_video_cache[_INTRO_CACHE_KEY] = {"video": video, "retry_at": time.time() + _INTRO_MISS_TTL}
         return jsonify({"success": True, "video": video}), 200
     except Exception as e:
         logger.exception("get_intro_video failed: %s", e)
@@ -12,6 +12,8 @@ import os
 from urllib.parse import urlparse
 import logging
 
+from utils import metrics
+
 logger = logging.getLogger(__name__)
 
 def _draw_rounded_rect_filled(img, x, y, width, height, radius, color):
@@ -656,6 +658,7 @@ def apply_corner_radius_only(image_data, corner_radius=15):
         logger.error(f"Error applying corner radius: {str(e)}")
         return {"success": False, "error": f"Failed to apply corner radius: {str(e)}"}
 
+@metrics.timed_stages("process_thumbnail_for_print")
 def process_thumbnail_for_print(image_data, print_dpi=300, soft_corners=False, edge_feather=False, crop_area=None, corner_radius_percent=0, feather_edge_percent=0, frame_enabled=False, frame_color='#FF0000', frame_width=10, double_frame=False, text_enabled=False, text_content='', text_font='Arial', text_color='#000000', text_size=24, text_offset_x=50, text_offset_y=50, add_white_background=False, print_area_width=None, print_area_height=None):
     """Process a thumbnail image for print quality output"""
     try:
@@ -725,6 +728,7 @@ def process_thumbnail_for_print(image_data, print_dpi=300, soft_corners=False, e
             pass
         else:
             return {"success": False, "error": "Unsupported image format"}
+        metrics.stage("decode")
         
         # Apply crop if specified
         if crop_area:
@@ -820,6 +824,7 @@ def process_thumbnail_for_print(image_data, print_dpi=300, soft_corners=False, e
                     target_height = original_height
                     logger.info(f"ℹ️ [PRINT_QUALITY] Image is larger than target, keeping original dimensions to preserve quality")
         
+        metrics.stage("resize")
         # Apply corner radius effect to the HIGH-RESOLUTION print quality image (AFTER resize)
         # Support both boolean (legacy) and numeric (0-100) values
         # Calculate corner_radius_value once for use in both corner radius and frame drawing
@@ -866,6 +871,7 @@ def process_thumbnail_for_print(image_data, print_dpi=300, soft_corners=False, e
             
             logger.info("Corner radius effect applied successfully to high-resolution image (RGB + alpha channels)")
         
+        metrics.stage("corner_radius")
         # Apply feather effect to the HIGH-RESOLUTION print quality image (AFTER resize and corner radius)
         # Support both boolean (legacy) and numeric (0-100) values
         feather_value = feather_edge_percent if isinstance(feather_edge_percent, (int, float)) and feather_edge_percent > 0 else (50 if edge_feather else 0)
@@ -1068,6 +1074,7 @@ def process_thumbnail_for_print(image_data, print_dpi=300, soft_corners=False, e
                 target_width, target_height = orig_w, orig_h
                 logger.info(f"[PRINT_QUALITY] Upscaled feathered image back to {target_width}x{target_height}")
         
+        metrics.stage("feather")
         # Apply frame border if enabled (AFTER feather to ensure frame is on top and visible)
         if frame_enabled and frame_width > 0:
             # Ensure frame_width is an integer and within bounds
@@ -1275,11 +1282,13 @@ def process_thumbnail_for_print(image_data, print_dpi=300, soft_corners=False, e
                     image[zero_alpha_mask, 2] = 0  # R channel
                 logger.info("Transparency preserved - RGB values zeroed where alpha is 0")
         
+        metrics.stage("frame_and_background")
         # Convert to PNG with proper DPI metadata using PIL
         # If white background was added, image is now BGR (3 channels), otherwise it's BGRA (4 channels)
         try:
-            from PIL import Image, ImageDraw, ImageFont
+            from PIL import Image
             import io
+            from utils import text_render
             
             # Convert OpenCV image (BGR/BGRA) to PIL Image (RGB/RGBA)
             if image.shape[2] == 4:  # BGRA
@@ -1294,7 +1303,6 @@ def process_thumbnail_for_print(image_data, print_dpi=300, soft_corners=False, e
             # Draw text overlay if enabled (after all other effects)
             if text_enabled and text_content and text_content.strip():
                 try:
-                    draw = ImageDraw.Draw(pil_image)
                     width, height = pil_image.size
                     # Headline-style: text_size 100 = ~22% of image min dimension (match frontend)
                     min_dim = min(width, height)
@@ -1304,29 +1312,8 @@ def process_thumbnail_for_print(image_data, print_dpi=300, soft_corners=False, e
                     oy = max(0, min(100, text_offset_y if text_offset_y is not None else 50))
                     center_x = int(width * ox / 100)
                     center_y = int(height * oy / 100)
-                    # Try to load font; fallback to default
-                    font_paths = []
-                    if os.name == 'nt':  # Windows
-                        font_dir = os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts')
-                        font_map = {'Arial': 'arial.ttf', 'Helvetica': 'arial.ttf', 'Georgia': 'georgia.ttf',
-                                    'Times New Roman': 'times.ttf', 'Verdana': 'verdana.ttf', 'Courier New': 'cour.ttf'}
-                        fname = font_map.get(text_font, 'arial.ttf')
-                        font_paths.append(os.path.join(font_dir, fname))
-                    else:
-                        for d in ['/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf', '/usr/share/fonts/TTF/DejaVuSans.ttf']:
-                            if os.path.isfile(d):
-                                font_paths.append(d)
-                                break
-                    font = None
-                    for fp in font_paths:
-                        if os.path.isfile(fp):
-                            try:
-                                font = ImageFont.truetype(fp, font_px)
-                                break
-                            except Exception:
-                                continue
-                    if font is None:
-                        font = ImageFont.load_default()
+                    # Fonts are discovered once and cached per (family, size)
+                    font = text_render.get_font(text_font, font_px)
                     # Parse hex color to RGB
                     hex_color = (text_color or '#000000').lstrip('#')
                     if len(hex_color) == 6:
@@ -1343,15 +1330,11 @@ def process_thumbnail_for_print(image_data, print_dpi=300, soft_corners=False, e
                         total_h = (len(lines) - 1) * line_height
                         start_y = center_y - total_h // 2
                         for i, line in enumerate(lines):
-                            # Get bbox to center each line (Pillow 8+ has textbbox; older has textsize)
-                            try:
-                                bbox = draw.textbbox((0, 0), line, font=font)
-                                tw = bbox[2] - bbox[0]
-                            except AttributeError:
-                                tw, _ = draw.textsize(line, font=font)
+                            tw, _ = text_render.measure(line, font)
                             x = center_x - tw // 2
                             y = start_y + i * line_height
-                            draw.text((x, y), line, font=font, fill=fill_tuple)
+                            # Cached line raster, composited (same pixels as draw.text)
+                            text_render.composite(pil_image, text_render.text_layer(line, font, fill_tuple), x, y)
                     logger.info("Text overlay applied successfully")
                 except Exception as text_err:
                     logger.warning("Could not apply text overlay: %s", str(text_err))
@@ -1369,6 +1352,7 @@ def process_thumbnail_for_print(image_data, print_dpi=300, soft_corners=False, e
             # Fallback to cv2 - encode as PNG (but without DPI metadata)
             _, buffer = cv2.imencode('.png', image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
             processed_image_data = base64.b64encode(buffer).decode('utf-8')
+        metrics.stage("encode")
         
         return {
             "success": True,
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the image pipeline, with JSON baselines and regression flags.
+
+Runs each function over a matrix of fixture sizes (thumbnail up to a 12x18" poster at 300 DPI),
+input formats and options, and records the median/min time per call and the peak memory of one
+call. Every case runs --rounds times, each round in a fresh child process, so caches and the
+allocator high-water mark of one case do not leak into the next. Rounds are interleaved (all
+cases once, then again), so a slow stretch on the machine hits one round of many cases rather
+than every round of one. Peak memory is the RSS high-water mark above the RSS before
+the call (Linux /proc; elsewhere ru_maxrss, which cannot be reset and so reads low).
+
+Functions:
+  process_thumbnail_for_print                screenshot_capture (behind /api/process-thumbnail-print-quality)
+  create_shirt_ready_image                   screenshot_capture
+  apply_feather_effect                       screenshot_capture
+  apply_corner_radius_only                   screenshot_capture
+  process_screenshot_data_for_print_quality  video_screenshot.VideoScreenshotCapture
+  remove_white_background_advanced           background_removal.BackgroundRemover (repo root)
+
+A case whose warm-up call already takes longer than --budget is timed on that call alone.
+
+Baselines are per machine (default backend/.benchmarks/images.json, not committed): --save
+writes one, later runs compare against it and list cases whose fastest time or peak memory grew
+by more than --threshold / --memory-threshold (exit status 1). The time compared is the fastest
+call over all rounds, because it is the least disturbed by other load on the machine.
+Differences under 10 ms, under the spread between rounds in either run, or under 8 MB are
+treated as noise, so rerunning an unchanged tree compares clean.
+
+Examples (run from backend/):
+  python scripts/bench_images.py --list
+  python scripts/bench_images.py --sizes thumb hd --save
+  python scripts/bench_images.py --sizes thumb hd
+  python scripts/bench_images.py -k process_thumbnail_for_print -k poster --repeats 1 --rounds 1
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import gc
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+sys.path.append(str(backend_dir.parent))  # background_removal.py lives at the repo root
+
+DEFAULT_BASELINE = backend_dir / ".benchmarks" / "images.json"
+NOISE_MS = 10.0
+NOISE_MB = 8.0
+
+SIZES = {
+    "thumb": (320, 180),      # YouTube-style thumbnail
+    "hd": (1280, 720),        # typical video screenshot
+    "fhd": (1920, 1080),
+    "poster": (3600, 5400),   # 12x18" at 300 DPI
+}
+FORMATS = ("png", "jpeg")
+
+FUNCTIONS = {
+    "process_thumbnail_for_print": ("screenshot_capture", "process_thumbnail_for_print", {
+        "plain": {},
+        "corners": {"corner_radius_percent": 12},
+        "feather": {"feather_edge_percent": 8},
+        "frame": {"frame_enabled": True, "frame_width": 20, "double_frame": True},
+        "text": {"text_enabled": True, "text_content": "ScreenMerch", "text_size": 96},
+        "white_bg": {"add_white_background": True},
+        "poster_area": {"print_area_width": 12, "print_area_height": 18},
+        "all": {"corner_radius_percent": 12, "feather_edge_percent": 8, "frame_enabled": True,
+                "text_enabled": True, "text_content": "ScreenMerch", "add_white_background": True},
+    }),
+    "create_shirt_ready_image": ("screenshot_capture", "create_shirt_ready_image", {
+        "default": {},
+        "no_enhance": {"enhance_quality": False},
+    }),
+    "apply_feather_effect": ("screenshot_capture", "apply_feather_effect", {
+        "r10": {"feather_radius": 10},
+        "r40": {"feather_radius": 40},
+    }),
+    "apply_corner_radius_only": ("screenshot_capture", "apply_corner_radius_only", {
+        "r15": {"corner_radius": 15},
+        "r60": {"corner_radius": 60},
+    }),
+    "process_screenshot_data_for_print_quality": ("video_screenshot", "VideoScreenshotCapture", {
+        "plain": {},
+        "soft_corners": {"soft_corners": True},
+        "edge_feather": {"edge_feather": True},
+    }),
+    "remove_white_background_advanced": ("background_removal", "BackgroundRemover", {
+        "adaptive": {"method": "adaptive"},
+        "edge_detection": {"method": "edge_detection"},
+        "threshold_no_feather": {"method": "threshold", "feather_edges": False},
+    }),
+}
+
+
+def case_keys(sizes, formats, filters):
+    keys = []
+    for function, (_module, _attr, options) in FUNCTIONS.items():
+        for option in options:
+            for size in sizes:
+                for fmt in formats:
+                    key = f"{function}[{option}]/{size}.{fmt}"
+                    if all(f in key for f in filters):
+                        keys.append(key)
+    return keys
+
+
+def parse_key(key):
+    head, _, fixture = key.partition("/")
+    function, _, option = head.partition("[")
+    size, _, fmt = fixture.partition(".")
+    return function, option.rstrip("]"), size, fmt
+
+
+def make_fixture(size, fmt):
+    """A deterministic screenshot-like image: gradient, shapes and noise on a white margin."""
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    width, height = SIZES[size]
+    rng = np.random.default_rng(7)
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    pixels = np.empty((height, width, 3), dtype=np.float32)
+    pixels[..., 0] = 40 + 160 * x
+    pixels[..., 1] = 60 + 120 * y
+    pixels[..., 2] = 180 - 100 * x * y
+    pixels += rng.normal(0, 6, pixels.shape)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    draw = ImageDraw.Draw(image)
+    margin = max(4, min(width, height) // 12)
+    draw.rectangle((0, 0, width, margin), fill="white")
+    draw.rectangle((0, height - margin, width, height), fill="white")
+    draw.ellipse((width // 4, height // 4, width * 3 // 4, height * 3 // 4), fill=(230, 80, 40))
+    buf = io.BytesIO()
+    image.save(buf, format=fmt.upper(), **({"quality": 90} if fmt == "jpeg" else {}))
+    return f"data:image/{fmt};base64," + base64.b64encode(buf.getvalue()).decode()
+
+
+def resolve(function, option):
+    import importlib
+
+    module_name, attr, options = FUNCTIONS[function]
+    target = getattr(importlib.import_module(module_name), attr)
+    if isinstance(target, type):
+        target = getattr(target(), function)
+    kwargs = options[option]
+    return lambda data: target(data, **kwargs)
+
+
+def output_size(result):
+    if isinstance(result, str):
+        return len(result)
+    if isinstance(result, dict):
+        if result.get("success") is False:
+            return None
+        return max((len(v) for v in result.values() if isinstance(v, str)), default=0)
+    return None
+
+
+def _proc_kb(field):
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak():
+    """Reset the RSS high-water mark (Linux >= 4.0). False when the platform cannot."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _trim():
+    """Hand freed heap pages back to the OS (glibc), so RSS before a call is not inflated by the warm-up."""
+    try:
+        import ctypes
+
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _max_rss_kb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class _PeakMeter:
+    """RSS growth above the level at ``start()`` (freed heap is trimmed first so it does not count)."""
+
+    def start(self):
+        gc.collect()
+        _trim()
+        if _reset_peak():
+            self.before, self.read = _proc_kb("VmRSS"), lambda: _proc_kb("VmHWM")
+        else:
+            self.before, self.read = _max_rss_kb(), _max_rss_kb
+
+    def peak_mb(self):
+        return round(max(0, (self.read() or 0) - (self.before or 0)) / 1024, 1)
+
+
+def measure(key, repeats, budget):
+    """Run one case in this process; returns its result row."""
+    logging.disable(logging.WARNING)
+    function, option, size, fmt = parse_key(key)
+    data = make_fixture(size, fmt)
+    call = resolve(function, option)
+    meter = _PeakMeter()
+
+    # Warm-up: imports, lazy tables, allocator growth. A case slower than the budget is timed on
+    # this call alone rather than paying for it twice.
+    meter.start()
+    t = time.perf_counter()
+    out = output_size(call(data))
+    times = [time.perf_counter() - t]
+    peak_mb = meter.peak_mb()
+    if times[0] < budget and repeats > 0:
+        times = []
+        meter.start()
+        start = time.perf_counter()
+        while len(times) < repeats:
+            t = time.perf_counter()
+            call(data)
+            times.append(time.perf_counter() - t)
+            if time.perf_counter() - start > budget:
+                break
+        peak_mb = meter.peak_mb()
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 2),
+        "min_ms": round(min(times) * 1000, 2),
+        "runs": len(times),
+        "peak_mb": peak_mb,
+        "input_bytes": len(data),
+        "output_bytes": out,
+        "ok": out is not None,
+    }
+
+
+def merge_rounds(rows):
+    """One result row from the per-round rows of a case (the first failure wins)."""
+    for row in rows:
+        if not row.get("ok"):
+            return row
+    mins = [row["min_ms"] for row in rows]
+    return {
+        "median_ms": round(statistics.median(row["median_ms"] for row in rows), 2),
+        "min_ms": round(min(mins), 2),
+        "spread_ms": round(max(mins) - min(mins), 2),
+        "runs": sum(row["runs"] for row in rows),
+        "rounds": len(rows),
+        "peak_mb": round(statistics.median(row["peak_mb"] for row in rows), 1),
+        "input_bytes": rows[0]["input_bytes"],
+        "output_bytes": rows[0]["output_bytes"],
+        "ok": True,
+    }
+
+
+def _child(conn, key, repeats, budget):
+    try:
+        conn.send(("ok", measure(key, repeats, budget)))
+    except BaseException as e:  # report, do not hang the parent
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def run_case(ctx, key, repeats, budget):
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(child, key, repeats, budget))
+    proc.start()
+    child.close()
+    try:
+        status, payload = parent.recv()
+    except EOFError:
+        status, payload = "error", "child process died"
+    proc.join()
+    if status != "ok":
+        return {"ok": False, "error": payload}
+    return payload
+
+
+def machine_info():
+    info = {"python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "cpu_count": os.cpu_count()}
+    for name, module in (("numpy", "numpy"), ("opencv", "cv2"), ("pillow", "PIL")):
+        try:
+            info[name] = __import__(module).__version__
+        except Exception:
+            info[name] = None
+    return info
+
+
+def compare(results, baseline, threshold, memory_threshold):
+    """Rows of (key, flags) for cases present in both runs; flags empty when within bounds."""
+    rows = []
+    for key, row in results.items():
+        base = baseline.get(key)
+        if not base or not row.get("ok") or not base.get("ok"):
+            continue
+        flags = []
+        noise_ms = max(NOISE_MS, row.get("spread_ms", 0), base.get("spread_ms", 0))
+        delta_ms = row["min_ms"] - base["min_ms"]
+        if delta_ms > noise_ms and row["min_ms"] > base["min_ms"] * (1 + threshold):
+            flags.append(f"time +{delta_ms / base['min_ms'] * 100:.0f}%")
+        elif -delta_ms > noise_ms and row["min_ms"] < base["min_ms"] * (1 - threshold):
+            flags.append(f"time {delta_ms / base['min_ms'] * 100:.0f}% (faster)")
+        delta_mb = row["peak_mb"] - base["peak_mb"]
+        if delta_mb > NOISE_MB and row["peak_mb"] > base["peak_mb"] * (1 + memory_threshold):
+            flags.append(f"memory +{delta_mb:.0f} MB")
+        rows.append((key, flags))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("-k", dest="filters", action="append", default=[],
+                        help="only cases whose key contains this (repeatable, all must match)")
+    parser.add_argument("--repeats", type=int, default=5, help="timed calls per round (after one warm-up)")
+    parser.add_argument("--rounds", type=int, default=3, help="fresh child processes per case")
+    parser.add_argument("--budget", type=float, default=10.0, help="stop repeating a case after this many seconds")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed time growth (0.25 = 25%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.20, help="allowed peak memory growth")
+    parser.add_argument("--json", type=Path, help="also write this run to a file")
+    parser.add_argument("--list", action="store_true", help="print the case keys and exit")
+    args = parser.parse_args()
+
+    keys = case_keys(args.sizes, args.formats, args.filters)
+    if args.list:
+        print("\n".join(keys))
+        return 0
+    if not keys:
+        print("no cases match")
+        return 2
+
+    baseline = {}
+    if not args.save and args.baseline.exists():
+        with open(args.baseline) as fh:
+            stored = json.load(fh)
+        baseline = stored.get("results", {})
+        if stored.get("machine") != machine_info():
+            print(f"note: baseline {args.baseline} was recorded on a different machine/stack; "
+                  f"time comparisons may not mean much")
+
+    ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+    results = {}
+    width = max(len(k) for k in keys)
+    print(f"{'case':<{width}}{'median ms':>11}{'min ms':>10}{'runs':>6}{'peak MB':>9}{'base min':>10}{'base MB':>9}")
+    rounds = {key: [] for key in keys}
+    for _ in range(max(1, args.rounds)):
+        for key in keys:
+            if not rounds[key] or rounds[key][-1].get("ok"):
+                rounds[key].append(run_case(ctx, key, args.repeats, args.budget))
+    for key in keys:
+        row = results[key] = merge_rounds(rounds[key])
+        base = baseline.get(key, {})
+        if not row.get("ok"):
+            print(f"{key:<{width}}  FAILED {row.get('error') or 'function reported failure'}")
+            continue
+        print(f"{key:<{width}}{row['median_ms']:>11.1f}{row['min_ms']:>10.1f}{row['runs']:>6}{row['peak_mb']:>9.1f}"
+              f"{base.get('min_ms', float('nan')):>10.1f}{base.get('peak_mb', float('nan')):>9.1f}")
+
+    document = {"created_at": datetime.now(timezone.utc).isoformat(), "machine": machine_info(),
+                "repeats": args.repeats, "rounds": args.rounds, "results": results}
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(document, indent=2))
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        if args.baseline.exists():
+            # Keep cases this run did not cover (e.g. a run limited with --sizes or -k).
+            with open(args.baseline) as fh:
+                document["results"] = {**json.load(fh).get("results", {}), **results}
+        args.baseline.write_text(json.dumps(document, indent=2))
+        print(f"\nbaseline saved to {args.baseline} ({len(document['results'])} cases)")
+        return 0
+
+    failed = [k for k, r in results.items() if not r.get("ok")]
+    if not baseline:
+        print(f"\nno baseline at {args.baseline}; run with --save to record one")
+        return 1 if failed else 0
+    changes = [(k, f) for k, f in compare(results, baseline, args.threshold, args.memory_threshold) if f]
+    regressions = [(k, f) for k, f in changes if any(not x.endswith("(faster)") for x in f)]
+    print(f"\ncompared {len(results)} cases with {args.baseline}: "
+          f"{len(regressions)} regressed, {len(changes) - len(regressions)} improved, {len(failed)} failed")
+    for key, flags in changes:
+        print(f"  {'REGRESSION' if (key, flags) in regressions else 'improved  '} {key}: {', '.join(flags)}")
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Per-request logging overhead on GET /api/product/browse, in-process (Flask test client).
+
+Three modes, same request loop:
+  off      logging disabled entirely - the floor
+  legacy   the old setup: basicConfig StreamHandler writing in the request thread, plus the
+           eager f-string INFO lines and print()s the request path used to emit (BEFORE_REQUEST
+           for every /api/ call, three browse lines, and one FILTER DEBUG line per product for a
+           named category)
+  current  utils/logging_setup: QueueHandler + listener thread, hot-path lines at DEBUG
+
+Log output goes to a sink that discards it; --sink-latency-ms makes each write sleep, to show
+what a slow stderr/pipe costs a request when I/O happens in the request thread. Needs real or
+dummy SUPABASE_URL / keys in the environment, like the app itself.
+
+Examples (run from backend/):
+  python scripts/bench_logging.py
+  python scripts/bench_logging.py --requests 2000 --category shirts
+  python scripts/bench_logging.py --sink-latency-ms 1
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+
+class Sink:
+    """Write target that drops everything, optionally after a delay per write."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def legacy_hook(logger, products, sink):
+    from flask import request
+
+    def before():
+        # What security_check, get_browse_api and filter_products_by_category emitted per request
+        # before the change (the filter's print() lines went to stdout synchronously).
+        if request.path.startswith('/api/'):
+            logger.info(f"🔵 [BEFORE_REQUEST] {request.method} {request.path} from {request.headers.get('Origin', 'unknown')}")
+        if request.path != '/api/product/browse':
+            return
+        category = request.args.get('category', 'all')
+        user_agent = request.headers.get('User-Agent', '')
+        is_mobile = 'Mobile' in user_agent or 'Android' in user_agent or 'iPhone' in user_agent
+        logger.info(f"📂 API Browse request - Category: {category}")
+        logger.info(f"📱 Mobile detection: {is_mobile}")
+        logger.info(f"📱 User-Agent: {user_agent}")
+        print(f"🔍 FILTER DEBUG: Received category: '{category}'", file=sink)
+        if category in ("all", "all-products", "thumbnails"):
+            print(f"🔍 FILTER DEBUG: returning early for '{category}'", file=sink)
+            return
+        print(f"🔍 FILTER DEBUG: Looking for products in category '{category}'", file=sink)
+        print(f"🔍 FILTER DEBUG: Category products: [...]", file=sink)
+        for product in products:
+            print(f"❌ FILTER DEBUG: Skipping product: {product['name']}", file=sink)
+        print(f"🔍 FILTER DEBUG: Returning filtered products out of {len(products)} total", file=sink)
+
+    return before
+
+
+def run(client, url, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        r = client.get(url)
+        samples.append(time.perf_counter() - start)
+        if r.status_code != 200:
+            raise RuntimeError(f"{url} returned {r.status_code}")
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--category", default="all")
+    parser.add_argument("--sink-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    import app as app_module
+    from utils import logging_setup
+
+    flask_app = app_module.app
+    client = flask_app.test_client()
+    url = f"/api/product/browse?category={args.category}"
+    sink = Sink(args.sink_latency_ms / 1000.0)
+    root = logging.getLogger()
+    queue_handler = logging_setup._state["handler"]
+    logging_setup._state["target"].setStream(sink)
+
+    legacy_handler = logging.StreamHandler(sink)
+    legacy_handler.setFormatter(logging.Formatter(logging_setup.TEXT_FORMAT))
+    hook = legacy_hook(logging.getLogger("app"), app_module.PRODUCTS, sink)
+
+    def set_mode(mode):
+        logging.disable(logging.NOTSET)
+        flask_app.before_request_funcs.setdefault(None, [])
+        funcs = flask_app.before_request_funcs[None]
+        if hook in funcs:
+            funcs.remove(hook)
+        root.handlers[:] = [queue_handler]
+        if mode == "off":
+            logging.disable(logging.CRITICAL)
+        elif mode == "legacy":
+            root.handlers[:] = [legacy_handler]
+            funcs.insert(0, hook)
+
+    results = {}
+    for mode in ("off", "legacy", "current"):
+        set_mode(mode)
+        run(client, url, args.warmup)
+        writes_before = sink.writes
+        samples = run(client, url, args.requests)
+        results[mode] = (statistics.mean(samples), statistics.median(samples), sink.writes - writes_before)
+    set_mode("current")
+    logging_setup.stop()
+
+    floor = results["off"][0]
+    print(f"{args.requests} x GET {url}  (sink latency {args.sink_latency_ms} ms/write)")
+    print(f"{'mode':<8} {'mean us':>9} {'p50 us':>9} {'overhead us':>12} {'writes/req':>11}")
+    for mode, (mean, p50, writes) in results.items():
+        print(f"{mode:<8} {mean * 1e6:>9.1f} {p50 * 1e6:>9.1f} {(mean - floor) * 1e6:>12.1f} "
+              f"{writes / args.requests:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
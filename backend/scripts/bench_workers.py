@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Throughput of the CPU-bound image path at 1, 2, 4... gunicorn workers.
+
+Starts gunicorn with gunicorn.conf.py for each worker count, POSTs a generated PNG to
+/api/process-corner-radius from N client threads for a fixed duration, and prints req/s.
+Rate limits are turned off for the run (RATE_LIMIT_ENABLED=0). Needs real or dummy
+SUPABASE_URL / keys in the environment, like the app itself.
+
+Examples (run from backend/):
+  python scripts/bench_workers.py
+  python scripts/bench_workers.py --workers 1 2 4 8 --clients 16 --duration 20
+  python scripts/bench_workers.py --worker-class gevent
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+backend_dir = Path(__file__).resolve().parent.parent
+
+
+def make_payload(size):
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (size, size), (30, 120, 200))
+    draw = ImageDraw.Draw(img)
+    for i in range(0, size, 16):
+        draw.line((0, i, size, size - i), fill=(255, 200, 0), width=3)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return {
+        "image_data": "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode(),
+        "corner_radius": 40,
+    }
+
+
+def wait_ready(url, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {proc.returncode}")
+        try:
+            if requests.get(url + "/api/ping", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def run_load(url, payload, clients, duration):
+    done = []
+    errors = []
+    stop_at = time.time() + duration
+    lock = threading.Lock()
+
+    def client():
+        session = requests.Session()
+        while time.time() < stop_at:
+            try:
+                r = session.post(url + "/api/process-corner-radius", json=payload, timeout=60)
+                with lock:
+                    (done if r.ok else errors).append(r.status_code)
+            except requests.RequestException as e:
+                with lock:
+                    errors.append(str(e))
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    return len(done) / elapsed, len(errors)
+
+
+def bench(workers, args, payload):
+    port = args.port
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(workers),
+        "GUNICORN_WORKER_CLASS": args.worker_class,
+        "GUNICORN_THREADS": str(args.threads),
+        "RATE_LIMIT_ENABLED": "0",
+    })
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=backend_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(url, proc)
+        run_load(url, payload, args.clients, 2)  # warm up every worker
+        return run_load(url, payload, args.clients, args.duration)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--worker-class", default="gthread")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--image-size", type=int, default=1024)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    payload = make_payload(args.image_size)
+    print(f"CPUs: {os.cpu_count()}  class: {args.worker_class}  threads/worker: {args.threads}  clients: {args.clients}")
+    print(f"{'workers':>8}{'req/s':>10}{'speedup':>10}{'errors':>8}")
+    baseline = None
+    for n in args.workers:
+        rps, errors = bench(n, args, payload)
+        baseline = baseline or rps
+        print(f"{n:>8}{rps:>10.2f}{rps / baseline if baseline else 0:>9.2f}x{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Offline load test: boots the app in-process against the local stand-ins in standins.py (fake
+PostgREST, Printful, Stripe and Resend), seeds a small store, drives a weighted traffic mix from
+N client threads and prints throughput and p50/p95/p99 latency per route.
+
+Nothing leaves the machine: SUPABASE_URL and stripe.api_base point at the stand-ins, ``requests``
+calls to api.printful.com / api.resend.com are redirected to them, and any other outbound host is
+answered with a 404 and listed in the report. Shared stores stay in memory (SHARED_STORE_URI is
+blank) and rate limits are off. Webhooks are real ``checkout.session.completed`` events for
+sessions the checkout scenario created, signed with STRIPE_WEBHOOK_SECRET like Stripe does.
+
+Scenarios (weights for --mix):
+  browse        GET  /api/product/browse
+  product       GET  /api/product/<id>
+  product_page  GET  /product/<id>
+  shipping      POST /api/calculate-shipping
+  checkout      POST /api/create-checkout-session
+  webhook       POST /webhook
+  analytics     GET  /api/analytics?user_id=<creator>
+  print         POST /api/process-thumbnail-print-quality
+
+Results are comparable between runs on the same machine only; use --json to keep them.
+
+Examples (run from backend/):
+  python scripts/loadtest.py
+  python scripts/loadtest.py --clients 16 --duration 30 --upstream-latency-ms 15
+  python scripts/loadtest.py --mix browse=1,analytics=1 --sales 5000 --json /tmp/before.json
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import standins  # noqa: E402
+
+DEFAULT_MIX = "browse=30,product=20,product_page=10,shipping=10,checkout=10,webhook=8,analytics=7,print=5"
+CATEGORIES = ["all", "mens", "womens", "kids", "mugs", "hats", "bags"]
+CART_PRODUCTS = [("Unisex T-Shirt", 24.99, "Black", "M"), ("Unisex Hoodie", 44.99, "Black", "L"),
+                 ("White Glossy Mug", 19.99, "White", "11 oz")]
+ADDRESS = {"name": "Load Test", "email": "buyer@example.com", "address1": "1 Main St", "city": "Austin",
+           "state_code": "TX", "zip": "78701", "country_code": "US"}
+
+
+def make_image(size, fmt="PNG"):
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (size, size * 9 // 16), (30, 120, 200))
+    draw = ImageDraw.Draw(img)
+    for i in range(0, size, 16):
+        draw.line((0, i, size, size - i), fill=(255, 200, 0), width=3)
+    buf = io.BytesIO()
+    img.save(buf, format=fmt)
+    return f"data:image/{fmt.lower()};base64," + base64.b64encode(buf.getvalue()).decode()
+
+
+def prepare_environment(base_url, args):
+    # Set before the app loads .env (which never overrides), VITE_* included since they win.
+    # Any JWT-shaped key passes supabase-py's check; the stand-in ignores it.
+    anon_key = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.loadtest"
+    os.environ.update({
+        "SUPABASE_URL": base_url,
+        "VITE_SUPABASE_URL": base_url,
+        "SUPABASE_ANON_KEY": anon_key,
+        "VITE_SUPABASE_ANON_KEY": anon_key,
+        "SUPABASE_SERVICE_ROLE_KEY": "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.loadtest",
+        "SHARED_STORE_URI": "",
+        "STRIPE_SECRET_KEY": "sk_test_loadtest",
+        "STRIPE_WEBHOOK_SECRET": "whsec_loadtest",
+        "RESEND_API_KEY": "re_loadtest",
+        "MAIL_TO": "orders@loadtest.invalid",
+        "PRINTFUL_API_KEY": "loadtest",
+        "RATE_LIMIT_ENABLED": "0",
+    })
+    os.environ.setdefault("FLASK_SECRET_KEY", "loadtest")
+    os.environ.setdefault("LOG_LEVEL", args.log_level)
+    # Slow-request stack capture would add sampler overhead and write a file per print render.
+    os.environ.setdefault("PROFILE_SLOW_MS", "0")
+
+
+def seed(state, args, screenshot):
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    creator_id = str(uuid.uuid4())
+    state.db.seed("users", [{
+        "id": creator_id, "email": "creator@loadtest.invalid", "display_name": "Load Creator",
+        "username": "loadcreator", "subdomain": "loadcreator", "role": "creator", "status": "active",
+    }])
+    product_ids = [str(uuid.uuid4()) for _ in range(args.products)]
+    state.db.seed("products", [{
+        "product_id": pid, "user_id": creator_id, "name": f"Product {i}",
+        "video_title": f"Video {i}", "creator_name": "Load Creator", "video_url": f"https://youtu.be/v{i}",
+        "thumbnail_url": f"https://img.loadtest.invalid/{pid}.jpg",
+        "screenshots_urls": json.dumps([f"https://img.loadtest.invalid/{pid}-{n}.jpg" for n in range(3)]),
+        "category": rng.choice(CATEGORIES[1:]), "created_at": (now - timedelta(hours=i)).isoformat(),
+    } for i, pid in enumerate(product_ids)])
+    state.db.seed("sales", [{
+        "id": str(uuid.uuid4()), "user_id": creator_id, "product_id": rng.choice(product_ids),
+        "product_name": rng.choice(CART_PRODUCTS)[0], "amount": rng.choice(CART_PRODUCTS)[1],
+        "video_title": "Video", "creator_name": "Load Creator", "image_url": screenshot,
+        "channel_id": None, "favorite_list_id": None,
+        "created_at": (now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))).isoformat(),
+    } for _ in range(args.sales)])
+    return creator_id, product_ids
+
+
+class Scenarios:
+    """One method per traffic type; each returns the test-client response."""
+
+    def __init__(self, state, creator_id, product_ids, screenshot, print_image):
+        self.state = state
+        self.creator_id = creator_id
+        self.product_ids = product_ids
+        self.screenshot = screenshot
+        self.print_image = print_image
+        self.completed = deque()
+
+    def _cart(self, rng):
+        cart = []
+        for name, price, color, size in rng.sample(CART_PRODUCTS, rng.randint(1, 2)):
+            cart.append({"product": name, "price": price, "quantity": 1, "variants": {"color": color, "size": size},
+                         "product_id": rng.choice(self.product_ids), "selected_screenshot": self.screenshot})
+        return cart
+
+    def browse(self, http, rng):
+        return http.get(f"/api/product/browse?category={rng.choice(CATEGORIES)}")
+
+    def product(self, http, rng):
+        return http.get(f"/api/product/{rng.choice(self.product_ids)}?category={rng.choice(CATEGORIES)}")
+
+    def product_page(self, http, rng):
+        return http.get(f"/product/{rng.choice(self.product_ids)}")
+
+    def shipping(self, http, rng):
+        return http.post("/api/calculate-shipping", json={"cart": self._cart(rng), "shipping_address": ADDRESS})
+
+    def checkout(self, http, rng):
+        response = http.post("/api/create-checkout-session", headers={"Origin": "https://loadcreator.screenmerch.com"},
+                             json={
+                                 "cart": self._cart(rng), "product_id": rng.choice(self.product_ids),
+                                 "shipping_address": ADDRESS, "shipping_cost": 4.75,
+                                 "user_email": "buyer@example.com", "videoTitle": "Video",
+                                 "creatorName": "Load Creator", "videoUrl": "https://youtu.be/v1",
+                                 "screenshot_timestamp": "00:42",
+                             })
+        url = (response.get_json(silent=True) or {}).get("url") or ""
+        if response.status_code == 200 and "/pay/" in url:
+            self.completed.append(url.rsplit("/", 1)[1])
+        return response
+
+    def webhook(self, http, rng):
+        try:
+            session_id = self.completed.popleft()
+        except IndexError:
+            # Nothing new to pay for: replay an earlier session, as Stripe's retries do.
+            session_id = rng.choice(list(self.state.sessions))
+        payload = json.dumps(self.state.completed_event(session_id)).encode()
+        return http.post("/webhook", data=payload, content_type="application/json",
+                         headers={"Stripe-Signature": self.state.sign(payload)})
+
+    def analytics(self, http, rng):
+        return http.get(f"/api/analytics?user_id={self.creator_id}")
+
+    def print(self, http, rng):
+        return http.post("/api/process-thumbnail-print-quality", json={
+            "thumbnail_data": self.print_image, "print_dpi": 300, "soft_corners": True,
+            "corner_radius_percent": 8, "edge_feather": True, "feather_edge_percent": 4,
+        })
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if not hasattr(Scenarios, name) or name.startswith("_"):
+            raise SystemExit(f"unknown scenario {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run(app, scenarios, mix, clients, duration, seed_value):
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    results = {name: {"latencies": [], "errors": 0, "statuses": {}} for name in names}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(index):
+        rng = random.Random(seed_value + index)
+        http = app.test_client()
+        local = {name: ([], {}) for name in names}
+        while time.perf_counter() < stop_at:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = getattr(scenarios, name)(http, rng).status_code
+            except Exception as e:
+                status = type(e).__name__
+            local[name][0].append(time.perf_counter() - start)
+            local[name][1][status] = local[name][1].get(status, 0) + 1
+        with lock:
+            for name, (latencies, statuses) in local.items():
+                row = results[name]
+                row["latencies"].extend(latencies)
+                for status, n in statuses.items():
+                    row["statuses"][status] = row["statuses"].get(status, 0) + n
+                    if not (isinstance(status, int) and status < 400):
+                        row["errors"] += n
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - start
+
+
+def report(results, elapsed, state, args):
+    rows = []
+    print(f"\n{args.clients} clients, {elapsed:.1f}s, upstream latency {args.upstream_latency_ms:g} ms")
+    print(f"{'route':<14}{'count':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    total = 0
+    for name, row in results.items():
+        latencies = sorted(row["latencies"])
+        total += len(latencies)
+        summary = {
+            "route": name, "count": len(latencies), "errors": row["errors"],
+            "rps": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000, "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000, "max_ms": (latencies[-1] if latencies else 0) * 1000,
+            "statuses": {str(k): v for k, v in row["statuses"].items()},
+        }
+        rows.append(summary)
+        print(f"{name:<14}{summary['count']:>8}{summary['errors']:>8}{summary['rps']:>9.1f}"
+              f"{summary['p50_ms']:>9.1f}{summary['p95_ms']:>9.1f}{summary['p99_ms']:>9.1f}{summary['max_ms']:>9.1f}")
+    print(f"{'total':<14}{total:>8}{sum(r['errors'] for r in rows):>8}{total / elapsed if elapsed else 0:>9.1f}")
+
+    for summary in rows:
+        odd = {k: v for k, v in summary["statuses"].items() if not (k.isdigit() and int(k) < 400)}
+        if odd:
+            print(f"  {summary['route']}: non-2xx/3xx outcomes {odd}")
+    upstream = {f"{service} {method}": n for (service, method), n in sorted(state.calls.items())}
+    print("upstream calls: " + (", ".join(f"{k}={v}" for k, v in upstream.items()) or "none"))
+    print(f"mail sent: {len(state.mail)}  stripe sessions: {len(state.sessions)}  "
+          f"orders: {len(state.db.rows('orders'))}  sales: {len(state.db.rows('sales'))}")
+    if state.external:
+        print("blocked outbound hosts: " + ", ".join(f"{h}={n}" for h, n in state.external.most_common()))
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"clients": args.clients, "duration_s": elapsed, "mix": args.mix,
+                       "upstream_latency_ms": args.upstream_latency_ms, "routes": rows,
+                       "upstream_calls": upstream, "blocked_outbound": dict(state.external)}, fh, indent=2)
+        print(f"wrote {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario=weight,... (default {DEFAULT_MIX})")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--sales", type=int, default=1000)
+    parser.add_argument("--image-size", type=int, default=1024, help="width of the print-render source image")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    state, base_url, server = standins.start(args.upstream_latency_ms / 1000.0)
+    prepare_environment(base_url, args)
+    standins.redirect_requests(base_url)
+
+    os.chdir(backend_dir)
+    import stripe
+    from app import app
+
+    stripe.api_base = base_url + "/stripe"
+    screenshot = make_image(160, "JPEG")
+    creator_id, product_ids = seed(state, args, screenshot)
+    scenarios = Scenarios(state, creator_id, product_ids, screenshot, make_image(args.image_size))
+
+    # Every scenario once (checkout first so the webhook has a session), then a short warm-up.
+    http = app.test_client()
+    rng = random.Random(args.seed)
+    for name in ["checkout"] + [n for n in mix if n != "checkout"]:
+        status = getattr(scenarios, name)(http, rng).status_code
+        if status >= 400:
+            print(f"warning: {name} answered {status} before the run")
+    if args.warmup > 0:
+        run(app, scenarios, mix, args.clients, args.warmup, args.seed + 1000)
+    state.calls.clear()
+
+    results, elapsed = run(app, scenarios, mix, args.clients, args.duration, args.seed)
+    report(results, elapsed, state, args)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the services the backend talks to, for offline load tests (see loadtest.py).
+
+One threaded HTTP server on 127.0.0.1 answers under these prefixes:
+
+  /rest/v1       in-memory PostgREST: select/projection, eq/neq/gt/gte/lt/lte/like/ilike/in/is
+                 filters (and ``not.``/``or=``), order, limit/offset/Range, Prefer count=exact and
+                 return=minimal, single-object Accept, insert/upsert/update/delete. RPCs answer
+                 PGRST202 (function not found), so callers take their table fallbacks.
+  /storage/v1    object upload/download kept in memory
+  /printful      /shipping/rates (flat STANDARD rate) and catalog reads (/products, /products/<id>,
+                 /v2/catalog-products/<id>/catalog-variants)
+  /stripe        /v1/customers and /v1/checkout/sessions (create + retrieve); point
+                 ``stripe.api_base`` at it
+  /resend        /emails mail sink
+  /_external     anything else a redirected client tried to reach; always 404 and counted
+
+``--latency-ms`` adds a fixed delay to every answer to mimic network round trips.
+
+Examples (run from backend/):
+  python scripts/standins.py --port 8787
+  python scripts/standins.py --port 8787 --latency-ms 20
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import hashlib
+import hmac
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urlunsplit
+
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+REDIRECTED_HOSTS = {"api.printful.com": "/printful", "api.resend.com": "/resend", "api.stripe.com": "/stripe"}
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+CATALOG_COLORS = ("Black", "White", "Navy", "Heather Grey")
+CATALOG_SIZES = ("XS", "S", "M", "L", "XL", "2XL", "3XL", "11 oz", "15 oz")
+
+
+class PostgrestError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+def _text(value):
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _sort_key(value):
+    try:
+        return 0, float(value), ""
+    except (TypeError, ValueError):
+        return 1, 0.0, _text(value)
+
+
+def _ordered(a, b):
+    """(a, b) as floats when both are numeric, else as strings (ISO timestamps sort correctly)."""
+    try:
+        return float(a), float(b)
+    except (TypeError, ValueError):
+        return _text(a), str(b)
+
+
+def _split_top(text):
+    """Split on commas that are not inside parentheses or double quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    if current:
+        parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _like(pattern, value, ignore_case):
+    regex = fnmatch.translate(pattern.replace("%", "*").replace("_", "?"))
+    return re.match(regex, _text(value), re.IGNORECASE if ignore_case else 0) is not None
+
+
+def _compare(op, arg, value):
+    if op == "eq":
+        return _text(value) == arg
+    if op == "neq":
+        return _text(value) != arg
+    if op in ("gt", "gte", "lt", "lte"):
+        if value is None:
+            return False
+        a, b = _ordered(value, arg)
+        return {"gt": a > b, "gte": a >= b, "lt": a < b, "lte": a <= b}[op]
+    if op in ("like", "ilike"):
+        return value is not None and _like(arg, value, op == "ilike")
+    if op == "in":
+        options = [o.strip('"') for o in _split_top(arg.strip("()"))]
+        return _text(value) in options
+    if op == "is":
+        return _text(value) == arg.lower()
+    if op == "cs":
+        wanted = json.loads(arg) if arg.startswith(("[", "{")) else arg.strip("{}").split(",")
+        if isinstance(value, dict) and isinstance(wanted, dict):
+            return all(value.get(k) == v for k, v in wanted.items())
+        return isinstance(value, list) and all(w in value for w in wanted)
+    raise PostgrestError(400, "PGRST100", f"operator {op!r} is not supported by the stand-in")
+
+
+def _condition(column, expr):
+    """``op.arg`` or ``not.op.arg`` for ``column`` -> predicate(row)."""
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[4:]
+    op, _, arg = expr.partition(".")
+    return lambda row: _compare(op, arg, row.get(column)) != negate
+
+
+def _logic(expr, any_of):
+    """Body of ``or=(...)`` / ``and=(...)``, including nested ``and(...)``/``or(...)``."""
+    predicates = []
+    for part in _split_top(expr.strip()[1:-1]):
+        nested = re.match(r"^(not\.)?(and|or)(\(.*\))$", part)
+        if nested:
+            inner = _logic(nested.group(3), nested.group(2) == "or")
+            predicates.append((lambda p: lambda row: not p(row))(inner) if nested.group(1) else inner)
+            continue
+        column, _, rest = part.partition(".")
+        predicates.append(_condition(column, rest))
+    combine = any if any_of else all
+    return lambda row: combine(p(row) for p in predicates)
+
+
+def _project(row, select):
+    if not select or select == "*":
+        return dict(row)
+    out = {}
+    for item in _split_top(select):
+        if item == "*":
+            out.update(row)
+        elif "(" in item:
+            # Embedded resource: the stand-in has no foreign keys, so embed nothing.
+            alias = item.split("(", 1)[0].split(":", 1)[0].split("!", 1)[0]
+            out[alias] = []
+        else:
+            name = item.split("::", 1)[0]
+            alias, _, column = name.rpartition(":")
+            out[alias or column] = row.get(column)
+    return out
+
+
+class PostgrestFake:
+    """Tables are lists of dicts; every request runs under one lock (good enough for a stand-in)."""
+
+    def __init__(self):
+        self.tables = {}
+        self._lock = threading.Lock()
+
+    def seed(self, table, rows):
+        with self._lock:
+            self.tables.setdefault(table, []).extend(dict(r) for r in rows)
+
+    def rows(self, table):
+        with self._lock:
+            return [dict(r) for r in self.tables.get(table, [])]
+
+    def _predicate(self, args):
+        predicates = []
+        for key in args:
+            if key in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+                continue
+            for value in args.getlist(key):
+                if key in ("or", "and"):
+                    predicates.append(_logic(value, key == "or"))
+                else:
+                    predicates.append(_condition(key, value))
+        return lambda row: all(p(row) for p in predicates)
+
+    @staticmethod
+    def _order(rows, spec):
+        for term in reversed(_split_top(spec or "")):
+            column, *mods = term.split(".")
+            desc = "desc" in mods
+            nulls_first = "nullsfirst" in mods or (desc and "nullslast" not in mods)
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: _sort_key(r.get(column)), reverse=desc)
+            rows = missing + present if nulls_first else present + missing
+        return rows
+
+    @staticmethod
+    def _window(args, headers):
+        offset = int(args.get("offset") or 0)
+        limit = args.get("limit")
+        limit = int(limit) if limit is not None else None
+        match = re.match(r"^(\d+)-(\d*)$", headers.get("Range", ""))
+        if match:
+            offset = int(match.group(1))
+            if match.group(2):
+                limit = int(match.group(2)) - offset + 1
+        return offset, limit
+
+    def select(self, table, args, headers):
+        with self._lock:
+            matched = [r for r in self.tables.get(table, []) if self._predicate(args)(r)]
+        matched = self._order(matched, args.get("order"))
+        offset, limit = self._window(args, headers)
+        page = matched[offset:offset + limit if limit is not None else None]
+        return [_project(r, args.get("select")) for r in page], offset, len(matched)
+
+    def insert(self, table, body, args, prefer):
+        rows = body if isinstance(body, list) else [body]
+        now = datetime.now(timezone.utc).isoformat()
+        conflict_cols = (args.get("on_conflict") or "id").split(",")
+        merge = "resolution=merge-duplicates" in prefer
+        ignore = "resolution=ignore-duplicates" in prefer
+        written = []
+        with self._lock:
+            store = self.tables.setdefault(table, [])
+            for row in rows:
+                row = dict(row)
+                if merge or ignore:
+                    key = [_text(row.get(c)) for c in conflict_cols]
+                    existing = next((r for r in store if [_text(r.get(c)) for c in conflict_cols] == key), None)
+                    if existing is not None:
+                        if merge:
+                            existing.update(row)
+                            written.append(dict(existing))
+                        continue
+                row.setdefault("id", str(uuid.uuid4()))
+                row.setdefault("created_at", now)
+                store.append(row)
+                written.append(dict(row))
+        return [_project(r, args.get("select")) for r in written]
+
+    def update(self, table, body, args):
+        with self._lock:
+            predicate = self._predicate(args)
+            changed = []
+            for row in self.tables.get(table, []):
+                if predicate(row):
+                    row.update(body)
+                    changed.append(dict(row))
+        return [_project(r, args.get("select")) for r in changed]
+
+    def delete(self, table, args):
+        with self._lock:
+            predicate = self._predicate(args)
+            store = self.tables.get(table, [])
+            removed = [r for r in store if predicate(r)]
+            self.tables[table] = [r for r in store if not predicate(r)]
+        return [_project(r, args.get("select")) for r in removed]
+
+
+class StandIns:
+    """Shared state of all stand-ins: the fake database, storage, Stripe sessions and sent mail."""
+
+    def __init__(self, latency=0.0, webhook_secret="whsec_loadtest"):
+        self.latency = latency
+        self.webhook_secret = webhook_secret
+        self.db = PostgrestFake()
+        self.objects = {}
+        self.sessions = {}
+        self.mail = []
+        self.calls = Counter()
+        self.external = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, service, method):
+        with self._lock:
+            self.calls[(service, method)] += 1
+
+    def completed_event(self, session_id):
+        """A ``checkout.session.completed`` event for a session created through the Stripe stand-in."""
+        with self._lock:
+            session = dict(self.sessions[session_id])
+        return {
+            "id": f"evt_{uuid.uuid4().hex[:24]}",
+            "object": "event",
+            "type": "checkout.session.completed",
+            "created": int(time.time()),
+            "data": {"object": session},
+        }
+
+    def sign(self, payload, timestamp=None):
+        """``Stripe-Signature`` header value for ``payload`` (bytes), as Stripe computes it."""
+        timestamp = int(timestamp or time.time())
+        signed = f"{timestamp}.".encode() + payload
+        digest = hmac.new(self.webhook_secret.encode(), signed, hashlib.sha256).hexdigest()
+        return f"t={timestamp},v1={digest}"
+
+
+def _stripe_form(form):
+    """Flat Stripe form keys (``metadata[order_id]``, ``line_items[0][quantity]``) -> what we need."""
+    metadata, amounts, quantities = {}, {}, {}
+    for key, value in form.items(multi=True):
+        match = re.match(r"^metadata\[(.+)\]$", key)
+        if match:
+            metadata[match.group(1)] = value
+        match = re.match(r"^line_items\[(\d+)\]\[price_data\]\[unit_amount\]$", key)
+        if match:
+            amounts[match.group(1)] = int(value)
+        match = re.match(r"^line_items\[(\d+)\]\[quantity\]$", key)
+        if match:
+            quantities[match.group(1)] = int(value)
+    total = sum(amount * quantities.get(i, 1) for i, amount in amounts.items())
+    return metadata, total
+
+
+def create_app(state):
+    app = Flask("standins")
+
+    def pgrst_error(status, code, message):
+        return jsonify({"code": code, "message": message, "details": None, "hint": None}), status
+
+    @app.before_request
+    def delay():
+        if state.latency:
+            time.sleep(state.latency)
+
+    @app.route("/rest/v1/rpc/<fn>", methods=["GET", "POST"])
+    def rpc(fn):
+        state.record("supabase", "RPC")
+        return pgrst_error(404, "PGRST202", f"Could not find the function public.{fn} in the schema cache")
+
+    @app.route("/rest/v1/<table>", methods=["GET", "HEAD", "POST", "PATCH", "DELETE"])
+    def rest(table):
+        state.record("supabase", request.method)
+        prefer = request.headers.get("Prefer", "")
+        try:
+            if request.method in ("GET", "HEAD"):
+                rows, offset, total = state.db.select(table, request.args, request.headers)
+            elif request.method == "POST":
+                rows = state.db.insert(table, request.get_json(force=True), request.args, prefer)
+                offset, total = 0, len(rows)
+            elif request.method == "PATCH":
+                rows = state.db.update(table, request.get_json(force=True), request.args)
+                offset, total = 0, len(rows)
+            else:
+                rows = state.db.delete(table, request.args)
+                offset, total = 0, len(rows)
+        except PostgrestError as e:
+            return pgrst_error(e.status, e.code, e.message)
+
+        if "application/vnd.pgrst.object+json" in request.headers.get("Accept", ""):
+            if len(rows) != 1:
+                return pgrst_error(406, "PGRST116", "JSON object requested, multiple (or no) rows returned")
+            body = json.dumps(rows[0])
+        elif "return=minimal" in prefer or request.method == "HEAD":
+            body = ""
+        else:
+            body = json.dumps(rows)
+        status = 201 if request.method == "POST" else (204 if body == "" and request.method != "HEAD" else 200)
+        response = Response(body, status=status, mimetype="application/json")
+        span = f"{offset}-{offset + len(rows) - 1}" if rows else "*"
+        response.headers["Content-Range"] = f"{span}/{total if 'count=' in prefer else '*'}"
+        return response
+
+    @app.route("/storage/v1/object/<path:key>", methods=["GET", "POST", "PUT", "DELETE"])
+    def storage(key):
+        state.record("storage", request.method)
+        key = key.split("public/", 1)[-1] if key.startswith(("public/", "sign/")) else key
+        if request.method in ("POST", "PUT"):
+            state.objects[key] = (request.get_data(), request.content_type or "application/octet-stream")
+            return jsonify({"Key": key})
+        if request.method == "DELETE":
+            state.objects.pop(key, None)
+            return jsonify({"message": "Successfully deleted"})
+        if key not in state.objects:
+            return jsonify({"statusCode": "404", "error": "not_found", "message": "Object not found"}), 404
+        data, content_type = state.objects[key]
+        return Response(data, mimetype=content_type)
+
+    @app.route("/printful/shipping/rates", methods=["POST"])
+    def printful_rates():
+        state.record("printful", "POST")
+        items = (request.get_json(silent=True) or {}).get("items") or []
+        extra = max(0, sum(int(i.get("quantity") or 1) for i in items) - 1)
+        return jsonify({"code": 200, "result": [{
+            "id": "STANDARD", "name": "Flat Rate (Estimated delivery: 4-8 business days)",
+            "rate": f"{4.75 + 2.25 * extra:.2f}", "currency": "USD",
+            "minDeliveryDays": 4, "maxDeliveryDays": 8,
+        }]})
+
+    @app.route("/printful/products", methods=["GET"])
+    def printful_catalog():
+        state.record("printful", "GET")
+        return jsonify({"code": 200, "result": [
+            {"id": 71, "type": "T-SHIRT", "title": "Unisex Staple T-Shirt", "variant_count": 2},
+            {"id": 19, "type": "MUG", "title": "White Glossy Mug", "variant_count": 1},
+        ]})
+
+    @app.route("/printful/products/<int:product_id>", methods=["GET"])
+    def printful_product(product_id):
+        state.record("printful", "GET")
+        return jsonify({"code": 200, "result": {
+            "product": {"id": product_id, "title": f"Catalog product {product_id}"},
+            "variants": [
+                {"id": product_id * 1000 + 1, "product_id": product_id, "color": "Black", "size": "M",
+                 "price": "12.95", "in_stock": True},
+                {"id": product_id * 1000 + 2, "product_id": product_id, "color": "White", "size": "L",
+                 "price": "12.95", "in_stock": True},
+            ],
+        }})
+
+    @app.route("/printful/v2/catalog-products/<int:product_id>/catalog-variants", methods=["GET"])
+    def printful_catalog_variants(product_id):
+        state.record("printful", "GET")
+        variants = [{"id": product_id * 1000 + n, "catalog_product_id": product_id, "color": color, "size": size}
+                    for n, (color, size) in enumerate((c, s) for c in CATALOG_COLORS for s in CATALOG_SIZES)]
+        offset = int(request.args.get("offset") or 0)
+        limit = int(request.args.get("limit") or 100)
+        return jsonify({"data": variants[offset:offset + limit],
+                        "paging": {"total": len(variants), "offset": offset, "limit": limit}})
+
+    @app.route("/printful/<path:rest>", methods=["GET", "POST", "PUT", "DELETE"])
+    def printful_other(rest):
+        state.record("printful", request.method)
+        return jsonify({"code": 200, "result": []})
+
+    @app.route("/stripe/v1/customers", methods=["POST"])
+    def stripe_customer():
+        state.record("stripe", "POST")
+        return jsonify({"id": f"cus_{uuid.uuid4().hex[:14]}", "object": "customer",
+                        "email": request.form.get("email")})
+
+    @app.route("/stripe/v1/checkout/sessions", methods=["POST"])
+    def stripe_session_create():
+        state.record("stripe", "POST")
+        metadata, total = _stripe_form(request.form)
+        session_id = f"cs_test_{uuid.uuid4().hex}"
+        email = request.form.get("customer_email") or "buyer@example.com"
+        session = {
+            "id": session_id, "object": "checkout.session", "mode": "payment",
+            "url": f"https://checkout.stripe.com/c/pay/{session_id}",
+            "metadata": metadata, "amount_total": total, "amount_subtotal": total, "currency": "usd",
+            "payment_status": "paid", "status": "complete", "payment_intent": f"pi_{uuid.uuid4().hex[:24]}",
+            "total_details": {"amount_tax": 0, "amount_shipping": 0},
+            "customer_details": {"name": "Load Test", "email": email, "phone": "+15555550100",
+                                 "address": {"line1": "1 Main St", "city": "Austin", "state": "TX",
+                                             "postal_code": "78701", "country": "US"}},
+            "shipping_details": {"name": "Load Test",
+                                 "address": {"line1": "1 Main St", "line2": None, "city": "Austin", "state": "TX",
+                                             "postal_code": "78701", "country": "US"}},
+        }
+        with state._lock:
+            state.sessions[session_id] = session
+        return jsonify(session)
+
+    @app.route("/stripe/v1/checkout/sessions/<session_id>", methods=["GET"])
+    def stripe_session_retrieve(session_id):
+        state.record("stripe", "GET")
+        session = state.sessions.get(session_id)
+        if session is None:
+            return jsonify({"error": {"type": "invalid_request_error",
+                                      "message": f"No such checkout.session: '{session_id}'"}}), 404
+        return jsonify(session)
+
+    @app.route("/stripe/<path:rest>", methods=["GET", "POST", "DELETE"])
+    def stripe_other(rest):
+        state.record("stripe", request.method)
+        return jsonify({"error": {"type": "invalid_request_error",
+                                  "message": f"Unrecognized request URL ({request.method}: /{rest})"}}), 404
+
+    @app.route("/resend/emails", methods=["POST"])
+    def resend_emails():
+        state.record("resend", "POST")
+        message = request.get_json(silent=True) or {}
+        with state._lock:
+            state.mail.append({"to": message.get("to"), "subject": message.get("subject")})
+        return jsonify({"id": str(uuid.uuid4())})
+
+    @app.route("/_external/<host>/", defaults={"rest": ""}, methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    @app.route("/_external/<host>/<path:rest>", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    def external(host, rest):
+        with state._lock:
+            state.external[host] += 1
+        return jsonify({"error": f"{host} is not reachable from the load test"}), 404
+
+    return app
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def start(latency=0.0, port=0, webhook_secret="whsec_loadtest"):
+    """Serve the stand-ins on a daemon thread. Returns ``(state, base_url, server)``."""
+    state = StandIns(latency, webhook_secret)
+    server = make_server("127.0.0.1", port, create_app(state), threaded=True, request_handler=_QuietHandler)
+    threading.Thread(target=server.serve_forever, name="standins", daemon=True).start()
+    return state, f"http://127.0.0.1:{server.server_port}", server
+
+
+def redirect_requests(base_url):
+    """
+    Route ``requests`` traffic for hosts the app hardcodes (api.printful.com, api.resend.com) to the
+    stand-ins, and anything else non-local to ``/_external`` so a run never leaves the machine.
+    Patches ``HTTPAdapter.send`` in this process only; install it before importing the app so the
+    metrics wrapper still labels calls by their original host.
+    """
+    from requests.adapters import HTTPAdapter
+
+    target = urlsplit(base_url)
+    original_send = HTTPAdapter.send
+
+    def send(self, prepared, *args, **kwargs):
+        url = urlsplit(prepared.url)
+        if url.hostname not in LOCAL_HOSTS:
+            prefix = REDIRECTED_HOSTS.get(url.hostname, f"/_external/{url.hostname}")
+            prepared = prepared.copy()
+            prepared.url = urlunsplit(("http", target.netloc, prefix + url.path, url.query, ""))
+            prepared.headers.pop("Host", None)
+        return original_send(self, prepared, *args, **kwargs)
+
+    HTTPAdapter.send = send
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    state, base_url, server = start(args.latency_ms / 1000.0, args.port)
+    print(f"Stand-ins on {base_url}  (SUPABASE_URL={base_url}, stripe.api_base={base_url}/stripe)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
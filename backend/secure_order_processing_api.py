@@ -4,38 +4,101 @@ This module provides secure endpoints for outsourced workers to process orders
 while protecting proprietary processing algorithms.
 """
 
-from flask import request, jsonify
+from flask import g, request, jsonify
 from functools import wraps
 import logging
 from datetime import datetime
 import time
 
+from utils import processing_queue, work_queue
+
 logger = logging.getLogger(__name__)
 
-def processor_required(f):
+ALLOWED_ORIGINS = ["https://screenmerch.fly.dev", "https://screenmerch.com", "https://www.screenmerch.com"]
+
+
+def _preflight(methods):
+    response = jsonify(success=True)
+    origin = request.headers.get('Origin')
+    response.headers.add('Access-Control-Allow-Origin', origin if origin in ALLOWED_ORIGINS else 'https://screenmerch.com')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Methods', methods)
+    response.headers.add('Access-Control-Allow-Credentials', 'true')
+    return response
+
+
+# processor_permissions.role values and users.admin_role values allowed to work the queue.
+WORKER_ROLES = ('processor', 'admin')
+ADMIN_ROLES = (None, 'admin', 'master_admin', 'order_processing_admin')
+
+
+def _bearer_token():
+    auth_header = request.headers.get('Authorization') or ''
+    if not auth_header.startswith('Bearer '):
+        return None
+    return auth_header[len('Bearer '):].strip() or None
+
+
+def _verified_user_id(supabase):
+    """Id of the user the bearer token belongs to, or None when it is missing or rejected."""
+    token = _bearer_token()
+    if not token:
+        return None
+    try:
+        user = getattr(supabase.auth.get_user(token), 'user', None)
+    except Exception as e:
+        logger.warning(f"⚠️ [SECURE_PROCESSING] Token rejected: {str(e)}")
+        return None
+    return str(user.id) if user is not None and getattr(user, 'id', None) else None
+
+
+def _worker_role(client, user_id):
+    """'admin' for order-processing admins, the active processor_permissions role, else None."""
+    users = client.table('users').select('is_admin, admin_role').eq('id', user_id).limit(1).execute()
+    user = (users.data or [None])[0]
+    if user and user.get('is_admin') and user.get('admin_role') in ADMIN_ROLES:
+        return 'admin'
+    perms = client.table('processor_permissions').select('role, is_active').eq('user_id', user_id).limit(1).execute()
+    perm = (perms.data or [None])[0]
+    if perm and perm.get('is_active', True) and perm.get('role') in WORKER_ROLES:
+        return perm['role']
+    return None
+
+
+def _worker_id():
+    """The calling worker's user id, as verified by processor_required."""
+    return g.get('worker_id')
+
+
+def processor_required(supabase, supabase_admin):
     """
-    Decorator to require processor authentication.
-    Checks if user is authenticated and has processor permissions.
+    Decorator factory requiring a verified Supabase session whose user is a processor or admin.
+    The worker id comes from the token, never from headers or the body; endpoints behind it
+    may use the service-role client.
     """
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        # Get auth token from request
-        auth_header = request.headers.get('Authorization')
-        if not auth_header:
-            return jsonify({"success": False, "error": "Authentication required"}), 401
-        
-        # Extract token (assuming Bearer token format)
-        try:
-            token = auth_header.replace('Bearer ', '')
-        except:
-            return jsonify({"success": False, "error": "Invalid authentication format"}), 401
-        
-        # Verify token and get user (this would use Supabase auth)
-        # For now, we'll check in the endpoint itself
-        # In production, you'd verify the JWT token here
-        
-        return f(*args, **kwargs)
-    return decorated_function
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method == "OPTIONS":
+                return f(*args, **kwargs)
+            
+            user_id = _verified_user_id(supabase)
+            if not user_id:
+                return jsonify({"success": False, "error": "Authentication required"}), 401
+            
+            try:
+                role = _worker_role(supabase_admin or supabase, user_id)
+            except Exception as e:
+                logger.error(f"❌ [SECURE_PROCESSING] Error checking worker role: {str(e)}")
+                return jsonify({"success": False, "error": "Could not verify permissions"}), 500
+            if not role:
+                return jsonify({"success": False, "error": "Processor access required"}), 403
+            
+            g.worker_id = user_id
+            g.worker_role = role
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
 
 def apply_proprietary_processing(screenshot_data, order_id=None):
     """
@@ -112,6 +175,9 @@ def register_secure_processing_routes(app, supabase, supabase_admin):
         supabase_admin: Supabase client (admin/service role)
     """
     
+    # Queue endpoints write through the service-role client, so they need a verified worker.
+    worker_required = processor_required(supabase, supabase_admin)
+    
     @app.route("/api/secure/process-order", methods=["POST", "OPTIONS"])
     def secure_process_order():
         """
@@ -268,6 +334,7 @@ def register_secure_processing_routes(app, supabase, supabase_admin):
             }), 500
     
     @app.route("/api/secure/queue", methods=["GET", "OPTIONS"])
+    @worker_required
     def get_processing_queue():
         """
         Get orders assigned to the authenticated worker.
@@ -286,20 +353,16 @@ def register_secure_processing_routes(app, supabase, supabase_admin):
             return response
         
         try:
-            # Get auth token
-            auth_header = request.headers.get('Authorization')
-            if not auth_header:
-                return jsonify({"success": False, "error": "Authentication required"}), 401
-            
             # Get query parameters
             status = request.args.get('status', 'assigned')  # assigned, pending, completed
             limit = int(request.args.get('limit', 50))
             
-            # Get queue items (this would filter by authenticated user_id in production)
-            # For now, return all items with the requested status
-            queue_result = supabase.table('order_processing_queue').select(
-                '*, orders(*)'
-            ).eq('status', status).order('priority', desc=True).order('created_at', desc=False).limit(limit).execute()
+            # Leased rows are scoped to the calling worker; new work comes from /api/secure/lease.
+            query = supabase.table('order_processing_queue').select('*, orders(*)').eq('status', status)
+            worker_id = _worker_id()
+            if worker_id and status in work_queue.LEASED_STATUSES:
+                query = query.eq('assigned_to', worker_id)
+            queue_result = query.order('priority', desc=True).order('created_at', desc=False).limit(limit).execute()
             
             return jsonify({
                 "success": True,
@@ -314,6 +377,7 @@ def register_secure_processing_routes(app, supabase, supabase_admin):
             }), 500
     
     @app.route("/api/secure/claim-order", methods=["POST", "OPTIONS"])
+    @worker_required
     def claim_order():
         """
         Allow worker to claim a pending order.
@@ -337,16 +401,13 @@ def register_secure_processing_routes(app, supabase, supabase_admin):
             if not queue_id:
                 return jsonify({"success": False, "error": "queue_id is required"}), 400
             
-            # Update queue item to assign to worker
-            # In production, you'd get user_id from auth token
-            result = supabase.table('order_processing_queue').update({
-                'status': 'assigned',
-                'assigned_at': datetime.utcnow().isoformat(),
-                # 'assigned_to': user_id  # Set from auth token
-            }).eq('id', queue_id).eq('status', 'pending').execute()
+            worker_id = _worker_id()
             
-            if result.data:
-                return jsonify({"success": True, "message": "Order claimed successfully"})
+            # Conditional on status=pending, so only one worker can win the row; it comes with a lease.
+            row = work_queue.claim(supabase_admin or supabase, worker_id, queue_id, data.get("lease_seconds"))
+            
+            if row:
+                return jsonify({"success": True, "message": "Order claimed successfully", "item": row})
             else:
                 return jsonify({"success": False, "error": "Order not available or already claimed"}), 400
                 
@@ -357,3 +418,156 @@ def register_secure_processing_routes(app, supabase, supabase_admin):
                 "error": f"Internal server error: {str(e)}"
             }), 500
 
+    @app.route("/api/secure/lease", methods=["POST", "OPTIONS"])
+    @worker_required
+    def lease_orders():
+        """
+        Lease the next pending orders (highest priority, oldest first) to the calling worker.
+        
+        Request:
+            {"count": 5, "lease_seconds": 900}
+        
+        Leased rows are "assigned" to the worker until lease_expires_at; unfinished leases go
+        back to pending. Concurrent workers never receive the same row.
+        """
+        if request.method == "OPTIONS":
+            return _preflight('POST,OPTIONS')
+        
+        data = request.get_json(silent=True) or {}
+        try:
+            client = supabase_admin or supabase
+            items = work_queue.lease(client, _worker_id(), data.get("count"), data.get("lease_seconds"))
+            order_ids = sorted({r["order_id"] for r in items if r.get("order_id")})
+            if order_ids:
+                found = client.table('orders').select(processing_queue.ORDER_SUMMARY_COLUMNS).in_('order_id', order_ids).execute()
+                orders = {o["order_id"]: o for o in found.data or []}
+                for row in items:
+                    row["orders"] = orders.get(row.get("order_id"))
+            return jsonify({"success": True, "items": items})
+        except work_queue.WorkQueueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except Exception as e:
+            logger.error(f"❌ [SECURE_PROCESSING] Error leasing orders: {str(e)}")
+            return jsonify({
+                "success": False,
+                "error": f"Internal server error: {str(e)}"
+            }), 500
+    
+    @app.route("/api/secure/lease/heartbeat", methods=["POST", "OPTIONS"])
+    @worker_required
+    def heartbeat_leases():
+        """
+        Extend the calling worker's leases.
+        
+        Request:
+            {"queue_ids": ["uuid", ...], "lease_seconds": 900, "status": "processing"}
+        
+        Returns the ids still held; anything missing was requeued and must be dropped.
+        """
+        if request.method == "OPTIONS":
+            return _preflight('POST,OPTIONS')
+        
+        data = request.get_json(silent=True) or {}
+        try:
+            held = work_queue.heartbeat(supabase_admin or supabase, _worker_id(), data.get("queue_ids"),
+                                        data.get("lease_seconds"), data.get("status"))
+            return jsonify({"success": True, "queue_ids": held})
+        except work_queue.WorkQueueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except Exception as e:
+            logger.error(f"❌ [SECURE_PROCESSING] Error extending leases: {str(e)}")
+            return jsonify({
+                "success": False,
+                "error": f"Internal server error: {str(e)}"
+            }), 500
+    
+    @app.route("/api/secure/lease/complete", methods=["POST", "OPTIONS"])
+    @worker_required
+    def complete_lease():
+        """
+        Finish a leased order.
+        
+        Request:
+            {"queue_id": "uuid", "status": "completed" | "failed", "notes": "...",
+             "processed_image_url": "...", "processing_time_seconds": 42}
+        
+        409 when the lease is no longer the worker's (it expired and was requeued).
+        """
+        if request.method == "OPTIONS":
+            return _preflight('POST,OPTIONS')
+        
+        data = request.get_json(silent=True) or {}
+        queue_id = data.get("queue_id")
+        worker_id = _worker_id()
+        if not queue_id:
+            return jsonify({"success": False, "error": "queue_id is required"}), 400
+        try:
+            row = work_queue.complete(
+                supabase_admin or supabase, worker_id, queue_id,
+                status=data.get("status", "completed"),
+                notes=data.get("notes"),
+                processed_image_url=data.get("processed_image_url"),
+                processing_time_seconds=data.get("processing_time_seconds"),
+            )
+            if not row:
+                return jsonify({"success": False, "error": "Lease expired or held by another worker"}), 409
+            return jsonify({"success": True, "item": row})
+        except work_queue.WorkQueueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except Exception as e:
+            logger.error(f"❌ [SECURE_PROCESSING] Error completing lease: {str(e)}")
+            return jsonify({
+                "success": False,
+                "error": f"Internal server error: {str(e)}"
+            }), 500
+    
+    @app.route("/api/secure/lease/release", methods=["POST", "OPTIONS"])
+    @worker_required
+    def release_leases():
+        """
+        Hand leased orders back to the queue unprocessed.
+        
+        Request:
+            {"queue_ids": ["uuid", ...]}
+        """
+        if request.method == "OPTIONS":
+            return _preflight('POST,OPTIONS')
+        
+        data = request.get_json(silent=True) or {}
+        worker_id = _worker_id()
+        try:
+            released = work_queue.release(supabase_admin or supabase, worker_id, data.get("queue_ids"))
+            return jsonify({"success": True, "queue_ids": released})
+        except Exception as e:
+            logger.error(f"❌ [SECURE_PROCESSING] Error releasing leases: {str(e)}")
+            return jsonify({
+                "success": False,
+                "error": f"Internal server error: {str(e)}"
+            }), 500
+    
+    @app.route("/api/secure/worker-stats", methods=["GET", "OPTIONS"])
+    @worker_required
+    def worker_throughput():
+        """
+        Per-worker throughput: completed/failed counts, average seconds, completed per hour
+        and current leases over the last ?hours= (default 24). Admins see every worker (?worker_id=
+        narrows to one); processors see only themselves.
+        """
+        if request.method == "OPTIONS":
+            return _preflight('GET,OPTIONS')
+        
+        try:
+            hours = min(24 * 30, max(1, int(request.args.get('hours', 24))))
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "hours must be an integer"}), 400
+        try:
+            # Processors only see their own numbers; admins may look at any worker.
+            worker_id = request.args.get('worker_id') if g.worker_role == 'admin' else _worker_id()
+            stats = work_queue.worker_stats(supabase_admin or supabase, hours, worker_id)
+            return jsonify({"success": True, "hours": hours, "workers": stats})
+        except Exception as e:
+            logger.error(f"❌ [SECURE_PROCESSING] Error getting worker stats: {str(e)}")
+            return jsonify({
+                "success": False,
+                "error": f"Internal server error: {str(e)}"
+            }), 500
@@ -1,7 +1,7 @@
 # Security Configuration for ScreenMerch
 import os
-from datetime import datetime, timedelta
-from collections import defaultdict
+import re
+from datetime import timedelta
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,89 +9,145 @@ logger = logging.getLogger(__name__)
 class SecurityManager:
     """Security manager for rate limiting and threat detection"""
     
-    def __init__(self):
-        self.request_counts = defaultdict(list)
-        self.blocked_ips = set()
+    def __init__(self, rate_limiter=None):
+        # O(1) GCRA state per IP in the shared store (utils.rate_limit); blocks expire on their own.
+        self._rate_limiter = rate_limiter
         self.max_requests_per_minute = 60
         self.max_requests_per_hour = 1000
         self.block_duration = timedelta(hours=1)
     
+    @property
+    def rate_limiter(self):
+        if self._rate_limiter is None:
+            from utils.rate_limit import get_rate_limiter
+            self._rate_limiter = get_rate_limiter()
+        return self._rate_limiter
+    
     def check_rate_limit(self, ip_address):
         """Check if IP is rate limited"""
-        now = datetime.now()
-        
-        # Clean old requests
-        self.request_counts[ip_address] = [
-            req_time for req_time in self.request_counts[ip_address]
-            if now - req_time < timedelta(hours=1)
-        ]
+        limiter = self.rate_limiter
+        block_key = f"ip-block:{ip_address}"
         
         # Check if IP is blocked
-        if ip_address in self.blocked_ips:
+        if limiter.is_blocked(block_key):
             return False, "IP is temporarily blocked"
         
-        # Add current request
-        self.request_counts[ip_address].append(now)
-        
         # Check minute limit
-        minute_ago = now - timedelta(minutes=1)
-        recent_requests = len([
-            req_time for req_time in self.request_counts[ip_address]
-            if req_time > minute_ago
-        ])
-        
-        if recent_requests > self.max_requests_per_minute:
-            self.blocked_ips.add(ip_address)
+        if not limiter.hit(f"ip-minute:{ip_address}", self.max_requests_per_minute, 60).allowed:
+            limiter.block(block_key, self.block_duration.total_seconds())
             logger.warning(f"Rate limit exceeded for IP: {ip_address}")
             return False, "Rate limit exceeded"
         
         # Check hour limit
-        hour_ago = now - timedelta(hours=1)
-        hourly_requests = len([
-            req_time for req_time in self.request_counts[ip_address]
-            if req_time > hour_ago
-        ])
-        
-        if hourly_requests > self.max_requests_per_hour:
-            self.blocked_ips.add(ip_address)
+        if not limiter.hit(f"ip-hour:{ip_address}", self.max_requests_per_hour, 3600).allowed:
+            limiter.block(block_key, self.block_duration.total_seconds())
             logger.warning(f"Hourly rate limit exceeded for IP: {ip_address}")
             return False, "Hourly rate limit exceeded"
         
         return True, "OK"
     
+    def unblock_ip(self, ip_address):
+        """Lift a block before it expires (e.g. after a false positive)."""
+        self.rate_limiter.unblock(f"ip-block:{ip_address}")
+    
     def is_suspicious_request(self, request):
-        """Check for suspicious request patterns"""
-        suspicious_indicators = [
-            # SQL injection attempts
-            "' OR '1'='1",
-            "'; DROP TABLE",
-            "UNION SELECT",
-            # XSS attempts
-            "<script>",
-            "javascript:",
-            # Path traversal
-            "../",
-            "..\\",
-            # Command injection
-            "; ls",
-            "| cat",
-            # Large payloads
-            len(request.get_data()) > 10000
-        ]
-        
-        request_data = str(request.get_data()).lower()
-        request_url = request.url.lower()
-        
-        for indicator in suspicious_indicators:
-            if isinstance(indicator, str) and indicator.lower() in request_data:
-                logger.warning(f"Suspicious request detected: {indicator}")
+        """Check for suspicious request patterns without buffering or copying large bodies.
+
+        Size limits come from Content-Length before anything is read. Multipart uploads are
+        screened on their text fields and file names only; file contents are never scanned.
+        Other bodies are scanned window by window with one precompiled case-insensitive pattern.
+        """
+        content_length = request.content_length
+        if request.mimetype == "multipart/form-data":
+            if content_length is not None and content_length > MAX_FILE_SIZE:
+                logger.warning("Large payload detected")
                 return True
-            elif isinstance(indicator, bool) and indicator:
+            # Werkzeug spools file parts to disk while parsing; the view reuses this parse.
+            texts = [v for values in request.form.listvalues() for v in values]
+            texts.extend(f.filename or "" for files in request.files.listvalues() for f in files)
+            match = next((m for m in map(_SUSPICIOUS_TEXT.search, texts) if m), None)
+        else:
+            if content_length is not None and content_length > MAX_SCREENED_BODY:
                 logger.warning("Large payload detected")
                 return True
-        
+            chunks, too_large = _read_bounded(request, MAX_SCREENED_BODY)
+            if too_large:
+                logger.warning("Large payload detected")
+                return True
+            match = find_suspicious(chunks)
+
+        if match:
+            logger.warning(f"Suspicious request detected: {match}")
+            return True
         return False
 
+# Request screening: substrings that flag a request body (matched case-insensitively).
+SUSPICIOUS_INDICATORS = (
+    # SQL injection attempts
+    "' OR '1'='1",
+    "'; DROP TABLE",
+    "UNION SELECT",
+    # XSS attempts
+    "<script>",
+    "javascript:",
+    # Path traversal
+    "../",
+    "..\\",
+    # Command injection
+    "; ls",
+    "| cat",
+)
+# Non-multipart bodies above this size are flagged without being read.
+MAX_SCREENED_BODY = 10000
+SCAN_WINDOW = 64 * 1024
+
+# One alternation per indicator set, so each window is a single pass with no lowercased copy.
+_SUSPICIOUS_BYTES = re.compile(b"|".join(re.escape(i.encode()) for i in SUSPICIOUS_INDICATORS), re.IGNORECASE)
+_SUSPICIOUS_TEXT = re.compile("|".join(re.escape(i) for i in SUSPICIOUS_INDICATORS), re.IGNORECASE)
+_OVERLAP = max(len(i) for i in SUSPICIOUS_INDICATORS) - 1
+
+
+def find_suspicious(chunks):
+    """First indicator in a sequence of byte chunks (decoded), or None.
+
+    Each chunk is searched in place; matches spanning two chunks are caught by searching the
+    few bytes around the boundary, so no chunk is ever concatenated or copied.
+    """
+    tail = b""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        edge = tail + bytes(chunk[:_OVERLAP])
+        m = _SUSPICIOUS_BYTES.search(edge) or _SUSPICIOUS_BYTES.search(chunk)
+        if m:
+            return m.group(0).decode("utf-8", "replace")
+        tail = bytes(chunk[-_OVERLAP:])
+    return None
+
+
+def _read_bounded(request, limit):
+    """Body of a non-multipart request as SCAN_WINDOW-sized views; ``(chunks, too_large)``.
+
+    With a Content-Length (already checked against ``limit``) the body is read once and cached
+    for the view. Chunked bodies are read from the stream one window at a time and abandoned as
+    soon as they pass ``limit``.
+    """
+    if request.content_length is not None:
+        data = memoryview(request.get_data(cache=True))
+        return [data[i:i + SCAN_WINDOW] for i in range(0, len(data), SCAN_WINDOW)], False
+    chunks, size = [], 0
+    while True:
+        chunk = request.stream.read(SCAN_WINDOW)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > limit:
+            return [], True
+        chunks.append(chunk)
+    # Keep what was read so request.get_data()/get_json() in the view still see the body.
+    request._cached_data = b"".join(chunks)
+    return chunks, False
+
 # Security headers configuration
 SECURITY_HEADERS = {
     'X-Content-Type-Options': 'nosniff',
@@ -0,0 +1,346 @@
+"""
+Batch fulfillment: render print files for pending ``order_processing_queue`` rows.
+
+- Pending rows are leased ``chunk_size`` at a time through ``utils.work_queue`` (priority desc,
+  oldest first) under the runner's ``worker_id``, the same way portal and API workers take them,
+  so no row is worked twice. Leases are extended while a chunk renders; if the run dies they
+  expire and ``work_queue.requeue_expired`` puts the rows back to ``pending``.
+- Each order is rendered in a local process pool by calling the capture/processing functions
+  directly: ``capture_print_quality_screenshot`` for items with a video URL and timestamp,
+  ``process_thumbnail_for_print`` on the saved screenshot otherwise (or when capture fails).
+- Print files go to Storage under ``print-files/<order_id>/``; the queue row is completed with
+  the first file's URL (only while this runner still holds the lease) and a
+  ``processing_history`` row is written per order.
+- A JSON checkpoint records claimed, uploaded and finished rows, so an interrupted run resumes
+  the rows it still holds without rendering or uploading them twice.
+- ``BatchStats`` reports orders/min and time spent per stage (fetch, claim, render, upload, update).
+"""
+import base64
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+
+from services.uploads import public_object_url
+from utils import work_queue
+
+logger = logging.getLogger(__name__)
+
+QUEUE_TABLE = "order_processing_queue"
+HISTORY_TABLE = "processing_history"
+DEFAULT_BUCKET = os.getenv("PRINT_FILES_BUCKET", "product-images")
+DEFAULT_CHUNK_SIZE = 25
+PRINT_DPI = 300
+STAGES = ("fetch", "claim", "render", "upload", "update")
+
+_SCREENSHOT_FIELDS = ("selected_screenshot", "screenshot", "img", "thumbnail")
+
+
+class BatchStats:
+    """Order counts and seconds per stage: ``with stats.stage("upload"): ...``."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.completed = 0
+        self.failed = 0
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def orders_per_minute(self):
+        done = self.completed + self.failed
+        return done * 60.0 / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        # render is summed over pool workers, so it can exceed the wall-clock total.
+        parts = [f"completed={self.completed}", f"failed={self.failed}", f"orders/min={self.orders_per_minute:.1f}"]
+        parts += [f"{name}={seconds:.2f}s" for name, seconds in self.seconds.items()]
+        parts.append(f"total={self.elapsed:.2f}s")
+        return " ".join(parts)
+
+
+class Checkpoint:
+    """Queue ids claimed / uploaded / finished by this runner, kept in a JSON file (in memory when path is None)."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.claimed = set()
+        self.uploaded = {}
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.claimed = set(state.get("claimed", []))
+            self.uploaded = dict(state.get("uploaded", {}))
+            self.done = set(state.get("done", []))
+
+    @property
+    def unfinished(self):
+        return sorted(self.claimed - self.done)
+
+    def save(self):
+        if not self.path:
+            return
+        state = {"claimed": sorted(self.claimed), "uploaded": self.uploaded, "done": sorted(self.done)}
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+
+def _timestamp_seconds(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_job(row, order, print_dpi=PRINT_DPI):
+    """Render job for a queue row: one entry per cart item (video capture and/or screenshot source)."""
+    order = order or {}
+    order_screenshot = next((order.get(f) for f in _SCREENSHOT_FIELDS if order.get(f)), None)
+    items = []
+    for item in order.get("cart") or []:
+        video_url = (item.get("video_url") or order.get("video_url") or "").strip()
+        items.append({
+            "video_url": video_url if video_url.startswith(("http://", "https://")) else None,
+            "timestamp": _timestamp_seconds(item.get("screenshot_timestamp", item.get("timestamp"))),
+            "crop_area": item.get("crop_area"),
+            "screenshot": next((item.get(f) for f in _SCREENSHOT_FIELDS if item.get(f)), None) or order_screenshot,
+        })
+    if not items and order_screenshot:
+        items.append({"video_url": None, "timestamp": None, "crop_area": None, "screenshot": order_screenshot})
+    return {"queue_id": row["id"], "order_id": row["order_id"], "print_dpi": print_dpi, "items": items}
+
+
+def _decode(result):
+    header, _, payload = result["screenshot"].partition(",")
+    content_type = header[5:].split(";")[0] if header.startswith("data:") else "image/png"
+    return base64.b64decode(payload or header), content_type
+
+
+def _render_item(item, print_dpi):
+    error = None
+    if item["video_url"] and item["timestamp"] is not None:
+        from video_screenshot import screenshot_capture
+        result = screenshot_capture.capture_print_quality_screenshot(
+            item["video_url"], item["timestamp"], item["crop_area"], print_dpi
+        )
+        if result.get("success"):
+            return _decode(result)
+        error = result.get("error")
+    if item["screenshot"]:
+        import screenshot_capture as sc_module
+        result = sc_module.process_thumbnail_for_print(item["screenshot"], print_dpi=print_dpi)
+        if result.get("success"):
+            return _decode(result)
+        error = result.get("error")
+    raise ValueError(error or "Item has no video URL/timestamp or screenshot to render")
+
+
+def render_job(job):
+    """
+    Render every item of a job (runs in a pool worker). Returns
+    ``{"queue_id", "files": [(bytes, content_type)], "seconds"}`` or ``{"queue_id", "error", "seconds"}``.
+    """
+    start = time.perf_counter()
+    try:
+        if not job["items"]:
+            raise ValueError("Order has no items to render")
+        files = [_render_item(item, job["print_dpi"]) for item in job["items"]]
+        return {"queue_id": job["queue_id"], "files": files, "seconds": time.perf_counter() - start}
+    except Exception as e:
+        return {"queue_id": job["queue_id"], "error": str(e), "seconds": time.perf_counter() - start}
+
+
+class BatchRunner:
+    """
+    Fulfil pending queue rows in chunks. ``client`` is a service-role Supabase client and
+    ``worker_id`` the ``users.id`` the rows are leased to (``assigned_to`` references users);
+    ``processes=0`` renders in-process (``render`` then need not be picklable).
+    """
+
+    def __init__(self, client, supabase_url, worker_id, bucket=DEFAULT_BUCKET, chunk_size=DEFAULT_CHUNK_SIZE,
+                 processes=None, checkpoint=None, render=render_job, print_dpi=PRINT_DPI,
+                 lease_seconds=work_queue.DEFAULT_LEASE_SECONDS):
+        if not worker_id:
+            raise work_queue.WorkQueueError("worker_id is required")
+        self.client = client
+        self.supabase_url = supabase_url
+        self.worker_id = worker_id
+        self.bucket = bucket
+        self.chunk_size = min(work_queue.MAX_BATCH, max(1, int(chunk_size)))
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.checkpoint = checkpoint if checkpoint is not None else Checkpoint()
+        self.render = render
+        self.print_dpi = print_dpi
+        self.lease_seconds = lease_seconds
+        self.stats = BatchStats()
+
+    def _queue(self):
+        return self.client.table(QUEUE_TABLE)
+
+    def _hold(self, ids):
+        """Extend this runner's leases on ``ids`` and mark them processing; returns the ids still held."""
+        return set(work_queue.heartbeat(self.client, self.worker_id, ids, self.lease_seconds, status="processing"))
+
+    def lease_pending(self, limit):
+        """Lease up to ``limit`` pending rows; a fresh lease starts over even if an earlier run finished the row."""
+        rows = work_queue.lease(self.client, self.worker_id, count=limit, lease_seconds=self.lease_seconds)
+        held = self._hold([r["id"] for r in rows]) if rows else set()
+        rows = [r for r in rows if r["id"] in held]
+        for row in rows:
+            self.checkpoint.uploaded.pop(str(row["id"]), None)
+            self.checkpoint.done.discard(row["id"])
+        self.checkpoint.claimed.update(r["id"] for r in rows)
+        self.checkpoint.save()
+        return rows
+
+    def fetch_resumable(self, ids):
+        """Rows this runner claimed before an interruption and whose lease it still holds."""
+        held = self._hold(ids)
+        if not held:
+            return []
+        return self._queue().select("*").in_("id", sorted(held)).execute().data or []
+
+    def fetch_orders(self, order_ids):
+        result = self.client.table("orders").select("*").in_("order_id", order_ids).execute()
+        return {o["order_id"]: o for o in result.data or []}
+
+    def upload(self, job, files):
+        urls = []
+        for n, (data, content_type) in enumerate(files, 1):
+            ext = content_type.rsplit("/", 1)[-1].replace("jpeg", "jpg")
+            path = f"print-files/{job['order_id']}/{job['queue_id']}-{n}.{ext}"
+            self.client.storage.from_(self.bucket).upload(
+                path=path, file=data, file_options={"content-type": content_type, "upsert": "true"}
+            )
+            urls.append(public_object_url(self.supabase_url, self.bucket, path))
+        self.checkpoint.uploaded[str(job["queue_id"])] = urls
+        self.checkpoint.save()
+        return urls
+
+    def finish(self, row, urls=None, error=None, seconds=0.0):
+        """
+        Complete or fail the queue row; returns the processing_history row to insert, or None
+        when the lease was lost (the row was requeued and may be someone else's by now).
+        """
+        status = "failed" if error else "completed"
+        won = work_queue.complete(
+            self.client, self.worker_id, row["id"], status=status,
+            notes=f"Batch render failed: {error}"[:1000] if error else None,
+            processed_image_url=urls[0] if urls else None,
+            processing_time_seconds=int(seconds), record=False,
+        )
+        self.checkpoint.done.add(row["id"])
+        self.checkpoint.save()
+        if won is None:
+            logger.warning("Queue row %s lost its lease before the batch finished it; result dropped", row["id"])
+            return None
+        if error:
+            self.stats.failed += 1
+        else:
+            self.stats.completed += 1
+        return {
+            "order_id": row["order_id"],
+            "queue_id": row["id"],
+            "processed_by": self.worker_id,
+            "status": status,
+            "processed_image_url": urls[0] if urls else None,
+            "processing_time_seconds": int(seconds),
+            "notes": error or "Batch render: " + " ".join(urls),
+        }
+
+    def _process_chunk(self, rows, pool):
+        with self.stats.stage("fetch"):
+            orders = self.fetch_orders(list({r["order_id"] for r in rows}))
+
+        history = []
+        by_id = {r["id"]: r for r in rows}
+        jobs = {}
+        for row in rows:
+            uploaded = self.checkpoint.uploaded.get(str(row["id"]))
+            if uploaded:
+                with self.stats.stage("update"):
+                    history.append(self.finish(row, urls=uploaded))
+            elif row["order_id"] not in orders:
+                with self.stats.stage("update"):
+                    history.append(self.finish(row, error="Order not found"))
+            else:
+                jobs[row["id"]] = build_job(row, orders[row["order_id"]], self.print_dpi)
+
+        if pool is None:
+            results = (self.render(job) for job in jobs.values())
+        else:
+            results = (f.result() for f in as_completed([pool.submit(self.render, job) for job in jobs.values()]))
+        waiting = set(jobs)
+        last_beat = time.monotonic()
+        for result in results:
+            self.stats.add("render", result["seconds"])
+            row = by_id[result["queue_id"]]
+            waiting.discard(row["id"])
+            error, urls = result.get("error"), None
+            if not error:
+                try:
+                    with self.stats.stage("upload"):
+                        urls = self.upload(jobs[row["id"]], result["files"])
+                except Exception as e:
+                    error = f"Upload failed: {e}"
+            with self.stats.stage("update"):
+                history.append(self.finish(row, urls=urls, error=error, seconds=result["seconds"]))
+                # Keep the rest of the chunk leased while it is still rendering.
+                if waiting and time.monotonic() - last_beat > self.lease_seconds / 3:
+                    self._hold(sorted(waiting))
+                    last_beat = time.monotonic()
+
+        history = [h for h in history if h is not None]
+        if history:
+            with self.stats.stage("update"):
+                try:
+                    self.client.table(HISTORY_TABLE).insert(history).execute()
+                except Exception as e:
+                    logger.warning("processing_history insert failed for %s rows: %s", len(history), e)
+
+    def run(self, limit=None):
+        """Process pending rows (and rows left over from an interrupted run) until none remain or ``limit``."""
+        seen = set()
+        pool = ProcessPoolExecutor(max_workers=self.processes) if self.processes > 0 else None
+        try:
+            resume = self.checkpoint.unfinished
+            while limit is None or len(seen) < limit:
+                size = self.chunk_size if limit is None else min(self.chunk_size, limit - len(seen))
+                with self.stats.stage("claim"):
+                    if resume:
+                        rows, resume = self.fetch_resumable(resume[:size]), resume[size:]
+                    else:
+                        rows = self.lease_pending(size)
+                        if not rows:
+                            break
+                if rows:
+                    seen.update(r["id"] for r in rows)
+                    self._process_chunk(rows, pool)
+                    logger.info("Fulfillment batch progress: %s", self.stats.summary())
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return self.stats
@@ -0,0 +1,88 @@
+"""
+Google sign-in helpers for the OAuth callback.
+
+- Discovery clients (``oauth2 v2``, ``youtube v3``) are built once per process from the discovery
+  documents bundled with google-api-python-client (``static_discovery=True``, no network) and
+  reused; each request executes with its own authorized HTTP object, so the shared client is
+  never bound to one user's credentials.
+- ``fetch_google_profile`` runs userinfo and the YouTube channel lookup concurrently.
+- ``PhaseTimer`` records per-phase latency for the sign-in log line.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.executors import fork_safe_executor
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_HTTP_TIMEOUT = 15
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_discovery_client(api, version):
+    """Process-wide discovery client for ``api``/``version`` (built on first use)."""
+    key = (api, version)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                import httplib2
+                from googleapiclient.discovery import build
+                client = build(
+                    api, version,
+                    http=httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT),
+                    static_discovery=True,
+                    cache_discovery=False,
+                )
+                _clients[key] = client
+    return client
+
+
+def _authorized_http(credentials):
+    # httplib2.Http is not thread-safe: one per call.
+    import google_auth_httplib2
+    import httplib2
+    return google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT))
+
+
+def fetch_userinfo(credentials):
+    request = get_discovery_client("oauth2", "v2").userinfo().get()
+    return request.execute(http=_authorized_http(credentials))
+
+
+def fetch_youtube_channel(credentials):
+    request = get_discovery_client("youtube", "v3").channels().list(part="snippet,statistics", mine=True)
+    return request.execute(http=_authorized_http(credentials))
+
+
+def fetch_google_profile(credentials):
+    """Return ``(user_info, channel_response)``; the two Google calls run in parallel."""
+    channel_future = fork_safe_executor("google-profile", 4).submit(fetch_youtube_channel, credentials)
+    user_info = fetch_userinfo(credentials)
+    return user_info, channel_future.result(timeout=GOOGLE_HTTP_TIMEOUT * 2)
+
+
+class PhaseTimer:
+    """Collects ``(phase, seconds)`` pairs: ``with timer.phase("token_exchange"): ...``."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def summary(self):
+        parts = [f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.phases]
+        parts.append(f"total={(time.perf_counter() - self.started) * 1000:.0f}ms")
+        return " ".join(parts)
@@ -0,0 +1,285 @@
+"""
+Width-bucketed image derivatives for storefront grids and product browse.
+
+``/static/images/<file>?w=320`` and ``/images/derived?src=<storage url>&w=320`` return a resized
+copy of the original instead of the full-size upload:
+
+- The requested width is rounded up to one of ``WIDTH_BUCKETS`` so a handful of files cover
+  every layout.
+- Format comes from the ``Accept`` header: AVIF, then WebP, then JPEG (PNG when the image has
+  transparency and the browser takes neither AVIF nor WebP).
+- Each derivative is rendered once and kept on local disk, keyed by source fingerprint, width and
+  format. The responses are ``immutable`` because the URL changes whenever the source changes.
+- The disk cache is capped at ``IMAGE_DERIVATIVE_CACHE_MB`` (default 512). Hits refresh a file's
+  mtime; once enough new bytes are written, the least recently used derivatives are deleted.
+- ``X-Image-Bytes-Saved`` reports original bytes minus derivative bytes.
+"""
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+WIDTH_BUCKETS = (160, 320, 480, 640, 960, 1280, 1920)
+QUALITY = {"avif": 55, "webp": 80, "jpeg": 82}
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+MAX_SOURCE_BYTES = 15 * 1024 * 1024
+MAX_CACHE_BYTES = int(float(os.getenv("IMAGE_DERIVATIVE_CACHE_MB", "512")) * 1024 * 1024)
+# Prune down to this share of the cap so every new render does not trigger another pass.
+PRUNE_TARGET = 0.9
+
+_locks = [threading.Lock() for _ in range(32)]
+_avif_supported = None
+_prune_lock = threading.Lock()
+_bytes_since_prune = None  # None: prune on the first write of this process
+
+
+def cache_dir():
+    path = os.getenv("IMAGE_DERIVATIVE_DIR") or os.path.join(tempfile.gettempdir(), "screenmerch-derived")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def bucket_width(width):
+    """Smallest bucket >= ``width`` (the largest bucket for anything bigger); None for bad input."""
+    try:
+        width = int(width)
+    except (TypeError, ValueError):
+        return None
+    if width <= 0:
+        return None
+    for bucket in WIDTH_BUCKETS:
+        if width <= bucket:
+            return bucket
+    return WIDTH_BUCKETS[-1]
+
+
+def avif_supported():
+    global _avif_supported
+    if _avif_supported is None:
+        try:
+            from PIL import features
+            _avif_supported = bool(features.check("avif"))
+        except Exception:
+            _avif_supported = False
+    return _avif_supported
+
+
+def negotiate_format(accept, has_alpha=False):
+    accept = (accept or "").lower()
+    if "image/avif" in accept and avif_supported():
+        return "avif"
+    if "image/webp" in accept:
+        return "webp"
+    return "png" if has_alpha else "jpeg"
+
+
+def fingerprint_file(path):
+    """Version token for a local file; changes when the file is replaced."""
+    st = os.stat(path)
+    return f"{st.st_mtime_ns:x}{st.st_size:x}"
+
+
+def fingerprint_url(url):
+    # Storage uploads get timestamped paths and are never overwritten in place.
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+def _has_alpha(img):
+    return img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def render(data, width, fmt):
+    """Bytes of ``data`` scaled down to ``width`` (never up) in ``fmt``."""
+    from PIL import Image, ImageOps
+    img = Image.open(io.BytesIO(data))
+    img = ImageOps.exif_transpose(img)
+    alpha = _has_alpha(img)
+    if img.width > width:
+        img = img.resize((width, max(1, round(img.height * width / img.width))), Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    if fmt == "jpeg":
+        img = img.convert("RGB")
+        img.save(out, "JPEG", quality=QUALITY["jpeg"], optimize=True, progressive=True)
+    elif fmt == "png":
+        img.save(out, "PNG", optimize=True)
+    else:
+        img = img.convert("RGBA" if alpha else "RGB")
+        img.save(out, fmt.upper(), quality=QUALITY[fmt])
+    return out.getvalue()
+
+
+def source_has_alpha(data):
+    from PIL import Image
+    try:
+        return _has_alpha(Image.open(io.BytesIO(data)))
+    except Exception:
+        return False
+
+
+class Derivative:
+    __slots__ = ("path", "mimetype", "size", "original_size")
+
+    def __init__(self, path, mimetype, size, original_size):
+        self.path = path
+        self.mimetype = mimetype
+        self.size = size
+        self.original_size = original_size
+
+    @property
+    def bytes_saved(self):
+        return max(0, self.original_size - self.size)
+
+
+def get_derivative(source_key, fingerprint, width, accept, load):
+    """
+    Cached derivative of a source image. ``load()`` returns the original bytes and is only
+    called on a cache miss. Returns a Derivative; raises whatever ``load``/Pillow raise.
+    """
+    root = cache_dir()
+    digest = hashlib.sha1(f"{source_key}|{fingerprint}".encode("utf-8")).hexdigest()
+    meta_path = os.path.join(root, f"{digest}.orig")
+    original_size = None
+    alpha = None
+    try:
+        with open(meta_path) as f:
+            size_s, alpha_s = f.read().split()
+        original_size, alpha = int(size_s), alpha_s == "1"
+    except (OSError, ValueError):
+        pass
+
+    data = None
+    if alpha is None:
+        data = load()
+        original_size, alpha = len(data), source_has_alpha(data)
+    fmt = negotiate_format(accept, alpha)
+    path = os.path.join(root, f"{digest}.w{width}.{fmt}")
+    rendered = None
+    try:
+        os.utime(path)  # hit: mark as recently used for pruning
+    except FileNotFoundError:
+        with _locks[int(digest[:4], 16) % len(_locks)]:
+            if not os.path.exists(path):
+                if data is None:
+                    data = load()
+                rendered = render(data, width, fmt)
+                _atomic_write(path, rendered)
+                _atomic_write(meta_path, f"{original_size} {int(alpha)}".encode())
+    if rendered is not None:
+        _note_written(root, len(rendered))
+        return Derivative(path, MIME_TYPES[fmt], len(rendered), original_size)
+    return Derivative(path, MIME_TYPES[fmt], os.path.getsize(path), original_size)
+
+
+def _note_written(root, size):
+    global _bytes_since_prune
+    with _prune_lock:
+        due = _bytes_since_prune is None or _bytes_since_prune + size > MAX_CACHE_BYTES * (1 - PRUNE_TARGET)
+        _bytes_since_prune = 0 if due else _bytes_since_prune + size
+    if due:
+        prune(root)
+
+
+def prune(root=None, max_bytes=None):
+    """
+    Delete least recently used derivatives (oldest mtime first) until the cache is under
+    ``PRUNE_TARGET`` of ``max_bytes``; source metadata goes with a source's last derivative.
+    Returns the number of derivatives removed.
+    """
+    root = root or cache_dir()
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    entries, total = [], 0
+    try:
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.name.endswith(".tmp") or entry.name.endswith(".orig"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.name))
+                total += st.st_size
+    except FileNotFoundError:
+        return 0
+    if total <= max_bytes:
+        return 0
+    removed, digests = 0, set()
+    target = max_bytes * PRUNE_TARGET
+    for _, size, name in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(os.path.join(root, name))
+        except FileNotFoundError:
+            continue
+        total -= size
+        removed += 1
+        digests.add(name.split(".", 1)[0])
+    kept = {name.split(".", 1)[0] for _, _, name in entries if os.path.exists(os.path.join(root, name))}
+    for digest in digests - kept:
+        try:
+            os.remove(os.path.join(root, f"{digest}.orig"))
+        except FileNotFoundError:
+            pass
+    logger.info("image derivative cache pruned %s file(s), %s bytes left", removed, total)
+    return removed
+
+
+def _atomic_write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def fetch_source(url, timeout=10):
+    """Download a Storage object with a size cap (never buffers more than MAX_SOURCE_BYTES)."""
+    import requests
+    with requests.get(url, timeout=timeout, stream=True) as resp:
+        resp.raise_for_status()
+        chunks, total = [], 0
+        for chunk in resp.iter_content(64 * 1024):
+            total += len(chunk)
+            if total > MAX_SOURCE_BYTES:
+                raise ValueError(f"Source image over {MAX_SOURCE_BYTES} bytes")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def storage_public_prefix(supabase_url):
+    return f"{(supabase_url or '').rstrip('/')}/storage/v1/object/public/"
+
+
+def derived_url(base_url, src, width):
+    """Resized URL for a Storage public URL (served by /images/derived)."""
+    from urllib.parse import urlencode
+    return f"{base_url.rstrip('/')}/images/derived?{urlencode({'src': src, 'w': width})}"
+
+
+def static_derived_url(base_url, filename, width, version=None):
+    """Resized URL for a file in static/images; ``version`` (fingerprint_file) makes it immutable."""
+    url = f"{base_url.rstrip('/')}/static/images/{filename}?w={width}"
+    return f"{url}&v={version}" if version else url
+
+
+def srcset(make_url, widths=(320, 640, 960)):
+    return ", ".join(f"{make_url(w)} {w}w" for w in widths)
+
+
+def log_saving(label, derivative):
+    logger.debug(
+        "image derivative %s: %s -> %s bytes (saved %s)",
+        label, derivative.original_size, derivative.size, derivative.bytes_saved,
+    )
@@ -0,0 +1,156 @@
+"""
+Order email image assets, rendered once and reused by every email path.
+
+The same order is emailed from create_checkout_session, success(), the Stripe webhook and the
+admin resend tools. Each used to re-download URL screenshots and re-run the JPEG shrink loop.
+``email_inline_image`` renders the email-body JPEG once per (order, screenshot hash) and keeps it
+in the shared store (utils/shared_store.py), so all workers and all paths reuse it.
+
+JPEG quality is chosen with a bisection over the quality range for a byte budget, so a fit is
+found in about three encodes and at the highest quality that fits.
+"""
+import base64
+import hashlib
+import logging
+from io import BytesIO
+
+from utils.shared_store import SharedDict
+
+logger = logging.getLogger(__name__)
+
+# Inline base64 over ~100KB is dropped or clipped by several clients (Gmail, Proton).
+MAX_INLINE_BASE64_LEN = 100000
+# (max_bytes, max_width) tiers tried in order until the body image fits MAX_INLINE_BASE64_LEN.
+INLINE_TIERS = ((95000, 600), (80000, 500), (60000, 400), (45000, 320), (35000, 280))
+MIN_QUALITY = 50
+MAX_QUALITY = 85
+
+_inline_assets = SharedDict("order_email_inline", ttl=14 * 86400)
+_fetched_images = SharedDict("order_email_fetched", ttl=3600)
+
+
+def _digest(value):
+    return hashlib.sha1(value.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def fetch_image_data_url(url, timeout=10):
+    """Fetch an HTTP(S) image as data:image/...;base64,... (cached for an hour), or None on failure."""
+    if not url or not isinstance(url, str) or not url.strip().startswith(("http://", "https://")):
+        return None
+    key = _digest(url.strip())
+    cached = _fetched_images.get(key)
+    if cached is not None:
+        return cached
+    try:
+        import requests
+        resp = requests.get(url, timeout=timeout)
+        resp.raise_for_status()
+        content_type = (resp.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if not content_type.startswith("image/"):
+            content_type = "image/png"
+        data_url = f"data:{content_type};base64,{base64.b64encode(resp.content).decode('ascii')}"
+    except Exception as e:
+        logger.warning("Failed to fetch screenshot URL for email attachment: %s", e)
+        return None
+    _fetched_images[key] = data_url
+    return data_url
+
+
+def _decode_data_url(data_url):
+    if not data_url or "data:image" not in data_url or "," not in data_url:
+        return None
+    from PIL import Image
+    _, b64 = data_url.split(",", 1)
+    return Image.open(BytesIO(base64.b64decode(b64))).convert("RGB")
+
+
+def _fit_width(img, max_width):
+    from PIL import Image
+    w, h = img.size
+    if w <= max_width:
+        return img
+    return img.resize((max_width, max(1, int(h * max_width / w))), Image.Resampling.LANCZOS)
+
+
+def encode_jpeg_to_budget(img, max_bytes, min_quality=MIN_QUALITY, max_quality=MAX_QUALITY):
+    """
+    Highest JPEG quality in [min_quality, max_quality] whose output is <= max_bytes, found by
+    bisection. Returns (jpeg_bytes, fits); when nothing fits, the min_quality encoding is returned.
+    """
+    def encode(quality):
+        out = BytesIO()
+        img.save(out, "JPEG", quality=quality, optimize=True)
+        return out.getvalue()
+
+    best = encode(max_quality)
+    if len(best) <= max_bytes:
+        return best, True
+    smallest = encode(min_quality)
+    if len(smallest) > max_bytes:
+        return smallest, False
+    best, lo, hi = smallest, min_quality + 1, max_quality - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        data = encode(mid)
+        if len(data) <= max_bytes:
+            best, lo = data, mid + 1
+        else:
+            hi = mid - 1
+    return best, True
+
+
+def _jpeg_data_url(data):
+    return "data:image/jpeg;base64," + base64.b64encode(data).decode("ascii")
+
+
+def compress_data_url(data_url, max_bytes=95000, max_width=600):
+    """Shrink a data-URL image to a JPEG data URL near ``max_bytes`` (best effort), or None."""
+    try:
+        img = _decode_data_url(data_url)
+        if img is None:
+            return None
+        data, _ = encode_jpeg_to_budget(_fit_width(img, max_width), max_bytes)
+        return _jpeg_data_url(data)
+    except Exception as e:
+        logger.warning("Failed to compress screenshot for inline: %s", e)
+        return None
+
+
+def render_inline_jpeg(data_url, tiers=INLINE_TIERS, max_b64_len=MAX_INLINE_BASE64_LEN):
+    """Email-body JPEG data URL that fits ``max_b64_len``, trying smaller tiers as needed; None if none fits."""
+    try:
+        img = _decode_data_url(data_url)
+    except Exception as e:
+        logger.warning("Failed to decode screenshot for inline: %s", e)
+        return None
+    if img is None:
+        return None
+    # Base64 grows 4/3; leave room for the data: prefix.
+    b64_budget = (max_b64_len - 32) * 3 // 4
+    for max_bytes, max_width in tiers:
+        data, fits = encode_jpeg_to_budget(_fit_width(img, max_width), min(max_bytes, b64_budget))
+        if fits:
+            return _jpeg_data_url(data)
+    return None
+
+
+def email_inline_image(order_id, image):
+    """
+    Inline email JPEG for ``image`` (data URL or http(s) URL), rendered once per
+    (order, image hash) and shared by every email path and worker. None when it can't be inlined.
+    """
+    if not image or not isinstance(image, str) or not image.strip():
+        return None
+    image = image.strip()
+    key = f"{order_id}:{_digest(image)}"
+    cached = _inline_assets.get(key)
+    if cached is not None:
+        return cached or None
+    is_url = image.startswith(("http://", "https://"))
+    source = fetch_image_data_url(image) if is_url else image
+    if not source or "data:image" not in source:
+        return None
+    rendered = render_inline_jpeg(source)
+    # "" remembers "too large to inline" for this exact image; fetch failures are retried.
+    _inline_assets[key] = rendered or ""
+    return rendered
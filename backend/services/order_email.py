@@ -12,61 +12,28 @@ import json
 import logging
 from urllib.parse import quote
 
+from services.order_assets import (
+    MAX_INLINE_BASE64_LEN,  # Inline in body when under ~100KB; over that use cid (attachment)
+    compress_data_url,
+    email_inline_image,
+    fetch_image_data_url,
+)
+
 logger = logging.getLogger(__name__)
 
 PRINT_QUALITY_BASE_URL = "https://screenmerch.fly.dev/print-quality"
 EDIT_TOOLS_BASE_URL = "https://screenmerch.com/tools"
 # Inline base64 shows IN the email body (e.g. Proton); CID shows as attachment only. Prefer inline when small so body shows the image.
-MAX_INLINE_BASE64_LEN = 100000  # Inline in body when under ~100KB; over that use cid (attachment)
 
 
 def _fetch_image_as_base64(url, timeout=10):
-    """Fetch image from HTTP(S) URL and return as data:image/...;base64,... or None on failure."""
-    if not url or not isinstance(url, str) or not url.strip().startswith(("http://", "https://")):
-        return None
-    try:
-        import requests
-        resp = requests.get(url, timeout=timeout)
-        resp.raise_for_status()
-        content_type = (resp.headers.get("Content-Type") or "").split(";")[0].strip().lower()
-        if not content_type.startswith("image/"):
-            content_type = "image/png"
-        b64 = __import__("base64").b64encode(resp.content).decode("ascii")
-        return f"data:{content_type};base64,{b64}"
-    except Exception as e:
-        logger.warning("Failed to fetch screenshot URL for email attachment: %s", e)
-        return None
+    """Fetch image from HTTP(S) URL and return as data:image/...;base64,... or None on failure (cached, see order_assets)."""
+    return fetch_image_data_url(url, timeout=timeout)
 
 
 def _compress_for_inline(data_url, max_bytes=95000, max_width=600):
     """Compress base64 image to fit under max_bytes so it can be inlined in email body (e.g. Proton). Returns data:image/jpeg;base64,... or None."""
-    if not data_url or "data:image" not in data_url or "," not in data_url:
-        return None
-    try:
-        import base64
-        from io import BytesIO
-        header, b64 = data_url.split(",", 1)
-        raw = base64.b64decode(b64)
-        from PIL import Image
-        img = Image.open(BytesIO(raw)).convert("RGB")
-        w, h = img.size
-        if w > max_width:
-            ratio = max_width / w
-            img = img.resize((max_width, int(h * ratio)), Image.Resampling.LANCZOS)
-        out = BytesIO()
-        quality = 85
-        while quality >= 50:
-            out.seek(0)
-            out.truncate(0)
-            img.save(out, "JPEG", quality=quality, optimize=True)
-            if out.tell() <= max_bytes:
-                break
-            quality -= 10
-        b64_out = base64.b64encode(out.getvalue()).decode("ascii")
-        return f"data:image/jpeg;base64,{b64_out}"
-    except Exception as e:
-        logger.warning("Failed to compress screenshot for inline: %s", e)
-        return None
+    return compress_data_url(data_url, max_bytes=max_bytes, max_width=max_width)
 
 
 def get_order_screenshot(order_data, cart):
@@ -271,14 +238,10 @@ def build_admin_order_email(order_id, order_data, cart, order_number, total_amou
         # Per-product screenshot (item's selected_screenshot or fallback to order/first)
         item_img = _get_item_screenshot(item, fallback=fallback_screenshot)
         item_img = _ensure_base64(item_img)
-        # Compress for inline so each product's screenshot shows in body
+        # Compressed body copy so each product's screenshot shows inline (rendered once per order + image)
         screenshot_for_body = item_img
         if item_img and isinstance(item_img, str) and "data:image" in item_img:
-            for max_bytes, max_width in [(95000, 600), (80000, 500), (60000, 400), (45000, 320), (35000, 280)]:
-                compressed = _compress_for_inline(item_img, max_bytes=max_bytes, max_width=max_width)
-                if compressed and len(compressed) < MAX_INLINE_BASE64_LEN:
-                    screenshot_for_body = compressed
-                    break
+            screenshot_for_body = email_inline_image(order_id, item_img) or item_img
         product_img_tag = _screenshot_img_html(screenshot_for_body, cid=None)
         # One attachment for first product only (so email has at least one attachment for clients that strip inline)
         if idx == 0 and item_img and "data:image" in str(item_img):
@@ -340,6 +303,9 @@ def build_customer_order_email(order_id, order_data, cart, order_number, total_a
         <h2 style="color: #333;">🛍️ Products</h2>
     """
     # Order screenshot first under Products (same spot as admin email – red box area)
+    if screenshot and isinstance(screenshot, str) and "data:image" in screenshot:
+        # Same cached body JPEG as the admin email
+        screenshot = email_inline_image(order_id, screenshot) or screenshot
     if screenshot and isinstance(screenshot, str) and screenshot.strip():
         if "data:image" in screenshot and len(screenshot) < MAX_INLINE_BASE64_LEN:
             safe_src = screenshot.replace('"', "&quot;")
@@ -0,0 +1,202 @@
+"""
+Image uploads to Supabase Storage (favorites, creator logos).
+
+- Server uploads stream the multipart file to Storage in chunks and stop as soon as the size
+  limit is passed; requests whose Content-Length is already over the limit are refused before
+  the body is read (``request_too_large``).
+- ``sign_direct_upload`` issues a Storage signed upload URL plus an HMAC ticket, so the browser
+  PUTs the bytes straight to Storage and the API only ``claim_direct_upload``s the object
+  (size/type checked from Storage metadata).
+- ``schedule_variants`` builds WebP thumbnails in a background thread after the upload so
+  grids can load a 320px image instead of the original.
+"""
+import hashlib
+import hmac
+import io
+import logging
+import time
+
+from utils.executors import fork_safe_executor
+
+logger = logging.getLogger(__name__)
+
+# Multipart framing + the small text fields sent next to the file.
+MULTIPART_OVERHEAD = 64 * 1024
+CHUNK_SIZE = 256 * 1024
+# (width, suffix) WebP variants written next to the original: foo.png -> foo.w320.webp
+VARIANT_WIDTHS = (320, 960)
+VARIANT_QUALITY = 80
+TICKET_TTL = 15 * 60
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes):
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+def request_too_large(request, max_bytes):
+    """True when the declared body is bigger than ``max_bytes`` plus multipart overhead (nothing read yet)."""
+    length = request.content_length
+    return length is not None and length > max_bytes + MULTIPART_OVERHEAD
+
+
+def public_object_url(supabase_url, bucket, path):
+    return f"{supabase_url.rstrip('/')}/storage/v1/object/public/{bucket}/{path}"
+
+
+def image_extension(filename, allowed, default="png"):
+    ext = ((filename or "").rsplit(".", 1)[-1] if "." in (filename or "") else "").lower().replace(" ", "")[:10]
+    return ext if ext in allowed else default
+
+
+class _LimitedRaw(io.RawIOBase):
+    """Raw reader over a file object that raises UploadTooLarge once more than ``max_bytes`` are read."""
+
+    def __init__(self, fileobj, max_bytes):
+        self._f = fileobj
+        self._max = max_bytes
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        data = self._f.read(len(buf))
+        n = len(data)
+        self.bytes_read += n
+        if self.bytes_read > self._max:
+            raise UploadTooLarge(self._max)
+        buf[:n] = data
+        return n
+
+
+def limited_reader(fileobj, max_bytes):
+    # storage3 streams BufferedReader bodies instead of copying them into one bytes object.
+    return io.BufferedReader(_LimitedRaw(fileobj, max_bytes), buffer_size=CHUNK_SIZE)
+
+
+def read_limited(fileobj, max_bytes):
+    """Read at most ``max_bytes`` (chunked); raises UploadTooLarge past the limit."""
+    return limited_reader(fileobj, max_bytes).read()
+
+
+def upload_stream(storage, bucket, path, fileobj, content_type, max_bytes, upsert=False):
+    """Stream ``fileobj`` into ``bucket/path``; raises UploadTooLarge without storing a partial object."""
+    storage.from_(bucket).upload(
+        path=path,
+        file=limited_reader(fileobj, max_bytes),
+        file_options={"content-type": content_type or "image/png", "upsert": "true" if upsert else "false"},
+    )
+
+
+def _ticket(secret, bucket, path, max_bytes, expires):
+    msg = f"{bucket}|{path}|{max_bytes}|{expires}".encode()
+    return hmac.new(secret.encode() if isinstance(secret, str) else secret, msg, hashlib.sha256).hexdigest()
+
+
+def sign_direct_upload(storage, bucket, path, max_bytes, secret):
+    """Signed Storage upload URL for ``path`` and a ticket the finalize call must return."""
+    signed = storage.from_(bucket).create_signed_upload_url(path)
+    expires = int(time.time()) + TICKET_TTL
+    return {
+        "bucket": bucket,
+        "path": path,
+        "signed_url": signed["signed_url"],
+        "token": signed["token"],
+        "max_bytes": max_bytes,
+        "upload_ticket": f"{expires}.{_ticket(secret, bucket, path, max_bytes, expires)}",
+    }
+
+
+def verify_ticket(secret, bucket, path, max_bytes, ticket):
+    try:
+        expires_s, digest = (ticket or "").split(".", 1)
+        expires = int(expires_s)
+    except ValueError:
+        return False
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(digest, _ticket(secret, bucket, path, max_bytes, expires))
+
+
+def stat_object(storage, bucket, path):
+    """Storage metadata (size, mimetype, ...) for ``path``, or None if it does not exist."""
+    folder, _, name = path.rpartition("/")
+    for item in storage.from_(bucket).list(folder, {"limit": 1, "search": name}) or []:
+        if item.get("name") == name:
+            return item.get("metadata") or {}
+    return None
+
+
+def claim_direct_upload(storage, bucket, path, ticket, max_bytes, secret):
+    """
+    Check a browser's direct upload before using it. Returns None when ok, else an error message;
+    oversized or non-image objects are deleted.
+    """
+    if not verify_ticket(secret, bucket, path, max_bytes, ticket):
+        return "Upload ticket is invalid or expired"
+    meta = stat_object(storage, bucket, path)
+    if meta is None:
+        return "Uploaded file not found"
+    size = int(meta.get("size") or meta.get("contentLength") or 0)
+    mimetype = (meta.get("mimetype") or meta.get("contentType") or "").lower()
+    if size > max_bytes or (mimetype and not mimetype.startswith("image/")):
+        try:
+            storage.from_(bucket).remove([path])
+        except Exception as e:
+            logger.warning("Could not remove rejected upload %s/%s: %s", bucket, path, e)
+        return "File too large" if size > max_bytes else "File must be an image"
+    return None
+
+
+def variant_path(path, width):
+    stem = path.rsplit(".", 1)[0]
+    return f"{stem}.w{width}.webp"
+
+
+def render_variants(data, widths=VARIANT_WIDTHS, quality=VARIANT_QUALITY):
+    """[(width, webp_bytes)] for each width smaller than the image (plus a full-size WebP if none are)."""
+    from PIL import Image, ImageOps
+    img = Image.open(io.BytesIO(data))
+    img.seek(0)
+    img = ImageOps.exif_transpose(img)
+    img = img.convert("RGBA") if img.mode in ("RGBA", "LA", "P") else img.convert("RGB")
+    out = []
+    for width in widths:
+        if img.width <= width and out:
+            break
+        scaled = img
+        if img.width > width:
+            scaled = img.resize((width, max(1, round(img.height * width / img.width))), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        scaled.save(buf, "WEBP", quality=quality, method=4)
+        out.append((width, buf.getvalue()))
+    return out
+
+
+def build_variants(storage, bucket, path, data=None, on_done=None):
+    """Create and store the WebP variants of ``bucket/path``; ``on_done({width: path})`` when finished."""
+    try:
+        if data is None:
+            data = storage.from_(bucket).download(path)
+        paths = {}
+        for width, webp in render_variants(data):
+            vpath = variant_path(path, width)
+            storage.from_(bucket).upload(
+                path=vpath,
+                file=webp,
+                file_options={"content-type": "image/webp", "upsert": "true", "cache-control": "31536000"},
+            )
+            paths[width] = vpath
+        if on_done and paths:
+            on_done(paths)
+        return paths
+    except Exception as e:
+        logger.warning("Image variants for %s/%s failed: %s", bucket, path, e)
+        return {}
+
+
+def schedule_variants(storage, bucket, path, data=None, on_done=None):
+    """Run ``build_variants`` off the request thread."""
+    return fork_safe_executor("upload-variants", 2).submit(build_variants, storage, bucket, path, data, on_done)
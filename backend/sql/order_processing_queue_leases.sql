@@ -0,0 +1,71 @@
+-- Work-queue leases for order_processing_queue (utils/work_queue.py).
+-- Run in Supabase SQL editor after database_order_processing_queue.sql.
+
+ALTER TABLE public.order_processing_queue
+  ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE;
+
+-- Expired-lease sweep: only leased rows carry lease_expires_at.
+CREATE INDEX IF NOT EXISTS order_processing_queue_lease_expires_idx
+  ON public.order_processing_queue (lease_expires_at)
+  WHERE status IN ('assigned', 'processing');
+
+-- Throughput per worker (worker-stats endpoint).
+CREATE INDEX IF NOT EXISTS processing_history_processed_by_idx
+  ON public.processing_history (processed_by, processed_at DESC);
+
+-- Return expired leases to the queue; rows that used up their attempts are failed instead.
+CREATE OR REPLACE FUNCTION public.requeue_expired_processing_leases(p_max_attempts integer DEFAULT 3)
+RETURNS integer
+LANGUAGE sql
+AS $$
+  WITH expired AS (
+    UPDATE public.order_processing_queue
+       SET status = CASE WHEN processing_attempts >= p_max_attempts THEN 'failed' ELSE 'pending' END,
+           assigned_to = NULL,
+           lease_expires_at = NULL,
+           worker_notes = CASE WHEN processing_attempts >= p_max_attempts
+                               THEN 'Lease expired after ' || processing_attempts || ' attempts'
+                               ELSE worker_notes END,
+           updated_at = now()
+     WHERE status IN ('assigned', 'processing')
+       AND lease_expires_at < now()
+    RETURNING 1
+  )
+  SELECT count(*)::integer FROM expired
+$$;
+
+-- Lease the next p_limit pending rows (priority first, oldest first) to p_worker.
+-- SKIP LOCKED lets concurrent callers take disjoint rows without waiting on each other.
+CREATE OR REPLACE FUNCTION public.lease_processing_queue(
+  p_worker uuid,
+  p_limit integer DEFAULT 1,
+  p_lease_seconds integer DEFAULT 900,
+  p_max_attempts integer DEFAULT 3
+)
+RETURNS SETOF public.order_processing_queue
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM public.requeue_expired_processing_leases(p_max_attempts);
+  RETURN QUERY
+  UPDATE public.order_processing_queue q
+     SET status = 'assigned',
+         assigned_to = p_worker,
+         assigned_at = now(),
+         lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+         processing_attempts = COALESCE(q.processing_attempts, 0) + 1,
+         updated_at = now()
+    FROM (
+      SELECT id
+        FROM public.order_processing_queue
+       WHERE status = 'pending'
+       ORDER BY priority DESC, created_at ASC
+       LIMIT p_limit
+         FOR UPDATE SKIP LOCKED
+    ) picked
+   WHERE q.id = picked.id
+  RETURNING q.*;
+END
+$$;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,18 @@
+-- Admin processing queue read model (utils/processing_queue.py).
+-- Run in Supabase SQL editor.
+
+-- Computed column: `select=...,orders(order_id,item_count)` returns the cart length without
+-- shipping the cart JSON. PostgREST exposes functions taking the table row as columns.
+CREATE OR REPLACE FUNCTION public.item_count(public.orders)
+RETURNS integer
+LANGUAGE sql STABLE
+AS $$
+  SELECT CASE WHEN jsonb_typeof($1.cart::jsonb) = 'array' THEN jsonb_array_length($1.cart::jsonb) ELSE 0 END
+$$;
+
+-- Page order for the portal: filter by status/priority, oldest first within a priority.
+CREATE INDEX IF NOT EXISTS order_processing_queue_status_priority_idx
+  ON public.order_processing_queue (status, priority DESC, created_at ASC);
+
+-- Reload the schema cache so the embedded orders/users relationships and item_count are visible.
+NOTIFY pgrst, 'reload schema';
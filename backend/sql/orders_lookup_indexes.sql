@@ -0,0 +1,12 @@
+-- Indexes for the order resolver (utils/order_lookup.py): email/admin links resolve
+-- ORD-XXXXXXXX, order_number, uuid and 8-char suffixes against these columns.
+-- order_id is already covered by its UNIQUE constraint and idx_orders_order_id
+-- (create_orders_table.sql). Run in Supabase SQL editor.
+
+CREATE INDEX IF NOT EXISTS orders_order_number_idx
+  ON public.orders (order_number);
+
+-- Suffix fallback (order_id ILIKE '%abcd1234%') only; skip if pg_trgm is unavailable.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS orders_order_id_trgm_idx
+  ON public.orders USING gin (order_id gin_trgm_ops);
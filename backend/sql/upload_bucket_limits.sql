@@ -0,0 +1,12 @@
+-- Size/type limits enforced by Storage itself for buckets the browser uploads to directly
+-- with signed upload URLs (/api/uploads/sign). claim_direct_upload re-checks on finalize, but
+-- an object that is uploaded and never claimed would otherwise keep any size or content.
+-- Matches MAX_LOGO_SIZE / LOGO_EXTENSIONS in app.py. Run in Supabase SQL editor.
+--
+-- The thumbnails bucket (favorites) is also written by other upload paths, so it is not
+-- limited here; favorite uploads already require a signed-in session to get a signed URL.
+
+UPDATE storage.buckets
+   SET file_size_limit = 2097152,
+       allowed_mime_types = ARRAY['image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/svg+xml']
+ WHERE id = 'creator-logos';
@@ -0,0 +1,129 @@
+"""
+Cold-start bookkeeping for app.py: per-phase import timings and lazy imports.
+
+Heavy optional dependencies (OpenCV/NumPy, PIL/ffmpeg, Google API clients) are wrapped in
+``lazy_import`` proxies so they load on first use instead of before ``/api/ping`` can answer.
+
+    python app.py --profile-startup     # import the app, print the phase report, exit
+    SCREENMERCH_PROFILE_STARTUP=1 gunicorn app:app   # log the report once at boot
+"""
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_T0 = time.perf_counter()
+_last_mark = _T0
+PHASES = []          # [(phase name, seconds)]
+LAZY_IMPORTS = {}    # {module label: seconds spent importing on first use}
+_lazy_lock = threading.RLock()
+_lazy_proxies = []
+
+
+def mark(name):
+    """Close the current phase (time since the previous mark) under ``name``."""
+    global _last_mark
+    now = time.perf_counter()
+    PHASES.append((name, now - _last_mark))
+    _last_mark = now
+
+
+def total_seconds():
+    return _last_mark - _T0
+
+
+class LazyModule:
+    """
+    Stand-in for a module (or one attribute of it) that is imported on first use.
+
+    Attribute access, calls and ``isinstance``-free usage all work as with the real object:
+    ``cv2 = lazy_import("cv2")``; ``build = lazy_import("googleapiclient.discovery", "build")``.
+    """
+
+    def __init__(self, module_name, attr=None):
+        object.__setattr__(self, "_module_name", module_name)
+        object.__setattr__(self, "_attr", attr)
+        object.__setattr__(self, "_target", None)
+
+    @property
+    def _label(self):
+        return self._module_name + (f".{self._attr}" if self._attr else "")
+
+    def _load(self):
+        target = self._target
+        if target is not None:
+            return target
+        with _lazy_lock:
+            if self._target is None:
+                start = time.perf_counter()
+                module = importlib.import_module(self._module_name)
+                target = getattr(module, self._attr) if self._attr else module
+                LAZY_IMPORTS[self._label] = time.perf_counter() - start
+                object.__setattr__(self, "_target", target)
+                logger.info("Lazy import %s took %.1f ms", self._label, LAZY_IMPORTS[self._label] * 1000)
+        return self._target
+
+    @property
+    def is_loaded(self):
+        return self._target is not None
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __setattr__(self, item, value):
+        setattr(self._load(), item, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        state = "loaded" if self.is_loaded else "deferred"
+        return f"<LazyModule {self._label} ({state})>"
+
+
+def lazy_import(module_name, attr=None):
+    proxy = LazyModule(module_name, attr)
+    _lazy_proxies.append(proxy)
+    return proxy
+
+
+def warm(*proxies):
+    """Force-load deferred imports (e.g. in a gunicorn preload master so workers share them)."""
+    for proxy in proxies or _lazy_proxies:
+        proxy._load()
+
+
+def profile_requested():
+    return "--profile-startup" in sys.argv or os.getenv("SCREENMERCH_PROFILE_STARTUP") == "1"
+
+
+def report(measure_deferred=False):
+    """Human-readable phase table; with ``measure_deferred`` also loads and times the lazy imports."""
+    lines = ["Startup profile (seconds)", "-" * 56]
+    for name, seconds in PHASES:
+        lines.append(f"{name:<46}{seconds:>10.3f}")
+    lines.append("-" * 56)
+    lines.append(f"{'total until app ready':<46}{total_seconds():>10.3f}")
+    pending = [p for p in _lazy_proxies if not p.is_loaded]
+    if measure_deferred:
+        for proxy in pending:
+            try:
+                proxy._load()
+            except Exception as e:
+                LAZY_IMPORTS.setdefault(proxy._label, float("nan"))
+                logger.warning("Deferred import %s failed: %s", proxy._label, e)
+    if LAZY_IMPORTS or pending:
+        lines.append("")
+        lines.append("Deferred until first use" + (" (timed now)" if measure_deferred else ""))
+        for proxy in _lazy_proxies:
+            seconds = LAZY_IMPORTS.get(proxy._label)
+            shown = f"{seconds:>10.3f}" if seconds is not None else f"{'not loaded':>10}"
+            lines.append(f"{proxy._label:<46}{shown}")
+        saved = sum(v for v in LAZY_IMPORTS.values() if v == v)
+        if measure_deferred:
+            lines.append(f"{'cold-start time saved':<46}{saved:>10.3f}")
+    return "\n".join(lines)
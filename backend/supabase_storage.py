@@ -1,16 +1,76 @@
 import os
 import base64
+import hashlib
+import random
+import threading
+import time
 import uuid
 import logging
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+from utils.executors import fork_safe_executor
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 # Lazy Supabase client so a bad key does not crash the app at import (avoids restart loop on Fly).
 _supabase: Client | None = None
 _supabase_failed = False
+_supabase_lock = threading.Lock()
+
+# Concurrent uploads per save_multiple_images call (STORAGE_UPLOAD_CONCURRENCY).
+UPLOAD_CONCURRENCY = max(1, int(os.getenv("STORAGE_UPLOAD_CONCURRENCY", "4") or 4))
+UPLOAD_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.25
+
+# (magic prefix, content type, extension); WebP is RIFF....WEBP and checked separately.
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png", "png"),
+    (b"\xff\xd8\xff", "image/jpeg", "jpg"),
+    (b"GIF87a", "image/gif", "gif"),
+    (b"GIF89a", "image/gif", "gif"),
+)
+
+
+def sniff_image_type(data):
+    """(content_type, extension) from the file's magic bytes; PNG when unknown."""
+    head = bytes(data[:16])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", "webp"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif", "avif"
+    for magic, content_type, ext in _IMAGE_SIGNATURES:
+        if head.startswith(magic):
+            return content_type, ext
+    return "image/png", "png"
+
+
+def decode_image_data(image_data):
+    """Bytes from base64 / data-URL text (bytes are passed through)."""
+    if isinstance(image_data, (bytes, bytearray)):
+        return bytes(image_data)
+    if image_data.startswith('data:'):
+        image_data = image_data.split(',', 1)[1]
+    return base64.b64decode(image_data)
+
+
+def _is_duplicate_error(err):
+    text = str(err)
+    return "Duplicate" in text or "already exists" in text or "'statusCode': 409" in text or "'409'" in text
+
+
+def _with_retry(fn, attempts=UPLOAD_ATTEMPTS, base_delay=RETRY_BASE_DELAY):
+    """Call ``fn`` retrying transient errors with jittered exponential backoff; duplicates are not retried."""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if _is_duplicate_error(e) or attempt == attempts - 1:
+                raise
+            delay = base_delay * (2 ** attempt) * (0.5 + random.random())
+            logger.info("Storage upload failed (%s), retrying in %.2fs", e, delay)
+            time.sleep(delay)
 
 
 def _get_supabase() -> Client | None:
@@ -19,6 +79,14 @@ def _get_supabase() -> Client | None:
         return _supabase
     if _supabase_failed:
         return None
+    with _supabase_lock:
+        if _supabase is not None or _supabase_failed:
+            return _supabase
+        return _create_supabase()
+
+
+def _create_supabase() -> Client | None:
+    global _supabase, _supabase_failed
     url = os.getenv("VITE_SUPABASE_URL") or os.getenv("SUPABASE_URL")
     key = os.getenv("VITE_SUPABASE_ANON_KEY") or os.getenv("SUPABASE_ANON_KEY")
     if not url or not key:
@@ -39,13 +107,14 @@ class SupabaseStorage:
     def __init__(self):
         self.bucket_name = "product-images"
     
-    def save_image(self, image_data, filename=None):
+    def save_image(self, image_data, filename=None, dedupe=False):
         """
         Save an image to Supabase Storage
         
         Args:
-            image_data (str): Base64 encoded image data
+            image_data (str|bytes): Base64 / data-URL encoded image data, or raw bytes
             filename (str): Optional filename, will generate one if not provided
+            dedupe (bool): Treat "object already exists" as success (content-addressed filenames)
             
         Returns:
             str: Public URL of the saved image
@@ -54,55 +123,81 @@ class SupabaseStorage:
         if not supabase:
             return None
         try:
+            image_bytes = decode_image_data(image_data)
+            content_type, ext = sniff_image_type(image_bytes)
             # Generate filename if not provided
             if not filename:
-                file_id = str(uuid.uuid4())
-                filename = f"product_{file_id}.png"
-            
-            # Remove data URL prefix if present
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            
-            # Decode base64 data
-            image_bytes = base64.b64decode(image_data)
-            
-            # Upload to Supabase Storage
-            response = supabase.storage.from_(self.bucket_name).upload(
-                path=filename,
-                file=image_bytes,
-                file_options={"content-type": "image/png"}
-            )
-            
-            if response:
-                # Get public URL
-                public_url = supabase.storage.from_(self.bucket_name).get_public_url(filename)
-                return public_url
-            
-            return None
-            
+                filename = f"product_{uuid.uuid4()}.{ext}"
+            return self._upload(supabase, filename, image_bytes, content_type, dedupe)
         except Exception as e:
             logger.warning("Error saving image to Supabase: %s", e)
             return None
+
+    def _upload(self, supabase, filename, image_bytes, content_type, dedupe):
+        bucket = supabase.storage.from_(self.bucket_name)
+        try:
+            response = _with_retry(lambda: bucket.upload(
+                path=filename,
+                file=image_bytes,
+                file_options={"content-type": content_type}
+            ))
+        except Exception as e:
+            if not (dedupe and _is_duplicate_error(e)):
+                raise
+            response = True  # identical content is already stored under this name
+        if response:
+            return bucket.get_public_url(filename)
+        return None
     
-    def save_multiple_images(self, images_data, prefix="product"):
+    def save_multiple_images(self, images_data, prefix="product", dedupe=True):
         """
-        Save multiple images to Supabase Storage
+        Save multiple images to Supabase Storage, uploading up to UPLOAD_CONCURRENCY at once
         
         Args:
             images_data (list): List of base64 encoded image data
             prefix (str): Prefix for filenames
+            dedupe (bool): Name files by content hash so identical screenshots are uploaded once
             
         Returns:
-            list: List of public URLs for saved images
+            list: List of public URLs for saved images (input order; failed images are skipped)
         """
-        saved_urls = []
-        
+        supabase = _get_supabase()
+        if not supabase or not images_data:
+            return []
+
+        def prepare(i, image_data):
+            image_bytes = decode_image_data(image_data)
+            content_type, ext = sniff_image_type(image_bytes)
+            if dedupe:
+                filename = f"{prefix}_{hashlib.sha256(image_bytes).hexdigest()[:32]}.{ext}"
+            else:
+                filename = f"{prefix}_{uuid.uuid4()}_{i}.{ext}"
+            return filename, image_bytes, content_type
+
+        prepared = []
         for i, image_data in enumerate(images_data):
-            filename = f"{prefix}_{uuid.uuid4()}_{i}.png"
-            url = self.save_image(image_data, filename)
+            try:
+                prepared.append(prepare(i, image_data))
+            except Exception as e:
+                logger.warning("Error decoding image %s for Supabase: %s", i, e)
+                prepared.append(None)
+
+        def upload(filename, image_bytes, content_type):
+            try:
+                return self._upload(supabase, filename, image_bytes, content_type, dedupe)
+            except Exception as e:
+                logger.warning("Error saving image to Supabase: %s", e)
+                return None
+
+        futures = {}
+        for item in prepared:
+            if item is not None and item[0] not in futures:
+                futures[item[0]] = fork_safe_executor("storage-upload", UPLOAD_CONCURRENCY).submit(upload, *item)
+        saved_urls = []
+        for item in prepared:
+            url = futures[item[0]].result() if item is not None else None
             if url:
                 saved_urls.append(url)
-        
         return saved_urls
     
     def delete_image(self, image_url):
@@ -0,0 +1,112 @@
+"""Bulk maintenance: keyset-chunked deletes without row payloads, progress and background jobs (fake PostgREST)."""
+import time
+import unittest
+import unittest.mock
+
+from postgrest_fake import FakeQuery, FakeSupabase
+from utils import bulk_maintenance
+from utils.helpers import reset_all_platform_sales_records, reset_creator_sales_records
+from utils.shared_store import MemoryKV, SharedDict
+
+
+def _missing(*tables):
+    return lambda query: RuntimeError(f'relation "{query.table}" does not exist') if query.table in tables else None
+
+
+def _deletes(db):
+    return [(q.table, q.affected, q.returning) for q in db.queries if q.method == "delete"]
+
+
+def _rows(n, **fields):
+    return [dict({"id": f"{i:04d}"}, **fields) for i in range(n)]
+
+
+class TestDeleteInChunks(unittest.TestCase):
+    def test_chunks_report_progress_and_return_count(self):
+        db = FakeSupabase(sales=_rows(7))
+        seen = []
+        deleted = bulk_maintenance.delete_in_chunks(db, "sales", batch_size=3, pause=0,
+                                                    progress=lambda t, d, total: seen.append((t, d, total)))
+        self.assertEqual(deleted, 7)
+        self.assertEqual(db.tables["sales"], [])
+        self.assertEqual([n for _, n, _ in _deletes(db)], [3, 3, 1])
+        self.assertTrue(all(str(r.value) == "minimal" for _, _, r in _deletes(db)))
+        self.assertEqual(seen, [("sales", 0, 7), ("sales", 3, 7), ("sales", 6, 7), ("sales", 7, 7)])
+
+    def test_filters_limit_the_delete(self):
+        db = FakeSupabase(sales=_rows(4, user_id="a") + [{"id": "9999", "user_id": "b"}])
+        self.assertEqual(bulk_maintenance.delete_in_chunks(db, "sales", {"user_id": "a"}, batch_size=2, pause=0), 4)
+        self.assertEqual(db.tables["sales"], [{"id": "9999", "user_id": "b"}])
+
+    def test_batch_size_is_clamped(self):
+        self.assertEqual(bulk_maintenance.batch_size_from(None), bulk_maintenance.DEFAULT_BATCH_SIZE)
+        self.assertEqual(bulk_maintenance.batch_size_from("100000"), bulk_maintenance.MAX_BATCH_SIZE)
+        self.assertEqual(bulk_maintenance.batch_size_from("x"), bulk_maintenance.DEFAULT_BATCH_SIZE)
+
+
+class TestResets(unittest.TestCase):
+    def test_reset_all_counts_each_table_and_tolerates_missing_ones(self):
+        db = FakeSupabase(sales=_rows(5), creator_earnings=_rows(2))
+        db.errors.append(_missing("umbrella_collaborator_payouts"))
+        order_store = {"o1": {}, "o2": {}}
+        result = reset_all_platform_sales_records(db, order_store, batch_size=2)
+        self.assertEqual(result, {"deleted_sales_count": 5, "deleted_earnings_count": 2,
+                                  "deleted_payouts_count": 0, "purged_order_store_count": 2})
+        self.assertEqual(order_store, {})
+
+    def test_reset_all_reports_rows_deleted_before_a_failure(self):
+        db = FakeSupabase(sales=_rows(5), creator_earnings=[], umbrella_collaborator_payouts=[])
+        real_execute = FakeQuery.execute
+
+        def execute(query):
+            if query.method == "delete" and len(_deletes(db)) == 2:
+                raise RuntimeError("statement timeout")
+            return real_execute(query)
+
+        with unittest.mock.patch.object(FakeQuery, "execute", execute):
+            result = reset_all_platform_sales_records(db, None, batch_size=2)
+        self.assertEqual(result["deleted_sales_count"], 4)
+        self.assertEqual(len(db.tables["sales"]), 1)
+
+    def test_reset_creator_only_touches_that_creator(self):
+        db = FakeSupabase(sales=_rows(3, user_id="u1") + [{"id": "x", "user_id": "u2"}],
+                    creator_earnings=_rows(1, user_id="u1"),
+                    umbrella_collaborator_payouts=_rows(2, storefront_owner_id="u1"))
+        result = reset_creator_sales_records(db, "u1", {"o1": {"user_id": "u1"}, "o2": {"user_id": "u2"}})
+        self.assertEqual((result["deleted_sales_count"], result["deleted_earnings_count"],
+                          result["deleted_payouts_count"], result["purged_order_store_count"]), (3, 1, 2, 1))
+        self.assertEqual(db.tables["sales"], [{"id": "x", "user_id": "u2"}])
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, bulk_maintenance, "_jobs", bulk_maintenance._jobs)
+        bulk_maintenance._jobs = SharedDict("maintenance_jobs", kv=MemoryKV())
+
+    def _wait(self, job_id):
+        deadline = time.time() + 2
+        while bulk_maintenance.get_job(job_id)["status"] == "running" and time.time() < deadline:
+            time.sleep(0.01)
+        return bulk_maintenance.get_job(job_id)
+
+    def test_background_reset_records_progress_and_result(self):
+        db = FakeSupabase(sales=_rows(5), creator_earnings=_rows(1), umbrella_collaborator_payouts=[])
+        job_id = bulk_maintenance.start_job(
+            "reset", lambda progress: reset_all_platform_sales_records(db, None, None, 2, progress), "admin@x")
+        job = self._wait(job_id)
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(job["progress"]["sales"], {"deleted": 5, "total": 5})
+        self.assertEqual(job["result"]["deleted_sales_count"], 5)
+        self.assertEqual(job["started_by"], "admin@x")
+
+    def test_failed_job_keeps_error(self):
+        def boom(progress):
+            raise RuntimeError("statement timeout")
+
+        job = self._wait(bulk_maintenance.start_job("reset", boom))
+        self.assertEqual((job["status"], job["error"]), ("failed", "statement timeout"))
+        self.assertIsNone(bulk_maintenance.get_job("missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+"""Fulfillment batch runner: leased chunks, uploads, checkpoints and resume (fake Supabase, no rendering)."""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from postgrest_fake import FakeSupabase
+from services import fulfillment_batch as batch
+from utils import work_queue
+
+
+class FakeBucket:
+    def __init__(self, objects, bucket):
+        self.objects = objects
+        self.bucket = bucket
+
+    def upload(self, path, file, file_options=None):
+        self.objects[(self.bucket, path)] = (file, file_options["content-type"])
+
+
+class FakeStorage:
+    def __init__(self):
+        self.objects = {}
+
+    def from_(self, bucket):
+        return FakeBucket(self.objects, bucket)
+
+
+class FakeClient(FakeSupabase):
+    def __init__(self, **tables):
+        super().__init__(**tables)
+        self.storage = FakeStorage()
+
+
+def _queue_row(n, priority=0, status="pending", **extra):
+    return dict({"id": n, "order_id": f"o{n}", "status": status, "priority": priority,
+                 "created_at": f"2026-01-01T00:00:{n:02d}", "processing_attempts": 0,
+                 "assigned_to": None, "lease_expires_at": None}, **extra)
+
+
+def _lease_until(minutes):
+    return (datetime.now(timezone.utc) + timedelta(minutes=minutes)).isoformat()
+
+
+def _order(n, items=1):
+    return {"order_id": f"o{n}", "cart": [{"product": "Tee", "img": "data:image/png;base64,AA=="}] * items}
+
+
+class FakeRender:
+    """Stands in for render_job; records job order and fails the given queue ids."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+
+    def __call__(self, job):
+        self.calls.append(job["queue_id"])
+        if job["queue_id"] in self.fail:
+            return {"queue_id": job["queue_id"], "error": "bad frame", "seconds": 0.01}
+        files = [(b"png-%d" % i, "image/png") for i in range(len(job["items"]))]
+        return {"queue_id": job["queue_id"], "files": files, "seconds": 0.01}
+
+
+def _runner(client, render, checkpoint=None, chunk_size=2):
+    return batch.BatchRunner(client, "https://x.supabase.co", "batch-worker", bucket="b", chunk_size=chunk_size,
+                             processes=0, checkpoint=checkpoint or batch.Checkpoint(), render=render)
+
+
+class TestBuildJob(unittest.TestCase):
+    def test_items_prefer_video_and_fall_back_to_screenshot(self):
+        order = {
+            "order_id": "o1",
+            "selected_screenshot": "data:image/png;base64,BB==",
+            "cart": [
+                {"video_url": "https://cdn.test/v.mp4", "screenshot_timestamp": "12.5", "img": "data:x"},
+                {"video_url": "blob:https://app/1", "timestamp": "Not provided"},
+            ],
+        }
+        job = batch.build_job({"id": 1, "order_id": "o1"}, order)
+        first, second = job["items"]
+        self.assertEqual((first["video_url"], first["timestamp"], first["screenshot"]), ("https://cdn.test/v.mp4", 12.5, "data:x"))
+        self.assertEqual((second["video_url"], second["timestamp"]), (None, None))
+        self.assertEqual(second["screenshot"], "data:image/png;base64,BB==")
+
+    def test_render_job_reports_missing_sources(self):
+        result = batch.render_job({"queue_id": 1, "print_dpi": 300, "items": []})
+        self.assertEqual(result["queue_id"], 1)
+        self.assertIn("no items", result["error"])
+
+
+class TestBatchRunner(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, work_queue, "_rpc_supported", True)
+        self.addCleanup(setattr, work_queue, "_lease_column_supported", True)
+        self.client = FakeClient(**{
+            batch.QUEUE_TABLE: [_queue_row(1), _queue_row(2, priority=5), _queue_row(3), _queue_row(4, status="completed")],
+            "orders": [_order(1), _order(2, items=2), _order(3), _order(4)],
+        })
+        self.db = self.client.tables
+
+    def _row(self, queue_id):
+        return next(r for r in self.db[batch.QUEUE_TABLE] if r["id"] == queue_id)
+
+    def test_processes_pending_by_priority_and_records_outputs(self):
+        render = FakeRender()
+        stats = _runner(self.client, render).run()
+        self.assertEqual(render.calls, [2, 1, 3])
+        self.assertEqual((stats.completed, stats.failed), (3, 0))
+        row = self._row(2)
+        self.assertEqual(row["status"], "completed")
+        self.assertEqual(row["processing_attempts"], 1)
+        self.assertEqual(row["processed_image_url"], "https://x.supabase.co/storage/v1/object/public/b/print-files/o2/2-1.png")
+        self.assertIn(("b", "print-files/o2/2-2.png"), self.client.storage.objects)
+        self.assertEqual(sorted(h["queue_id"] for h in self.db[batch.HISTORY_TABLE]), [1, 2, 3])
+        self.assertGreater(stats.orders_per_minute, 0)
+        self.assertIn("orders/min=", stats.summary())
+
+    def test_failed_render_and_missing_order_mark_row_failed(self):
+        self.db["orders"] = [o for o in self.db["orders"] if o["order_id"] != "o3"]
+        stats = _runner(self.client, FakeRender(fail={1})).run()
+        self.assertEqual((stats.completed, stats.failed), (1, 2))
+        self.assertEqual(self._row(1)["status"], "failed")
+        self.assertIn("bad frame", self._row(1)["worker_notes"])
+        self.assertEqual(self._row(3)["status"], "failed")
+        self.assertNotIn(("b", "print-files/o1/1-1.png"), self.client.storage.objects)
+
+    def test_limit_stops_early(self):
+        render = FakeRender()
+        _runner(self.client, render, chunk_size=5).run(limit=1)
+        self.assertEqual(render.calls, [2])
+        self.assertEqual(self._row(1)["status"], "pending")
+
+    def test_resume_finishes_claimed_rows_without_rendering_uploaded_ones(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "checkpoint.json")
+            interrupted = batch.Checkpoint(path)
+            interrupted.claimed.update({1, 2})
+            interrupted.uploaded["2"] = ["https://x.supabase.co/storage/v1/object/public/b/print-files/o2/2-1.png"]
+            interrupted.save()
+            for queue_id in (1, 2):
+                self._row(queue_id).update(status="processing", assigned_to="batch-worker",
+                                           lease_expires_at=_lease_until(5), processing_attempts=1)
+
+            render = FakeRender()
+            checkpoint = batch.Checkpoint(path)
+            _runner(self.client, render, checkpoint=checkpoint).run()
+
+            self.assertEqual(render.calls, [1, 3])
+            self.assertEqual(self._row(2)["status"], "completed")
+            self.assertTrue(self._row(2)["processed_image_url"].endswith("/2-1.png"))
+            self.assertEqual(batch.Checkpoint(path).done, {1, 2, 3})
+
+    def test_rows_leased_by_other_workers_are_left_alone(self):
+        self._row(2).update(status="assigned", assigned_to="portal-worker", lease_expires_at=_lease_until(5))
+        render = FakeRender()
+        _runner(self.client, render).run()
+        self.assertEqual(render.calls, [1, 3])
+        self.assertEqual((self._row(2)["status"], self._row(2)["assigned_to"]), ("assigned", "portal-worker"))
+
+    def test_claimed_rows_carry_a_lease_that_expiry_recovers(self):
+        runner = _runner(self.client, FakeRender())
+        rows = runner.lease_pending(2)
+        self.assertEqual([r["id"] for r in rows], [2, 1])
+        for queue_id in (2, 1):
+            row = self._row(queue_id)
+            self.assertEqual((row["status"], row["assigned_to"]), ("processing", "batch-worker"))
+            self.assertGreater(row["lease_expires_at"], datetime.now(timezone.utc).isoformat())
+
+        # The run dies here; once the leases run out the rows go back to pending.
+        for queue_id in (2, 1):
+            self._row(queue_id)["lease_expires_at"] = _lease_until(-1)
+        self.assertEqual(work_queue.requeue_expired(self.client), 2)
+        self.assertEqual(self._row(2)["status"], "pending")
+
+    def test_result_for_a_lost_lease_is_dropped(self):
+        class Requeueing(FakeRender):
+            def __call__(render, job):
+                if job["queue_id"] == 2:
+                    self._row(2).update(status="pending", assigned_to=None, lease_expires_at=None)
+                return super().__call__(job)
+
+        stats = _runner(self.client, Requeueing(), chunk_size=1).run(limit=1)
+        self.assertEqual((stats.completed, stats.failed), (0, 0))
+        self.assertEqual(self._row(2)["status"], "pending")
+        self.assertNotIn(batch.HISTORY_TABLE, self.db)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Google sign-in helpers: cached discovery clients, concurrent profile fetch, phase timing (no network)."""
+import time
+import unittest
+from unittest import mock
+
+from services import google_oauth
+
+
+class TestDiscoveryClients(unittest.TestCase):
+    def test_built_once_from_bundled_document(self):
+        with mock.patch("httplib2.Http.request", side_effect=AssertionError("network used")):
+            first = google_oauth.get_discovery_client("youtube", "v3")
+            second = google_oauth.get_discovery_client("youtube", "v3")
+        self.assertIs(first, second)
+        request = first.channels().list(part="snippet,statistics", mine=True)
+        self.assertIn("/youtube/v3/channels", request.uri)
+
+    def test_request_executes_with_per_call_http(self):
+        response = mock.Mock(status=200)
+        response.get = lambda k, d=None: d
+        authed = mock.Mock()
+        authed.request.return_value = (response, b'{"email": "a@example.com"}')
+        with mock.patch.object(google_oauth, "_authorized_http", return_value=authed):
+            info = google_oauth.fetch_userinfo(credentials=object())
+        self.assertEqual(info, {"email": "a@example.com"})
+        self.assertIn("/oauth2/v2/userinfo", authed.request.call_args[0][0])
+
+
+class TestFetchGoogleProfile(unittest.TestCase):
+    def test_calls_run_concurrently(self):
+        def slow(value):
+            def f(credentials):
+                time.sleep(0.2)
+                return value
+            return f
+
+        with mock.patch.object(google_oauth, "fetch_userinfo", slow({"id": "1"})), \
+                mock.patch.object(google_oauth, "fetch_youtube_channel", slow({"items": []})):
+            start = time.perf_counter()
+            info, channels = google_oauth.fetch_google_profile(credentials=object())
+            elapsed = time.perf_counter() - start
+        self.assertEqual((info, channels), ({"id": "1"}, {"items": []}))
+        self.assertLess(elapsed, 0.35)
+
+    def test_channel_error_propagates(self):
+        with mock.patch.object(google_oauth, "fetch_userinfo", return_value={"id": "1"}), \
+                mock.patch.object(google_oauth, "fetch_youtube_channel", side_effect=RuntimeError("quota")):
+            with self.assertRaises(RuntimeError):
+                google_oauth.fetch_google_profile(credentials=object())
+
+
+class TestPhaseTimer(unittest.TestCase):
+    def test_summary_lists_phases_and_total(self):
+        timer = google_oauth.PhaseTimer()
+        with timer.phase("token_exchange"):
+            pass
+        with self.assertRaises(ValueError):
+            with timer.phase("user_lookup"):
+                raise ValueError
+        summary = timer.summary()
+        self.assertRegex(summary, r"^token_exchange=\d+ms user_lookup=\d+ms total=\d+ms$")
+
+
+if __name__ == "__main__":
+    unittest.main()
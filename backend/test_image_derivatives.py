@@ -0,0 +1,112 @@
+"""Image derivatives: width buckets, Accept negotiation and the on-disk render cache (no network)."""
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from services import image_derivatives as derivatives
+
+
+def _image_bytes(size=(1600, 1000), mode="RGB", fmt="PNG"):
+    out = io.BytesIO()
+    color = (30, 120, 200, 128) if mode == "RGBA" else (30, 120, 200)
+    Image.new(mode, size, color).save(out, fmt)
+    return out.getvalue()
+
+
+class TestNegotiation(unittest.TestCase):
+    def test_bucket_width(self):
+        self.assertEqual(derivatives.bucket_width("300"), 320)
+        self.assertEqual(derivatives.bucket_width(320), 320)
+        self.assertEqual(derivatives.bucket_width(5000), derivatives.WIDTH_BUCKETS[-1])
+        for bad in (None, "", "abc", "0", "-5"):
+            self.assertIsNone(derivatives.bucket_width(bad))
+
+    def test_negotiate_format(self):
+        with mock.patch.object(derivatives, "avif_supported", return_value=True):
+            self.assertEqual(derivatives.negotiate_format("image/avif,image/webp,*/*"), "avif")
+        with mock.patch.object(derivatives, "avif_supported", return_value=False):
+            self.assertEqual(derivatives.negotiate_format("image/avif,image/webp,*/*"), "webp")
+        self.assertEqual(derivatives.negotiate_format("image/png,*/*"), "jpeg")
+        self.assertEqual(derivatives.negotiate_format("*/*", has_alpha=True), "png")
+        self.assertEqual(derivatives.negotiate_format(None), "jpeg")
+
+    def test_derived_urls(self):
+        url = derivatives.derived_url("https://api.test/", "https://x.supabase.co/storage/v1/object/public/b/a b.png", 320)
+        self.assertTrue(url.startswith("https://api.test/images/derived?src=https%3A%2F%2Fx.supabase.co"))
+        self.assertTrue(url.endswith("&w=320"))
+        self.assertEqual(
+            derivatives.static_derived_url("https://api.test", "mug.png", 640, "abc"),
+            "https://api.test/static/images/mug.png?w=640&v=abc",
+        )
+        self.assertEqual(derivatives.srcset(lambda w: f"u{w}", (320, 640)), "u320 320w, u640 640w")
+
+
+class TestDerivativeCache(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch.dict(os.environ, {"IMAGE_DERIVATIVE_DIR": self._dir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self._dir.cleanup)
+
+    def test_renders_once_per_width_and_format(self):
+        data = _image_bytes()
+        load = mock.Mock(return_value=data)
+        first = derivatives.get_derivative("static:a.png", "v1", 320, "image/webp", load)
+        again = derivatives.get_derivative("static:a.png", "v1", 320, "image/webp", load)
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(first.path, again.path)
+        self.assertEqual(first.mimetype, "image/webp")
+        self.assertEqual(first.original_size, len(data))
+        self.assertEqual(first.bytes_saved, len(data) - first.size)
+        with Image.open(first.path) as img:
+            self.assertEqual(img.size, (320, 200))
+
+        jpeg = derivatives.get_derivative("static:a.png", "v1", 320, "*/*", load)
+        self.assertEqual(jpeg.mimetype, "image/jpeg")
+        self.assertEqual(load.call_count, 2)
+
+    def test_new_fingerprint_renders_again(self):
+        load = mock.Mock(return_value=_image_bytes())
+        a = derivatives.get_derivative("static:a.png", "v1", 320, "image/webp", load)
+        b = derivatives.get_derivative("static:a.png", "v2", 320, "image/webp", load)
+        self.assertNotEqual(a.path, b.path)
+        self.assertEqual(load.call_count, 2)
+
+    def test_never_upscales_and_keeps_alpha(self):
+        d = derivatives.get_derivative("static:b.png", "v1", 960, "*/*", lambda: _image_bytes((200, 100), "RGBA"))
+        self.assertEqual(d.mimetype, "image/png")
+        with Image.open(d.path) as img:
+            self.assertEqual(img.size, (200, 100))
+            self.assertEqual(img.mode, "RGBA")
+
+    def test_cache_is_capped_least_recently_used_first(self):
+        load = mock.Mock(return_value=_image_bytes())
+        paths = {}
+        for n, name in enumerate(("a", "b", "c")):
+            paths[name] = derivatives.get_derivative(f"static:{name}.png", "v1", 320, "image/webp", load).path
+            os.utime(paths[name], (1000 + n, 1000 + n))
+        derivatives.get_derivative("static:a.png", "v1", 320, "image/webp", load)  # hit refreshes a
+
+        size = os.path.getsize(paths["b"])
+        self.assertEqual(derivatives.prune(self._dir.name, max_bytes=int(size * 2.5)), 1)
+        self.assertFalse(os.path.exists(paths["b"]))
+        self.assertTrue(os.path.exists(paths["a"]) and os.path.exists(paths["c"]))
+        self.assertEqual(len([n for n in os.listdir(self._dir.name) if n.endswith(".orig")]), 2)
+        self.assertEqual(derivatives.prune(self._dir.name, max_bytes=size * 10), 0)
+
+    def test_fetch_source_size_cap(self):
+        resp = mock.MagicMock()
+        resp.__enter__.return_value = resp
+        resp.iter_content.return_value = [b"x" * 1024] * 4
+        with mock.patch("requests.get", return_value=resp), mock.patch.object(derivatives, "MAX_SOURCE_BYTES", 2048):
+            with self.assertRaises(ValueError):
+                derivatives.fetch_source("https://x.supabase.co/storage/v1/object/public/b/a.png")
+
+
+if __name__ == "__main__":
+    unittest.main()
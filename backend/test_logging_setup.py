@@ -0,0 +1,91 @@
+"""Logging subsystem: JSON output, sampling, rate limits, lazy queue records and runtime levels."""
+import json
+import logging
+import sys
+import unittest
+
+from utils import logging_setup
+from utils.shared_store import MemoryKV, SharedDict
+
+
+def _record(name="app", level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestFormattingAndFilters(unittest.TestCase):
+    def test_parse_spec(self):
+        self.assertEqual(logging_setup.parse_spec("app=0.5, routes.products=0.1,bad,x=y"),
+                         {"app": 0.5, "routes.products": 0.1})
+        self.assertEqual(logging_setup.parse_spec("werkzeug=WARNING", str), {"werkzeug": "WARNING"})
+        self.assertEqual(logging_setup.parse_spec(None), {})
+
+    def test_json_formatter_includes_extras_and_exception(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord("app", logging.ERROR, __file__, 1, "order %s failed", ("o1",),
+                                       sys.exc_info())
+        record.order_id = "o1"
+        payload = json.loads(logging_setup.JsonFormatter().format(record))
+        self.assertEqual((payload["level"], payload["logger"], payload["msg"]), ("ERROR", "app", "order o1 failed"))
+        self.assertEqual(payload["order_id"], "o1")
+        self.assertIn("ValueError: boom", payload["exc"])
+
+    def test_sampling_matches_prefix_and_never_drops_warnings(self):
+        sampler = logging_setup.SamplingFilter({"routes": 0.1, "routes.auth": 1}, rng=lambda: 0.5)
+        self.assertFalse(sampler.filter(_record("routes.products")))
+        self.assertTrue(sampler.filter(_record("routes.auth")))
+        self.assertTrue(sampler.filter(_record("app")))
+        self.assertTrue(sampler.filter(_record("routes.products", level=logging.WARNING)))
+
+    def test_rate_limit_counts_suppressed_records(self):
+        now = [0.0]
+        limiter = logging_setup.RateLimitFilter({"app": 2}, clock=lambda: now[0])
+        passed = [limiter.filter(_record()) for _ in range(5)]
+        self.assertEqual(passed, [True, True, False, False, False])
+        self.assertEqual(limiter.suppressed(), {"app": 3})
+        self.assertTrue(limiter.filter(_record(level=logging.ERROR)))
+
+        now[0] = 1.0
+        record = _record()
+        self.assertTrue(limiter.filter(record))
+        self.assertEqual(record.suppressed, 3)
+        self.assertEqual(limiter.suppressed(), {})
+        self.assertTrue(limiter.filter(_record("other")))
+
+    def test_queue_records_stay_lazy_unless_args_are_mutable(self):
+        handler = logging_setup.LazyQueueHandler(None)
+        lazy = handler.prepare(_record(args=("o1", 3)))
+        self.assertEqual((lazy.msg, lazy.args), ("hello %s", ("o1", 3)))
+
+        cart = ["shirt"]
+        eager = handler.prepare(_record(args=(cart,)))
+        cart.append("mug")
+        self.assertEqual((eager.msg, eager.args), ("hello ['shirt']", None))
+
+
+class TestRuntimeLevels(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, logging_setup, "_level_overrides", logging_setup._level_overrides)
+        logging_setup._level_overrides = SharedDict("log_levels", kv=MemoryKV())
+        self.addCleanup(logging_setup._state.update, applied=dict(logging_setup._state["applied"]))
+        self.addCleanup(logging.getLogger("bench.levels").setLevel, logging.NOTSET)
+
+    def test_set_level_applies_and_is_shared(self):
+        self.assertEqual(logging_setup.set_level("bench.levels", "debug"), "DEBUG")
+        self.assertEqual(logging.getLogger("bench.levels").level, logging.DEBUG)
+        self.assertEqual(logging_setup.levels()["bench.levels"], "DEBUG")
+        self.assertEqual(logging_setup._level_overrides["bench.levels"], "DEBUG")
+        with self.assertRaises(ValueError):
+            logging_setup.set_level("bench.levels", "LOUD")
+
+    def test_sync_picks_up_other_workers_overrides(self):
+        logging_setup._level_overrides["bench.levels"] = "ERROR"
+        logging_setup.sync_levels(force=True)
+        self.assertEqual(logging.getLogger("bench.levels").level, logging.ERROR)
+
+
+if __name__ == "__main__":
+    unittest.main()
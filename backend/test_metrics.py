@@ -0,0 +1,140 @@
+"""Metrics: per-thread shards, Prometheus exposition, Flask hooks, stage timers and worker aggregation."""
+import os
+import threading
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from utils import cache as cache_module, metrics
+from utils.cache import TTLCache
+from utils.shared_store import MemoryKV, SharedDict
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        metrics._reset_after_fork()
+        self.addCleanup(metrics._reset_after_fork)
+        self.addCleanup(setattr, metrics, "_snapshots", metrics._snapshots)
+        self.addCleanup(setattr, metrics, "_retired", metrics._retired)
+        metrics._snapshots = SharedDict("metrics_workers", kv=MemoryKV())
+        metrics._retired = SharedDict("metrics_retired", kv=MemoryKV())
+        # No publisher thread in tests.
+        metrics._publisher["pid"] = os.getpid()
+
+
+class TestRecording(MetricsTestCase):
+    def test_threads_record_without_sharing_a_shard(self):
+        def work():
+            for _ in range(1000):
+                metrics.inc("jobs_total", (("kind", "a"),))
+                metrics.observe("job_seconds", 0.02)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        snap = metrics.snapshot()
+        self.assertEqual(len(metrics._shards), 8)
+        self.assertEqual(snap["counters"][("jobs_total", (("kind", "a"),))], 8000)
+        row = snap["histograms"][("job_seconds", ())]
+        self.assertEqual(row[-1], 8000)
+        self.assertEqual(row[metrics.DURATION_BUCKETS.index(0.025)], 8000)
+
+    def test_render_is_cumulative_prometheus_text(self):
+        metrics.inc("screenmerch_http_requests_total", (("method", "GET"), ("route", '/a"b'), ("status", "200")), 3)
+        for seconds in (0.001, 0.2, 99):
+            metrics.observe("screenmerch_http_request_duration_seconds", seconds, (("method", "GET"), ("route", "/a")))
+        text = metrics.render(metrics.snapshot())
+        self.assertIn("# TYPE screenmerch_http_request_duration_seconds histogram", text)
+        self.assertIn('screenmerch_http_requests_total{method="GET",route="/a\\"b",status="200"} 3', text)
+        self.assertIn('screenmerch_http_request_duration_seconds_bucket{method="GET",route="/a",le="0.005"} 1', text)
+        self.assertIn('screenmerch_http_request_duration_seconds_bucket{method="GET",route="/a",le="0.25"} 2', text)
+        self.assertIn('screenmerch_http_request_duration_seconds_bucket{method="GET",route="/a",le="+Inf"} 3', text)
+        self.assertIn('screenmerch_http_request_duration_seconds_count{method="GET",route="/a"} 3', text)
+
+    def test_stage_timer_and_named_caches(self):
+        @metrics.timed_stages("pipe")
+        def run():
+            metrics.stage("decode")
+            metrics.stage("encode")
+
+        run()
+        metrics.stage("ignored")
+        histograms = metrics.snapshot()["histograms"]
+        stages = sorted(labels[1][1] for name, labels in histograms if name == "screenmerch_image_stage_seconds")
+        self.assertEqual(stages, ["decode", "encode", "total"])
+
+        cache = TTLCache(name="test_metrics_cache")
+        self.addCleanup(cache_module._named.pop, "test_metrics_cache", None)
+        cache.set("k", 1)
+        cache.get("k")
+        cache.get("missing")
+        counters = metrics.snapshot()["counters"]
+        self.assertEqual(counters[("screenmerch_cache_requests_total", (("cache", "test_metrics_cache"), ("result", "hit")))], 1)
+        self.assertEqual(counters[("screenmerch_cache_requests_total", (("cache", "test_metrics_cache"), ("result", "miss")))], 1)
+
+    def test_outbound_services(self):
+        self.assertEqual(metrics.service_for_host("abc.supabase.co"), "supabase")
+        self.assertEqual(metrics.service_for_host("api.printful.com"), "printful")
+        self.assertEqual(metrics.service_for_host("api.stripe.com"), "stripe")
+        self.assertEqual(metrics.service_for_host("api.resend.com"), "resend")
+        self.assertEqual(metrics.service_for_host("evilstripe.com"), "other")
+        metrics._record_outbound("api.stripe.com", "POST", 0, 402)
+        labels = next(labels for name, labels in metrics.snapshot()["histograms"]
+                      if name == "screenmerch_outbound_request_duration_seconds")
+        self.assertEqual(labels, (("service", "stripe"), ("method", "POST"), ("outcome", "4xx")))
+
+
+class TestFlaskIntegration(MetricsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = Flask(__name__)
+        metrics.init_app(self.app)
+        self.app.add_url_rule("/orders/<order_id>", "order", lambda order_id: order_id)
+
+        def boom():
+            raise RuntimeError("boom")
+
+        self.app.add_url_rule("/boom", "boom", boom)
+        self.http = self.app.test_client()
+
+    def test_requests_are_labelled_by_rule_and_status(self):
+        self.http.get("/orders/1")
+        self.http.get("/orders/2")
+        self.http.get("/boom")
+        counters = metrics.snapshot()["counters"]
+        self.assertEqual(counters[("screenmerch_http_requests_total",
+                                   (("method", "GET"), ("route", "/orders/<order_id>"), ("status", "200")))], 2)
+        self.assertEqual(counters[("screenmerch_http_requests_total",
+                                   (("method", "GET"), ("route", "/boom"), ("status", "500")))], 1)
+        self.assertEqual(metrics.snapshot()["gauges"][("screenmerch_http_requests_in_flight", ())], 0)
+
+    def test_metrics_endpoint_requires_token(self):
+        with mock.patch.dict(os.environ, {"METRICS_TOKEN": ""}):
+            self.assertEqual(self.http.get("/metrics").status_code, 404)
+        with mock.patch.dict(os.environ, {"METRICS_TOKEN": "s3cret"}):
+            self.assertEqual(self.http.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code, 401)
+            ok = self.http.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+        self.assertEqual(ok.status_code, 200)
+        self.assertIn("screenmerch_http_requests_in_flight 1", ok.get_data(as_text=True))
+
+
+class TestWorkerAggregation(MetricsTestCase):
+    def test_collect_sums_workers_and_keeps_retired_totals(self):
+        key = ("screenmerch_http_requests_total", (("method", "GET"), ("route", "/x"), ("status", "200")))
+        metrics._snapshots["99999"] = {"counters": {key: 5}, "gauges": {}, "histograms": {}}
+        metrics.inc(*key)
+        self.assertEqual(metrics.collect()["counters"][key], 6)
+
+        metrics.retire()
+        self.assertNotIn(str(os.getpid()), metrics._snapshots)
+        metrics._reset_after_fork()
+        metrics._publisher["pid"] = os.getpid()
+        metrics.inc(*key)
+        self.assertEqual(metrics.collect()["counters"][key], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""SecurityMonitor ring buffers and batched digests (no Resend calls)."""
+import unittest
+from unittest import mock
+
+import monitoring
+from monitoring import SecurityMonitor
+
+
+class TestSecurityMonitor(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+        self.monitor = SecurityMonitor(
+            buffer_size=5, alert_threshold=3, window_seconds=3600, min_alert_interval=60,
+            send_func=lambda subject, html: self.sent.append((subject, html)),
+        )
+        self.addCleanup(self.monitor.stop)
+
+    def test_ring_buffer_is_bounded_and_counted(self):
+        for i in range(12):
+            self.monitor.log_security_event("sqli", f"attempt {i}", "1.2.3.4")
+        self.assertEqual(len(self.monitor.security_events), 5)
+        self.assertEqual(self.monitor.security_events[-1]["details"], "attempt 11")
+        self.assertEqual(self.monitor.get_stats()["security_events_by_type"], {"sqli": 12})
+
+    def test_logging_never_sends_inline(self):
+        for _ in range(50):
+            self.monitor.log_security_event("xss", "<script>")
+        self.assertEqual(self.sent, [])
+
+    def test_digest_dedups_and_rate_limits(self):
+        for _ in range(4):
+            self.monitor.log_security_event("xss", "<script>")
+        self.assertTrue(self.monitor.flush(now=1000))
+        self.assertEqual(len(self.sent), 1)
+        self.assertIn("(x4)", self.sent[0][1])
+        self.assertIn("&lt;script&gt;", self.sent[0][1])
+
+        for _ in range(4):
+            self.monitor.log_security_event("traversal", "../etc")
+        self.assertFalse(self.monitor.flush(now=1030))
+        self.assertEqual(self.monitor.alerts_suppressed, 1)
+
+        for _ in range(4):
+            self.monitor.log_security_event("xss", "<script>")
+        self.assertFalse(self.monitor.flush(now=1100))
+
+        for _ in range(4):
+            self.monitor.log_error("db", "timeout")
+        self.assertTrue(self.monitor.flush(now=1200))
+        self.assertEqual(self.sent[-1][0], "⚠️ ScreenMerch Error Alert")
+
+    def test_pending_queue_is_bounded_and_drops_are_counted(self):
+        for i in range(12):
+            self.monitor.log_security_event("sqli", f"attempt {i}")
+        self.assertEqual(self.monitor._pending.qsize(), 5)
+        self.assertEqual(self.monitor.get_stats()["events_dropped"], 7)
+        self.assertTrue(self.monitor.flush(now=1000))
+        self.assertIn("7 more event(s) were dropped", self.sent[0][1])
+
+    def test_failed_send_is_retried_next_window(self):
+        def failing(subject, html):
+            raise RuntimeError("Resend returned 500")
+
+        self.monitor._send = failing
+        for _ in range(4):
+            self.monitor.log_security_event("xss", "<script>")
+        self.assertFalse(self.monitor.flush(now=1000))
+        self.assertEqual((self.monitor.alerts_sent, self.monitor._last_alert_at), (0, 0.0))
+
+        self.monitor._send = lambda subject, html: self.sent.append((subject, html))
+        self.assertTrue(self.monitor.flush(now=1010))
+        self.assertIn("(x4)", self.sent[0][1])
+
+    def test_below_threshold_sends_nothing(self):
+        self.monitor.log_security_event("xss", "x")
+        self.assertFalse(self.monitor.flush(now=1000))
+        self.assertEqual(self.sent, [])
+
+
+class TestResendSend(unittest.TestCase):
+    def test_non_2xx_raises(self):
+        for status, raises in ((200, False), (202, False), (422, True), (500, True)):
+            response = mock.Mock(status_code=status, text="body")
+            with mock.patch.object(monitoring.requests, "post", return_value=response):
+                if raises:
+                    with self.assertRaises(RuntimeError):
+                        monitoring._send_resend_email("s", "<p>x</p>")
+                else:
+                    monitoring._send_resend_email("s", "<p>x</p>")
+
+
+if __name__ == "__main__":
+    unittest.main()
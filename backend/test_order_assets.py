@@ -0,0 +1,88 @@
+"""Order email assets: byte-budget JPEG search and once-per-order inline rendering (no network)."""
+import base64
+import unittest
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image
+
+from services import order_assets
+from services.order_email import build_admin_order_email, build_customer_order_email
+from utils.shared_store import MemoryKV, SharedDict
+
+
+def _noise_data_url(size=(900, 700), fmt="PNG"):
+    img = Image.effect_noise(size, 60).convert("RGB")
+    out = BytesIO()
+    img.save(out, fmt)
+    return f"data:image/{fmt.lower()};base64," + base64.b64encode(out.getvalue()).decode("ascii")
+
+
+class TestEncodeToBudget(unittest.TestCase):
+    def setUp(self):
+        self.img = Image.effect_noise((500, 400), 40).convert("RGB")
+
+    def _size(self, quality):
+        out = BytesIO()
+        self.img.save(out, "JPEG", quality=quality, optimize=True)
+        return out.tell()
+
+    def test_picks_highest_quality_that_fits(self):
+        budget = (self._size(60) + self._size(61)) // 2
+        data, fits = order_assets.encode_jpeg_to_budget(self.img, budget)
+        self.assertTrue(fits)
+        self.assertEqual(len(data), self._size(60))
+
+    def test_reports_when_nothing_fits(self):
+        data, fits = order_assets.encode_jpeg_to_budget(self.img, 100)
+        self.assertFalse(fits)
+        self.assertEqual(len(data), self._size(order_assets.MIN_QUALITY))
+
+    def test_inline_render_fits_limit(self):
+        rendered = order_assets.render_inline_jpeg(_noise_data_url())
+        self.assertTrue(rendered.startswith("data:image/jpeg;base64,"))
+        self.assertLess(len(rendered), order_assets.MAX_INLINE_BASE64_LEN)
+
+
+class TestEmailInlineImage(unittest.TestCase):
+    def setUp(self):
+        kv = MemoryKV()
+        patches = [
+            mock.patch.object(order_assets, "_inline_assets", SharedDict("inline", kv=kv)),
+            mock.patch.object(order_assets, "_fetched_images", SharedDict("fetched", kv=kv)),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.image = _noise_data_url()
+
+    def test_rendered_once_for_every_email_path(self):
+        cart = [{"product": "Tee", "price": 20.0, "selected_screenshot": self.image}]
+        with mock.patch.object(order_assets, "render_inline_jpeg", wraps=order_assets.render_inline_jpeg) as render:
+            admin_html, attachments = build_admin_order_email("ORD-1", {}, cart, "1", 20.0)
+            build_admin_order_email("ORD-1", {}, cart, "1", 20.0)
+            customer_html = build_customer_order_email("ORD-1", {"selected_screenshot": self.image}, cart, "1", 20.0)
+        self.assertEqual(render.call_count, 1)
+        body = order_assets.email_inline_image("ORD-1", self.image)
+        self.assertIn(body, admin_html)
+        self.assertIn(body, customer_html)
+        self.assertEqual(len(attachments), 1)
+
+    def test_url_fetched_once(self):
+        raw = base64.b64decode(self.image.split(",", 1)[1])
+        response = mock.Mock(content=raw, headers={"Content-Type": "image/png"})
+        with mock.patch("requests.get", return_value=response) as get:
+            first = order_assets.email_inline_image("ORD-2", "https://cdn.example.com/s.png")
+            order_assets.fetch_image_data_url("https://cdn.example.com/s.png")
+            second = order_assets.email_inline_image("ORD-2", "https://cdn.example.com/s.png")
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(first, second)
+
+    def test_fetch_failure_not_cached(self):
+        with mock.patch("requests.get", side_effect=OSError("down")):
+            self.assertIsNone(order_assets.email_inline_image("ORD-3", "https://cdn.example.com/x.png"))
+        self.assertEqual(len(order_assets._inline_assets), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""Order resolver: one query for every key form, canonical-id cache, suffix fallback (fake PostgREST)."""
+import re
+import unittest
+
+from postgrest_fake import FakeSupabase
+from utils import order_lookup
+from utils.order_lookup import order_key_matchers, resolve_order
+
+
+class FakeClient(FakeSupabase):
+    def __init__(self, rows, has_id=True):
+        super().__init__(orders=rows)
+        self.has_id = has_id
+        self.failed_id_queries = 0
+        self.errors.append(self._missing_id_column)
+
+    def _missing_id_column(self, query):
+        if not self.has_id and any(re.search(r"(^|[(,])id\.", expr) for expr in query.args.getlist("or")):
+            self.failed_id_queries += 1
+            return RuntimeError("column orders.id does not exist")
+        return None
+
+
+UUID = "3f2a9b1c-1111-4222-8333-abcdef012345"
+ROWS = [
+    {"id": UUID, "order_id": "ORD-3F2A9B1C", "order_number": "1001", "screenshot": "data:image/png;base64,x"},
+    {"id": "00000000-0000-4000-8000-000000000002", "order_id": "ORD-AB12CD34", "order_number": "ORD-3F2A9B1C"},
+]
+
+
+class TestResolveOrder(unittest.TestCase):
+    def setUp(self):
+        order_lookup.clear_order_lookup_cache()
+        order_lookup._orders_has_id_column = True
+
+    def test_every_key_form_resolves_in_one_query(self):
+        for key in ("ORD-3F2A9B1C", UUID, "1001", "3f2a9b1c", "ord-3f2a9b1c"):
+            order_lookup.clear_order_lookup_cache()
+            client = FakeClient(ROWS)
+            row, canonical = resolve_order(client, key, columns="order_id")
+            self.assertEqual(canonical, "ORD-3F2A9B1C", key)
+            self.assertEqual(len(client.queries), 1, key)
+
+    def test_order_id_beats_order_number(self):
+        # The second row's order_number equals the first row's order_id; order_id wins, as before.
+        client = FakeClient(ROWS)
+        row, canonical = resolve_order(client, "ORD-3F2A9B1C")
+        self.assertEqual(row["order_number"], "1001")
+
+    def test_projection_keeps_key_columns(self):
+        client = FakeClient(ROWS)
+        row, _ = resolve_order(client, "1001", columns="status")
+        self.assertNotIn("screenshot", row)
+        self.assertIn("order_id,order_number", client.queries[0].columns)
+
+    def test_cached_key_is_single_eq_query(self):
+        resolve_order(FakeClient(ROWS), "1001")
+        client = FakeClient(ROWS)
+        _, canonical = resolve_order(client, "1001")
+        self.assertEqual(canonical, "ORD-3F2A9B1C")
+        self.assertEqual(len(client.queries), 1)
+        self.assertEqual(client.queries[0].columns, "*")
+
+    def test_stale_cache_entry_falls_back(self):
+        resolve_order(FakeClient(ROWS), "1001")
+        client = FakeClient([{"order_id": "ORD-99999999", "order_number": "1001"}])
+        _, canonical = resolve_order(client, "1001")
+        self.assertEqual(canonical, "ORD-99999999")
+
+    def test_suffix_fallback_only_on_miss(self):
+        client = FakeClient(ROWS)
+        _, canonical = resolve_order(client, "cd34")
+        self.assertEqual(canonical, "ORD-AB12CD34")
+        self.assertEqual(len(client.queries), 2)
+
+    def test_schema_without_id_column(self):
+        client = FakeClient(ROWS, has_id=False)
+        _, canonical = resolve_order(client, UUID)
+        self.assertEqual(canonical, "ORD-3F2A9B1C")
+        self.assertEqual(client.failed_id_queries, 1)
+        order_lookup.clear_order_lookup_cache()
+        resolve_order(client, UUID)
+        self.assertEqual(client.failed_id_queries, 1)
+
+    def test_transient_error_keeps_id_lookups(self):
+        class Flaky(FakeClient):
+            def table(self, name):
+                raise TimeoutError("read timed out")
+
+        self.assertEqual(resolve_order(Flaky(ROWS), UUID), (None, None))
+        self.assertTrue(order_lookup._orders_has_id_column)
+        _, canonical = resolve_order(FakeClient(ROWS), UUID)
+        self.assertEqual(canonical, "ORD-3F2A9B1C")
+
+    def test_exact_skips_suffix_forms_and_cache(self):
+        resolve_order(FakeClient(ROWS), "cd34")  # caches "cd34" -> ORD-AB12CD34
+        for key in ("cd34", "3f2a9b1c", "ord-3f2a9b1c"):
+            client = FakeClient(ROWS)
+            self.assertEqual(resolve_order(client, key, exact=True), (None, None), key)
+            self.assertEqual(len(client.queries), 1, key)
+        for key in ("ORD-3F2A9B1C", UUID, "1001"):
+            self.assertEqual(resolve_order(FakeClient(ROWS), key, exact=True)[1], "ORD-3F2A9B1C", key)
+
+    def test_not_found(self):
+        self.assertEqual(resolve_order(FakeClient(ROWS), "nope"), (None, None))
+        self.assertEqual(resolve_order(None, "1001"), (None, None))
+
+
+class TestMatchers(unittest.TestCase):
+    def test_precedence(self):
+        self.assertEqual(
+            order_key_matchers("ORD-3F2A9B1C"),
+            [("order_id", "ORD-3F2A9B1C"), ("order_number", "ORD-3F2A9B1C"), ("order_number", "3F2A9B1C")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
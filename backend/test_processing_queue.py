@@ -0,0 +1,122 @@
+"""Admin processing queue read model: one embedded query per page, batched fallback (fake PostgREST)."""
+import unittest
+
+from postgrest_fake import FakeSupabase
+from utils import processing_queue
+
+
+class FakeClient(FakeSupabase):
+    def __init__(self, rejected=()):
+        super().__init__(
+            order_processing_queue=[
+                {"id": "q1", "order_id": "o1", "status": "pending", "priority": 0, "assigned_to": None, "created_at": "2026-01-01"},
+                {"id": "q2", "order_id": "o2", "status": "assigned", "priority": 2, "assigned_to": "u1", "created_at": "2026-01-02"},
+                {"id": "q3", "order_id": "o3", "status": "pending", "priority": 1, "assigned_to": "u1", "created_at": "2026-01-03"},
+            ],
+            orders=[{"order_id": f"o{i}", "cart": [{"img": "data:..."}] * i, "status": "paid"} for i in (1, 2, 3)],
+            users=[{"id": "u1", "display_name": "Worker", "email": "w@example.com"}],
+        )
+        self.rejected = list(rejected)
+        self.error = None
+        self.errors.append(self._schema_error)
+
+    def _schema_error(self, query):
+        if self.error:
+            return self.error
+        for needle in self.rejected:
+            if needle in query.columns and needle.endswith("("):
+                return RuntimeError(f"Could not find a relationship between '{query.table}' and "
+                                    f"'{needle[:-1]}' in the schema cache")
+            if needle in query.columns:
+                return RuntimeError(f"column {query.table}.{needle} does not exist")
+        return None
+
+    def embed(self, query, rows):
+        if query.table == "order_processing_queue" and "orders(" in query.columns:
+            orders = {o["order_id"]: o for o in self.tables["orders"]}
+            users = {u["id"]: u for u in self.tables["users"]}
+            for row in rows:
+                row["orders"] = dict(orders[row["order_id"]]) if row["order_id"] in orders else None
+                row["assigned_to_user"] = dict(users[row["assigned_to"]]) if row["assigned_to"] in users else None
+        return rows
+
+    @property
+    def calls(self):
+        return [(q.table, q.columns) for q in self.queries]
+
+
+def _filters(**args):
+    return processing_queue.parse_filters(args)
+
+
+class TestFilters(unittest.TestCase):
+    def test_defaults_and_limits(self):
+        self.assertEqual(_filters(), {"statuses": [], "priority": None, "assigned_to": None, "page": 0, "limit": 100})
+        f = _filters(status="pending,failed", priority="2", page="3", limit="10000", assigned_to="u1")
+        self.assertEqual(f["statuses"], ["pending", "failed"])
+        self.assertEqual((f["priority"], f["page"], f["limit"], f["assigned_to"]), (2, 3, processing_queue.MAX_LIMIT, "u1"))
+
+    def test_bad_values_raise(self):
+        with self.assertRaises(processing_queue.QueueFilterError):
+            _filters(status="bogus")
+        with self.assertRaises(processing_queue.QueueFilterError):
+            _filters(priority="high")
+
+
+class TestQueuePage(unittest.TestCase):
+    def setUp(self):
+        processing_queue._embed_supported = True
+        processing_queue._item_count_supported = True
+        self.addCleanup(setattr, processing_queue, "_embed_supported", True)
+        self.addCleanup(setattr, processing_queue, "_item_count_supported", True)
+
+    def test_single_embedded_query_with_filters_and_paging(self):
+        client = FakeClient()
+        rows, total = processing_queue.fetch_queue_page(client, _filters(status="pending", limit=1))
+        self.assertEqual(len(client.calls), 1)
+        self.assertIn("assigned_to_user:users!assigned_to(", client.calls[0][1])
+        self.assertNotIn("cart", client.calls[0][1])
+        self.assertEqual(total, 2)
+        self.assertEqual([r["id"] for r in rows], ["q3"])
+        self.assertEqual(rows[0]["assigned_to_user"]["display_name"], "Worker")
+
+        rows, _ = processing_queue.fetch_queue_page(client, _filters(status="pending", limit=1, page=1))
+        self.assertEqual([r["id"] for r in rows], ["q1"])
+
+    def test_falls_back_to_batched_queries(self):
+        client = FakeClient(rejected=["orders("])
+        rows, total = processing_queue.fetch_queue_page(client, _filters())
+        self.assertEqual([r["id"] for r in rows], ["q2", "q3", "q1"])
+        self.assertEqual(total, 3)
+        self.assertEqual(rows[0]["orders"]["order_id"], "o2")
+        self.assertEqual(rows[0]["assigned_to_user"]["email"], "w@example.com")
+        self.assertIsNone(rows[2]["assigned_to_user"])
+        self.assertFalse(processing_queue._embed_supported)
+
+        client.queries.clear()
+        processing_queue.fetch_queue_page(client, _filters(assigned_to="u1"))
+        self.assertEqual([table for table, _ in client.calls], ["order_processing_queue", "orders", "users"])
+
+    def test_missing_item_count_only_drops_that_column(self):
+        client = FakeClient(rejected=["item_count"])
+        processing_queue.fetch_queue_page(client, _filters())
+        self.assertTrue(processing_queue._embed_supported)
+        self.assertFalse(processing_queue._item_count_supported)
+        self.assertIn("orders(", client.calls[-1][1])
+
+    def test_transient_error_keeps_embedded_query(self):
+        client = FakeClient()
+        client.error = TimeoutError("read timed out")
+        with self.assertRaises(TimeoutError):
+            processing_queue.fetch_queue_page(client, _filters())
+        self.assertTrue(processing_queue._embed_supported)
+        self.assertTrue(processing_queue._item_count_supported)
+
+    def test_queue_item_has_full_order(self):
+        item = processing_queue.fetch_queue_item(FakeClient(), "q2")
+        self.assertEqual(len(item["orders"]["cart"]), 2)
+        self.assertIsNone(processing_queue.fetch_queue_item(FakeClient(), "missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
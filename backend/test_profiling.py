@@ -0,0 +1,113 @@
+"""Request profiling: on-demand cProfile for admins, slow-request stack capture and the ring directory."""
+import os
+import tempfile
+import time
+import unittest
+
+from flask import Flask, session
+
+from postgrest_fake import FakeAuth, FakeSupabase
+from utils import profiling
+from utils.security import verified_master_admin
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        saved = dict(vars(profiling.settings))
+        self.addCleanup(vars(profiling.settings).update, saved)
+        profiling.settings.directory = self.dir.name
+        profiling.settings.paths = ("/slow",)
+        profiling.settings.slow_seconds = 0.05
+        profiling.settings.sample_rate = 0
+        profiling.settings.keep = 3
+        self.addCleanup(setattr, profiling._sampler, "interval", profiling._sampler.interval)
+        profiling._sampler.interval = 0.002
+
+        self.admin = False
+        self.app = Flask(__name__)
+        profiling.init_app(self.app, authorize=lambda: self.admin)
+        self.app.add_url_rule("/fast", "fast", lambda: "ok")
+        self.app.add_url_rule("/slow", "slow", lambda: time.sleep(self.delay) or "done")
+        self.delay = 0.12
+        self.http = self.app.test_client()
+
+    def test_on_demand_profile_only_for_authorized_callers(self):
+        self.assertNotIn("X-Profile-Id", self.http.get("/fast", headers={"X-Profile": "1"}).headers)
+        self.assertEqual(profiling.list_profiles(), [])
+
+        self.admin = True
+        response = self.http.get("/fast?_profile=1")
+        profile_id = response.headers["X-Profile-Id"]
+        (meta,) = profiling.list_profiles()
+        self.assertEqual((meta["id"], meta["path"], meta["status"], meta["trigger"]), (profile_id, "/fast", 200, "on_demand"))
+        self.assertEqual(sorted(meta["files"]), ["json", "prof", "txt"])
+        with open(profiling.path_for(profile_id, "txt")) as fh:
+            self.assertIn("cumulative", fh.read())
+
+    def test_slow_requests_keep_collapsed_stacks_fast_ones_do_not(self):
+        self.http.get("/slow")
+        (meta,) = profiling.list_profiles()
+        self.assertEqual((meta["trigger"], meta["files"]), ("slow", ["collapsed", "json"]))
+        self.assertGreater(meta["samples"], 0)
+        with open(profiling.path_for(meta["id"], "collapsed")) as fh:
+            lines = fh.read().splitlines()
+        self.assertTrue(any("time.sleep" in line or ":<lambda>" in line for line in lines))
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+
+        self.delay = 0
+        self.http.get("/slow")
+        self.assertEqual(len(profiling.list_profiles()), 1)
+        self.assertFalse(profiling._sampler._active.is_set())
+
+    def test_ring_directory_keeps_newest_and_rejects_bad_ids(self):
+        self.admin = True
+        ids = [self.http.get("/fast", headers={"X-Profile": "1"}).headers["X-Profile-Id"] for _ in range(5)]
+        self.assertEqual([meta["id"] for meta in profiling.list_profiles()], ids[:1:-1])
+        self.assertEqual(len(os.listdir(self.dir.name)), 9)
+        self.assertIsNone(profiling.path_for("../../etc/passwd", "txt"))
+        self.assertIsNone(profiling.path_for(ids[-1], "exe"))
+
+
+class TestVerifiedMasterAdmin(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeSupabase(users=[
+            {"id": "m1", "email": "boss@example.com", "is_admin": True, "admin_role": "master_admin"},
+            {"id": "a1", "email": "ops@example.com", "is_admin": True, "admin_role": "order_processing_admin"},
+        ])
+        self.db.auth = FakeAuth({"tboss": "m1", "tops": "a1"})
+        self.app = Flask(__name__)
+        self.app.secret_key = "test"
+        self.app.add_url_rule("/check", "check", lambda: "yes" if verified_master_admin(self.db) else "no")
+
+        def login(email):
+            session["admin_logged_in"] = True
+            session["admin_email"] = email
+            return "ok"
+
+        self.app.add_url_rule("/login/<email>", "login", login)
+
+    def _check(self, http=None, **headers):
+        return (http or self.app.test_client()).get("/check", headers=headers).get_data(as_text=True)
+
+    def test_client_supplied_email_is_not_trusted(self):
+        self.assertEqual(self._check(**{"X-User-Email": "boss@example.com"}), "no")
+        self.assertEqual(self.app.test_client().get("/check?user_email=boss@example.com").get_data(as_text=True), "no")
+
+    def test_bearer_token_must_verify_and_belong_to_a_master_admin(self):
+        self.assertEqual(self._check(Authorization="Bearer tboss"), "yes")
+        self.assertEqual(self._check(Authorization="Bearer tops"), "no")
+        self.assertEqual(self._check(Authorization="Bearer forged"), "no")
+
+    def test_admin_session(self):
+        http = self.app.test_client()
+        http.get("/login/boss@example.com")
+        self.assertEqual(self._check(http), "yes")
+        http = self.app.test_client()
+        http.get("/login/ops@example.com")
+        self.assertEqual(self._check(http), "no")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""GCRA rate limiter, shared SQLite storage and SecurityManager blocks (no network)."""
+import os
+import tempfile
+import unittest
+
+from flask import Flask
+
+from security_config import SecurityManager
+from utils.limiter import Limiter, client_ip
+from utils.rate_limit import MemoryBackend, RateLimiter, SQLiteBackend, parse_rate
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestParseRate(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(parse_rate("10 per minute"), (10, 60.0))
+        self.assertEqual(parse_rate("200/day"), (200, 86400.0))
+        self.assertEqual(parse_rate("5 per 10 seconds"), (5, 10.0))
+        with self.assertRaises(ValueError):
+            parse_rate("lots per fortnight")
+
+
+class BackendContract:
+    def make_backend(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(self.make_backend(), clock=self.clock)
+
+    def test_burst_then_refill(self):
+        for i in range(3):
+            self.assertTrue(self.limiter.hit("k", 3, 60).allowed, i)
+        denied = self.limiter.hit("k", 3, 60)
+        self.assertFalse(denied.allowed)
+        self.assertAlmostEqual(denied.retry_after, 20.0, places=3)
+        self.clock.now += 20
+        self.assertTrue(self.limiter.hit("k", 3, 60).allowed)
+
+    def test_block_expires(self):
+        self.limiter.block("b", 10)
+        self.assertTrue(self.limiter.is_blocked("b"))
+        self.clock.now += 11
+        self.assertFalse(self.limiter.is_blocked("b"))
+
+    def test_evicts_idle_keys(self):
+        self.limiter.hit("idle", 5, 60)
+        self.limiter.block("b", 1)
+        self.clock.now += 120
+        self.assertEqual(self.limiter.backend.evict(self.clock.now), 2)
+
+
+class TestMemoryBackend(BackendContract, unittest.TestCase):
+    def make_backend(self):
+        return MemoryBackend()
+
+
+class TestSQLiteBackend(BackendContract, unittest.TestCase):
+    def make_backend(self):
+        fd, self.path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        return SQLiteBackend(self.path)
+
+    def test_state_shared_between_instances(self):
+        other = RateLimiter(SQLiteBackend(self.path), clock=self.clock)
+        self.assertTrue(self.limiter.hit("shared", 2, 60).allowed)
+        self.assertTrue(other.hit("shared", 2, 60).allowed)
+        self.assertFalse(self.limiter.hit("shared", 2, 60).allowed)
+
+
+class TestSecurityManager(unittest.TestCase):
+    def test_blocks_then_expires(self):
+        clock = FakeClock()
+        manager = SecurityManager(rate_limiter=RateLimiter(MemoryBackend(), clock=clock))
+        manager.max_requests_per_minute = 2
+        self.assertTrue(manager.check_rate_limit("1.2.3.4")[0])
+        self.assertTrue(manager.check_rate_limit("1.2.3.4")[0])
+        self.assertEqual(manager.check_rate_limit("1.2.3.4"), (False, "Rate limit exceeded"))
+        clock.now += 61
+        self.assertEqual(manager.check_rate_limit("1.2.3.4"), (False, "IP is temporarily blocked"))
+        clock.now += manager.block_duration.total_seconds()
+        self.assertTrue(manager.check_rate_limit("1.2.3.4")[0])
+        self.assertTrue(manager.check_rate_limit("5.6.7.8")[0])
+
+
+class TestFlaskLimiter(unittest.TestCase):
+    def test_default_explicit_and_exempt(self):
+        os.environ["RATE_LIMIT_STORAGE_URI"] = "memory://"
+        self.addCleanup(os.environ.pop, "RATE_LIMIT_STORAGE_URI", None)
+        import utils.rate_limit as rl
+        rl._shared_limiter = None
+        self.addCleanup(setattr, rl, "_shared_limiter", None)
+
+        app = Flask(__name__)
+        limiter = Limiter(default_limits=["2 per hour"])
+        limiter.init_app(app)
+
+        @app.route("/default")
+        def default_view():
+            return "ok"
+
+        @app.route("/login")
+        @limiter.limit("1 per minute")
+        def login_view():
+            return "ok"
+
+        @app.route("/free")
+        @limiter.exempt
+        def free_view():
+            return "ok"
+
+        client = app.test_client()
+        self.assertEqual([client.get("/default").status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual([client.get("/login").status_code for _ in range(3)], [200, 429, 429])
+        self.assertEqual({client.get("/free").status_code for _ in range(5)}, {200})
+        self.assertIn("Retry-After", client.get("/login").headers)
+
+    def test_client_ip_ignores_client_supplied_forwarded_hops(self):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+
+        app = Flask(__name__)
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+        app.add_url_rule("/ip", "ip", client_ip)
+        client = app.test_client()
+        # The proxy appends the real peer; anything to its left came from the client.
+        headers = {"X-Forwarded-For": "6.6.6.6, 203.0.113.7"}
+        self.assertEqual(client.get("/ip", headers=headers).get_data(as_text=True), "203.0.113.7")
+        self.assertEqual(client.get("/ip", headers=dict(headers, **{"Fly-Client-IP": "198.51.100.2"})).get_data(as_text=True),
+                         "198.51.100.2")
+        self.assertEqual(client.get("/ip").get_data(as_text=True), "127.0.0.1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""SecurityManager.is_suspicious_request: Content-Length limits, windowed scanning, multipart text-only screening."""
+import io
+import unittest
+
+from flask import Flask, request
+
+import security_config
+from security_config import SecurityManager, find_suspicious
+
+
+class TestFindSuspicious(unittest.TestCase):
+    def test_case_insensitive_and_across_chunk_boundaries(self):
+        self.assertEqual(find_suspicious([b"name=1 union select *"]), "union select")
+        self.assertEqual(find_suspicious([b"a" * 10 + b"<scr", b"IPT>alert(1)"]), "<scrIPT>")
+        self.assertEqual(find_suspicious([b"..", b"/etc/passwd"]), "../")
+        self.assertIsNone(find_suspicious([b'{"title": "Select your union shirt"}', b""]))
+
+
+class TestIsSuspiciousRequest(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.manager = SecurityManager(rate_limiter=object())
+
+    def _check(self, **kwargs):
+        with self.app.test_request_context("/api/x", method="POST", **kwargs):
+            flagged = self.manager.is_suspicious_request(request)
+            body = request.get_data() if request.mimetype != "multipart/form-data" else None
+            return flagged, body
+
+    def test_clean_json_body_still_readable_by_view(self):
+        flagged, body = self._check(json={"title": "My video", "timestamp": 12})
+        self.assertFalse(flagged)
+        self.assertIn(b"My video", body)
+
+    def test_indicator_in_body(self):
+        self.assertTrue(self._check(data="q=1' or '1'='1", content_type="application/x-www-form-urlencoded")[0])
+
+    def test_oversized_body_rejected_from_content_length_without_reading(self):
+        class Unreadable(io.RawIOBase):
+            def read(self, *_):
+                raise AssertionError("body must not be read")
+
+        environ = {"wsgi.input": Unreadable(), "CONTENT_LENGTH": str(security_config.MAX_SCREENED_BODY + 1),
+                   "CONTENT_TYPE": "application/json"}
+        with self.app.test_request_context("/api/x", method="POST", environ_base=environ):
+            self.assertTrue(self.manager.is_suspicious_request(request))
+
+    def test_multipart_screens_fields_and_filenames_not_file_bytes(self):
+        video = (io.BytesIO(b"\x00\x01<script>" + b"\xff" * 20000), "clip.mp4")
+        flagged, _ = self._check(data={"title": "Clip", "video": video}, content_type="multipart/form-data")
+        self.assertFalse(flagged)
+
+        video = (io.BytesIO(b"\x00"), "../../etc/clip.mp4")
+        self.assertTrue(self._check(data={"video": video}, content_type="multipart/form-data")[0])
+        self.assertTrue(self._check(data={"title": ["ok", "javascript:alert(1)"]}, content_type="multipart/form-data")[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
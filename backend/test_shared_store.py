@@ -0,0 +1,156 @@
+"""SharedDict on memory and SQLite storage: write-back, TTL and cross-process visibility."""
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from utils.shared_store import MemoryKV, SharedDict, SQLiteKV
+
+
+class StoreContract:
+    def make_kv(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.kv = self.make_kv()
+        self.store = SharedDict("orders", kv=self.kv)
+
+    def test_roundtrip_and_keys_are_strings(self):
+        self.store[42] = {"status": "pending", "cart": [{"id": 1}]}
+        self.assertIn("42", self.store)
+        self.assertIn(42, self.store)
+        self.assertEqual(self.store["42"]["cart"], [{"id": 1}])
+        self.assertEqual(list(self.store), ["42"])
+        self.assertEqual(len(self.store), 1)
+
+    def test_nested_assignment_is_written_back(self):
+        self.store["o1"] = {"status": "pending"}
+        self.store["o1"]["status"] = "paid"
+        self.store["o1"].update(total=12.5)
+        self.assertEqual(self.store["o1"], {"status": "paid", "total": 12.5})
+
+    def test_field_writes_from_stale_views_do_not_clobber(self):
+        self.store["o1"] = {"status": "pending", "screenshot": "data:..."}
+        worker_a, worker_b = self.store["o1"], self.store["o1"]
+        worker_a["status"] = "paid"
+        worker_b["tracking"] = "1Z"
+        del worker_b["screenshot"]
+        self.assertEqual(self.store["o1"], {"status": "paid", "tracking": "1Z"})
+        self.assertEqual(worker_b, {"status": "paid", "tracking": "1Z"})
+
+    def test_empty_store_is_falsy_but_usable(self):
+        self.assertFalse(self.store)
+        self.assertIsNone(self.store.get("missing"))
+        self.assertEqual(self.store.pop("missing", "d"), "d")
+        with self.assertRaises(KeyError):
+            del self.store["missing"]
+
+    def test_namespaces_are_isolated(self):
+        other = SharedDict("sessions", kv=self.kv)
+        self.store["k"] = 1
+        other["k"] = 2
+        self.assertEqual(self.store["k"], 1)
+        other.clear()
+        self.assertEqual(self.store["k"], 1)
+        self.assertNotIn("k", other)
+
+    def test_ttl_expires_entries(self):
+        store = SharedDict("tokens", ttl=10, kv=self.kv)
+        with mock.patch("utils.shared_store.time.time", return_value=1000.0):
+            store["t"] = "user@example.com"
+        with mock.patch("utils.shared_store.time.time", return_value=1005.0):
+            self.assertEqual(store.get("t"), "user@example.com")
+        with mock.patch("utils.shared_store.time.time", return_value=1011.0):
+            self.assertEqual(len(store), 0)
+            self.assertEqual(self.kv.purge_expired(1011.0), 1)
+            self.assertIsNone(store.get("t"))
+
+    def test_find_uses_the_index_and_follows_updates(self):
+        store = SharedDict("indexed", kv=self.kv, index={"user": lambda o: o.get("user_id") or ""})
+        store["o1"] = {"user_id": "u1", "screenshot": "data:..."}
+        store["o2"] = {"user_id": "u2"}
+        store["o3"] = {}
+        store["note"] = "not a dict"
+        self.assertEqual([k for k, _ in store.find(user="u1")], ["o1"])
+        self.assertEqual(sorted(k for k, _ in store.find(user=("u2", ""))), ["o2", "o3"])
+
+        store["o2"]["user_id"] = "u1"
+        del store["o1"]
+        self.assertEqual([k for k, v in store.find(user="u1")], ["o2"])
+        store.find(user="u1")[0][1]["paid"] = True
+        self.assertTrue(store["o2"]["paid"])
+
+        # An entry rewritten by a view without the index is re-checked, not trusted.
+        SharedDict("indexed", kv=self.kv)["o2"] = {"user_id": "u9"}
+        self.assertEqual(store.find(user="u1"), [])
+        self.assertEqual(store.find(user=[]), [])
+        with self.assertRaises(KeyError):
+            store.find(email="x")
+
+        with mock.patch("utils.shared_store.time.time", return_value=time.time() + 10):
+            expiring = SharedDict("indexed", ttl=5, kv=self.kv, index=store.index)
+            expiring["o4"] = {"user_id": "u4"}
+        self.assertEqual(len(store.find(user="u4")), 1)
+        with mock.patch("utils.shared_store.time.time", return_value=time.time() + 20):
+            self.assertEqual(store.find(user="u4"), [])
+
+
+class TestMemoryKV(StoreContract, unittest.TestCase):
+    def make_kv(self):
+        return MemoryKV()
+
+    def test_values_are_copied(self):
+        data = {"a": [1]}
+        self.store["x"] = data
+        data["a"].append(2)
+        self.assertEqual(self.store["x"], {"a": [1]})
+
+
+def _write_from_child(path):
+    SharedDict("orders", kv=SQLiteKV(path))["from-child"] = {"pid": os.getpid()}
+
+
+def _set_fields(path, prefix):
+    order = SharedDict("orders", kv=SQLiteKV(path))["o1"]
+    for i in range(25):
+        order[f"{prefix}-{i}"] = i
+
+
+class TestSQLiteKV(StoreContract, unittest.TestCase):
+    def make_kv(self):
+        fd, self.path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        return SQLiteKV(self.path)
+
+    def test_visible_to_other_instances(self):
+        other = SharedDict("orders", kv=SQLiteKV(self.path))
+        self.store["o1"] = {"status": "pending"}
+        other["o1"]["status"] = "paid"
+        self.assertEqual(self.store["o1"]["status"], "paid")
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_concurrent_field_updates_across_processes(self):
+        self.store["o1"] = {}
+        ctx = multiprocessing.get_context("fork")
+        procs = [ctx.Process(target=_set_fields, args=(self.path, f"w{i}")) for i in range(4)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join(30)
+        self.assertEqual(len(self.store["o1"]), 4 * 25)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_visible_across_processes(self):
+        self.store["warm"] = 1  # open a connection before forking, like a preloaded master
+        proc = multiprocessing.get_context("fork").Process(target=_write_from_child, args=(self.path,))
+        proc.start()
+        proc.join(30)
+        self.assertEqual(proc.exitcode, 0)
+        self.assertNotEqual(self.store["from-child"]["pid"], os.getpid())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+"""Lazy import proxies, startup phase report and fork-safe thread pools."""
+import sys
+import unittest
+from unittest import mock
+
+import startup
+from utils.executors import fork_safe_executor
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_module_loads_on_first_attribute(self):
+        sys.modules.pop("colorsys", None)
+        colorsys = startup.lazy_import("colorsys")
+        self.assertFalse(colorsys.is_loaded)
+        self.assertNotIn("colorsys", sys.modules)
+        self.assertEqual(colorsys.rgb_to_hsv(1, 0, 0)[0], 0.0)
+        self.assertTrue(colorsys.is_loaded)
+        self.assertIn("colorsys", startup.LAZY_IMPORTS)
+
+    def test_attribute_proxy_is_callable(self):
+        dedent = startup.lazy_import("textwrap", "dedent")
+        self.assertEqual(dedent("  x"), "x")
+
+    def test_report_lists_phases_and_deferred(self):
+        startup.mark("unit-test phase")
+        startup.lazy_import("json", "dumps")
+        text = startup.report()
+        self.assertIn("unit-test phase", text)
+        self.assertIn("json.dumps", text)
+
+
+class TestForkSafeExecutor(unittest.TestCase):
+    def test_one_pool_per_name_and_process(self):
+        pool = fork_safe_executor("test-pool", 2)
+        self.assertIs(fork_safe_executor("test-pool", 2), pool)
+        self.assertIsNot(fork_safe_executor("test-other", 2), pool)
+        self.assertEqual(pool.submit(lambda: 42).result(timeout=5), 42)
+        with mock.patch("utils.executors.os.getpid", return_value=-1):
+            self.assertIsNot(fork_safe_executor("test-pool", 2), pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Storefront widget cache: snapshots, ETag/304, stale-while-revalidate and invalidation (fake PostgREST)."""
+import os
+import time
+import unittest
+
+from flask import Flask
+
+from postgrest_fake import FakeSupabase
+from utils import storefront_cache
+from utils.shared_store import MemoryKV, SharedDict
+
+
+def _timeout(query):
+    return RuntimeError("read operation timed out")
+
+
+def _user(n, status="active", **extra):
+    return dict({"id": f"u{n}", "username": f"creator{n}", "display_name": f"Creator {n}", "role": "creator",
+                 "status": status, "subdomain": f"c{n}", "created_at": f"2026-01-{n:02d}"}, **extra)
+
+
+class TestStorefrontCache(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeSupabase(users=[
+            _user(1), _user(2, status="pending"), _user(3, is_admin=True), _user(4, username="screenmerch"),
+            _user(5, status="suspended"), _user(6),
+        ])
+        self.addCleanup(setattr, storefront_cache, "_snapshots", storefront_cache._snapshots)
+        storefront_cache._snapshots = SharedDict("storefront_widgets", kv=MemoryKV())
+        # No refresher thread in tests.
+        self.addCleanup(storefront_cache._refresher.update, dict(storefront_cache._refresher))
+        storefront_cache._refresher["pid"] = os.getpid()
+
+        self.app = Flask(__name__)
+        get_client = lambda: self.client  # noqa: E731
+        self.app.add_url_rule("/list", "list", lambda: storefront_cache.serve("creators_list", get_client)
+                              or ("unavailable", 503))
+        self.app.add_url_rule("/spots", "spots", lambda: storefront_cache.serve("soft_launch_spots", get_client)
+                              or ("unavailable", 503))
+        self.http = self.app.test_client()
+
+    def _wait_for_refresh(self):
+        deadline = time.time() + 2
+        while storefront_cache._refreshing and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_payloads_exclude_staff_and_match_widgets(self):
+        creators = self.http.get("/list").get_json()["creators"]
+        self.assertEqual([c["id"] for c in creators], ["u6", "u1"])
+        self.assertEqual(creators[0], {"id": "u6", "username": "creator6", "name": "Creator 6", "avatar": None, "subdomain": "c6"})
+
+        spots = self.http.get("/spots").get_json()
+        self.assertEqual((spots["claimed"], spots["available"]), (3, 17))
+        self.assertEqual([(s["spot"], s["status"]) for s in spots["taken_slots"]], [(1, "active"), (2, "pending"), (3, "active")])
+
+    def test_cached_response_headers_and_304(self):
+        first = self.http.get("/list")
+        self.assertIn("public", first.headers["Cache-Control"])
+        self.assertIn("stale-while-revalidate", first.headers["Cache-Control"])
+        etag = first.headers["ETag"]
+
+        queries = len(self.client.queries)
+        again = self.http.get("/list", headers={"If-None-Match": etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.headers["ETag"], etag)
+        self.assertEqual(len(self.client.queries), queries)
+
+    def test_stale_snapshot_served_while_refreshing(self):
+        self.http.get("/list")
+        storefront_cache._snapshots["creators_list"]["built_at"] = 0
+        self.client.tables["users"].append(_user(9))
+
+        stale = self.http.get("/list").get_json()["creators"]
+        self.assertNotIn("u9", [c["id"] for c in stale])
+        self._wait_for_refresh()
+        self.assertEqual(self.http.get("/list").get_json()["creators"][0]["id"], "u9")
+
+    def test_invalidate_rebuilds_and_failures_keep_last_snapshot(self):
+        self.http.get("/spots")
+        self.client.tables["users"].append(_user(10, status="pending"))
+        storefront_cache.invalidate(self.client)
+        self._wait_for_refresh()
+        self.assertEqual(self.http.get("/spots").get_json()["claimed"], 4)
+
+        self.client.errors.append(_timeout)
+        storefront_cache.invalidate()
+        self.assertEqual(self.http.get("/spots").get_json()["claimed"], 4)
+        self._wait_for_refresh()
+        self.assertEqual(self.http.get("/spots").get_json()["claimed"], 4)
+
+        storefront_cache._snapshots.clear()
+        self.assertEqual(self.http.get("/list").status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
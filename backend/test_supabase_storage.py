@@ -0,0 +1,141 @@
+"""SupabaseStorage bulk saves: format sniffing, content-hash dedup, retries and parallel uploads (fake client)."""
+import base64
+import io
+import threading
+import time
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+import supabase_storage
+from supabase_storage import SupabaseStorage, sniff_image_type
+
+
+def _image(fmt, color=(10, 20, 30)):
+    out = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(out, fmt)
+    return out.getvalue()
+
+
+def _data_url(data, mime="image/png"):
+    return f"data:{mime};base64," + base64.b64encode(data).decode("ascii")
+
+
+class FakeBucket:
+    def __init__(self, client):
+        self.client = client
+
+    def upload(self, path, file, file_options=None):
+        return self.client.upload(path, file, file_options)
+
+    def get_public_url(self, path):
+        return f"https://storage.test/product-images/{path}"
+
+
+class FakeClient:
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.objects = {}
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self.storage = self
+
+    def from_(self, bucket):
+        return FakeBucket(self)
+
+    def upload(self, path, data, options):
+        with self._lock:
+            self.calls.append(path)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            with self._lock:
+                if self.failures:
+                    self.failures -= 1
+                    raise RuntimeError("502 Bad Gateway")
+                if path in self.objects:
+                    raise RuntimeError("{'statusCode': 409, 'error': 'Duplicate', 'message': 'The resource already exists'}")
+                self.objects[path] = (data, options["content-type"])
+            return {"Key": path}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class TestSniff(unittest.TestCase):
+    def test_magic_bytes(self):
+        self.assertEqual(sniff_image_type(_image("PNG")), ("image/png", "png"))
+        self.assertEqual(sniff_image_type(_image("JPEG")), ("image/jpeg", "jpg"))
+        self.assertEqual(sniff_image_type(_image("WEBP")), ("image/webp", "webp"))
+        self.assertEqual(sniff_image_type(_image("GIF")), ("image/gif", "gif"))
+        self.assertEqual(sniff_image_type(b"not an image"), ("image/png", "png"))
+
+
+class TestSaveMultiple(unittest.TestCase):
+    def _use(self, client, skip_backoff=True):
+        patcher = mock.patch.object(supabase_storage, "_supabase", client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        if skip_backoff:
+            random = mock.patch.object(supabase_storage.random, "random", return_value=-0.5)
+            random.start()
+            self.addCleanup(random.stop)
+
+    def test_labels_real_format_and_keeps_order(self):
+        client = FakeClient()
+        self._use(client)
+        jpeg, png = _image("JPEG"), _image("PNG", (200, 0, 0))
+        urls = SupabaseStorage().save_multiple_images([_data_url(jpeg, "image/png"), _data_url(png)], "shots_1")
+        self.assertEqual(len(urls), 2)
+        self.assertTrue(urls[0].endswith(".jpg") and urls[1].endswith(".png"))
+        types = sorted(content_type for _, content_type in client.objects.values())
+        self.assertEqual(types, ["image/jpeg", "image/png"])
+
+    def test_identical_screenshots_upload_once(self):
+        client = FakeClient()
+        self._use(client)
+        shot = _data_url(_image("PNG"))
+        storage = SupabaseStorage()
+        urls = storage.save_multiple_images([shot, shot, shot], "shots_1")
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual(len(set(urls)), 1)
+        self.assertEqual(len(urls), 3)
+        # A later save of the same bytes reuses the stored object.
+        self.assertEqual(storage.save_multiple_images([shot], "shots_1"), urls[:1])
+
+    def test_without_dedupe_each_image_is_uploaded(self):
+        client = FakeClient()
+        self._use(client)
+        shot = _data_url(_image("PNG"))
+        urls = SupabaseStorage().save_multiple_images([shot, shot], "shots_1", dedupe=False)
+        self.assertEqual(len(client.calls), 2)
+        self.assertEqual(len(set(urls)), 2)
+
+    def test_transient_errors_are_retried(self):
+        client = FakeClient(failures=2)
+        self._use(client)
+        urls = SupabaseStorage().save_multiple_images([_data_url(_image("PNG"))], "shots_1")
+        self.assertEqual(len(urls), 1)
+        self.assertEqual(len(client.calls), 3)
+
+    def test_bad_input_and_exhausted_retries_are_skipped(self):
+        client = FakeClient(failures=supabase_storage.UPLOAD_ATTEMPTS)
+        self._use(client)
+        urls = SupabaseStorage().save_multiple_images(["%%%not-base64", _data_url(_image("PNG"))], "shots_1")
+        self.assertEqual(urls, [])
+
+    def test_uploads_run_concurrently(self):
+        client = FakeClient(delay=0.05)
+        self._use(client, skip_backoff=False)
+        shots = [_data_url(_image("PNG", (i, i, i))) for i in range(4)]
+        self.assertEqual(len(SupabaseStorage().save_multiple_images(shots, "shots_1")), 4)
+        self.assertGreater(client.max_active, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
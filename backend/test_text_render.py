@@ -0,0 +1,86 @@
+"""Text rendering engine: font registry, cached layers and compositing that matches draw.text."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from utils import text_render
+
+
+def _diff(a, b):
+    return int(np.abs(np.array(a, dtype=int) - np.array(b, dtype=int)).max())
+
+
+class TestFontRegistry(unittest.TestCase):
+    def test_resolves_families_with_fallback(self):
+        with tempfile.TemporaryDirectory() as d:
+            os.makedirs(os.path.join(d, "sub"))
+            for name in ("DejaVuSans.ttf", "sub/Georgia.TTF", "readme.txt"):
+                open(os.path.join(d, name), "w").close()
+            registry = text_render.FontRegistry([d])
+            self.assertEqual(registry.resolve("Georgia"), os.path.join(d, "sub", "Georgia.TTF"))
+            self.assertEqual(registry.resolve("Arial"), os.path.join(d, "DejaVuSans.ttf"))
+            self.assertEqual(registry.resolve(None), os.path.join(d, "DejaVuSans.ttf"))
+            self.assertIsNone(registry.find("readme"))
+
+    def test_scans_once(self):
+        registry = text_render.FontRegistry([])
+        with mock.patch.object(registry, "_scan", wraps=registry._scan) as scan:
+            registry.resolve("Arial")
+            registry.resolve("Georgia")
+        self.assertEqual(scan.call_count, 1)
+
+    def test_font_objects_are_reused(self):
+        self.assertIs(text_render.get_font("Arial", 31), text_render.get_font("Arial", 31))
+
+
+class TestLayers(unittest.TestCase):
+    def setUp(self):
+        text_render.clear_caches()
+        self.font = text_render.get_font("Arial", 36)
+
+    def test_composite_matches_draw_text(self):
+        for mode, bg in (("RGBA", (40, 80, 120, 255)), ("RGB", (40, 80, 120))):
+            ref = Image.new(mode, (260, 100), bg)
+            ImageDraw.Draw(ref).text((-8, 30), "Watermark", font=self.font, fill=(255, 255, 255),
+                                     stroke_width=2, stroke_fill=(0, 0, 0))
+            out = Image.new(mode, (260, 100), bg)
+            layer = text_render.text_layer("Watermark", self.font, (255, 255, 255), 2, (0, 0, 0))
+            text_render.composite(out, layer, -8, 30)
+            self.assertEqual(_diff(ref, out), 0, mode)
+
+    def test_shadow_matches_full_canvas_blur(self):
+        ref = Image.new("RGBA", (260, 100), (0, 0, 0, 0))
+        ImageDraw.Draw(ref).text((23, 23), "Hi", font=self.font, fill=text_render.SHADOW_COLOR)
+        ref = ref.filter(ImageFilter.GaussianBlur(text_render.SHADOW_BLUR))
+        out = Image.new("RGBA", (260, 100), (0, 0, 0, 0))
+        text_render.composite(out, text_render.shadow_layer("Hi", self.font), 20, 20)
+        self.assertEqual(_diff(np.array(ref)[..., 3], np.array(out)[..., 3]), 0)
+
+    def test_repeated_overlay_renders_once(self):
+        base = Image.new("RGBA", (200, 80), (0, 0, 0, 255))
+        for _ in range(5):
+            text_render.composite(base, text_render.text_layer("@creator", self.font, (255, 255, 255)), 10, 10)
+        info = text_render.cache_info()["layers"]
+        self.assertEqual((info.misses, info.hits), (1, 4))
+
+    def test_font_without_file_is_not_cached(self):
+        font = ImageFont.load_default()
+        ref = Image.new("RGBA", (100, 40), (0, 0, 0, 0))
+        ImageDraw.Draw(ref).text((5, 5), "abc", font=font, fill=(255, 255, 255))
+        out = Image.new("RGBA", (100, 40), (0, 0, 0, 0))
+        text_render.composite(out, text_render.text_layer("abc", font, (255, 255, 255)), 5, 5)
+        self.assertEqual(_diff(ref, out), 0)
+        self.assertEqual(text_render.cache_info()["layers"].currsize, 0)
+
+    def test_composite_outside_base_is_noop(self):
+        base = Image.new("RGBA", (50, 50), (1, 2, 3, 255))
+        text_render.composite(base, text_render.text_layer("x", self.font, (255, 0, 0)), 500, 500)
+        self.assertEqual(base.getpixel((0, 0)), (1, 2, 3, 255))
+
+
+if __name__ == "__main__":
+    unittest.main()
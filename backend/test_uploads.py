@@ -0,0 +1,147 @@
+"""Image uploads: streamed size limit, direct-upload tickets and WebP variants (fake Storage, no network)."""
+import io
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from services import uploads
+
+SECRET = "test-secret"
+
+
+class FakeBucket:
+    def __init__(self, store, bucket):
+        self.store = store
+        self.bucket = bucket
+
+    def upload(self, path, file, file_options=None):
+        data = file.read() if hasattr(file, "read") else file
+        self.store.objects[(self.bucket, path)] = (data, (file_options or {}).get("content-type"))
+
+    def download(self, path):
+        return self.store.objects[(self.bucket, path)][0]
+
+    def remove(self, paths):
+        for path in paths:
+            self.store.objects.pop((self.bucket, path), None)
+
+    def list(self, folder, options=None):
+        out = []
+        for (bucket, path), (data, content_type) in self.store.objects.items():
+            parent, _, name = path.rpartition("/")
+            if bucket == self.bucket and parent == folder:
+                out.append({"name": name, "metadata": {"size": len(data), "mimetype": content_type}})
+        return out
+
+    def create_signed_upload_url(self, path):
+        return {"signed_url": f"https://storage.test/{self.bucket}/{path}?token=t", "token": "t", "path": path}
+
+
+class FakeStorage:
+    def __init__(self):
+        self.objects = {}
+
+    def from_(self, bucket):
+        return FakeBucket(self, bucket)
+
+
+def _png(size=(1200, 800)):
+    out = io.BytesIO()
+    Image.new("RGB", size, (200, 40, 40)).save(out, "PNG")
+    return out.getvalue()
+
+
+class TestLimits(unittest.TestCase):
+    def test_read_limited_raises_past_limit(self):
+        self.assertEqual(uploads.read_limited(io.BytesIO(b"x" * 100), 100), b"x" * 100)
+        with self.assertRaises(uploads.UploadTooLarge):
+            uploads.read_limited(io.BytesIO(b"x" * 101), 100)
+
+    def test_upload_stream_stores_nothing_when_too_large(self):
+        storage = FakeStorage()
+        with self.assertRaises(uploads.UploadTooLarge):
+            uploads.upload_stream(storage, "b", "u/a.png", io.BytesIO(b"x" * 2048), "image/png", 1024)
+        self.assertEqual(storage.objects, {})
+
+    def test_request_too_large_uses_content_length(self):
+        limit = 1024
+        self.assertFalse(uploads.request_too_large(mock.Mock(content_length=None), limit))
+        self.assertFalse(uploads.request_too_large(mock.Mock(content_length=limit + uploads.MULTIPART_OVERHEAD), limit))
+        self.assertTrue(uploads.request_too_large(mock.Mock(content_length=limit + uploads.MULTIPART_OVERHEAD + 1), limit))
+
+    def test_image_extension(self):
+        self.assertEqual(uploads.image_extension("Photo.JPG", {"jpg", "png"}), "jpg")
+        self.assertEqual(uploads.image_extension("evil.svg", {"jpg", "png"}), "png")
+        self.assertEqual(uploads.image_extension(None, {"jpg"}), "png")
+
+
+class TestDirectUpload(unittest.TestCase):
+    def setUp(self):
+        self.storage = FakeStorage()
+
+    def test_ticket_round_trip(self):
+        signed = uploads.sign_direct_upload(self.storage, "b", "u/incoming/1.png", 1024, SECRET)
+        self.assertEqual(signed["token"], "t")
+        ticket = signed["upload_ticket"]
+        self.assertTrue(uploads.verify_ticket(SECRET, "b", "u/incoming/1.png", 1024, ticket))
+        self.assertFalse(uploads.verify_ticket(SECRET, "b", "other/incoming/1.png", 1024, ticket))
+        self.assertFalse(uploads.verify_ticket(SECRET, "b", "u/incoming/1.png", 4096, ticket))
+        self.assertFalse(uploads.verify_ticket("other", "b", "u/incoming/1.png", 1024, ticket))
+        self.assertFalse(uploads.verify_ticket(SECRET, "b", "u/incoming/1.png", 1024, "garbage"))
+
+    def test_ticket_expires(self):
+        with mock.patch("services.uploads.time.time", return_value=1000.0):
+            ticket = uploads.sign_direct_upload(self.storage, "b", "u/1.png", 10, SECRET)["upload_ticket"]
+        with mock.patch("services.uploads.time.time", return_value=1000.0 + uploads.TICKET_TTL + 1):
+            self.assertFalse(uploads.verify_ticket(SECRET, "b", "u/1.png", 10, ticket))
+
+    def test_claim_accepts_image_within_limit(self):
+        ticket = uploads.sign_direct_upload(self.storage, "b", "u/1.png", 1024, SECRET)["upload_ticket"]
+        self.storage.from_("b").upload("u/1.png", b"x" * 512, {"content-type": "image/png"})
+        self.assertIsNone(uploads.claim_direct_upload(self.storage, "b", "u/1.png", ticket, 1024, SECRET))
+        self.assertIn(("b", "u/1.png"), self.storage.objects)
+
+    def test_claim_rejects_and_removes_oversized_or_non_image(self):
+        ticket = uploads.sign_direct_upload(self.storage, "b", "u/1.png", 1024, SECRET)["upload_ticket"]
+        self.storage.from_("b").upload("u/1.png", b"x" * 2048, {"content-type": "image/png"})
+        self.assertEqual(uploads.claim_direct_upload(self.storage, "b", "u/1.png", ticket, 1024, SECRET), "File too large")
+        self.assertEqual(self.storage.objects, {})
+
+        self.storage.from_("b").upload("u/1.png", b"<html>", {"content-type": "text/html"})
+        self.assertEqual(uploads.claim_direct_upload(self.storage, "b", "u/1.png", ticket, 1024, SECRET), "File must be an image")
+        self.assertEqual(self.storage.objects, {})
+
+    def test_claim_missing_object(self):
+        ticket = uploads.sign_direct_upload(self.storage, "b", "u/1.png", 1024, SECRET)["upload_ticket"]
+        self.assertEqual(uploads.claim_direct_upload(self.storage, "b", "u/1.png", ticket, 1024, SECRET), "Uploaded file not found")
+
+
+class TestVariants(unittest.TestCase):
+    def test_render_variants_widths(self):
+        widths = [(w, Image.open(io.BytesIO(data)).size) for w, data in uploads.render_variants(_png())]
+        self.assertEqual(widths, [(320, (320, 213)), (960, (960, 640))])
+
+    def test_small_image_gets_single_variant(self):
+        variants = uploads.render_variants(_png((200, 100)))
+        self.assertEqual([w for w, _ in variants], [320])
+        self.assertEqual(Image.open(io.BytesIO(variants[0][1])).size, (200, 100))
+
+    def test_build_variants_uploads_and_reports(self):
+        storage = FakeStorage()
+        storage.from_("b").upload("u/favorites/1.png", _png(), {"content-type": "image/png"})
+        done = []
+        paths = uploads.build_variants(storage, "b", "u/favorites/1.png", on_done=done.append)
+        self.assertEqual(paths, {320: "u/favorites/1.w320.webp", 960: "u/favorites/1.w960.webp"})
+        self.assertEqual(done, [paths])
+        self.assertEqual(storage.objects[("b", "u/favorites/1.w320.webp")][1], "image/webp")
+
+    def test_build_variants_swallows_bad_images(self):
+        storage = FakeStorage()
+        done = []
+        self.assertEqual(uploads.build_variants(storage, "b", "u/x.png", data=b"not an image", on_done=done.append), {})
+        self.assertEqual(done, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""Video feed keyset cursors and response cache (no Supabase calls)."""
+import base64
+import time
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from postgrest_fake import FakeSupabase
+from utils.cache import TTLCache
+from utils.shared_store import MemoryKV, SharedDict
+from routes import videos
+from routes.videos import _decode_video_cursor, _encode_video_cursor
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_expires_after_ttl(self):
+        cache = TTLCache(ttl=0.01)
+        cache.set("k", 1)
+        self.assertEqual(cache.get("k"), 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("k"))
+
+    def test_pinned_entry_and_lru_eviction(self):
+        cache = TTLCache(ttl=0.01, maxsize=2)
+        cache.set("pinned", "x", ttl=0)
+        cache.set("a", 1)
+        cache.get("pinned")
+        cache.set("b", 2)
+        time.sleep(0.02)
+        self.assertEqual(cache.get("pinned"), "x")
+        self.assertIsNone(cache.get("a"))
+
+    def test_invalidate_predicate(self):
+        cache = TTLCache()
+        cache.set((None, "u1"), 1)
+        cache.set((None, "u2"), 2)
+        self.assertEqual(cache.invalidate(lambda k: k[1] == "u1"), 1)
+        self.assertEqual(cache.get((None, "u2")), 2)
+
+
+class TestVideoCursor(unittest.TestCase):
+    def test_round_trip(self):
+        row = {"created_at": "2025-03-01T12:00:00.123+00:00", "id": "5b2c7f0e-0000-4000-8000-000000000001"}
+        self.assertEqual(
+            _decode_video_cursor(_encode_video_cursor(row)),
+            (row["created_at"], row["id"]),
+        )
+
+    def test_malformed_cursor(self):
+        self.assertIsNone(_decode_video_cursor("not-a-cursor!"))
+        self.assertIsNone(_decode_video_cursor(""))
+
+    def test_cursor_values_cannot_inject_filters(self):
+        def raw(text):
+            return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+        self.assertEqual(_decode_video_cursor(raw("2025-03-01T12:00:00Z|42")), ("2025-03-01T12:00:00Z", "42"))
+        for text in ('2025-03-01",user_id.neq.x|1', "2025-03-01T12:00:00|1),or(id.gt.0",
+                     "yesterday|1", "2025-03-01T12:00:00|"):
+            self.assertIsNone(_decode_video_cursor(raw(text)), text)
+
+
+class TestIntroAndInvalidation(unittest.TestCase):
+    def setUp(self):
+        kv = MemoryKV()
+        # Two workers sharing one store.
+        self.worker_a = SharedDict("intro_video", ttl=60, kv=kv)
+        self.worker_b = SharedDict("intro_video", ttl=60, kv=kv)
+        patcher = mock.patch.object(videos, "_intro_video_cache", self.worker_a)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_invalidation_reaches_other_workers(self):
+        self.worker_b[videos._INTRO_CACHE_KEY] = {"video": {"id": 1}, "retry_at": 0}
+        videos.invalidate_video_cache()
+        self.assertNotIn(videos._INTRO_CACHE_KEY, self.worker_b)
+
+    def test_invalidate_endpoint_requires_admin(self):
+        app = Flask(__name__)
+        app.secret_key = "test"
+        app.register_blueprint(videos.videos_bp)
+        resp = app.test_client().post("/api/videos/cache/invalidate", json={})
+        self.assertEqual(resp.status_code, 401)
+
+
+class TestVideoFeed(unittest.TestCase):
+    def setUp(self):
+        self.kv = MemoryKV()
+        self.db = FakeSupabase(videos2=[
+            {"id": i, "title": f"v{i}", "user_id": "u1", "created_at": f"2025-03-0{i}T12:00:00+00:00"}
+            for i in range(1, 4)
+        ])
+        self.app = Flask(__name__)
+        self.app.register_blueprint(videos.videos_bp)
+        for name, value in (("_video_feed_cache", TTLCache()),
+                            ("_video_feed_stamps", SharedDict("video_feed_stamp", kv=self.kv)),
+                            ("_intro_video_cache", SharedDict("intro_video", kv=self.kv))):
+            patcher = mock.patch.object(videos, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(videos, "_get_supabase_client", return_value=self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, query):
+        return self.app.test_client().get(f"/api/videos?{query}")
+
+    def test_limit_zero_is_clamped_to_one(self):
+        resp = self.get("limit=0")
+        self.assertEqual([row["id"] for row in resp.get_json()], [3])
+        self.assertIn("X-Next-Cursor", resp.headers)
+
+    def test_invalidation_from_another_worker_retires_cached_pages(self):
+        self.assertEqual(self.get("user_id=u1").headers["X-Cache"], "MISS")
+        self.assertEqual(self.get("user_id=u1").headers["X-Cache"], "HIT")
+        # Another worker: same shared stamps, its own page cache.
+        with mock.patch.object(videos, "_video_feed_cache", TTLCache()):
+            videos.invalidate_video_cache("u1")
+        self.assertEqual(self.get("user_id=u1").headers["X-Cache"], "MISS")
+        self.assertEqual(self.get("user_id=u2").headers["X-Cache"], "MISS")
+        self.assertEqual(self.get("user_id=u2").headers["X-Cache"], "HIT")
+        with mock.patch.object(videos, "_video_feed_cache", TTLCache()):
+            videos.invalidate_video_cache("u1")
+        self.assertEqual(self.get("user_id=u2").headers["X-Cache"], "HIT")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+"""Processing work queue: leases, expiry requeue, owner-checked writes and concurrent workers (fake PostgREST)."""
+import threading
+import unittest
+import unittest.mock
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+
+from postgrest_fake import FakeAuth, FakeQuery, FakeSupabase, Result
+from secure_order_processing_api import register_secure_processing_routes
+from utils import work_queue
+
+
+def _db(queue):
+    return FakeSupabase(**{work_queue.QUEUE_TABLE: queue, work_queue.HISTORY_TABLE: []})
+
+
+def _row(n, priority=0, status="pending", **extra):
+    return dict({"id": f"q{n}", "order_id": f"o{n}", "status": status, "priority": priority,
+                 "created_at": f"2026-01-01T00:00:{n:02d}", "assigned_to": None,
+                 "lease_expires_at": None, "processing_attempts": 0}, **extra)
+
+
+class WorkQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        work_queue._rpc_supported = True
+        work_queue._lease_column_supported = True
+        self.addCleanup(setattr, work_queue, "_rpc_supported", True)
+        self.addCleanup(setattr, work_queue, "_lease_column_supported", True)
+
+    def _queue(self, db, queue_id):
+        return next(r for r in db.tables[work_queue.QUEUE_TABLE] if r["id"] == queue_id)
+
+
+class TestLease(WorkQueueTestCase):
+    def test_rpc_lease_is_used_when_available(self):
+        db = _db([])
+        leased = [_row(2, status="assigned"), _row(1, priority=2, status="assigned")]
+
+        class Rpc:
+            def execute(self):
+                return Result(leased)
+
+        db.rpc = lambda name, params: db.rpc_calls.append((name, params)) or Rpc()
+        rows = work_queue.lease(db, "w1", count=2, lease_seconds=120)
+        self.assertEqual([r["id"] for r in rows], ["q1", "q2"])
+        self.assertEqual(db.rpc_calls, [("lease_processing_queue", {
+            "p_worker": "w1", "p_limit": 2, "p_lease_seconds": 120, "p_max_attempts": 3})])
+        self.assertEqual(len(db.queries), 0)
+
+    def test_fallback_leases_by_priority_and_bumps_attempts(self):
+        db = _db([_row(1), _row(2, priority=2), _row(3, processing_attempts=1), _row(4, status="completed")])
+        rows = work_queue.lease(db, "w1", count=2)
+        self.assertFalse(work_queue._rpc_supported)
+        self.assertEqual([r["id"] for r in rows], ["q2", "q1"])
+        q2 = self._queue(db, "q2")
+        self.assertEqual((q2["status"], q2["assigned_to"], q2["processing_attempts"]), ("assigned", "w1", 1))
+        self.assertGreater(q2["lease_expires_at"], datetime.now(timezone.utc).isoformat())
+
+        rows = work_queue.lease(db, "w2", count=5)
+        self.assertEqual([r["id"] for r in rows], ["q3"])
+        self.assertEqual(self._queue(db, "q3")["processing_attempts"], 2)
+        self.assertEqual(work_queue.lease(db, "w3", count=5), [])
+
+    def test_ten_workers_never_share_a_row(self):
+        db = _db([_row(n, priority=n % 3) for n in range(60)])
+        work_queue._rpc_supported = False
+        results = {}
+        barrier = threading.Barrier(10)
+
+        def worker(name):
+            barrier.wait()
+            mine = []
+            while True:
+                got = work_queue.lease(db, name, count=4)
+                if not got:
+                    break
+                mine.extend(r["id"] for r in got)
+            results[name] = mine
+
+        threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        leased = [queue_id for ids in results.values() for queue_id in ids]
+        self.assertEqual(len(leased), 60)
+        self.assertEqual(len(set(leased)), 60)
+        for name, ids in results.items():
+            for queue_id in ids:
+                self.assertEqual(self._queue(db, queue_id)["assigned_to"], name)
+
+    def test_rpc_errors_other_than_missing_function_propagate(self):
+        db = _db([_row(1)])
+
+        def rpc(name, params):
+            raise TimeoutError("read timed out")
+
+        db.rpc = rpc
+        with self.assertRaises(TimeoutError):
+            work_queue.lease(db, "w1")
+        self.assertTrue(work_queue._rpc_supported)
+        self.assertIsNone(self._queue(db, "q1")["assigned_to"])
+
+    def test_bad_arguments(self):
+        with self.assertRaises(work_queue.WorkQueueError):
+            work_queue.lease(_db([]), None)
+        with self.assertRaises(work_queue.WorkQueueError):
+            work_queue.lease(_db([]), "w1", count="many")
+
+
+class TestLeaseLifecycle(WorkQueueTestCase):
+    def test_expired_leases_are_requeued_or_failed(self):
+        past = (datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat()
+        future = (datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat()
+        db = _db([
+            _row(1, status="assigned", assigned_to="w1", lease_expires_at=past, processing_attempts=1),
+            _row(2, status="processing", assigned_to="w1", lease_expires_at=past, processing_attempts=3),
+            _row(3, status="processing", assigned_to="w2", lease_expires_at=future, processing_attempts=1),
+        ])
+        self.assertEqual(work_queue.requeue_expired(db), 2)
+        self.assertEqual((self._queue(db, "q1")["status"], self._queue(db, "q1")["assigned_to"]), ("pending", None))
+        self.assertEqual(self._queue(db, "q2")["status"], "failed")
+        self.assertEqual(self._queue(db, "q3")["assigned_to"], "w2")
+
+        # The stale holder can no longer extend or finish the requeued row.
+        self.assertEqual(work_queue.heartbeat(db, "w1", ["q1"]), [])
+        self.assertIsNone(work_queue.complete(db, "w1", "q1"))
+
+    def test_heartbeat_between_sweep_read_and_update_keeps_the_lease(self):
+        past = (datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat()
+        db = _db([_row(1, status="processing", assigned_to="w1", lease_expires_at=past)])
+        real_execute = FakeQuery.execute
+
+        def execute(query):
+            result = real_execute(query)
+            if query.method == "select" and query.table == work_queue.QUEUE_TABLE:
+                work_queue.heartbeat(db, "w1", ["q1"])  # lands after the sweep picked q1
+            return result
+
+        with unittest.mock.patch.object(FakeQuery, "execute", execute):
+            self.assertEqual(work_queue.requeue_expired(db), 0)
+        self.assertEqual((self._queue(db, "q1")["status"], self._queue(db, "q1")["assigned_to"]), ("processing", "w1"))
+
+    def test_heartbeat_complete_and_release_are_owner_checked(self):
+        db = _db([_row(1), _row(2), _row(3)])
+        work_queue._rpc_supported = False
+        work_queue.lease(db, "w1", count=2)
+        work_queue.lease(db, "w2", count=1)
+
+        before = self._queue(db, "q1")["lease_expires_at"]
+        self.assertEqual(work_queue.heartbeat(db, "w1", ["q1", "q3"], lease_seconds=1800, status="processing"), ["q1"])
+        self.assertGreater(self._queue(db, "q1")["lease_expires_at"], before)
+        self.assertEqual(self._queue(db, "q1")["status"], "processing")
+        self.assertIsNotNone(self._queue(db, "q1")["started_at"])
+
+        row = work_queue.complete(db, "w1", "q1", notes="ok", processed_image_url="https://cdn/q1.png",
+                                  processing_time_seconds=30)
+        self.assertEqual(row["status"], "completed")
+        self.assertIsNone(self._queue(db, "q1")["lease_expires_at"])
+        self.assertEqual(db.tables[work_queue.HISTORY_TABLE][0]["processed_by"], "w1")
+        self.assertIsNone(work_queue.complete(db, "w1", "q3"))
+
+        self.assertEqual(work_queue.release(db, "w1", ["q2", "q3"]), ["q2"])
+        self.assertEqual(self._queue(db, "q2")["status"], "pending")
+
+    def test_claim_single_row(self):
+        db = _db([_row(1)])
+        self.assertEqual(work_queue.claim(db, "w1", "q1")["assigned_to"], "w1")
+        self.assertIsNone(work_queue.claim(db, "w2", "q1"))
+
+    def test_worker_stats(self):
+        now = datetime.now(timezone.utc).isoformat()
+        db = _db([_row(1, status="assigned", assigned_to="w2")])
+        db.tables[work_queue.HISTORY_TABLE] = [
+            {"processed_by": "w1", "status": "completed", "processing_time_seconds": 30, "processed_at": now},
+            {"processed_by": "w1", "status": "completed", "processing_time_seconds": 60, "processed_at": now},
+            {"processed_by": "w1", "status": "failed", "processing_time_seconds": 5, "processed_at": now},
+            {"processed_by": "w2", "status": "completed", "processing_time_seconds": 10, "processed_at": "2020-01-01"},
+        ]
+        stats = work_queue.worker_stats(db, since_hours=2)
+        self.assertEqual(stats["w1"], {"completed": 2, "failed": 1, "leased": 0, "avg_seconds": 45.0, "per_hour": 1.0})
+        self.assertEqual(stats["w2"], {"completed": 0, "failed": 0, "leased": 1, "avg_seconds": None, "per_hour": 0.0})
+
+
+class TestSecureLeaseEndpoints(WorkQueueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db = _db([_row(1), _row(2), _row(3, status="assigned", assigned_to="w2",
+                                                    lease_expires_at="2999-01-01T00:00:00+00:00")])
+        self.db.tables["users"] = [{"id": "w1", "is_admin": False}, {"id": "boss", "is_admin": True, "admin_role": "master_admin"}]
+        self.db.tables["processor_permissions"] = [{"user_id": "w1", "role": "processor", "is_active": True},
+                                                   {"user_id": "w2", "role": "processor", "is_active": True}]
+        anon = FakeSupabase()
+        anon.auth = FakeAuth({"t1": "w1", "tboss": "boss", "tnobody": "nobody"})
+        app = Flask(__name__)
+        register_secure_processing_routes(app, anon, self.db)
+        self.client = app.test_client()
+
+    def _post(self, path, token=None, **body):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return self.client.post(path, json=body, headers=headers)
+
+    def test_missing_or_rejected_token_is_401(self):
+        self.assertEqual(self._post("/api/secure/lease", count=1).status_code, 401)
+        self.assertEqual(self._post("/api/secure/lease", token="forged", count=1).status_code, 401)
+        self.assertIsNone(self._queue(self.db, "q1")["assigned_to"])
+
+    def test_user_without_processor_role_is_403(self):
+        self.assertEqual(self._post("/api/secure/lease", token="tnobody", count=1).status_code, 403)
+
+    def test_worker_identity_comes_from_the_token(self):
+        resp = self.client.post("/api/secure/lease", json={"count": 1, "worker_id": "w2"},
+                                headers={"Authorization": "Bearer t1", "X-User-Id": "w2"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([r["assigned_to"] for r in resp.get_json()["items"]], ["w1"])
+
+        # w2's lease cannot be released or completed by w1 claiming to be w2.
+        self.assertEqual(self._post("/api/secure/lease/release", token="t1", worker_id="w2", queue_ids=["q3"]).get_json()["queue_ids"], [])
+        self.assertEqual(self._post("/api/secure/lease/complete", token="t1", worker_id="w2", queue_id="q3").status_code, 409)
+        self.assertEqual(self._queue(self.db, "q3")["assigned_to"], "w2")
+
+    def test_admin_may_work_the_queue(self):
+        resp = self._post("/api/secure/lease", token="tboss", count=1)
+        self.assertEqual([r["assigned_to"] for r in resp.get_json()["items"]], ["boss"])
+
+
+if __name__ == "__main__":
+    unittest.main()
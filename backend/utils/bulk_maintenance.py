@@ -0,0 +1,142 @@
+"""
+Bulk maintenance: chunked deletes and background jobs for admin reset operations.
+
+``delete_in_chunks`` removes matching rows in keyset order (``id``): read the next ``batch_size``
+ids after the last one seen, delete exactly those with ``count=exact`` and ``return=minimal``, pause,
+repeat. Each statement is short, holds its locks only for one chunk and never ships deleted rows
+back to the app; the total to delete comes from a ``count=exact`` header, not from row payloads.
+
+``start_job`` runs a callable in a daemon thread and keeps its status/progress in the shared store
+so the admin UI can poll ``get_job`` from any gunicorn worker on the machine.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from postgrest.types import CountMethod, ReturnMethod
+
+from utils.shared_store import SharedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = int(os.getenv("BULK_DELETE_BATCH_SIZE", "500"))
+MAX_BATCH_SIZE = 5000
+# Pause between chunks so a reset never monopolises the database.
+DEFAULT_PAUSE = float(os.getenv("BULK_DELETE_PAUSE_SECONDS", "0.05"))
+
+_jobs = SharedDict("maintenance_jobs", ttl=7 * 86400)
+
+
+class ChunkedDeleteError(Exception):
+    """A chunked delete stopped partway; ``deleted`` rows were already removed."""
+
+    def __init__(self, table, deleted, cause):
+        super().__init__(f"delete from {table} failed after {deleted} rows: {cause}")
+        self.table = table
+        self.deleted = deleted
+
+
+def batch_size_from(value):
+    """Clamp a requested batch size (None = default) to 1..MAX_BATCH_SIZE."""
+    try:
+        size = int(value) if value not in (None, "") else DEFAULT_BATCH_SIZE
+    except (TypeError, ValueError):
+        size = DEFAULT_BATCH_SIZE
+    return max(1, min(MAX_BATCH_SIZE, size))
+
+
+def _apply(query, filters):
+    for column, value in (filters or {}).items():
+        query = query.eq(column, value)
+    return query
+
+
+def count_rows(client, table, filters=None, key="id"):
+    """Exact number of rows matching ``filters`` (one id row on the wire; the total comes from Content-Range)."""
+    result = _apply(client.table(table).select(key, count=CountMethod.exact), filters).limit(1).execute()
+    return result.count or 0
+
+
+def delete_in_chunks(client, table, filters=None, batch_size=None, pause=None, progress=None, key="id"):
+    """Delete rows of ``table`` matching ``filters`` (column -> value) in ``key`` order; returns the count.
+
+    ``progress(table, deleted_so_far, total)`` is called before the first chunk and after every chunk.
+    Any failure is raised as ``ChunkedDeleteError`` carrying the rows deleted before it.
+    """
+    batch_size = batch_size_from(batch_size)
+    pause = DEFAULT_PAUSE if pause is None else pause
+    deleted = 0
+    last = None
+    try:
+        total = count_rows(client, table, filters, key)
+        if progress:
+            progress(table, 0, total)
+        while total:
+            query = _apply(client.table(table).select(key), filters).order(key).limit(batch_size)
+            if last is not None:
+                query = query.gt(key, last)
+            ids = [row[key] for row in query.execute().data or []]
+            if not ids:
+                break
+            result = _apply(
+                client.table(table).delete(count=CountMethod.exact, returning=ReturnMethod.minimal), filters
+            ).in_(key, ids).execute()
+            # postgrest-py reports count=0 when the body is empty (return=minimal); the chunk is the ids we sent.
+            deleted += result.count or len(ids)
+            last = ids[-1]
+            if progress:
+                progress(table, deleted, total)
+            if len(ids) < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+    except Exception as e:
+        raise ChunkedDeleteError(table, deleted, e) from e
+    return deleted
+
+
+def start_job(kind, fn, started_by=None):
+    """Run ``fn(progress)`` in the background; returns the job id.
+
+    ``progress(table, deleted, total)`` records per-table counts; ``fn``'s return value becomes ``result``.
+    """
+    job_id = uuid.uuid4().hex
+    _jobs[job_id] = {
+        "id": job_id,
+        "kind": kind,
+        "status": "running",
+        "progress": {},
+        "result": None,
+        "error": None,
+        "started_by": started_by,
+        "started_at": datetime.utcnow().isoformat(),
+        "finished_at": None,
+    }
+
+    def progress(table, deleted, total):
+        job = _jobs.get(job_id)
+        if job is not None:
+            job["progress"] = dict(job["progress"], **{table: {"deleted": deleted, "total": total}})
+
+    def run():
+        try:
+            result = fn(progress)
+            _jobs[job_id] = dict(_jobs[job_id], status="completed", result=result,
+                                 finished_at=datetime.utcnow().isoformat())
+            logger.info("maintenance job %s (%s) completed: %s", job_id, kind, result)
+        except Exception as e:
+            logger.exception("maintenance job %s (%s) failed", job_id, kind)
+            _jobs[job_id] = dict(_jobs[job_id], status="failed", error=str(e),
+                                 finished_at=datetime.utcnow().isoformat())
+
+    threading.Thread(target=run, name=f"maintenance-{kind}", daemon=True).start()
+    return job_id
+
+
+def get_job(job_id):
+    """Job status dict (``status`` running / completed / failed, ``progress``, ``result``) or None."""
+    job = _jobs.get(job_id)
+    return dict(job) if job is not None else None
@@ -0,0 +1,77 @@
+"""Small in-process caches shared by route modules (per worker, thread-safe)."""
+import threading
+import time
+from collections import OrderedDict
+
+_named = {}
+
+
+def named_caches():
+    """Caches created with a ``name`` (reported by utils.metrics), by name."""
+    return dict(_named)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after ``ttl`` seconds.
+
+    Used for short-lived response caching of public read endpoints. Each gunicorn
+    worker holds its own copy, so keep TTLs short and invalidate on writes.
+    """
+
+    def __init__(self, ttl=30.0, maxsize=256, name=None):
+        self.ttl = float(ttl)
+        self.maxsize = int(maxsize)
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if name:
+            _named[name] = self
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store ``value``; ``ttl=0`` pins the entry until it is evicted or invalidated."""
+        ttl = self.ttl if ttl is None else float(ttl)
+        expires_at = time.monotonic() + ttl if ttl > 0 else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def invalidate(self, predicate=None):
+        """Drop every entry, or only keys for which ``predicate(key)`` is true. Returns count dropped."""
+        with self._lock:
+            if predicate is None:
+                n = len(self._data)
+                self._data.clear()
+                return n
+            doomed = [k for k in self._data if predicate(k)]
+            for k in doomed:
+                del self._data[k]
+            return len(doomed)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
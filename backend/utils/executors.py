@@ -0,0 +1,25 @@
+"""Process-local thread pools for background work that is safe across gunicorn's preload fork."""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def fork_safe_executor(name, max_workers):
+    """
+    This process's ``ThreadPoolExecutor`` for ``name`` (also the thread name prefix).
+
+    Created lazily, and again after a fork, so a preloaded gunicorn master never owns pool threads
+    and each worker gets its own. ``max_workers`` only applies when the pool is created.
+    """
+    pid = os.getpid()
+    entry = _executors.get(name)
+    if entry is None or entry[0] != pid:
+        with _executors_lock:
+            entry = _executors.get(name)
+            if entry is None or entry[0] != pid:
+                entry = (pid, ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name))
+                _executors[name] = entry
+    return entry[1]
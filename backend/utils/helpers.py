@@ -368,16 +368,24 @@ def platform_revenue_attribution_for_earning(
     }
 
 
-def reset_creator_sales_records(client, user_id, order_store=None, log=None):
-    """Clear sales + creator_earnings (+ in-memory orders) for one storefront owner."""
+def reset_creator_sales_records(client, user_id, order_store=None, log=None, batch_size=None, progress=None):
+    """Clear sales + creator_earnings (+ in-memory orders) for one storefront owner.
+
+    Rows are deleted in chunks (utils/bulk_maintenance.py); ``progress(table, deleted, total)`` is
+    called after each chunk. A failed sales delete fails the call; the other tables report what
+    they managed to delete.
+    """
+    from utils.bulk_maintenance import ChunkedDeleteError, delete_in_chunks
+
     uid = str(user_id)
-    deleted_sales = client.table("sales").delete().eq("user_id", uid).execute()
-    deleted_sales_count = len(deleted_sales.data or [])
+    deleted_sales_count = delete_in_chunks(client, "sales", {"user_id": uid}, batch_size, progress=progress)
     deleted_earnings_count = 0
     try:
-        earnings_res = client.table("creator_earnings").delete().eq("user_id", uid).execute()
-        deleted_earnings_count = len(earnings_res.data or [])
-    except Exception as err:
+        deleted_earnings_count = delete_in_chunks(
+            client, "creator_earnings", {"user_id": uid}, batch_size, progress=progress
+        )
+    except ChunkedDeleteError as err:
+        deleted_earnings_count = err.deleted
         if log:
             log.warning("Could not delete creator_earnings for %s: %s", uid, err)
 
@@ -392,11 +400,11 @@ def reset_creator_sales_records(client, user_id, order_store=None, log=None):
 
     deleted_payouts_count = 0
     try:
-        payouts_res = client.table("umbrella_collaborator_payouts").delete().eq(
-            "storefront_owner_id", uid
-        ).execute()
-        deleted_payouts_count = len(payouts_res.data or [])
-    except Exception as err:
+        deleted_payouts_count = delete_in_chunks(
+            client, "umbrella_collaborator_payouts", {"storefront_owner_id": uid}, batch_size, progress=progress
+        )
+    except ChunkedDeleteError as err:
+        deleted_payouts_count = err.deleted
         if log:
             log.warning("Could not delete umbrella_collaborator_payouts for %s: %s", uid, err)
 
@@ -408,28 +416,23 @@ def reset_creator_sales_records(client, user_id, order_store=None, log=None):
     }
 
 
-def _delete_all_table_rows(client, table_name, log=None):
-    """Delete every row in a Supabase table (PostgREST requires a filter)."""
-    attempts = [
-        lambda q: q.gte("created_at", "1970-01-01T00:00:00Z"),
-        lambda q: q.neq("id", "00000000-0000-0000-0000-000000000000"),
-        lambda q: q.neq("id", 0),
-    ]
-    for build in attempts:
-        try:
-            result = build(client.table(table_name).delete()).execute()
-            return len(result.data or [])
-        except Exception as err:
-            if log:
-                log.warning("delete all rows from %s failed: %s", table_name, err)
-    return 0
+def _delete_all_table_rows(client, table_name, log=None, batch_size=None, progress=None):
+    """Delete every row in a Supabase table, one keyset chunk at a time; returns the count (partial on failure)."""
+    from utils.bulk_maintenance import ChunkedDeleteError, delete_in_chunks
+
+    try:
+        return delete_in_chunks(client, table_name, batch_size=batch_size, progress=progress)
+    except ChunkedDeleteError as err:
+        if log:
+            log.warning("delete all rows from %s failed: %s", table_name, err)
+        return err.deleted
 
 
-def reset_all_platform_sales_records(client, order_store=None, log=None):
-    """Master admin: wipe all sales analytics + platform revenue test data."""
-    deleted_sales_count = _delete_all_table_rows(client, "sales", log)
-    deleted_earnings_count = _delete_all_table_rows(client, "creator_earnings", log)
-    deleted_payouts_count = _delete_all_table_rows(client, "umbrella_collaborator_payouts", log)
+def reset_all_platform_sales_records(client, order_store=None, log=None, batch_size=None, progress=None):
+    """Master admin: wipe all sales analytics + platform revenue test data (chunked; see _delete_all_table_rows)."""
+    deleted_sales_count = _delete_all_table_rows(client, "sales", log, batch_size, progress)
+    deleted_earnings_count = _delete_all_table_rows(client, "creator_earnings", log, batch_size, progress)
+    deleted_payouts_count = _delete_all_table_rows(client, "umbrella_collaborator_payouts", log, batch_size, progress)
 
     purged_order_store_count = 0
     if order_store is not None:
@@ -1,6 +1,26 @@
-"""Rate limiter for auth and sensitive endpoints - single instance, init_app in app.py"""
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+"""Rate limiter for auth and sensitive endpoints - single instance, init_app in app.py
+
+Drop-in for the subset of Flask-Limiter we used (``init_app``, ``limit``, ``exempt``), backed by
+the shared GCRA store in utils.rate_limit so limits hold across gunicorn workers.
+"""
+import logging
+import math
+import os
+from functools import wraps
+
+from utils.rate_limit import get_rate_limiter, parse_rate
+
+logger = logging.getLogger(__name__)
+
+
+def client_ip():
+    """
+    Client address behind Fly's proxy: Fly-Client-IP, else ``remote_addr`` as resolved by ProxyFix
+    (x_for=1, the hop our proxy appended). The leftmost X-Forwarded-For hop is client-controlled,
+    so it never picks the rate-limit bucket.
+    """
+    from flask import request
+    return request.headers.get("Fly-Client-IP") or request.remote_addr or "unknown"
 
 
 def _exempt_browse_and_static():
@@ -13,8 +33,79 @@ def _exempt_browse_and_static():
         return False
 
 
+def _too_many_requests(spec, retry_after):
+    from flask import jsonify
+    resp = jsonify({"error": "Rate limit exceeded", "limit": spec})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(max(1, int(math.ceil(retry_after))))
+    return resp
+
+
+class Limiter:
+    """
+    Per-route limits keyed by client IP. ``default_limits`` apply to every endpoint that has
+    neither its own ``@limiter.limit`` nor ``@limiter.exempt``; each endpoint gets its own bucket.
+    """
+
+    def __init__(self, key_func=client_ip, default_limits=None, default_limits_exempt_when=None):
+        self.key_func = key_func
+        self.default_limits = [(spec, parse_rate(spec)) for spec in (default_limits or [])]
+        self.default_limits_exempt_when = default_limits_exempt_when
+        self.enabled = True
+
+    def init_app(self, app):
+        # RATE_LIMIT_ENABLED=0 turns limits off (load tests / benchmarks against a local server).
+        self.enabled = app.config.get("RATELIMIT_ENABLED", True) and os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+        app.before_request(self._check_default_limits)
+
+    def _check(self, scope, limits):
+        if not self.enabled:
+            return None
+        rate_limiter = get_rate_limiter()
+        ident = self.key_func()
+        for spec, (count, period) in limits:
+            result = rate_limiter.hit(f"{scope}:{spec}:{ident}", count, period)
+            if not result.allowed:
+                logger.warning(f"Rate limit {spec} exceeded on {scope} for {ident}")
+                return _too_many_requests(spec, result.retry_after)
+        return None
+
+    def _check_default_limits(self):
+        from flask import current_app, request
+        if not self.default_limits or request.method == "OPTIONS" or not request.endpoint:
+            return None
+        view = current_app.view_functions.get(request.endpoint)
+        if view is None or getattr(view, "_rate_limit_exempt", False) or getattr(view, "_rate_limit_explicit", False):
+            return None
+        if self.default_limits_exempt_when and self.default_limits_exempt_when():
+            return None
+        return self._check(request.endpoint, self.default_limits)
+
+    def limit(self, spec):
+        """Decorator: apply ``spec`` (e.g. ``"10 per minute"``) to this view instead of the defaults."""
+        limits = [(spec, parse_rate(spec))]
+
+        def decorator(f):
+            @wraps(f)
+            def wrapped(*args, **kwargs):
+                from flask import request
+                if request.method != "OPTIONS":
+                    denied = self._check(f"{f.__module__}.{f.__name__}", limits)
+                    if denied is not None:
+                        return denied
+                return f(*args, **kwargs)
+            wrapped._rate_limit_explicit = True
+            return wrapped
+        return decorator
+
+    def exempt(self, f):
+        """Mark a view as exempt from the default limits."""
+        f._rate_limit_exempt = True
+        return f
+
+
 limiter = Limiter(
-    key_func=get_remote_address,
+    key_func=client_ip,
     default_limits=["200 per day", "50 per hour"],
     default_limits_exempt_when=_exempt_browse_and_static,
 )
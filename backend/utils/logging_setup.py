@@ -0,0 +1,293 @@
+"""
+Process-wide logging: request threads only enqueue records, a listener thread does the I/O.
+
+``configure_logging()`` replaces the old ``logging.basicConfig`` call in app.py:
+
+- the root logger gets a single ``QueueHandler``; a ``QueueListener`` thread formats records and
+  writes them to stderr, so a slow log sink never blocks a request;
+- records keep ``msg``/``args`` until the listener formats them (``%``-style calls such as
+  ``logger.info("order %s", order_id)`` cost nothing when the level filters them out, and little
+  when it doesn't);
+- INFO/DEBUG records can be sampled and rate limited per logger before they are enqueued.
+  WARNING and above always pass;
+- logger levels can be changed at runtime (``set_level``, ``/api/admin/log-levels``). Overrides
+  are kept in the shared store, so every gunicorn worker on the machine picks them up within
+  ``LEVEL_SYNC_SECONDS``.
+
+Environment:
+  LOG_LEVEL       root level (default INFO)
+  LOG_FORMAT      "text" (default, the previous basicConfig layout) or "json" (one object per line)
+  LOG_SAMPLE      fraction of INFO/DEBUG records kept per logger, e.g. "routes.products=0.1,app=0.5"
+  LOG_RATE_LIMIT  max INFO/DEBUG records per second per logger, e.g. "app=20,routes=50"
+  LOG_LEVELS      initial per-logger levels, e.g. "routes.products=WARNING,werkzeug=WARNING"
+
+Logger names match by dotted prefix: "routes" covers "routes.products" unless it has its own entry.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from utils.shared_store import SharedDict
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LEVEL_SYNC_SECONDS = 5.0
+
+# Attributes every LogRecord has; anything else was passed via ``extra=`` and goes into JSON output.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+# Args of these types can't change after the call, so formatting them later is safe.
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None), bytes)
+
+_level_overrides = SharedDict("log_levels")
+_state = {"handler": None, "listener": None, "target": None, "synced_at": 0.0, "applied": {}}
+_state_lock = threading.Lock()
+
+
+def parse_spec(value, convert=float):
+    """``"a=1,b.c=0.5"`` -> ``{"a": 1.0, "b.c": 0.5}``; malformed entries are skipped."""
+    spec = {}
+    for part in (value or "").split(","):
+        name, sep, raw = part.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            spec[name.strip()] = convert(raw.strip())
+        except (TypeError, ValueError):
+            continue
+    return spec
+
+
+def _match(spec, name):
+    """Value for the longest dotted prefix of ``name`` in ``spec`` ("" matches everything), or None."""
+    while True:
+        if name in spec:
+            return spec[name]
+        if not name:
+            return None
+        name = name.rpartition(".")[0]
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg, plus exc and any ``extra=`` fields."""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        if record.stack_info:
+            payload["stack"] = self.formatStack(record.stack_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO/DEBUG records per logger (``{"routes.products": 0.1}``)."""
+
+    def __init__(self, rates, rng=random.random):
+        super().__init__()
+        self.rates = dict(rates)
+        self.rng = rng
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        rate = _match(self.rates, record.name)
+        return rate is None or rate >= 1 or self.rng() < rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per logger for INFO/DEBUG records (``{"app": 20}`` = 20 records/s, burst 20).
+
+    Records dropped while a bucket is empty are counted; the next record that gets through carries
+    the count as ``suppressed`` (a JSON field, and a suffix on the text message).
+    """
+
+    def __init__(self, limits, clock=time.monotonic):
+        super().__init__()
+        self.limits = dict(limits)
+        self.clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or not self.limits:
+            return True
+        rate = _match(self.limits, record.name)
+        if rate is None:
+            return True
+        now = self.clock()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(record.name, (rate, now, 0))
+            tokens = min(rate, tokens + (now - last) * rate)
+            if tokens < 1:
+                self._buckets[record.name] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[record.name] = (tokens - 1, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def suppressed(self):
+        """Records currently held back, per logger."""
+        with self._lock:
+            return {name: s for name, (_, _, s) in self._buckets.items() if s}
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", None)
+        return f"{text} [{suppressed} similar suppressed]" if suppressed else text
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock ``prepare`` renders the message (and traceback) in the caller's thread. Records only
+    cross threads here, never processes, so they are enqueued as they are; only mutable args
+    (dicts, lists, objects) are rendered up front so a later change can't alter the logged text.
+    """
+
+    def prepare(self, record):
+        if record.args and not all(isinstance(a, _IMMUTABLE_ARGS) for a in _iter_args(record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def _iter_args(args):
+    return args.values() if isinstance(args, dict) else args
+
+
+def _build_formatter(fmt):
+    return JsonFormatter() if fmt == "json" else _TextFormatter(TEXT_FORMAT)
+
+
+def _start_listener():
+    handler, target = _state["handler"], _state["target"]
+    handler.queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(handler.queue, target, respect_handler_level=True)
+    listener.start()
+    _state["listener"] = listener
+
+
+def _after_fork():
+    # gunicorn preloads app.py in the master: listener threads don't survive the fork, and the
+    # inherited queue may have been mid-operation. Each worker gets its own queue and listener.
+    if _state["handler"] is not None:
+        _state["listener"] = None
+        _start_listener()
+
+
+def stop():
+    """Flush queued records and stop the listener thread (registered with atexit)."""
+    listener = _state.get("listener")
+    if listener is not None:
+        _state["listener"] = None
+        listener.stop()
+
+
+def configure_logging(level=None, fmt=None, sample=None, rate_limit=None, levels=None, stream=None):
+    """Install the queue handler on the root logger; arguments default to the LOG_* env vars."""
+    with _state_lock:
+        if _state["handler"] is not None:
+            return _state["handler"]
+        root = logging.getLogger()
+        root.setLevel((level or os.getenv("LOG_LEVEL") or "INFO").upper())
+
+        target = logging.StreamHandler(stream)
+        target.setFormatter(_build_formatter((fmt or os.getenv("LOG_FORMAT") or "text").lower()))
+
+        handler = LazyQueueHandler(queue.SimpleQueue())
+        handler.addFilter(SamplingFilter(sample if sample is not None else parse_spec(os.getenv("LOG_SAMPLE"))))
+        handler.addFilter(RateLimitFilter(
+            rate_limit if rate_limit is not None else parse_spec(os.getenv("LOG_RATE_LIMIT"))))
+
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        _state.update(handler=handler, target=target)
+        _start_listener()
+
+        initial = levels if levels is not None else parse_spec(os.getenv("LOG_LEVELS"), str)
+        for name, lvl in initial.items():
+            logging.getLogger(name).setLevel(lvl.upper())
+
+        atexit.register(stop)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_after_fork)
+        return handler
+
+
+def _level_name(level):
+    if isinstance(level, int):
+        return logging.getLevelName(level)
+    name = str(level or "").strip().upper()
+    if name not in ("NOTSET", "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+        raise ValueError(f"unknown log level: {level!r}")
+    return name
+
+
+def set_level(name, level):
+    """Set a logger's level here and in every worker (``name`` "" / "root" = root logger)."""
+    name = "" if name in (None, "root") else name
+    level = _level_name(level)
+    logging.getLogger(name or None).setLevel(level)
+    _level_overrides[name or "root"] = level
+    _state["applied"][name or "root"] = level
+    return level
+
+
+def sync_levels(force=False):
+    """Apply level overrides set by other workers; cheap no-op between LEVEL_SYNC_SECONDS checks."""
+    now = time.monotonic()
+    if not force and now - _state["synced_at"] < LEVEL_SYNC_SECONDS:
+        return
+    _state["synced_at"] = now
+    try:
+        overrides = dict(_level_overrides.items())
+    except Exception:
+        return
+    applied = _state["applied"]
+    for name, level in overrides.items():
+        if applied.get(name) != level:
+            logging.getLogger(None if name == "root" else name).setLevel(level)
+            applied[name] = level
+
+
+def levels():
+    """Effective level of the root logger and of every logger with an explicit level."""
+    manager = logging.root.manager
+    result = {"root": logging.getLevelName(logging.root.level)}
+    for name, lg in sorted(manager.loggerDict.items()):
+        if isinstance(lg, logging.Logger) and lg.level != logging.NOTSET:
+            result[name] = logging.getLevelName(lg.level)
+    return result
+
+
+def stats():
+    """Handler state for the admin endpoint: queue depth and per-logger suppressed counts."""
+    handler = _state["handler"]
+    if handler is None:
+        return {"configured": False}
+    rate_filter = next((f for f in handler.filters if isinstance(f, RateLimitFilter)), None)
+    return {
+        "configured": True,
+        "queued": handler.queue.qsize(),
+        "suppressed": rate_filter.suppressed() if rate_filter else {},
+    }
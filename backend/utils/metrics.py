@@ -0,0 +1,391 @@
+"""
+Request, outbound-call, cache and image-pipeline metrics in Prometheus text format (``/metrics``).
+
+Recording never takes a lock: every thread owns a shard (counters, gauges, histograms) that only
+it writes; readers copy the shards (``dict.copy`` is atomic in CPython) and sum them. A record is
+a dict lookup plus an add.
+
+What is recorded:
+
+- ``screenmerch_http_requests_total`` / ``_request_duration_seconds`` per method and URL rule
+  (``/api/orders/<order_id>``, not the raw path), from ``before_request``/``teardown_request``;
+  ``screenmerch_http_requests_in_flight``;
+- ``screenmerch_outbound_request_duration_seconds`` per service (supabase, printful, stripe,
+  resend, other) - ``requests`` (Printful, Stripe, Resend) and ``httpx`` (Supabase) are timed at
+  the transport, so no call site changes;
+- ``screenmerch_cache_requests_total`` hits/misses of named ``TTLCache`` instances and of the
+  storefront widget cache;
+- ``screenmerch_image_stage_seconds`` for functions decorated with ``timed_stages`` that call
+  ``stage(name)`` between steps (``process_thumbnail_for_print``).
+
+Each gunicorn worker publishes its totals to the shared store every ``PUBLISH_SECONDS``; a scrape
+(answered by any worker) sums every worker on the machine. ``retire()`` (gunicorn ``worker_exit``)
+folds a recycled worker's totals into a retired total so counters don't go backwards (a worker
+killed without ``worker_exit`` drops out once its snapshot expires).
+
+``/metrics`` needs ``Authorization: Bearer $METRICS_TOKEN``; without METRICS_TOKEN it is a 404.
+"""
+import bisect
+import functools
+import hmac
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from flask import Response, abort, request
+
+from utils.cache import named_caches
+from utils.shared_store import SharedDict
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PUBLISH_SECONDS = float(os.getenv("METRICS_PUBLISH_SECONDS", "10"))
+
+# name -> (type, help)
+METRICS = {
+    "screenmerch_http_requests_total": ("counter", "HTTP requests by method, route and status."),
+    "screenmerch_http_request_duration_seconds": ("histogram", "HTTP request duration by method and route."),
+    "screenmerch_http_requests_in_flight": ("gauge", "HTTP requests being handled."),
+    "screenmerch_outbound_request_duration_seconds": ("histogram", "Outbound HTTP calls by service and outcome."),
+    "screenmerch_cache_requests_total": ("counter", "Cache lookups by cache and result (hit/miss/stale)."),
+    "screenmerch_image_stage_seconds": ("histogram", "Image pipeline stage duration."),
+}
+
+# Host suffix -> service label for outbound calls.
+OUTBOUND_SERVICES = (
+    ("supabase.co", "supabase"),
+    ("supabase.in", "supabase"),
+    ("printful.com", "printful"),
+    ("stripe.com", "stripe"),
+    ("resend.com", "resend"),
+)
+
+_local = threading.local()
+_shards = []
+_shards_lock = threading.Lock()
+_snapshots = SharedDict("metrics_workers", ttl=max(60.0, PUBLISH_SECONDS * 6))
+_retired = SharedDict("metrics_retired")
+_publisher = {"pid": None}
+
+
+def _shard():
+    try:
+        return _local.shard
+    except AttributeError:
+        shard = ({}, {}, {})  # counters, gauges, histograms
+        with _shards_lock:
+            _shards.append(shard)
+        _local.shard = shard
+        return shard
+
+
+def _reset_after_fork():
+    # Counts recorded in the gunicorn master (preload) belong to no worker.
+    global _local, _shards
+    _local = threading.local()
+    _shards = []
+    _publisher["pid"] = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def inc(name, labels=(), value=1):
+    """Add ``value`` to a counter. ``labels`` is a tuple of (name, value) pairs in a fixed order."""
+    counters = _shard()[0]
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + value
+
+
+def gauge_add(name, delta, labels=()):
+    gauges = _shard()[1]
+    key = (name, labels)
+    gauges[key] = gauges.get(key, 0) + delta
+
+
+def observe(name, seconds, labels=()):
+    """Record a duration into a histogram with DURATION_BUCKETS."""
+    histograms = _shard()[2]
+    key = (name, labels)
+    row = histograms.get(key)
+    if row is None:
+        # Per-bucket (non-cumulative) counts, then +Inf, sum, count.
+        row = histograms[key] = [0] * (len(DURATION_BUCKETS) + 3)
+    row[bisect.bisect_left(DURATION_BUCKETS, seconds)] += 1
+    row[-2] += seconds
+    row[-1] += 1
+
+
+# --- image pipeline stages ---------------------------------------------------------------------
+
+def timed_stages(pipeline):
+    """Decorator: ``stage(name)`` calls inside the function record time since the previous mark;
+    the whole call is recorded as stage ``total``."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            outer = getattr(_local, "stages", None)
+            start = time.perf_counter()
+            _local.stages = [pipeline, start]
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _local.stages = outer
+                observe("screenmerch_image_stage_seconds", time.perf_counter() - start,
+                        (("pipeline", pipeline), ("stage", "total")))
+        return wrapper
+    return decorator
+
+
+def stage(name):
+    """Close the current stage of the enclosing ``timed_stages`` call (no-op outside one)."""
+    current = getattr(_local, "stages", None)
+    if current is None:
+        return
+    now = time.perf_counter()
+    observe("screenmerch_image_stage_seconds", now - current[1], (("pipeline", current[0]), ("stage", name)))
+    current[1] = now
+
+
+# --- outbound HTTP ------------------------------------------------------------------------------
+
+def service_for_host(host):
+    host = (host or "").lower()
+    for suffix, service in OUTBOUND_SERVICES:
+        if host == suffix or host.endswith("." + suffix):
+            return service
+    supabase_host = urlparse(os.getenv("SUPABASE_URL") or "").hostname
+    if supabase_host and host == supabase_host:
+        return "supabase"
+    return "other"
+
+
+def _record_outbound(host, method, start, status=None):
+    outcome = f"{status // 100}xx" if status else "error"
+    observe("screenmerch_outbound_request_duration_seconds", time.perf_counter() - start,
+            (("service", service_for_host(host)), ("method", method), ("outcome", outcome)))
+
+
+def instrument_http():
+    """Time every ``requests`` and ``httpx`` (sync) call at the transport. Idempotent."""
+    try:
+        from requests.adapters import HTTPAdapter
+    except ImportError:
+        HTTPAdapter = None
+    if HTTPAdapter is not None and not getattr(HTTPAdapter.send, "_metrics", False):
+        original_send = HTTPAdapter.send
+
+        @functools.wraps(original_send)
+        def send(self, request, *args, **kwargs):
+            start = time.perf_counter()
+            status = None
+            try:
+                response = original_send(self, request, *args, **kwargs)
+                status = response.status_code
+                return response
+            finally:
+                _record_outbound(urlparse(request.url).hostname, request.method, start, status)
+
+        send._metrics = True
+        HTTPAdapter.send = send
+
+    try:
+        import httpx
+    except ImportError:
+        return
+    if not getattr(httpx.HTTPTransport.handle_request, "_metrics", False):
+        original_handle = httpx.HTTPTransport.handle_request
+
+        @functools.wraps(original_handle)
+        def handle_request(self, request):
+            start = time.perf_counter()
+            status = None
+            try:
+                response = original_handle(self, request)
+                status = response.status_code
+                return response
+            finally:
+                _record_outbound(request.url.host, request.method, start, status)
+
+        handle_request._metrics = True
+        httpx.HTTPTransport.handle_request = handle_request
+
+
+# --- snapshots, aggregation and exposition ----------------------------------------------------
+
+def snapshot():
+    """This process's totals: ``{"counters": {...}, "gauges": {...}, "histograms": {...}}``."""
+    counters, gauges, histograms = {}, {}, {}
+    for shard_counters, shard_gauges, shard_histograms in list(_shards):
+        for key, value in shard_counters.copy().items():
+            counters[key] = counters.get(key, 0) + value
+        for key, value in shard_gauges.copy().items():
+            gauges[key] = gauges.get(key, 0) + value
+        for key, row in shard_histograms.copy().items():
+            _add_row(histograms, key, row[:])
+    for name, cache in named_caches().items():
+        for result, value in (("hit", cache.hits), ("miss", cache.misses)):
+            key = ("screenmerch_cache_requests_total", (("cache", name), ("result", result)))
+            counters[key] = counters.get(key, 0) + value
+    return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+
+def _add_row(histograms, key, row):
+    total = histograms.get(key)
+    if total is None:
+        histograms[key] = list(row)
+    else:
+        for i, value in enumerate(row):
+            total[i] += value
+
+
+def merge(snapshots):
+    merged = {"counters": {}, "gauges": {}, "histograms": {}}
+    for snap in snapshots:
+        for kind in ("counters", "gauges"):
+            target = merged[kind]
+            for key, value in snap.get(kind, {}).items():
+                target[key] = target.get(key, 0) + value
+        for key, row in snap.get("histograms", {}).items():
+            _add_row(merged["histograms"], key, row)
+    return merged
+
+
+def publish():
+    """Write this worker's totals to the shared store (a scrape on any worker then includes them)."""
+    _snapshots[str(os.getpid())] = snapshot()
+
+
+def retire():
+    """Worker is exiting: keep its counters in the ``retired`` entry and drop its live snapshot."""
+    finished = snapshot()
+    finished["gauges"] = {}
+    _retired["totals"] = merge([_retired.get("totals") or {}, finished])
+    _snapshots.pop(str(os.getpid()), None)
+
+
+def collect():
+    """Totals for every worker on the machine (this one read live)."""
+    own = snapshot()
+    try:
+        _snapshots[str(os.getpid())] = own
+        others = [snap for pid, snap in _snapshots.items() if pid != str(os.getpid())]
+        others.append(_retired.get("totals") or {})
+    except Exception:
+        others = []
+    return merge([own] + others)
+
+
+def _ensure_publisher():
+    if _publisher["pid"] == os.getpid():
+        return
+    with _shards_lock:
+        if _publisher["pid"] == os.getpid():
+            return
+        _publisher["pid"] = os.getpid()
+
+    def loop():
+        while True:
+            time.sleep(PUBLISH_SECONDS)
+            try:
+                publish()
+            except Exception:
+                pass
+
+    threading.Thread(target=loop, name="metrics-publisher", daemon=True).start()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render(data):
+    """Prometheus text exposition (version 0.0.4) of a ``snapshot``/``merge`` result."""
+    by_name = {}
+    for kind in ("counters", "gauges", "histograms"):
+        for (name, labels), value in data.get(kind, {}).items():
+            by_name.setdefault(name, []).append((labels, value))
+    lines = []
+    for name in sorted(set(METRICS) | set(by_name)):
+        kind, help_text = METRICS.get(name, ("untyped", ""))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(by_name.get(name, []), key=lambda item: item[0]):
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + ("+Inf",), value[:-2]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(float(bound))
+                lines.append(f"{name}_bucket{_labels(labels, (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(value[-2])}")
+            lines.append(f"{name}_count{_labels(labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Flask integration ------------------------------------------------------------------------
+
+def _before_request():
+    # One request per thread at a time (gthread, and gevent patches threading.local), so the
+    # start time lives in the thread's own state instead of flask.g.
+    if _publisher["pid"] != os.getpid():
+        _ensure_publisher()
+    _local.request = [time.perf_counter(), 500]
+    gauge_add("screenmerch_http_requests_in_flight", 1)
+
+
+def _after_request(response):
+    current = getattr(_local, "request", None)
+    if current is not None:
+        current[1] = response.status_code
+    return response
+
+
+def _teardown_request(exc):
+    current = getattr(_local, "request", None)
+    if current is None:
+        return
+    _local.request = None
+    gauge_add("screenmerch_http_requests_in_flight", -1)
+    req = request._get_current_object()
+    rule = req.url_rule
+    route = rule.rule if rule is not None else "unmatched"
+    inc("screenmerch_http_requests_total", (("method", req.method), ("route", route), ("status", str(current[1]))))
+    observe("screenmerch_http_request_duration_seconds", time.perf_counter() - current[0],
+            (("method", req.method), ("route", route)))
+
+
+def metrics_view():
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        abort(404)
+    supplied = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+        return Response("unauthorized\n", status=401, mimetype="text/plain",
+                        headers={"WWW-Authenticate": 'Bearer realm="metrics"'})
+    return Response(render(collect()), mimetype="text/plain; version=0.0.4; charset=utf-8",
+                    headers={"Cache-Control": "no-store"})
+
+
+def init_app(app):
+    """Register the request hooks (call right after creating the app so they run first) and /metrics."""
+    instrument_http()
+    app.before_request_funcs.setdefault(None, []).insert(0, _before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view, methods=["GET"])
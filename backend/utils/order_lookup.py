@@ -0,0 +1,182 @@
+"""
+Resolve an `orders` row from any key form used in emails and admin links.
+
+Links carry ``ORD-XXXXXXXX``, the bare order_number, the Stripe/Postgres UUID, or just an
+8-char suffix. ``resolve_order`` turns all of them into one PostgREST ``or=(...)`` query over the
+indexed key columns (sql/orders_lookup_indexes.sql), picks the best match in Python with the
+same precedence the old one-query-per-form cascade had, and remembers key -> canonical order_id
+so repeat clicks are a single ``eq('order_id', ...)``. The ``ilike`` suffix scan only runs when
+the exact forms all miss. Unauthenticated routes pass ``exact=True``: only the literal
+order_id / id / order_number match, with no suffix forms and no cache.
+"""
+import logging
+import re
+
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+UUID_RE = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$",
+    re.IGNORECASE,
+)
+
+# Columns the admin order detail page and resolver need (no screenshot blobs).
+ORDER_DETAIL_COLUMNS = (
+    "order_id,order_number,cart,status,created_at,video_title,creator_name,video_url,"
+    "shipping_cost,shipping_address,customer_email,customer_phone,total_amount"
+)
+
+# Lookup key -> canonical order_id. Order ids never change, so entries are pinned (LRU-bounded).
+_canonical_ids = TTLCache(ttl=0, maxsize=4096, name="order_canonical_ids")
+# Set to False the first time PostgREST rejects `id` (tables created without a uuid primary key).
+_orders_has_id_column = True
+
+
+def ord_candidates_from_order_key(oid):
+    """Build possible ORD-XXXXXXXX keys from a path segment (ORD-xxx, 8-char hex, full UUID, etc.)."""
+    out = []
+    if not oid:
+        return out
+    s = str(oid).strip()
+    if not s:
+        return out
+    # Full UUID (e.g. from Stripe): map to ORD-{first8} and ORD-{last8} of the 32 hex chars
+    if UUID_RE.match(s):
+        hex32 = s.replace("-", "").lower()
+        if len(hex32) == 32:
+            out.append(f"ORD-{hex32[:8].upper()}")
+            out.append(f"ORD-{hex32[-8:].upper()}")
+    frag = re.sub(r"[^0-9a-fA-F]", "", s.replace("ORD-", "").replace("ord-", ""))
+    if len(frag) >= 8:
+        out.append(f"ORD-{frag[:8].upper()}")
+        out.append(f"ORD-{frag[-8:].upper()}")
+    # de-dupe preserving order
+    seen = set()
+    uniq = []
+    for x in out:
+        if x and x not in seen:
+            seen.add(x)
+            uniq.append(x)
+    return uniq
+
+
+def order_key_matchers(oid, include_id=True, exact=False):
+    """
+    Every (column, value) pair that identifies ``oid``, most specific first. The position in
+    this list is the match precedence. ``exact`` keeps only the literal column matches.
+    """
+    oid = str(oid).strip()
+    matchers = [("order_id", oid)]
+    if include_id and UUID_RE.match(oid):
+        matchers.append(("id", oid))
+    matchers.append(("order_number", oid))
+    if exact:
+        return matchers
+    stripped = oid.replace("ORD-", "")
+    if stripped != oid:
+        matchers.append(("order_number", stripped))
+    for cand in ord_candidates_from_order_key(oid):
+        if cand != oid:
+            matchers.append(("order_id", cand))
+    return matchers
+
+
+def _quote(value):
+    # PostgREST list values: double-quote so commas, dots and parens in user input stay literal.
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _or_filter(matchers):
+    by_column = {}
+    for column, value in matchers:
+        by_column.setdefault(column, [])
+        if value not in by_column[column]:
+            by_column[column].append(value)
+    return ",".join(f"{column}.in.({','.join(_quote(v) for v in values)})" for column, values in by_column.items())
+
+
+def _with_key_columns(columns, include_id):
+    if columns.strip() == "*":
+        return "*"
+    wanted = [c.strip() for c in columns.split(",") if c.strip()]
+    for key in ("order_id", "order_number") + (("id",) if include_id else ()):
+        if key not in wanted:
+            wanted.append(key)
+    return ",".join(wanted)
+
+
+def _best_match(rows, matchers):
+    def rank(row):
+        for i, (column, value) in enumerate(matchers):
+            if row.get(column) is not None and str(row.get(column)) == value:
+                return i
+        return len(matchers)
+    return min(rows, key=rank) if rows else None
+
+
+def _is_missing_id_column(error):
+    # PostgREST relays Postgres 42703: 'column orders.id does not exist'.
+    return "orders.id does not exist" in str(error)
+
+
+def _query_matches(client, oid, columns, exact=False):
+    global _orders_has_id_column
+    matchers = order_key_matchers(oid, include_id=_orders_has_id_column, exact=exact)
+    by_id = any(column == "id" for column, _ in matchers)
+    try:
+        r = (client.table("orders").select(_with_key_columns(columns, by_id))
+             .or_(_or_filter(matchers)).limit(10).execute())
+    except Exception as e:
+        if not by_id or not _is_missing_id_column(e):
+            raise
+        # Older schemas have no uuid `id` column: drop that form and retry once.
+        logger.info("orders lookup without id column (%s)", e)
+        _orders_has_id_column = False
+        matchers = order_key_matchers(oid, include_id=False, exact=exact)
+        r = (client.table("orders").select(_with_key_columns(columns, False))
+             .or_(_or_filter(matchers)).limit(10).execute())
+    return _best_match(r.data or [], matchers)
+
+
+def resolve_order(client, order_key, columns="*", exact=False):
+    """
+    Resolve a row from `orders` when the URL/email uses ORD-XXXX, order_number, full UUID, or 8-char suffix.
+    Returns (row dict with ``columns`` or None, canonical_order_id str or None).
+    ``exact=True`` only accepts a literal order_id, uuid id or order_number (public routes).
+    """
+    if not client or not order_key:
+        return None, None
+    oid = str(order_key).strip()
+    if not oid:
+        return None, None
+    try:
+        if exact:
+            row = _query_matches(client, oid, columns, exact=True)
+            return (row, row.get("order_id") or oid) if row else (None, None)
+        canonical = _canonical_ids.get(oid)
+        if canonical is not None:
+            r = client.table("orders").select(columns).eq("order_id", canonical).limit(1).execute()
+            if r.data:
+                return r.data[0], canonical
+            _canonical_ids.pop(oid)  # order deleted/renamed: resolve from scratch
+
+        row = _query_matches(client, oid, columns)
+        if row is None:
+            suffix = re.sub(r"[^0-9a-fA-F]", "", oid.replace("ORD-", "").replace("-", ""))
+            if len(suffix) >= 4:
+                r = client.table("orders").select(columns).ilike("order_id", f"%{suffix}%").limit(1).execute()
+                row = r.data[0] if r.data else None
+        if row is None:
+            return None, None
+        if row.get("order_id"):
+            _canonical_ids.set(oid, row["order_id"])
+            return row, row["order_id"]
+        return row, oid
+    except Exception as e:
+        logger.warning("Order lookup failed for %s: %s", order_key, e)
+    return None, None
+
+
+def clear_order_lookup_cache():
+    _canonical_ids.invalidate()
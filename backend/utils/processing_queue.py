@@ -0,0 +1,132 @@
+"""
+Read model for the admin processing queue.
+
+``fetch_queue_page`` returns one page of ``order_processing_queue`` rows, filtered (status,
+priority, assignee) and paginated by PostgREST, each with a small order summary under ``orders``
+and the assignee under ``assigned_to_user``: the fields the portal table shows, not the order's
+cart and screenshots. Both come from resources embedded over the queue's foreign keys, so a page
+is one request; databases where PostgREST cannot see those relationships fall back to three
+batched queries (queue page, orders ``in``, users ``in``). ``item_count`` is a computed column
+(sql/order_processing_queue_read_model.sql) and is left out where that function is missing.
+
+``fetch_queue_item`` loads one row with the full order for the detail panel.
+"""
+import logging
+
+from utils.order_lookup import ORDER_DETAIL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("pending", "assigned", "processing", "completed", "reviewed", "failed")
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+ORDER_SUMMARY_COLUMNS = "order_id,order_number,status,created_at,total_amount,customer_email,creator_name,video_title"
+USER_COLUMNS = "id,display_name,email"
+
+# Flipped off the first time PostgREST rejects them; both stay off for the process lifetime.
+_embed_supported = True
+_item_count_supported = True
+
+
+class QueueFilterError(ValueError):
+    pass
+
+
+def parse_filters(args):
+    """Filters from query args (``status``, ``priority``, ``assigned_to``, ``page``, ``limit``)."""
+    status = (args.get("status") or "all").strip().lower()
+    statuses = [] if status == "all" else [s.strip() for s in status.split(",") if s.strip()]
+    unknown = [s for s in statuses if s not in STATUSES]
+    if unknown:
+        raise QueueFilterError(f"Unknown status: {', '.join(unknown)}")
+    priority = (args.get("priority") or "all").strip().lower()
+    try:
+        priority = None if priority == "all" else int(priority)
+        page = max(0, int(args.get("page", 0)))
+        limit = min(MAX_LIMIT, max(1, int(args.get("limit", DEFAULT_LIMIT))))
+    except (TypeError, ValueError):
+        raise QueueFilterError("priority, page and limit must be integers")
+    return {
+        "statuses": statuses,
+        "priority": priority,
+        "assigned_to": (args.get("assigned_to") or "").strip() or None,
+        "page": page,
+        "limit": limit,
+    }
+
+
+def _order_columns():
+    return ORDER_SUMMARY_COLUMNS + (",item_count" if _item_count_supported else "")
+
+
+def _page_query(client, columns, filters):
+    query = client.table("order_processing_queue").select(columns, count="exact")
+    if len(filters["statuses"]) == 1:
+        query = query.eq("status", filters["statuses"][0])
+    elif filters["statuses"]:
+        query = query.in_("status", filters["statuses"])
+    if filters["priority"] is not None:
+        query = query.eq("priority", filters["priority"])
+    if filters["assigned_to"]:
+        query = query.eq("assigned_to", filters["assigned_to"])
+    start = filters["page"] * filters["limit"]
+    return (query.order("priority", desc=True).order("created_at")
+            .range(start, start + filters["limit"] - 1).execute())
+
+
+def _embedded(client, filters):
+    columns = f"*,orders({_order_columns()}),assigned_to_user:users!assigned_to({USER_COLUMNS})"
+    result = _page_query(client, columns, filters)
+    return result.data or [], result.count
+
+
+def _batched(client, filters):
+    result = _page_query(client, "*", filters)
+    rows = result.data or []
+    order_ids = sorted({r["order_id"] for r in rows if r.get("order_id")})
+    user_ids = sorted({r["assigned_to"] for r in rows if r.get("assigned_to")})
+    orders, users = {}, {}
+    if order_ids:
+        found = client.table("orders").select(_order_columns()).in_("order_id", order_ids).execute()
+        orders = {o["order_id"]: o for o in found.data or []}
+    if user_ids:
+        found = client.table("users").select(USER_COLUMNS).in_("id", user_ids).execute()
+        users = {u["id"]: u for u in found.data or []}
+    for row in rows:
+        row["orders"] = orders.get(row.get("order_id"))
+        row["assigned_to_user"] = users.get(row.get("assigned_to"))
+    return rows, result.count
+
+
+def fetch_queue_page(client, filters):
+    """``(rows, total)`` for one page of the queue; ``total`` counts every row matching the filters."""
+    global _embed_supported, _item_count_supported
+    while True:
+        try:
+            rows, total = (_embedded if _embed_supported else _batched)(client, filters)
+            break
+        except Exception as e:
+            # Only schema gaps switch modes; timeouts and other errors leave the fast path on.
+            if _item_count_supported and "item_count" in str(e) and "does not exist" in str(e):
+                logger.info("processing queue without item_count (%s)", e)
+                _item_count_supported = False
+            elif _embed_supported and "could not find a relationship" in str(e).lower():
+                logger.info("processing queue without embedded orders/users (%s)", e)
+                _embed_supported = False
+            else:
+                raise
+    return rows, total if total is not None else len(rows)
+
+
+def fetch_queue_item(client, queue_id):
+    """One queue row with the full order (cart, shipping address) under ``orders``, or None."""
+    result = client.table("order_processing_queue").select("*").eq("id", queue_id).limit(1).execute()
+    if not result.data:
+        return None
+    row = result.data[0]
+    row["orders"] = None
+    if row.get("order_id"):
+        order = client.table("orders").select(ORDER_DETAIL_COLUMNS).eq("order_id", row["order_id"]).limit(1).execute()
+        row["orders"] = order.data[0] if order.data else None
+    return row
@@ -0,0 +1,284 @@
+"""
+Opt-in request profiling for slow endpoints. Captures go to a ring directory and are listed and
+downloaded through ``/api/admin/profiles``.
+
+Triggers:
+
+- on demand: a master admin (admin session or verified bearer token) sends ``X-Profile: 1`` (or
+  ``?_profile=1``). The request runs under cProfile and the response carries ``X-Profile-Id``;
+- sampled: ``PROFILE_SAMPLE_RATE`` (0..1) of requests to ``PROFILE_PATHS`` run under cProfile;
+- slow: while a request to ``PROFILE_PATHS`` is in flight, a sampler thread records its stack
+  every ``PROFILE_INTERVAL_MS``. If the request takes longer than ``PROFILE_SLOW_MS`` the samples
+  are kept as collapsed stacks (flamegraph.pl / speedscope input); otherwise they are dropped.
+  The sampler only wakes while a watched request is running.
+
+Each capture is ``<id>.json`` (path, status, duration, trigger) plus ``<id>.prof`` (pstats, e.g.
+snakeviz) and ``<id>.txt`` (top functions by cumulative time), or ``<id>.collapsed``.
+
+Environment:
+  PROFILE_DIR           ring directory (default <tmp>/screenmerch-profiles)
+  PROFILE_KEEP          captures kept, oldest deleted first (default 50)
+  PROFILE_PATHS         comma-separated path prefixes watched for sampling/slow capture
+                        (default: /api/analytics, /api/admin/platform-revenue,
+                        /api/process-thumbnail-print-quality)
+  PROFILE_SLOW_MS       slow-capture threshold in ms (default 2000, 0 = off)
+  PROFILE_INTERVAL_MS   stack sampling interval (default 10)
+  PROFILE_SAMPLE_RATE   fraction of watched requests run under cProfile (default 0)
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATHS = "/api/analytics,/api/admin/platform-revenue,/api/process-thumbnail-print-quality"
+KINDS = {"prof": "application/octet-stream", "txt": "text/plain", "collapsed": "text/plain", "json": "application/json"}
+_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{12}-[0-9a-f]{8}$")
+
+_local = threading.local()
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return float(default)
+
+
+class Settings:
+    def __init__(self):
+        self.directory = os.getenv("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "screenmerch-profiles")
+        self.keep = max(1, int(_env_float("PROFILE_KEEP", "50")))
+        self.paths = tuple(p.strip() for p in (os.getenv("PROFILE_PATHS") or DEFAULT_PATHS).split(",") if p.strip())
+        self.slow_seconds = _env_float("PROFILE_SLOW_MS", "2000") / 1000.0
+        self.interval = max(0.001, _env_float("PROFILE_INTERVAL_MS", "10") / 1000.0)
+        self.sample_rate = _env_float("PROFILE_SAMPLE_RATE", "0")
+
+    def watches(self, path):
+        return any(path == p or path.startswith(p.rstrip("/") + "/") for p in self.paths)
+
+
+settings = Settings()
+
+
+def collapse(frame):
+    """``module:function;...`` from the outermost frame to ``frame``, as flamegraph tools expect."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+        names.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """One thread per process that samples the stacks of watched threads."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._pid = None
+
+    def watch(self, ident):
+        counts = Counter()
+        with self._lock:
+            self._watched[ident] = counts
+            if self._pid != os.getpid():
+                # First use in this process (gunicorn forks after import): start the thread here.
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name="profile-sampler", daemon=True).start()
+        self._active.set()
+        return counts
+
+    def unwatch(self, ident):
+        with self._lock:
+            counts = self._watched.pop(ident, None)
+            if not self._watched:
+                self._active.clear()
+        return counts
+
+    def sample_once(self):
+        with self._lock:
+            watched = list(self._watched.items())
+        if not watched:
+            return
+        frames = sys._current_frames()
+        for ident, counts in watched:
+            frame = frames.get(ident)
+            if frame is not None:
+                counts[collapse(frame)] += 1
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            self.sample_once()
+            time.sleep(self.interval)
+
+
+_sampler = StackSampler(settings.interval)
+
+
+def _new_id():
+    # Sorts by time, so pruning by name drops the oldest captures.
+    return f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+
+
+def _write(profile_id, kind, data):
+    os.makedirs(settings.directory, exist_ok=True)
+    path = os.path.join(settings.directory, f"{profile_id}.{kind}")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data if isinstance(data, bytes) else data.encode("utf-8"))
+    os.replace(tmp, path)
+    return path
+
+
+def _prune():
+    try:
+        ids = sorted({name.split(".", 1)[0] for name in os.listdir(settings.directory)
+                      if _ID_RE.match(name.split(".", 1)[0])})
+    except FileNotFoundError:
+        return
+    for profile_id in ids[:-settings.keep]:
+        for kind in KINDS:
+            try:
+                os.remove(os.path.join(settings.directory, f"{profile_id}.{kind}"))
+            except FileNotFoundError:
+                pass
+
+
+def save_cprofile(profile_id, profiler, meta):
+    """Write the pstats dump, a top-40 text report and the metadata of a cProfile capture."""
+    os.makedirs(settings.directory, exist_ok=True)
+    profiler.dump_stats(os.path.join(settings.directory, f"{profile_id}.prof"))
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(40)
+    _write(profile_id, "txt", report.getvalue())
+    _write(profile_id, "json", json.dumps(meta))
+    _prune()
+
+
+def save_collapsed(profile_id, counts, meta):
+    """Write sampled stacks (``stack count`` per line) and the metadata of a slow-request capture."""
+    lines = [f"{stack} {n}" for stack, n in sorted(counts.items())]
+    _write(profile_id, "collapsed", "\n".join(lines) + "\n")
+    _write(profile_id, "json", json.dumps(dict(meta, samples=sum(counts.values()))))
+    _prune()
+
+
+def list_profiles():
+    """Metadata of stored captures, newest first."""
+    try:
+        names = sorted((n for n in os.listdir(settings.directory) if n.endswith(".json")), reverse=True)
+    except FileNotFoundError:
+        return []
+    captures = []
+    for name in names:
+        profile_id = name[:-5]
+        try:
+            with open(os.path.join(settings.directory, name)) as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        meta["id"] = profile_id
+        meta["files"] = [k for k in KINDS if os.path.exists(os.path.join(settings.directory, f"{profile_id}.{k}"))]
+        captures.append(meta)
+    return captures
+
+
+def path_for(profile_id, kind):
+    """File path of one capture artifact, or None (unknown id/kind, or already rotated out)."""
+    if kind not in KINDS or not _ID_RE.match(profile_id or ""):
+        return None
+    path = os.path.join(settings.directory, f"{profile_id}.{kind}")
+    return path if os.path.exists(path) else None
+
+
+# --- Flask integration ------------------------------------------------------------------------
+
+def _requested():
+    return request.headers.get("X-Profile") == "1" or request.args.get("_profile") == "1"
+
+
+def init_app(app, authorize):
+    """Register the hooks. ``authorize()`` decides (in request context) if an on-demand profile is allowed."""
+
+    def before():
+        _local.capture = None
+        if request.method == "OPTIONS":
+            return
+        trigger = None
+        if _requested() and authorize():
+            trigger = "on_demand"
+        elif settings.watches(request.path):
+            if settings.sample_rate and random.random() < settings.sample_rate:
+                trigger = "sampled"
+            elif settings.slow_seconds > 0:
+                _local.capture = {"trigger": "slow", "start": time.perf_counter(),
+                                  "counts": _sampler.watch(threading.get_ident())}
+                return
+        if trigger:
+            profiler = cProfile.Profile()
+            _local.capture = {"trigger": trigger, "start": time.perf_counter(), "profiler": profiler,
+                              "id": _new_id()}
+            profiler.enable()
+
+    def after(response):
+        capture = getattr(_local, "capture", None)
+        if capture is not None:
+            capture["status"] = response.status_code
+            if "id" in capture:
+                response.headers["X-Profile-Id"] = capture["id"]
+        return response
+
+    def teardown(exc):
+        capture = getattr(_local, "capture", None)
+        if capture is None:
+            return
+        _local.capture = None
+        profiler = capture.get("profiler")
+        if profiler is not None:
+            profiler.disable()
+        elif _sampler.unwatch(threading.get_ident()) is None:
+            return
+        duration = time.perf_counter() - capture["start"]
+        meta = {
+            "method": request.method,
+            "path": request.path,
+            "status": capture.get("status", 500),
+            "duration_ms": round(duration * 1000, 1),
+            "trigger": capture["trigger"],
+            "pid": os.getpid(),
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        try:
+            if profiler is not None:
+                save_cprofile(capture["id"], profiler, meta)
+            elif duration >= settings.slow_seconds and capture["counts"]:
+                profile_id = _new_id()
+                save_collapsed(profile_id, dict(capture["counts"]), meta)
+                logger.warning("Slow request %s %s took %.0f ms; stacks saved as profile %s",
+                               request.method, request.path, duration * 1000, profile_id)
+        except OSError as e:
+            logger.warning("Could not save request profile: %s", e)
+
+    app.before_request(before)
+    app.after_request(after)
+    app.teardown_request(teardown)
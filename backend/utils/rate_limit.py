@@ -0,0 +1,319 @@
+"""
+GCRA (token-bucket equivalent) rate limiting with pluggable shared storage.
+
+Each limit key stores a single float - its theoretical arrival time (TAT) - so a check is
+O(1) regardless of traffic. Storage backends:
+
+- ``memory://``            process-local dict (tests, single worker)
+- ``sqlite:///path.db``    shared by every gunicorn worker on one machine (default)
+- ``redis://host:6379/0``  any Redis-protocol server (Redis, KeyDB, Dragonfly, Upstash)
+
+Pick one with ``RATE_LIMIT_STORAGE_URI``. Blocks (temporary bans) live in the same backend and
+expire on their own; stale keys are evicted periodically.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from utils.shared_store import LocalSQLite, default_sqlite_path
+
+logger = logging.getLogger(__name__)
+
+RateLimitResult = namedtuple("RateLimitResult", ["allowed", "remaining", "retry_after"])
+
+_PERIODS = {
+    "second": 1, "seconds": 1,
+    "minute": 60, "minutes": 60,
+    "hour": 3600, "hours": 3600,
+    "day": 86400, "days": 86400,
+}
+_RATE_RE = re.compile(r"^\s*(\d+)\s*(?:per|/)\s*(\d+)?\s*([a-z]+)\s*$", re.IGNORECASE)
+
+
+def parse_rate(spec):
+    """Parse Flask-Limiter style strings: ``"10 per minute"``, ``"200/day"``, ``"5 per 10 seconds"``."""
+    m = _RATE_RE.match(spec or "")
+    if not m or m.group(3).lower() not in _PERIODS:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    count = int(m.group(1))
+    multiplier = int(m.group(2) or 1)
+    if count <= 0:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    return count, float(multiplier * _PERIODS[m.group(3).lower()])
+
+
+def _gcra(tat, now, limit, period, cost):
+    """
+    One GCRA step. Returns (allowed, new_tat, remaining, retry_after).
+
+    ``limit`` requests may arrive back to back; after that they are admitted once every
+    ``period / limit`` seconds.
+    """
+    interval = period / limit
+    tat = max(tat if tat is not None else now, now)
+    new_tat = tat + interval * cost
+    diff = new_tat - now
+    if diff > period:
+        return False, tat, 0, diff - period
+    remaining = int((period - diff) // interval)
+    return True, new_tat, remaining, 0.0
+
+
+class MemoryBackend:
+    """Process-local storage. Limits are per worker; use for tests and single-process dev."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tats = {}
+        self._blocks = {}
+
+    def hit(self, key, limit, period, cost, now):
+        with self._lock:
+            allowed, new_tat, remaining, retry_after = _gcra(self._tats.get(key), now, limit, period, cost)
+            if allowed:
+                self._tats[key] = new_tat
+        return RateLimitResult(allowed, remaining, retry_after)
+
+    def block(self, key, until):
+        with self._lock:
+            self._blocks[key] = until
+
+    def blocked_until(self, key, now):
+        with self._lock:
+            until = self._blocks.get(key)
+            if until is not None and until <= now:
+                del self._blocks[key]
+                return None
+        return until
+
+    def unblock(self, key):
+        with self._lock:
+            self._blocks.pop(key, None)
+
+    def evict(self, now):
+        with self._lock:
+            stale = [k for k, tat in self._tats.items() if tat <= now]
+            for k in stale:
+                del self._tats[k]
+            expired = [k for k, until in self._blocks.items() if until <= now]
+            for k in expired:
+                del self._blocks[k]
+        return len(stale) + len(expired)
+
+    def reset(self):
+        with self._lock:
+            self._tats.clear()
+            self._blocks.clear()
+
+
+class SQLiteBackend:
+    """
+    Shared storage for every process on one machine (gunicorn workers).
+
+    WAL mode + ``BEGIN IMMEDIATE`` serialises the read-modify-write of a key across processes;
+    each thread keeps its own connection and connections are never shared across a fork.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = LocalSQLite(path)
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS rl_tat (key TEXT PRIMARY KEY, tat REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS rl_block (key TEXT PRIMARY KEY, until REAL NOT NULL)")
+
+    def _conn(self):
+        return self._db.conn()
+
+    def hit(self, key, limit, period, cost, now):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rl_tat WHERE key = ?", (key,)).fetchone()
+            allowed, new_tat, remaining, retry_after = _gcra(row[0] if row else None, now, limit, period, cost)
+            if allowed:
+                conn.execute(
+                    "INSERT INTO rl_tat (key, tat) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                    (key, new_tat),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return RateLimitResult(allowed, remaining, retry_after)
+
+    def block(self, key, until):
+        self._conn().execute(
+            "INSERT INTO rl_block (key, until) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET until = excluded.until",
+            (key, until),
+        )
+
+    def blocked_until(self, key, now):
+        row = self._conn().execute("SELECT until FROM rl_block WHERE key = ? AND until > ?", (key, now)).fetchone()
+        return row[0] if row else None
+
+    def unblock(self, key):
+        self._conn().execute("DELETE FROM rl_block WHERE key = ?", (key,))
+
+    def evict(self, now):
+        conn = self._conn()
+        n = conn.execute("DELETE FROM rl_tat WHERE tat <= ?", (now,)).rowcount
+        n += conn.execute("DELETE FROM rl_block WHERE until <= ?", (now,)).rowcount
+        return n
+
+    def reset(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM rl_tat")
+        conn.execute("DELETE FROM rl_block")
+
+
+# KEYS[1]=tat key; ARGV: now, limit, period, cost. Returns {allowed, remaining, retry_after}.
+_REDIS_GCRA = """
+local now = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local interval = period / limit
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval * cost
+local diff = new_tat - now
+if diff > period then
+  return {0, 0, tostring(diff - period)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(diff * 1000))
+return {1, math.floor((period - diff) / interval), '0'}
+"""
+
+
+class RedisBackend:
+    """
+    Storage on any Redis-protocol server. ``client`` is a redis-py compatible client
+    (``redis.Redis``, ``fakeredis.FakeRedis``); keys expire server-side so no eviction is needed.
+    """
+
+    def __init__(self, client, prefix="rl:"):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_REDIS_GCRA)
+
+    @classmethod
+    def from_url(cls, url):
+        import redis  # optional dependency; only needed for redis:// storage
+        return cls(redis.Redis.from_url(url))
+
+    def hit(self, key, limit, period, cost, now):
+        allowed, remaining, retry_after = self._script(
+            keys=[self.prefix + "tat:" + key], args=[repr(now), limit, repr(period), cost]
+        )
+        return RateLimitResult(bool(int(allowed)), int(remaining), float(retry_after))
+
+    def block(self, key, until):
+        ttl_ms = max(1, int((until - time.time()) * 1000))
+        self.client.set(self.prefix + "block:" + key, repr(until), px=ttl_ms)
+
+    def blocked_until(self, key, now):
+        value = self.client.get(self.prefix + "block:" + key)
+        if value is None:
+            return None
+        until = float(value)
+        return until if until > now else None
+
+    def unblock(self, key):
+        self.client.delete(self.prefix + "block:" + key)
+
+    def evict(self, now):
+        return 0
+
+    def reset(self):
+        for k in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(k)
+
+
+def backend_from_uri(uri):
+    """Build a storage backend from ``memory://``, ``sqlite:///path`` or ``redis://...``."""
+    uri = (uri or "").strip()
+    if not uri or uri.startswith("sqlite://"):
+        path = uri[len("sqlite:///"):] if uri.startswith("sqlite:///") else ""
+        return SQLiteBackend(path or default_sqlite_path("ratelimit"))
+    if uri.startswith("memory://"):
+        return MemoryBackend()
+    if uri.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend.from_url(uri)
+    raise ValueError(f"Unsupported RATE_LIMIT_STORAGE_URI: {uri}")
+
+
+class RateLimiter:
+    """Front door for rate checks and temporary blocks; evicts stale keys every ``evict_interval`` s."""
+
+    def __init__(self, backend, evict_interval=60.0, clock=time.time):
+        self.backend = backend
+        self.evict_interval = float(evict_interval)
+        self._clock = clock
+        self._next_evict = clock() + self.evict_interval
+        self._evict_lock = threading.Lock()
+
+    def hit(self, key, limit, period, cost=1):
+        now = self._clock()
+        self._maybe_evict(now)
+        try:
+            return self.backend.hit(key, limit, period, cost, now)
+        except Exception as e:
+            # Fail open: a storage hiccup must not take the site down.
+            logger.warning("Rate limit backend error for %s: %s", key, e)
+            return RateLimitResult(True, limit, 0.0)
+
+    def hit_spec(self, key, spec, cost=1):
+        limit, period = parse_rate(spec)
+        return self.hit(key, limit, period, cost)
+
+    def block(self, key, seconds):
+        try:
+            self.backend.block(key, self._clock() + float(seconds))
+        except Exception as e:
+            logger.warning("Rate limit backend error blocking %s: %s", key, e)
+
+    def is_blocked(self, key):
+        try:
+            return self.backend.blocked_until(key, self._clock()) is not None
+        except Exception as e:
+            logger.warning("Rate limit backend error for %s: %s", key, e)
+            return False
+
+    def unblock(self, key):
+        self.backend.unblock(key)
+
+    def _maybe_evict(self, now):
+        if now < self._next_evict or not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_evict = now + self.evict_interval
+            evicted = self.backend.evict(now)
+            if evicted:
+                logger.debug("Rate limiter evicted %s stale keys", evicted)
+        except Exception as e:
+            logger.warning("Rate limiter eviction failed: %s", e)
+        finally:
+            self._evict_lock.release()
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Process-wide RateLimiter on ``RATE_LIMIT_STORAGE_URI`` (falls back to memory on error)."""
+    global _shared_limiter
+    if _shared_limiter is None:
+        with _shared_lock:
+            if _shared_limiter is None:
+                uri = os.getenv("RATE_LIMIT_STORAGE_URI", "")
+                try:
+                    backend = backend_from_uri(uri)
+                except Exception as e:
+                    logger.warning("Rate limit storage %r unavailable (%s); using per-process memory", uri, e)
+                    backend = MemoryBackend()
+                _shared_limiter = RateLimiter(backend)
+    return _shared_limiter
@@ -14,6 +14,40 @@ def _login_redirect_with_next():
     return redirect(url_for("auth.admin_login", next=next_path))
 
 
+def _bearer_user_id(client):
+    """Id of the user the ``Authorization: Bearer`` token belongs to, or None if missing or rejected."""
+    auth_header = request.headers.get('Authorization') or ''
+    token = auth_header[len('Bearer '):].strip() if auth_header.startswith('Bearer ') else ''
+    if not token:
+        return None
+    try:
+        user = getattr(client.auth.get_user(token), 'user', None)
+    except Exception as e:
+        logger.warning(f"⚠️ Bearer token rejected: {str(e)}")
+        return None
+    return str(user.id) if user is not None and getattr(user, 'id', None) else None
+
+
+def verified_master_admin(client):
+    """
+    True when the caller is a master admin according to the admin session or a verified bearer
+    token. Client-supplied identity (X-User-Email, ?user_email=) is never trusted here.
+    """
+    if session.get('admin_logged_in'):
+        column, value = 'email', (session.get('admin_email') or '').strip().lower()
+    else:
+        column, value = 'id', _bearer_user_id(client)
+    if not value:
+        return False
+    try:
+        result = client.table('users').select('is_admin, admin_role').eq(column, value).limit(1).execute()
+    except Exception as e:
+        logger.error(f"Error checking master admin status: {str(e)}")
+        return False
+    user = (result.data or [None])[0]
+    return bool(user and user.get('is_admin') and user.get('admin_role') == 'master_admin')
+
+
 def admin_required(supabase_admin=None):
     """
     Decorator factory to require admin authentication - supports both session and email-based auth
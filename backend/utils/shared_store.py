@@ -0,0 +1,414 @@
+"""
+Process-shared key/value stores for state that used to live in per-worker dicts.
+
+``order_store``, ``product_data_store`` and ``session_token_store`` are ``SharedDict`` instances so
+every gunicorn worker on a machine sees the same data (read-mostly lookup tables such as the
+Printful catalog maps stay plain module dicts, shared copy-on-write after a preloaded fork):
+
+- ``sqlite:///path.db``  (default, temp dir) - shared by all workers on one machine
+- ``memory://``          per-process dict, the old behaviour (tests, single worker)
+
+Pick one with ``SHARED_STORE_URI``. Values are pickled, keys are stored as strings.
+
+A ``SharedDict`` can declare ``index={name: fn}``: ``fn(value)`` is stored next to each dict entry,
+and ``find(name=...)`` returns only the matching entries (a SQL lookup for SQLite) instead of
+unpickling the whole namespace.
+"""
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import MutableMapping
+
+_MISSING = object()
+
+
+class LocalSQLite:
+    """One SQLite connection per thread and per process (never reused across a fork)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+def default_sqlite_path(name):
+    return os.path.join(tempfile.gettempdir(), f"screenmerch-{name}.sqlite3")
+
+
+def _matches(entries, criteria):
+    """``criteria`` maps index name -> value or collection of values; all must match."""
+    for name, wanted in criteria.items():
+        options = {wanted} if isinstance(wanted, str) else set(wanted)
+        if entries.get(name) not in options:
+            return False
+    return True
+
+
+class MemoryKV:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+        self._index = {}
+
+    def get(self, ns, key, now):
+        with self._lock:
+            item = self._data.get((ns, key))
+            if item is None:
+                return _MISSING
+            value, expires_at = item
+            if expires_at is not None and expires_at <= now:
+                del self._data[(ns, key)]
+                return _MISSING
+            return value
+
+    def set(self, ns, key, value, expires_at, index=None):
+        with self._lock:
+            self._data[(ns, key)] = (pickle.loads(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)), expires_at)
+            self._index[(ns, key)] = index(value) if index else {}
+
+    def update(self, ns, key, fn, now, expires_at, index=None):
+        """Atomically replace the value with ``fn(current or _MISSING)``; returns the new value."""
+        with self._lock:
+            item = self._data.get((ns, key))
+            current = item[0] if item is not None and (item[1] is None or item[1] > now) else _MISSING
+            value = pickle.loads(pickle.dumps(fn(current), pickle.HIGHEST_PROTOCOL))
+            self._data[(ns, key)] = (value, expires_at)
+            self._index[(ns, key)] = index(value) if index else {}
+            return value
+
+    def delete(self, ns, key):
+        with self._lock:
+            self._index.pop((ns, key), None)
+            return self._data.pop((ns, key), None) is not None
+
+    def find(self, ns, criteria, now):
+        with self._lock:
+            return [
+                (k, v) for (n, k), (v, exp) in list(self._data.items())
+                if n == ns and (exp is None or exp > now) and _matches(self._index.get((n, k), {}), criteria)
+            ]
+
+    def items(self, ns, now):
+        with self._lock:
+            return [
+                (k, v) for (n, k), (v, exp) in list(self._data.items())
+                if n == ns and (exp is None or exp > now)
+            ]
+
+    def count(self, ns, now):
+        return len(self.items(ns, now))
+
+    def clear(self, ns):
+        with self._lock:
+            for k in [k for k in self._data if k[0] == ns]:
+                del self._data[k]
+                self._index.pop(k, None)
+
+    def purge_expired(self, now):
+        with self._lock:
+            doomed = [k for k, (_, exp) in self._data.items() if exp is not None and exp <= now]
+            for k in doomed:
+                del self._data[k]
+                self._index.pop(k, None)
+            return len(doomed)
+
+
+class SQLiteKV:
+    def __init__(self, path):
+        self._db = LocalSQLite(path)
+        self._db.conn().execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " ns TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, expires_at REAL,"
+            " PRIMARY KEY (ns, key))"
+        )
+        self._db.conn().execute(
+            "CREATE TABLE IF NOT EXISTS kv_index ("
+            " ns TEXT NOT NULL, key TEXT NOT NULL, name TEXT NOT NULL, value TEXT NOT NULL,"
+            " PRIMARY KEY (ns, key, name))"
+        )
+        self._db.conn().execute("CREATE INDEX IF NOT EXISTS kv_index_lookup ON kv_index (ns, name, value)")
+
+    @staticmethod
+    def _write(conn, ns, key, value, expires_at, index):
+        conn.execute(
+            "INSERT INTO kv (ns, key, value, expires_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(ns, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (ns, key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires_at),
+        )
+        if index:
+            conn.execute("DELETE FROM kv_index WHERE ns = ? AND key = ?", (ns, key))
+            conn.executemany(
+                "INSERT INTO kv_index (ns, key, name, value) VALUES (?, ?, ?, ?)",
+                [(ns, key, name, str(v)) for name, v in index(value).items()],
+            )
+
+    def get(self, ns, key, now):
+        row = self._db.conn().execute(
+            "SELECT value FROM kv WHERE ns = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (ns, key, now),
+        ).fetchone()
+        return pickle.loads(row[0]) if row else _MISSING
+
+    def set(self, ns, key, value, expires_at, index=None):
+        conn = self._db.conn()
+        if not index:
+            self._write(conn, ns, key, value, expires_at, None)
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._write(conn, ns, key, value, expires_at, index)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def update(self, ns, key, fn, now, expires_at, index=None):
+        """Atomically replace the value with ``fn(current or _MISSING)``; returns the new value."""
+        conn = self._db.conn()
+        # IMMEDIATE takes the write lock before the read, so concurrent updates serialize.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE ns = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (ns, key, now),
+            ).fetchone()
+            value = fn(pickle.loads(row[0]) if row else _MISSING)
+            self._write(conn, ns, key, value, expires_at, index)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return value
+
+    def delete(self, ns, key):
+        conn = self._db.conn()
+        conn.execute("DELETE FROM kv_index WHERE ns = ? AND key = ?", (ns, key))
+        return conn.execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, key)).rowcount > 0
+
+    def items(self, ns, now):
+        rows = self._db.conn().execute(
+            "SELECT key, value FROM kv WHERE ns = ? AND (expires_at IS NULL OR expires_at > ?)", (ns, now)
+        ).fetchall()
+        return [(k, pickle.loads(v)) for k, v in rows]
+
+    def find(self, ns, criteria, now):
+        sql = ["SELECT key, value FROM kv WHERE ns = ? AND (expires_at IS NULL OR expires_at > ?)"]
+        params = [ns, now]
+        for name, wanted in criteria.items():
+            options = [wanted] if isinstance(wanted, str) else list(wanted)
+            if not options:
+                return []
+            sql.append(f"AND key IN (SELECT key FROM kv_index WHERE ns = ? AND name = ?"
+                       f" AND value IN ({', '.join('?' * len(options))}))")
+            params += [ns, name, *options]
+        rows = self._db.conn().execute(" ".join(sql), params).fetchall()
+        return [(k, pickle.loads(v)) for k, v in rows]
+
+    def count(self, ns, now):
+        return self._db.conn().execute(
+            "SELECT COUNT(*) FROM kv WHERE ns = ? AND (expires_at IS NULL OR expires_at > ?)", (ns, now)
+        ).fetchone()[0]
+
+    def clear(self, ns):
+        self._db.conn().execute("DELETE FROM kv_index WHERE ns = ?", (ns,))
+        self._db.conn().execute("DELETE FROM kv WHERE ns = ?", (ns,))
+
+    def purge_expired(self, now):
+        conn = self._db.conn()
+        purged = conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)).rowcount
+        if purged:
+            conn.execute(
+                "DELETE FROM kv_index WHERE NOT EXISTS"
+                " (SELECT 1 FROM kv WHERE kv.ns = kv_index.ns AND kv.key = kv_index.key)"
+            )
+        return purged
+
+
+def kv_from_uri(uri):
+    uri = (uri or "").strip()
+    if uri.startswith("memory://"):
+        return MemoryKV()
+    if not uri or uri.startswith("sqlite://"):
+        path = uri[len("sqlite:///"):] if uri.startswith("sqlite:///") else ""
+        return SQLiteKV(path or default_sqlite_path("shared-store"))
+    raise ValueError(f"Unsupported SHARED_STORE_URI: {uri}")
+
+
+_default_kv = None
+_default_kv_lock = threading.Lock()
+_PURGE_EVERY_WRITES = 500
+_writes_since_purge = 0
+
+
+def get_default_kv():
+    global _default_kv
+    if _default_kv is None:
+        with _default_kv_lock:
+            if _default_kv is None:
+                _default_kv = kv_from_uri(os.getenv("SHARED_STORE_URI", ""))
+    return _default_kv
+
+
+class _WriteBackDict(dict):
+    """
+    Value returned by SharedDict[key]: one-level mutations (``d[k]['status'] = x``) are persisted.
+    Each mutation is applied to the stored value inside one store transaction, so two workers
+    setting different fields of the same entry both keep their change.
+    """
+
+    def __init__(self, owner, key, data):
+        super().__init__(data)
+        self._owner = owner
+        self._key = key
+
+    def _save(self, change):
+        def apply(current):
+            # Entry gone or replaced by a non-dict: fall back to this view, as a plain write would.
+            merged = dict(current) if type(current) is dict else dict(self)
+            change(merged)
+            return merged
+
+        merged = self._owner._update(self._key, apply)
+        super().clear()
+        super().update(merged)
+
+    def __setitem__(self, k, v):
+        super().__setitem__(k, v)
+        self._save(lambda d: d.__setitem__(k, v))
+
+    def __delitem__(self, k):
+        super().__delitem__(k)
+        self._save(lambda d: d.pop(k, None))
+
+    def update(self, *args, **kwargs):
+        changes = dict(*args, **kwargs)
+        super().update(changes)
+        self._save(lambda d: d.update(changes))
+
+    def pop(self, k, *default):
+        out = super().pop(k, *default)
+        self._save(lambda d: d.pop(k, None))
+        return out
+
+    def setdefault(self, k, default=None):
+        if k in self:
+            return self[k]
+        self[k] = default
+        return default
+
+
+class SharedDict(MutableMapping):
+    """
+    Dict-like view of one namespace in the shared store. Entries optionally expire ``ttl`` seconds
+    after their last write. Dict values come back as write-back dicts so existing
+    ``store[id]["field"] = value`` call sites keep working across workers.
+
+    ``index`` maps a name to ``fn(entry) -> str`` for dict entries; ``find(name=value)`` (a value or
+    a collection of values per name) returns the matching ``(key, entry)`` pairs.
+    """
+
+    def __init__(self, namespace, ttl=None, kv=None, index=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._kv = kv
+        self.index = dict(index or {})
+
+    @property
+    def kv(self):
+        return self._kv if self._kv is not None else get_default_kv()
+
+    def _index_values(self, value):
+        if type(value) is not dict:
+            return {}
+        return {name: str(fn(value)) for name, fn in self.index.items()}
+
+    def _wrap(self, key, value):
+        return _WriteBackDict(self, key, value) if type(value) is dict else value
+
+    def __getitem__(self, key):
+        key = str(key)
+        value = self.kv.get(self.namespace, key, time.time())
+        if value is _MISSING:
+            raise KeyError(key)
+        return self._wrap(key, value)
+
+    def get(self, key, default=None):
+        key = str(key)
+        value = self.kv.get(self.namespace, key, time.time())
+        return default if value is _MISSING else self._wrap(key, value)
+
+    def __contains__(self, key):
+        return self.kv.get(self.namespace, str(key), time.time()) is not _MISSING
+
+    def __setitem__(self, key, value):
+        if isinstance(value, _WriteBackDict):
+            value = dict(value)
+        global _writes_since_purge
+        now = time.time()
+        self.kv.set(self.namespace, str(key), value, now + self.ttl if self.ttl else None,
+                    self._index_values if self.index else None)
+        _writes_since_purge += 1
+        if _writes_since_purge >= _PURGE_EVERY_WRITES:
+            _writes_since_purge = 0
+            self.kv.purge_expired(now)
+
+    def _update(self, key, fn):
+        now = time.time()
+        return self.kv.update(self.namespace, str(key), fn, now, now + self.ttl if self.ttl else None,
+                              self._index_values if self.index else None)
+
+    def __delitem__(self, key):
+        if not self.kv.delete(self.namespace, str(key)):
+            raise KeyError(key)
+
+    def pop(self, key, default=_MISSING):
+        key = str(key)
+        value = self.kv.get(self.namespace, key, time.time())
+        if value is _MISSING:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        self.kv.delete(self.namespace, key)
+        return value
+
+    def __iter__(self):
+        return iter([k for k, _ in self.kv.items(self.namespace, time.time())])
+
+    def __len__(self):
+        return self.kv.count(self.namespace, time.time())
+
+    def items(self):
+        return [(k, self._wrap(k, v)) for k, v in self.kv.items(self.namespace, time.time())]
+
+    def values(self):
+        return [v for _, v in self.items()]
+
+    def find(self, **criteria):
+        """``(key, entry)`` pairs whose index values match every criterion; only those are unpickled."""
+        unknown = set(criteria) - set(self.index)
+        if unknown:
+            raise KeyError(f"not an index of {self.namespace!r}: {', '.join(sorted(unknown))}")
+        rows = self.kv.find(self.namespace, criteria, time.time())
+        # Re-check on the loaded entry in case it was written by a SharedDict without this index.
+        return [(k, self._wrap(k, v)) for k, v in rows if _matches(self._index_values(v), criteria)]
+
+    def keys(self):
+        return list(iter(self))
+
+    def clear(self):
+        self.kv.clear(self.namespace)
+
+    def __repr__(self):
+        return f"<SharedDict {self.namespace!r} ({len(self)} entries)>"
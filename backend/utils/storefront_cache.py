@@ -0,0 +1,219 @@
+"""
+Precomputed JSON for the public homepage widgets: the sidebar creators list
+(``/api/creators/list``) and the soft-launch seat counter (``/api/creators/soft-launch-spots``).
+
+Anonymous homepage traffic never queries ``users``: each widget's response body is built once,
+stored with its ETag in the shared store (one copy per machine, every gunicorn worker reads it)
+and served with ``Cache-Control: public`` + ``stale-while-revalidate`` so browsers and any CDN in
+front can reuse it, and ``If-None-Match`` gets a 304.
+
+Snapshots are rebuilt:
+
+- right away when an admin changes a creator (approve, disapprove, activate, suspend, role),
+  via ``invalidate(client)``;
+- in the background once older than ``STOREFRONT_CACHE_TTL`` seconds (default 300), by the
+  per-process refresher thread or by the first request that sees the stale copy. That request
+  is still answered from the stale copy; only a cold cache makes a visitor wait for the query.
+
+If a rebuild fails the previous snapshot keeps being served.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import make_response, request
+
+from utils import metrics
+from utils.shared_store import SharedDict
+
+logger = logging.getLogger(__name__)
+
+SOFT_LAUNCH_TOTAL = 20
+CREATORS_LIST_SIZE = 20
+CACHE_TTL = float(os.getenv("STOREFRONT_CACHE_TTL", "300"))
+CACHE_CONTROL = "public, max-age=30, stale-while-revalidate=600"
+
+# Only what the widgets render plus what the staff filter needs.
+_CREATOR_COLUMNS = "id, username, display_name, profile_image_url, subdomain, is_admin, admin_role, email"
+_SEAT_COLUMNS = "username, display_name, subdomain, is_admin, admin_role, email, status"
+
+_snapshots = SharedDict("storefront_widgets")
+_refresh_lock = threading.Lock()
+_refreshing = set()
+_refresher = {"pid": None}
+
+
+def is_staff_or_excluded_creator(row):
+    """Staff/admin and platform test identities — not soft-launch public seats."""
+    if row.get("is_admin"):
+        return True
+    admin_role = (row.get("admin_role") or "").strip().lower()
+    if admin_role in ("master_admin", "admin", "order_processing_admin"):
+        return True
+    email = (row.get("email") or "").strip().lower()
+    username = (row.get("username") or "").strip().lower()
+    if email in ("alancraigdigital@gmail.com",) or username in ("alancraigdigital", "screenmerch"):
+        return True
+    return False
+
+
+def build_creators_list(client):
+    """Newest active creators for the sidebar (main site + subdomains)."""
+    r = client.table("users").select(_CREATOR_COLUMNS).eq("role", "creator").eq("status", "active") \
+        .order("created_at", desc=True).limit(50).execute()
+    creators = []
+    for row in (r.data or []):
+        if is_staff_or_excluded_creator(row):
+            continue
+        creators.append({
+            "id": row.get("id"),
+            "username": row.get("username") or "",
+            "name": (row.get("display_name") or row.get("username") or "Creator").strip() or "Creator",
+            "avatar": row.get("profile_image_url"),
+            "subdomain": (row.get("subdomain") or "").strip(),
+        })
+        if len(creators) >= CREATORS_LIST_SIZE:
+            break
+    return {"success": True, "creators": creators}
+
+
+def build_soft_launch_spots(client):
+    """Soft-launch seats: role=creator, active or pending (same as the signup limit), staff excluded."""
+    r = client.table("users").select(_SEAT_COLUMNS).eq("role", "creator").in_("status", ["active", "pending"]) \
+        .order("created_at", desc=False).limit(100).execute()
+    taken_slots = []
+    for row in (r.data or []):
+        if is_staff_or_excluded_creator(row):
+            continue
+        spot = len(taken_slots) + 1
+        if spot > SOFT_LAUNCH_TOTAL:
+            break
+        taken_slots.append({
+            "spot": spot,
+            "label": f"Store {spot}",
+            "status": row.get("status") or "pending",
+            "name": (row.get("display_name") or row.get("username") or "").strip(),
+            "subdomain": (row.get("subdomain") or "").strip(),
+        })
+    return {
+        "success": True,
+        "total": SOFT_LAUNCH_TOTAL,
+        "claimed": len(taken_slots),
+        "available": max(0, SOFT_LAUNCH_TOTAL - len(taken_slots)),
+        "taken_slots": taken_slots,
+    }
+
+
+WIDGETS = {
+    "creators_list": build_creators_list,
+    "soft_launch_spots": build_soft_launch_spots,
+}
+
+
+def refresh(client, name=None):
+    """Rebuild one widget (or all); returns the new snapshot(s). Raises if the query fails."""
+    names = [name] if name else list(WIDGETS)
+    built = {}
+    for widget in names:
+        body = json.dumps(WIDGETS[widget](client), separators=(",", ":")).encode("utf-8")
+        snapshot = {
+            "body": body,
+            "etag": hashlib.sha1(body).hexdigest()[:20],
+            "built_at": time.time(),
+        }
+        _snapshots[widget] = snapshot
+        built[widget] = snapshot
+    return built[name] if name else built
+
+
+def _refresh_in_background(client, name):
+    with _refresh_lock:
+        if name in _refreshing:
+            return
+        _refreshing.add(name)
+
+    def run():
+        try:
+            refresh(client, name)
+        except Exception as e:
+            logger.warning("storefront cache refresh failed for %s: %s", name, e)
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(name)
+
+    threading.Thread(target=run, name=f"storefront-refresh-{name}", daemon=True).start()
+
+
+def invalidate(client=None):
+    """Creator data changed: rebuild every widget in the background (or mark them stale without a client)."""
+    for name in WIDGETS:
+        if client is not None:
+            _refresh_in_background(client, name)
+            continue
+        snapshot = _snapshots.get(name)
+        if snapshot:
+            snapshot["built_at"] = 0
+
+
+def _ensure_refresher(client_getter):
+    """One daemon thread per process keeps snapshots younger than CACHE_TTL (forks start their own)."""
+    with _refresh_lock:
+        if _refresher["pid"] == os.getpid():
+            return
+        _refresher["pid"] = os.getpid()
+
+    def loop():
+        while True:
+            time.sleep(max(5.0, CACHE_TTL / 2))
+            client = client_getter()
+            if client is None:
+                continue
+            for name in WIDGETS:
+                snapshot = _snapshots.get(name)
+                # Another worker may already have refreshed it; only stale copies are rebuilt.
+                if snapshot is None or time.time() - snapshot["built_at"] >= CACHE_TTL:
+                    try:
+                        refresh(client, name)
+                    except Exception as e:
+                        logger.warning("storefront cache refresh failed for %s: %s", name, e)
+
+    threading.Thread(target=loop, name="storefront-refresher", daemon=True).start()
+
+
+def serve(name, client_getter):
+    """Response for a public widget from its snapshot; builds it synchronously only on a cold cache.
+
+    Returns None when there is no snapshot and the database is unavailable or the build failed,
+    so the caller can answer with its own error payload.
+    """
+    _ensure_refresher(client_getter)
+    snapshot = _snapshots.get(name)
+    result = "hit"
+    if snapshot is None:
+        result = "miss"
+        client = client_getter()
+        if client is None:
+            return None
+        try:
+            snapshot = refresh(client, name)
+        except Exception as e:
+            logger.error("storefront cache build failed for %s: %s", name, e)
+            return None
+    elif time.time() - snapshot["built_at"] >= CACHE_TTL:
+        result = "stale"
+        client = client_getter()
+        if client is not None:
+            _refresh_in_background(client, name)
+
+    metrics.inc("screenmerch_cache_requests_total", (("cache", f"storefront_{name}"), ("result", result)))
+    if request.if_none_match.contains(snapshot["etag"]):
+        response = make_response("", 304)
+    else:
+        response = make_response(snapshot["body"], 200)
+        response.mimetype = "application/json"
+    response.set_etag(snapshot["etag"])
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
@@ -0,0 +1,229 @@
+"""
+Shared text rendering for image overlays (print thumbnails, ImageTextOverlay).
+
+- ``FontRegistry`` scans the system font folders once and resolves family names ("Arial",
+  "Georgia", ...) to a file, with the DejaVu/Liberation fallbacks used on Linux servers.
+- ``get_font`` keeps an LRU of loaded (path, size) FreeType objects.
+- ``text_layer`` / ``shadow_layer`` / ``glow_layer`` rasterize text once per
+  (text, font file, size, color, stroke, effect) into a small cached RGBA layer; callers paste
+  it with ``composite`` so repeated overlays (creator watermarks, batch renders) are composited,
+  not re-rasterized. Fonts not loaded from a file (Pillow's default bitmap font) are rasterized
+  on every call.
+"""
+import logging
+import os
+import threading
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+logger = logging.getLogger(__name__)
+
+FONT_CACHE_SIZE = 64
+LAYER_CACHE_SIZE = 256
+
+# Family -> font file stems, most preferred first. Every family ends in the generic fallbacks.
+FONT_FAMILIES = {
+    "arial": ("arial",),
+    "helvetica": ("helvetica", "arial"),
+    "georgia": ("georgia",),
+    "times new roman": ("times", "timesnewroman"),
+    "verdana": ("verdana",),
+    "courier new": ("cour", "couriernew"),
+    "calibri": ("calibri",),
+    "dejavu sans": ("dejavusans",),
+    "dejavu sans bold": ("dejavusans-bold",),
+}
+FALLBACK_STEMS = ("dejavusans", "liberationsans-regular")
+
+SHADOW_OFFSET = 3
+SHADOW_BLUR = 2
+SHADOW_COLOR = (0, 0, 0, 128)
+GLOW_RADIUS = 5
+GLOW_BLUR = 3
+
+
+def _system_font_dirs():
+    dirs = [d for d in os.environ.get("FONT_DIRS", "").split(os.pathsep) if d]
+    if os.name == "nt":
+        dirs.append(os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"))
+    else:
+        dirs += [
+            "/usr/share/fonts",
+            "/usr/local/share/fonts",
+            os.path.expanduser("~/.fonts"),
+            "/System/Library/Fonts",
+            "/Library/Fonts",
+        ]
+    return dirs
+
+
+class FontRegistry:
+    """Font files found under the system font folders, indexed by lowercase file stem."""
+
+    def __init__(self, dirs=None):
+        self._dirs = dirs
+        self._paths = None
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        paths = {}
+        for root in self._dirs if self._dirs is not None else _system_font_dirs():
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    stem, ext = os.path.splitext(name)
+                    if ext.lower() in (".ttf", ".otf", ".ttc"):
+                        paths.setdefault(stem.lower(), os.path.join(dirpath, name))
+        logger.debug("Font registry: %s fonts", len(paths))
+        return paths
+
+    @property
+    def paths(self):
+        if self._paths is None:
+            with self._lock:
+                if self._paths is None:
+                    self._paths = self._scan()
+        return self._paths
+
+    def find(self, *stems):
+        """Path of the first stem that exists, or None."""
+        for stem in stems:
+            path = self.paths.get(stem.lower())
+            if path:
+                return path
+        return None
+
+    def resolve(self, family=None):
+        """Path for a family name ("Arial", "Georgia", ...) or a file stem, falling back to DejaVu/Liberation."""
+        key = (family or "").strip().lower()
+        stems = FONT_FAMILIES.get(key, (key,) if key else ())
+        return self.find(*stems, *FALLBACK_STEMS)
+
+
+registry = FontRegistry()
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def _load_font(path, size):
+    if path:
+        try:
+            return ImageFont.truetype(path, size)
+        except Exception as e:
+            logger.warning("Could not load font %s: %s", path, e)
+    return ImageFont.load_default()
+
+
+def get_font(family, size, candidates=None):
+    """
+    Cached FreeType font for ``family`` at ``size`` px. ``candidates`` (file stems) overrides
+    the family lookup. Falls back to Pillow's default bitmap font.
+    """
+    path = registry.find(*candidates) if candidates else registry.resolve(family)
+    return _load_font(path, int(size))
+
+
+def _font_key(font):
+    # (path, size) for FreeType fonts loaded from a file, which _load_font can hand back from the
+    # key alone; None for anything else, whose layers are not cached.
+    path = getattr(font, "path", None)
+    if isinstance(path, str):
+        return path, font.size
+    return None
+
+
+def measure(text, font):
+    """(width, height) of ``text`` as ImageDraw.textbbox((0, 0), ...) reports it."""
+    left, top, right, bottom = font.getbbox(text)
+    return right - left, bottom - top
+
+
+def _rgba(color):
+    color = tuple(color)
+    return color if len(color) == 4 else color + (255,)
+
+
+@lru_cache(maxsize=LAYER_CACHE_SIZE)
+def _render(text, font_key, fill, stroke_width, stroke_fill, effect):
+    return _rasterize(text, _load_font(*font_key), fill, stroke_width, stroke_fill, effect)
+
+
+def _rasterize(text, font, fill, stroke_width, stroke_fill, effect):
+    if effect == "shadow":
+        pad = SHADOW_BLUR * 3
+        offsets, blur, fill, stroke_width = ((SHADOW_OFFSET, SHADOW_OFFSET),), SHADOW_BLUR, SHADOW_COLOR, 0
+    elif effect == "glow":
+        pad = GLOW_BLUR * 3
+        spread = range(0, GLOW_RADIUS * 2, 2)
+        offsets = [(dx * s, dy * s) for s in spread for dx, dy in ((-1, -1), (1, -1), (-1, 1), (1, 1))]
+        blur, fill, stroke_width = GLOW_BLUR, fill[:3] + (128,), 0
+    else:
+        pad, offsets, blur = 0, ((0, 0),), 0
+
+    left, top, right, bottom = font.getbbox(text, stroke_width=stroke_width)
+    min_dx = min(dx for dx, _ in offsets)
+    min_dy = min(dy for _, dy in offsets)
+    max_dx = max(dx for dx, _ in offsets)
+    max_dy = max(dy for _, dy in offsets)
+    origin_x = pad - left - min_dx
+    origin_y = pad - top - min_dy
+    size = (right - left + max_dx - min_dx + 2 * pad, bottom - top + max_dy - min_dy + 2 * pad)
+    layer = Image.new("RGBA", (max(1, size[0]), max(1, size[1])), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    for dx, dy in offsets:
+        draw.text(
+            (origin_x + dx, origin_y + dy), text, font=font, fill=fill,
+            stroke_width=stroke_width, stroke_fill=stroke_fill,
+        )
+    if blur:
+        layer = layer.filter(ImageFilter.GaussianBlur(radius=blur))
+    return layer, (-origin_x, -origin_y)
+
+
+def text_layer(text, font, fill, stroke_width=0, stroke_fill=None, effect=None):
+    """
+    Cached RGBA layer for ``text`` and its offset from the draw origin: pasting the layer at
+    (x + dx, y + dy) matches ``draw.text((x, y), ...)``. ``effect`` is None, "shadow" or "glow".
+    Layers are shared between callers; do not modify them.
+    """
+    stroke = _rgba(stroke_fill) if stroke_fill is not None else None
+    key = _font_key(font)
+    if key is None:
+        return _rasterize(text, font, _rgba(fill), int(stroke_width or 0), stroke, effect)
+    return _render(text, key, _rgba(fill), int(stroke_width or 0), stroke, effect)
+
+
+def shadow_layer(text, font):
+    return text_layer(text, font, SHADOW_COLOR, effect="shadow")
+
+
+def glow_layer(text, font, color):
+    return text_layer(text, font, color, effect="glow")
+
+
+def composite(base, layer_and_offset, x, y):
+    """Composite a cached layer onto ``base`` (in place) with the layer's top-left at origin + offset."""
+    layer, (dx, dy) = layer_and_offset
+    left, top = int(x + dx), int(y + dy)
+    # Clip to the base; alpha_composite rejects negative destinations.
+    src_left, src_top = max(0, -left), max(0, -top)
+    right = min(base.width, left + layer.width)
+    bottom = min(base.height, top + layer.height)
+    if right <= max(left, 0) or bottom <= max(top, 0):
+        return base
+    box = (src_left, src_top, src_left + right - max(left, 0), src_top + bottom - max(top, 0))
+    dest = (max(left, 0), max(top, 0))
+    if base.mode == "RGBA":
+        base.alpha_composite(layer, dest=dest, source=box)
+    else:
+        part = layer.crop(box)
+        base.paste(part, dest, part)
+    return base
+
+
+def cache_info():
+    return {"fonts": _load_font.cache_info(), "layers": _render.cache_info()}
+
+
+def clear_caches():
+    _load_font.cache_clear()
+    _render.cache_clear()
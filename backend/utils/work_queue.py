@@ -0,0 +1,315 @@
+"""
+Work-queue semantics for ``order_processing_queue``: leases instead of list polling.
+
+A worker asks for its next N rows with ``lease``; each row comes back ``assigned`` to that worker
+with ``lease_expires_at`` set. While it works it calls ``heartbeat`` to extend the lease, and it
+ends with ``complete`` (completed / failed, plus a ``processing_history`` row) or ``release``
+(back to pending). Leases that run out are swept back to ``pending`` by ``requeue_expired`` (or
+to ``failed`` once ``max_attempts`` is used up), so a crashed worker never strands an order.
+
+``lease`` calls the ``lease_processing_queue`` function (sql/order_processing_queue_leases.sql),
+which picks rows with ``FOR UPDATE SKIP LOCKED``: concurrent workers take disjoint rows without
+blocking on each other. Where that function is not installed the same contract is kept with
+PostgREST alone: read a window of pending ids, then a conditional ``update ... in (ids) and
+status = 'pending'``; the rows it returns are the ones this worker won, and losers simply move on
+to the next candidates. Every write is filtered on the owner (``assigned_to``) so a worker whose
+lease was requeued cannot complete or extend someone else's row.
+
+``worker_stats`` reports per-worker throughput from ``processing_history`` plus current leases.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+QUEUE_TABLE = "order_processing_queue"
+HISTORY_TABLE = "processing_history"
+LEASED_STATUSES = ("assigned", "processing")
+FINAL_STATUSES = ("completed", "failed")
+
+DEFAULT_LEASE_SECONDS = 900
+MAX_LEASE_SECONDS = 3600
+MAX_BATCH = 50
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Flipped off the first time PostgREST reports them missing; both stay off for the process lifetime.
+_rpc_supported = True
+_lease_column_supported = True
+
+
+class WorkQueueError(ValueError):
+    pass
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _lease_seconds(value):
+    try:
+        seconds = int(value if value is not None else DEFAULT_LEASE_SECONDS)
+    except (TypeError, ValueError):
+        raise WorkQueueError("lease_seconds must be an integer")
+    return min(MAX_LEASE_SECONDS, max(30, seconds))
+
+
+def _batch_size(value):
+    try:
+        count = int(value if value is not None else 1)
+    except (TypeError, ValueError):
+        raise WorkQueueError("count must be an integer")
+    return min(MAX_BATCH, max(1, count))
+
+
+def _missing_lease_column(e):
+    return "lease_expires_at" in str(e)
+
+
+def _missing_rpc(e):
+    # PostgREST PGRST202: "Could not find the function public.lease_processing_queue(...) in the schema cache".
+    return getattr(e, "code", None) == "PGRST202" or "could not find the function" in str(e).lower()
+
+
+def _lease_fields(worker_id, seconds, now):
+    """Columns written when a row is leased or its lease is extended."""
+    fields = {"assigned_to": worker_id}
+    if _lease_column_supported:
+        fields["lease_expires_at"] = (now + timedelta(seconds=seconds)).isoformat()
+    else:
+        # Without lease_expires_at the lease runs from assigned_at; heartbeats move it forward.
+        fields["assigned_at"] = now.isoformat()
+    return fields
+
+
+def _priority_order(rows):
+    rows.sort(key=lambda r: str(r.get("created_at") or ""))
+    rows.sort(key=lambda r: r.get("priority") or 0, reverse=True)
+    return rows
+
+
+def requeue_expired(client, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Return expired leases to ``pending`` (``failed`` past ``max_attempts``); returns how many moved."""
+    global _lease_column_supported
+    now = _now()
+    cutoff = now - timedelta(seconds=_lease_seconds(lease_seconds))
+
+    def still_expired(query):
+        # Applied to the read and again to the update, so a heartbeat landing in between wins.
+        if _lease_column_supported:
+            return query.lt("lease_expires_at", now.isoformat())
+        return query.lt("assigned_at", cutoff.isoformat())
+
+    while True:
+        query = client.table(QUEUE_TABLE).select("id,processing_attempts").in_("status", list(LEASED_STATUSES))
+        try:
+            expired = still_expired(query).execute().data or []
+            break
+        except Exception as e:
+            if not (_lease_column_supported and _missing_lease_column(e)):
+                raise
+            logger.info("work queue without lease_expires_at (%s)", e)
+            _lease_column_supported = False
+
+    moved = 0
+    for status in ("pending", "failed"):
+        ids = [r["id"] for r in expired
+               if ((r.get("processing_attempts") or 0) >= max_attempts) == (status == "failed")]
+        if not ids:
+            continue
+        update = {"status": status, "assigned_to": None}
+        if _lease_column_supported:
+            update["lease_expires_at"] = None
+        if status == "failed":
+            update["worker_notes"] = "Lease expired too many times"
+        # Re-checking status and expiry keeps a row that was completed or heartbeated meanwhile.
+        result = still_expired(client.table(QUEUE_TABLE).update(update).in_("id", ids)
+                               .in_("status", list(LEASED_STATUSES))).execute()
+        moved += len(result.data or [])
+    if moved:
+        logger.info("work queue requeued %s expired lease(s)", moved)
+    return moved
+
+
+def _lease_rpc(client, worker_id, count, seconds, max_attempts):
+    result = client.rpc("lease_processing_queue", {
+        "p_worker": worker_id,
+        "p_limit": count,
+        "p_lease_seconds": seconds,
+        "p_max_attempts": max_attempts,
+    }).execute()
+    return _priority_order(list(result.data or []))
+
+
+def _lease_conditional(client, worker_id, count, seconds, max_attempts):
+    requeue_expired(client, seconds, max_attempts)
+    leased = []
+    # Read a few more candidates than needed so losing a race to another worker is not a refill.
+    window = min(MAX_BATCH * 4, count * 4)
+    candidates = (client.table(QUEUE_TABLE).select("id,processing_attempts").eq("status", "pending")
+                  .order("priority", desc=True).order("created_at").limit(window).execute().data or [])
+    attempts = {r["id"]: r.get("processing_attempts") or 0 for r in candidates}
+    ids = [r["id"] for r in candidates]
+    while ids and len(leased) < count:
+        take, ids = ids[:count - len(leased)], ids[count - len(leased):]
+        now = _now()
+        update = dict(_lease_fields(worker_id, seconds, now), status="assigned")
+        update.setdefault("assigned_at", now.isoformat())
+        # One update per attempts value so the bump rides on the claiming statement itself.
+        for tried in sorted(set(attempts[i] for i in take)):
+            group = [i for i in take if attempts[i] == tried]
+            won = (client.table(QUEUE_TABLE).update(dict(update, processing_attempts=tried + 1))
+                   .in_("id", group).eq("status", "pending").execute().data or [])
+            leased.extend(won)
+    return _priority_order(leased)
+
+
+def lease(client, worker_id, count=1, lease_seconds=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Lease up to ``count`` pending rows to ``worker_id``; returns the leased queue rows (highest priority first)."""
+    global _rpc_supported, _lease_column_supported
+    if not worker_id:
+        raise WorkQueueError("worker_id is required")
+    count = _batch_size(count)
+    seconds = _lease_seconds(lease_seconds)
+    if _rpc_supported:
+        try:
+            return _lease_rpc(client, worker_id, count, seconds, max_attempts)
+        except Exception as e:
+            if not _missing_rpc(e):
+                raise
+            logger.info("work queue without lease_processing_queue rpc (%s)", e)
+            _rpc_supported = False
+    while True:
+        try:
+            return _lease_conditional(client, worker_id, count, seconds, max_attempts)
+        except Exception as e:
+            if not (_lease_column_supported and _missing_lease_column(e)):
+                raise
+            logger.info("work queue without lease_expires_at (%s)", e)
+            _lease_column_supported = False
+
+
+def claim(client, worker_id, queue_id, lease_seconds=None):
+    """Lease one specific pending row to ``worker_id``; returns the row, or None if someone else has it."""
+    global _lease_column_supported
+    if not worker_id:
+        raise WorkQueueError("worker_id is required")
+    seconds = _lease_seconds(lease_seconds)
+    while True:
+        now = _now()
+        update = dict(_lease_fields(worker_id, seconds, now), status="assigned")
+        update.setdefault("assigned_at", now.isoformat())
+        try:
+            won = (client.table(QUEUE_TABLE).update(update).eq("id", queue_id)
+                   .eq("status", "pending").execute().data or [])
+            return won[0] if won else None
+        except Exception as e:
+            if not (_lease_column_supported and _missing_lease_column(e)):
+                raise
+            logger.info("work queue without lease_expires_at (%s)", e)
+            _lease_column_supported = False
+
+
+def heartbeat(client, worker_id, queue_ids, lease_seconds=None, status=None):
+    """Extend ``worker_id``'s leases on ``queue_ids``; returns the ids still held (the rest were requeued)."""
+    if not worker_id:
+        raise WorkQueueError("worker_id is required")
+    if status is not None and status not in LEASED_STATUSES:
+        raise WorkQueueError(f"status must be one of: {', '.join(LEASED_STATUSES)}")
+    ids = list(queue_ids or [])
+    if not ids:
+        return []
+    update = _lease_fields(worker_id, _lease_seconds(lease_seconds), _now())
+    if status == "processing":
+        # Rows still "assigned" start now; rows already processing only get the extension below.
+        (client.table(QUEUE_TABLE).update(dict(update, status="processing", started_at=_now().isoformat()))
+         .in_("id", ids).eq("assigned_to", worker_id).eq("status", "assigned").execute())
+    result = (client.table(QUEUE_TABLE).update(update).in_("id", ids).eq("assigned_to", worker_id)
+              .in_("status", list(LEASED_STATUSES)).execute())
+    return [r["id"] for r in result.data or []]
+
+
+def complete(client, worker_id, queue_id, status="completed", notes=None,
+             processed_image_url=None, processing_time_seconds=None, record=True):
+    """Finish a leased row as completed or failed and log it to ``processing_history``.
+
+    Returns the updated row, or None when the lease is no longer ``worker_id``'s. ``record=False``
+    skips the history insert for callers that batch their own history rows.
+    """
+    if status not in FINAL_STATUSES:
+        raise WorkQueueError(f"status must be one of: {', '.join(FINAL_STATUSES)}")
+    update = {"status": status}
+    if status == "completed":
+        update["completed_at"] = _now().isoformat()
+    if _lease_column_supported:
+        update["lease_expires_at"] = None
+    if notes:
+        update["worker_notes"] = notes
+    if processed_image_url:
+        update["processed_image_url"] = processed_image_url
+    won = (client.table(QUEUE_TABLE).update(update).eq("id", queue_id).eq("assigned_to", worker_id)
+           .in_("status", list(LEASED_STATUSES)).execute().data or [])
+    if not won:
+        return None
+    row = won[0]
+    if not record:
+        return row
+    client.table(HISTORY_TABLE).insert({
+        "order_id": row.get("order_id"),
+        "queue_id": queue_id,
+        "processed_by": worker_id,
+        "status": status,
+        "processed_image_url": processed_image_url,
+        "processing_time_seconds": processing_time_seconds,
+        "notes": notes,
+    }).execute()
+    return row
+
+
+def release(client, worker_id, queue_ids):
+    """Hand ``worker_id``'s leased rows back to ``pending``; returns the ids released."""
+    ids = list(queue_ids or [])
+    if not ids:
+        return []
+    update = {"status": "pending", "assigned_to": None}
+    if _lease_column_supported:
+        update["lease_expires_at"] = None
+    result = (client.table(QUEUE_TABLE).update(update).in_("id", ids).eq("assigned_to", worker_id)
+              .in_("status", list(LEASED_STATUSES)).execute())
+    return [r["id"] for r in result.data or []]
+
+
+def worker_stats(client, since_hours=24, worker_id=None):
+    """Per-worker throughput over the last ``since_hours``: ``{worker_id: {...}}``.
+
+    Each entry has ``completed``, ``failed``, ``avg_seconds`` (completed rows only),
+    ``per_hour`` (completed / window) and ``leased`` (rows the worker holds right now).
+    """
+    since = _now() - timedelta(hours=since_hours)
+    history = (client.table(HISTORY_TABLE).select("processed_by,status,processing_time_seconds")
+               .gte("processed_at", since.isoformat()))
+    leased = client.table(QUEUE_TABLE).select("assigned_to").in_("status", list(LEASED_STATUSES))
+    if worker_id:
+        history = history.eq("processed_by", worker_id)
+        leased = leased.eq("assigned_to", worker_id)
+
+    stats = {}
+
+    def entry(worker):
+        return stats.setdefault(worker, {"completed": 0, "failed": 0, "seconds": 0, "leased": 0})
+
+    for row in history.execute().data or []:
+        if not row.get("processed_by") or row.get("status") not in FINAL_STATUSES:
+            continue
+        e = entry(row["processed_by"])
+        e[row["status"]] += 1
+        if row["status"] == "completed":
+            e["seconds"] += row.get("processing_time_seconds") or 0
+    for row in leased.execute().data or []:
+        if row.get("assigned_to"):
+            entry(row["assigned_to"])["leased"] += 1
+
+    for e in stats.values():
+        seconds = e.pop("seconds")
+        e["avg_seconds"] = round(seconds / e["completed"], 1) if e["completed"] else None
+        e["per_hour"] = round(e["completed"] / since_hours, 2) if since_hours else None
+    return stats
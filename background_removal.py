@@ -8,11 +8,52 @@ import cv2
 import numpy as np
 import base64
 import io
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from PIL import Image, ImageFilter, ImageEnhance
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Working memory per batch chunk (RGBA stack + mask/gray/int32 scratch buffers).
+DEFAULT_BATCH_MEMORY = 256 * 1024 * 1024
+# Working bytes per pixel in a chunk: RGBA stack 4, two int32 scratch 8, gray/bright/mask 3,
+# feathering copies 2, plus slack.
+_BYTES_PER_PIXEL = 20
+# Pillow's default. PNG encoding is most of a batch's time; 1-3 trades ~10% size for ~2x speed.
+PNG_COMPRESS_LEVEL = 6
+_TRANSPARENT = np.uint8(0)
+_OPAQUE = np.uint8(255)
+# Methods whose masks are computed on a whole stack at once (edge_detection runs per image).
+_STACK_METHODS = ("adaptive", "threshold", "color_range")
+
+
+def _open_image(image_data):
+    """Base64 / data-URL image -> PIL image (header read only; pixels decode on first use)."""
+    if image_data.startswith('data:image'):
+        image_data = image_data.split(',')[1]
+    return Image.open(io.BytesIO(base64.b64decode(image_data)))
+
+
+def _to_rgba_array(image):
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    return np.array(image)
+
+
+def _encode_png(img_array, compress_level=PNG_COMPRESS_LEVEL):
+    buffer = io.BytesIO()
+    Image.fromarray(img_array, 'RGBA').save(buffer, format='PNG', compress_level=compress_level)
+    return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
+
+
+def _remove_one(image_bytes, method, feather_edges, white_threshold, png_compress_level):
+    # Top-level so a process pool can pickle it; gets raw bytes so base64 is decoded only once.
+    remover = BackgroundRemover()
+    remover.white_threshold = white_threshold
+    img_array = _to_rgba_array(Image.open(io.BytesIO(image_bytes)))
+    return _encode_png(remover._remove_from_array(img_array, method, feather_edges), png_compress_level)
+
+
 class BackgroundRemover:
     """Advanced background removal with multiple algorithms"""
     
@@ -33,52 +74,33 @@ class BackgroundRemover:
             Base64 encoded image with transparent background
         """
         try:
-            # Decode image
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Convert to RGBA for transparency support
-            if image.mode != 'RGBA':
-                image = image.convert('RGBA')
-            
-            # Convert to numpy array for processing
-            img_array = np.array(image)
-            
-            if method == "adaptive":
-                mask = self._create_adaptive_mask(img_array)
-            elif method == "threshold":
-                mask = self._create_threshold_mask(img_array)
-            elif method == "color_range":
-                mask = self._create_color_range_mask(img_array)
-            elif method == "edge_detection":
-                mask = self._create_edge_detection_mask(img_array)
-            else:
-                mask = self._create_adaptive_mask(img_array)
-            
-            # Apply feathering if requested
-            if feather_edges:
-                mask = self._feather_mask(mask)
-            
-            # Apply mask to create transparency
-            img_array[:, :, 3] = mask
-            
-            # Convert back to PIL Image
-            result_image = Image.fromarray(img_array, 'RGBA')
-            
-            # Convert back to base64
-            buffer = io.BytesIO()
-            result_image.save(buffer, format='PNG')  # PNG supports transparency
-            buffer.seek(0)
-            
-            result_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            return f"data:image/png;base64,{result_data}"
+            img_array = _to_rgba_array(_open_image(image_data))
+            return _encode_png(self._remove_from_array(img_array, method, feather_edges))
             
         except Exception as e:
             logger.error(f"Error removing background: {str(e)}")
             raise
+
+    def _remove_from_array(self, img_array, method, feather_edges):
+        """Set the alpha channel of an HxWx4 array from the chosen mask (in place) and return it."""
+        if method == "adaptive":
+            mask = self._create_adaptive_mask(img_array)
+        elif method == "threshold":
+            mask = self._create_threshold_mask(img_array)
+        elif method == "color_range":
+            mask = self._create_color_range_mask(img_array)
+        elif method == "edge_detection":
+            mask = self._create_edge_detection_mask(img_array)
+        else:
+            mask = self._create_adaptive_mask(img_array)
+        
+        # Apply feathering if requested
+        if feather_edges:
+            mask = self._feather_mask(mask)
+        
+        # Apply mask to create transparency
+        img_array[:, :, 3] = mask
+        return img_array
     
     def _create_adaptive_mask(self, img_array):
         """Create mask using adaptive white detection"""
@@ -154,24 +176,135 @@ class BackgroundRemover:
         feathered = cv2.GaussianBlur(mask, (feather_radius * 2 + 1, feather_radius * 2 + 1), feather_radius)
         return feathered
     
-    def remove_background_batch(self, image_data_list, method="adaptive"):
-        """Remove backgrounds from multiple images"""
-        results = []
-        
-        for image_data in image_data_list:
+    def remove_background_batch(self, image_data_list, method="adaptive", feather_edges=True,
+                                max_memory=DEFAULT_BATCH_MEMORY, processes=1,
+                                png_compress_level=PNG_COMPRESS_LEVEL):
+        """Remove backgrounds from multiple images (results in input order)"""
+        results = [None] * len(image_data_list)
+        for index, result in self.iter_remove_background_batch(
+            image_data_list, method, feather_edges, max_memory, processes, png_compress_level
+        ):
+            results[index] = result
+        return results
+
+    def iter_remove_background_batch(self, image_data_list, method="adaptive", feather_edges=True,
+                                     max_memory=DEFAULT_BATCH_MEMORY, processes=1,
+                                     png_compress_level=PNG_COMPRESS_LEVEL):
+        """
+        Yield (index, result) as each image finishes; result is the same dict as
+        remove_background_batch returns per image.
+
+        Each image is base64-decoded once and grouped by the size in its header. A same-size group
+        is processed as one NumPy stack (vectorized mask, one multi-channel Gaussian pass for
+        feathering) in chunks that fit ``max_memory`` bytes; pixels are decoded chunk by chunk
+        into reused buffers. With ``processes`` > 1, images whose size is unique in the batch
+        go to a process pool meanwhile.
+        """
+        groups = {}
+        for index, image_data in enumerate(image_data_list):
             try:
-                result = self.remove_white_background_advanced(image_data, method)
-                results.append({
-                    "success": True,
-                    "image_data": result
-                })
+                image = _open_image(image_data)
             except Exception as e:
-                results.append({
-                    "success": False,
-                    "error": str(e)
-                })
-        
-        return results
+                yield index, {"success": False, "error": str(e)}
+                continue
+            groups.setdefault(image.size, []).append((index, image))
+
+        if method not in _STACK_METHODS and method != "edge_detection":
+            method = "adaptive"
+        singles = []
+        if processes > 1:
+            singles = [item for items in groups.values() if len(items) == 1 for item in items]
+            groups = {size: items for size, items in groups.items() if len(items) > 1}
+
+        pool = ProcessPoolExecutor(max_workers=processes) if singles else None
+        try:
+            futures = {}
+            for index, image in singles:
+                image.fp.seek(0)
+                args = (image.fp.read(), method, feather_edges, self.white_threshold, png_compress_level)
+                futures[pool.submit(_remove_one, *args)] = index
+            for (width, height), items in groups.items():
+                yield from self._process_group(
+                    items, height, width, method, feather_edges, max_memory, png_compress_level
+                )
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], {"success": True, "image_data": future.result()}
+                except Exception as e:
+                    yield futures[future], {"success": False, "error": str(e)}
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def _process_group(self, items, height, width, method, feather_edges, max_memory, png_compress_level):
+        """Process same-size images as (chunk, H, W, 4) stacks; yields (index, result)."""
+        chunk_size = max(1, min(len(items), max_memory // (height * width * _BYTES_PER_PIXEL)))
+        stack = np.empty((chunk_size, height, width, 4), dtype=np.uint8)
+        scratch = (np.empty((chunk_size, height, width), dtype=np.int32),
+                   np.empty((chunk_size, height, width), dtype=np.int32))
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            n = len(chunk)
+            try:
+                # Pixels are decoded here, one chunk at a time, straight into the reused stack.
+                for i, (_, image) in enumerate(chunk):
+                    stack[i] = _to_rgba_array(image)
+                masks = self._stack_masks(stack[:n], method, (scratch[0][:n], scratch[1][:n]))
+                if feather_edges:
+                    masks = self._feather_stack(masks)
+                stack[:n, :, :, 3] = masks
+            except Exception as e:
+                # Fall back to one image at a time so one bad file does not fail its chunk.
+                for index, image in chunk:
+                    try:
+                        img_array = self._remove_from_array(_to_rgba_array(image), method, feather_edges)
+                        yield index, {"success": True, "image_data": _encode_png(img_array, png_compress_level)}
+                    except Exception as single_err:
+                        logger.error(f"Error removing background: {str(single_err)}")
+                        yield index, {"success": False, "error": str(single_err)}
+                continue
+            for i, (index, _) in enumerate(chunk):
+                try:
+                    yield index, {"success": True, "image_data": _encode_png(stack[i], png_compress_level)}
+                except Exception as e:
+                    yield index, {"success": False, "error": str(e)}
+
+    def _stack_masks(self, stack, method, scratch):
+        """Masks for an (N, H, W, 4) stack; same values as the per-image _create_*_mask methods."""
+        n, height, width, _ = stack.shape
+        if method == "edge_detection":
+            return np.stack([self._create_edge_detection_mask(img) for img in stack])
+        if method == "color_range":
+            rgb_min = np.minimum(np.minimum(stack[..., 0], stack[..., 1]), stack[..., 2])
+            return np.where(rgb_min >= self.white_threshold, _TRANSPARENT, _OPAQUE)
+        # Gray is per pixel, so the stack converts as one tall image (RGBA in, no channel copy).
+        gray = cv2.cvtColor(stack.reshape(n * height, width, 4), cv2.COLOR_RGBA2GRAY).reshape(n, height, width)
+        bright = gray > self.white_threshold
+        if method == "threshold":
+            return np.where(bright, _TRANSPARENT, _OPAQUE)
+        # Adaptive: bright and np.var(rgb) < 50, in exact integer form: 3*sum(x^2) - sum(x)^2 < 9*50.
+        total, squares = scratch
+        np.add(stack[..., 0], stack[..., 1], out=total, dtype=np.int32)
+        np.add(total, stack[..., 2], out=total)
+        np.multiply(stack[..., 0], stack[..., 0], out=squares, dtype=np.int32)
+        for c in (1, 2):
+            squares += np.square(stack[..., c], dtype=np.int32)
+        squares *= 3
+        np.multiply(total, total, out=total)
+        squares -= total
+        white = bright & (squares < 450)
+        return np.where(white, _TRANSPARENT, _OPAQUE)
+
+    def _feather_stack(self, masks, feather_radius=5):
+        """_feather_mask for every mask at once: the stack is blurred as one N-channel image."""
+        ksize = (feather_radius * 2 + 1, feather_radius * 2 + 1)
+        # OpenCV filters handle up to 512 channels per call.
+        out = np.empty_like(masks)
+        for start in range(0, len(masks), 512):
+            part = np.ascontiguousarray(masks[start:start + 512].transpose(1, 2, 0))
+            blurred = cv2.GaussianBlur(part, ksize, feather_radius)
+            out[start:start + 512] = blurred.reshape(part.shape).transpose(2, 0, 1)
+        return out
     
     def enhance_transparency(self, image_data, contrast_boost=1.2, saturation_boost=1.1):
         """Enhance image after background removal"""
@@ -222,6 +355,10 @@ def enhance_transparent_image(image_data, contrast_boost=1.2, saturation_boost=1
     """Convenience function for enhancing transparent images"""
     return background_remover.enhance_transparency(image_data, contrast_boost, saturation_boost)
 
-def batch_remove_backgrounds(image_data_list, method="adaptive"):
+def batch_remove_backgrounds(image_data_list, method="adaptive", feather_edges=True,
+                             max_memory=DEFAULT_BATCH_MEMORY, processes=1,
+                             png_compress_level=PNG_COMPRESS_LEVEL):
     """Convenience function for batch background removal"""
-    return background_remover.remove_background_batch(image_data_list, method)
+    return background_remover.remove_background_batch(
+        image_data_list, method, feather_edges, max_memory, processes, png_compress_level
+    )
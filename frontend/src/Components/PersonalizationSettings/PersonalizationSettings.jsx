@@ -4,6 +4,8 @@ import { getSubdomain, getCreatorFromSubdomain } from '../../utils/subdomainServ
 import { normalizeStorageUrl } from '../../utils/storageUrl';
 import { useCreator } from '../../contexts/CreatorContext';
 import { getBackendUrl } from '../../config/apiConfig';
+import { directUpload } from '../../utils/directUpload';
+import { claimSessionTokenIfNeeded } from '../../utils/userService';
 import './PersonalizationSettings.css';
 
 const BUCKET_CREATOR_LOGOS = 'creator-logos';
@@ -279,8 +281,25 @@ const PersonalizationSettings = () => {
       }
       const backendUrl = (typeof import.meta !== 'undefined' && import.meta.env?.VITE_BACKEND_URL) || 'https://screenmerch.fly.dev';
       const formData = new FormData();
-      formData.append('file', file);
+      // Direct uploads need the signed-in session (the multipart fallback below does not).
+      const sessionToken = await claimSessionTokenIfNeeded(userId);
+      let accountEmail = '';
+      try {
+        accountEmail = JSON.parse(localStorage.getItem('user') || '{}').email || '';
+      } catch (e) {}
+      const direct = await directUpload(
+        backendUrl, 'logo', file,
+        { user_id: userId, email: accountEmail, session_token: sessionToken }
+      );
+      if (direct) {
+        formData.append('storage_path', direct.storage_path);
+        formData.append('upload_ticket', direct.upload_ticket);
+      } else {
+        formData.append('file', file);
+      }
       formData.append('user_id', userId);
+      if (accountEmail) formData.append('email', accountEmail);
+      if (sessionToken) formData.append('session_token', sessionToken);
       const res = await fetch(`${backendUrl}/api/upload-creator-logo`, {
         method: 'POST',
         body: formData,
@@ -6,6 +6,9 @@ import { getPrintAreaDimensions } from '../../config/printAreaConfig';
 import { API_CONFIG } from '../../config/apiConfig';
 import './Admin.css';
 
+// Processing queue rows per page (the API caps this at 500).
+const QUEUE_PAGE_SIZE = 100;
+
 const Admin = () => {
   const [user, setUser] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -33,6 +36,9 @@ const Admin = () => {
   const [processingHistory, setProcessingHistory] = useState([]);
   const [workers, setWorkers] = useState([]);
   const [queueStatusFilter, setQueueStatusFilter] = useState('all');
+  const [queuePriorityFilter, setQueuePriorityFilter] = useState('all');
+  const [queuePage, setQueuePage] = useState(0);
+  const [queueTotal, setQueueTotal] = useState(0);
   const [queueLoading, setQueueLoading] = useState(false);
   const [selectedQueueIds, setSelectedQueueIds] = useState([]);
   const [bulkDeleteLoading, setBulkDeleteLoading] = useState(false);
@@ -54,6 +60,7 @@ const Admin = () => {
   const [editSubdomainValue, setEditSubdomainValue] = useState('');
   const [platformRevenue, setPlatformRevenue] = useState(null);
   const [platformRevenueLoading, setPlatformRevenueLoading] = useState(false);
+  const [platformResetProgress, setPlatformResetProgress] = useState(null);
   const [revenueStartDate, setRevenueStartDate] = useState('');
   const [revenueEndDate, setRevenueEndDate] = useState('');
   const [revenueCreatorFilter, setRevenueCreatorFilter] = useState('');
@@ -139,7 +146,7 @@ const Admin = () => {
       }
     }
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [isAdmin, activeTab, queueStatusFilter, isMasterAdmin]);
+  }, [isAdmin, activeTab, queueStatusFilter, queuePriorityFilter, queuePage, isMasterAdmin]);
 
 
   // Reload admin management data when tab changes
@@ -414,31 +421,26 @@ const Admin = () => {
   const loadProcessingQueue = async () => {
     setQueueLoading(true);
     try {
-      const data = await AdminService.getProcessingQueue(queueStatusFilter);
-      
+      const options = { priority: queuePriorityFilter, page: queuePage, limit: QUEUE_PAGE_SIZE };
+
       // For Order Processing Admins (not Master Admins), only show orders assigned to them
       if (isOrderProcessingAdmin && !isMasterAdmin) {
         // Get the database user ID from the users table
         const userEmail = user?.email || user?.user_metadata?.email;
-        if (userEmail) {
-          const { data: userData } = await supabase
-            .from('users')
-            .select('id')
-            .ilike('email', userEmail)
-            .single();
-          
-          if (userData?.id) {
-            const filteredData = data.filter(queueItem => queueItem.assigned_to === userData.id);
-            setProcessingQueue(filteredData);
-          } else {
-            setProcessingQueue([]);
-          }
-        } else {
+        const { data: userData } = userEmail
+          ? await supabase.from('users').select('id').ilike('email', userEmail).single()
+          : { data: null };
+        if (!userData?.id) {
           setProcessingQueue([]);
+          setQueueTotal(0);
+          return;
         }
-      } else {
-        setProcessingQueue(data);
+        options.assignedTo = userData.id;
       }
+
+      const { items, total } = await AdminService.getProcessingQueue(queueStatusFilter, options);
+      setProcessingQueue(items);
+      setQueueTotal(total);
     } catch (error) {
       console.error('Error loading processing queue:', error);
     } finally {
@@ -989,7 +991,7 @@ const Admin = () => {
 
   const handleBulkDeleteAll = async () => {
     if (processingQueue.length === 0) return;
-    if (!confirm(`Delete all ${processingQueue.length} orders in the queue? This cannot be undone.`)) return;
+    if (!confirm(`Delete all ${processingQueue.length} orders shown? This cannot be undone.`)) return;
     setBulkDeleteLoading(true);
     try {
       const ids = processingQueue.map(item => item.id);
@@ -1089,7 +1091,13 @@ const Admin = () => {
       return;
     }
     try {
-      const result = await AdminService.resetPlatformRevenueData();
+      setPlatformResetProgress('Starting…');
+      const result = await AdminService.resetPlatformRevenueData((progress) => {
+        const parts = Object.entries(progress).map(
+          ([table, p]) => `${table}: ${p.deleted}/${p.total}`
+        );
+        setPlatformResetProgress(parts.length ? parts.join(' · ') : 'Starting…');
+      });
       if (result.success) {
         alert(
           `✅ Cleared test data. Sales: ${result.deleted_sales_count || 0}, earnings: ${result.deleted_earnings_count || 0}.`
@@ -1101,6 +1109,8 @@ const Admin = () => {
     } catch (error) {
       console.error('Error clearing platform revenue data:', error);
       alert(`❌ Error: ${error.message}`);
+    } finally {
+      setPlatformResetProgress(null);
     }
   };
 
@@ -2294,7 +2304,7 @@ const Admin = () => {
                   <div className="queue-filters" style={{ display: 'flex', flexWrap: 'wrap', gap: '10px', alignItems: 'center' }}>
                     <select 
                       value={queueStatusFilter} 
-                      onChange={(e) => setQueueStatusFilter(e.target.value)}
+                      onChange={(e) => { setQueueStatusFilter(e.target.value); setQueuePage(0); }}
                       className="admin-filter"
                     >
                       <option value="all">All Orders</option>
@@ -2304,6 +2314,16 @@ const Admin = () => {
                       <option value="completed">Completed</option>
                       <option value="failed">Failed</option>
                     </select>
+                    <select
+                      value={queuePriorityFilter}
+                      onChange={(e) => { setQueuePriorityFilter(e.target.value); setQueuePage(0); }}
+                      className="admin-filter"
+                    >
+                      <option value="all">All Priorities</option>
+                      <option value="2">Urgent</option>
+                      <option value="1">High</option>
+                      <option value="0">Normal</option>
+                    </select>
                     <button onClick={loadProcessingQueue} className="refresh-btn">Refresh</button>
                     {isMasterAdmin && processingQueue.length > 0 && (
                       <div style={{ display: 'flex', gap: '10px', alignItems: 'center', marginLeft: 'auto', flexWrap: 'wrap' }}>
@@ -2390,7 +2410,28 @@ const Admin = () => {
                   )}
 
                   <div className="processing-queue-section">
-                    <h4>Processing Queue ({processingQueue.length} orders)</h4>
+                    <h4>Processing Queue ({queueTotal} orders)</h4>
+                    {queueTotal > QUEUE_PAGE_SIZE && (
+                      <div className="queue-pagination" style={{ display: 'flex', gap: '10px', alignItems: 'center', margin: '8px 0' }}>
+                        <button
+                          type="button"
+                          onClick={() => setQueuePage(p => Math.max(0, p - 1))}
+                          disabled={queuePage === 0}
+                        >
+                          Previous
+                        </button>
+                        <span style={{ fontSize: '13px', color: '#555' }}>
+                          Page {queuePage + 1} of {Math.ceil(queueTotal / QUEUE_PAGE_SIZE)}
+                        </span>
+                        <button
+                          type="button"
+                          onClick={() => setQueuePage(p => p + 1)}
+                          disabled={(queuePage + 1) * QUEUE_PAGE_SIZE >= queueTotal}
+                        >
+                          Next
+                        </button>
+                      </div>
+                    )}
                     {processingQueue.length === 0 ? (
                       <div className="no-orders">
                         <p>No orders in the processing queue.</p>
@@ -2435,9 +2476,9 @@ const Admin = () => {
                                   )}
                                   <td>
                                     <strong>{order.order_id ? order.order_id.slice(0, 8) : 'N/A'}</strong>
-                                    {order.cart && (
+                                    {order.item_count != null && (
                                       <div style={{ fontSize: '12px', color: '#666', marginTop: '4px' }}>
-                                        {order.cart.length} item(s)
+                                        {order.item_count} item(s)
                                       </div>
                                     )}
                                   </td>
@@ -2470,8 +2511,10 @@ const Admin = () => {
                                     <div style={{ display: 'flex', gap: '8px', alignItems: 'center' }}>
                                       <button
                                         className="btn-view-details"
-                                        onClick={() => {
-                                          setSelectedOrder(order);
+                                        onClick={async () => {
+                                          // The queue list carries an order summary; load the full order (cart, shipping) on open
+                                          const item = await AdminService.getProcessingQueueItem(queueItem.id);
+                                          setSelectedOrder(item?.orders || order);
                                           setSelectedCartItemIndex(null); // Reset selected item
                                           setProcessedImage(null);
                                           setOriginal300DpiImage(null);
@@ -2872,6 +2915,7 @@ const Admin = () => {
                 <button
                   type="button"
                   onClick={handleClearPlatformRevenueData}
+                  disabled={!!platformResetProgress}
                   style={{
                     padding: '8px 16px',
                     backgroundColor: '#dc3545',
@@ -2884,6 +2928,11 @@ const Admin = () => {
                 >
                   🗑️ Clear All Test Sales Data
                 </button>
+                {platformResetProgress && (
+                  <span style={{ alignSelf: 'center', color: '#666', fontSize: '13px' }}>
+                    Clearing… {platformResetProgress}
+                  </span>
+                )}
               </div>
 
               {platformRevenueLoading ? (
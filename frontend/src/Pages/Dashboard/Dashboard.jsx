@@ -7,6 +7,7 @@ import { AdminService } from '../../utils/adminService';
 import { fetchMyProfileFromBackend, claimSessionTokenIfNeeded } from '../../utils/userService';
 import { getBackendUrl } from '../../config/apiConfig';
 import { favoriteListsJson } from '../../utils/favoriteListsApi';
+import { directUpload } from '../../utils/directUpload';
 import PersonalizationSettings from '../../Components/PersonalizationSettings/PersonalizationSettings.jsx';
 import ChannelUmbrella from '../../Components/ChannelUmbrella/ChannelUmbrella.jsx';
 import { channelFriendsJson } from '../../utils/channelFriendsApi';
@@ -726,7 +727,6 @@ const Dashboard = ({ sidebar }) => {
                 // Google OAuth: backend uploads to storage and inserts row (bypasses RLS)
                 const channelTitle = userProfile?.display_name || userProfile?.username || 'Unknown';
                 const formData = new FormData();
-                formData.append('file', newFavorite.image);
                 formData.append('user_id', userId);
                 formData.append('title', newFavorite.title);
                 if (newFavorite.description) formData.append('description', newFavorite.description);
@@ -739,6 +739,18 @@ const Dashboard = ({ sidebar }) => {
                 const headers = { 'X-User-Id': userId };
                 if (accountEmail) headers['X-User-Email'] = accountEmail;
                 if (sessionToken) headers['X-Session-Token'] = sessionToken;
+                // Send the image straight to Storage when possible; the API then only records it
+                const direct = await directUpload(
+                    getBackendUrl(), 'favorite', newFavorite.image,
+                    { user_id: userId, email: accountEmail, session_token: sessionToken },
+                    headers
+                );
+                if (direct) {
+                    formData.append('storage_path', direct.storage_path);
+                    formData.append('upload_ticket', direct.upload_ticket);
+                } else {
+                    formData.append('file', newFavorite.image);
+                }
                 const res = await fetch(`${getBackendUrl()}/api/favorites/upload`, {
                     method: 'POST',
                     credentials: 'include',
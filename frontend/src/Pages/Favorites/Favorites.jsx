@@ -2,7 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { useNavigate, useParams } from 'react-router-dom';
 import { useCreator } from '../../contexts/CreatorContext';
 import { getSubdomain } from '../../utils/subdomainService';
-import { fetchPublicFavoritesByList, favoriteImageUrl } from '../../utils/favoriteListsApi';
+import { fetchPublicFavoritesByList, favoriteImageUrl, favoriteThumbUrl, favoriteSrcSet } from '../../utils/favoriteListsApi';
 import { favoriteListPageHeading } from '../../utils/favoriteListLabels';
 import StorefrontFlowBanner from '../../Components/StorefrontFlowBanner/StorefrontFlowBanner';
 import './Favorites.css';
@@ -133,9 +133,12 @@ const Favorites = ({ sidebar }) => {
                 <div className="favorites-card-image">
                   <img
                     src={
-                      favoriteImageUrl(favorite) ||
+                      favoriteThumbUrl(favorite) ||
                       'https://via.placeholder.com/320x180?text=No+Image'
                     }
+                    srcSet={favoriteSrcSet(favorite)}
+                    sizes="(max-width: 600px) 100vw, 320px"
+                    loading="lazy"
                     alt={favorite.title || 'Favorite'}
                   />
                 </div>
@@ -6,7 +6,7 @@ import './Home.css'
 import { useNavigate, Link } from 'react-router-dom';
 import { useCreator } from '../../contexts/CreatorContext';
 import { getSubdomain, isCreatorStorefrontHostname } from '../../utils/subdomainService';
-import { fetchPublicFavoriteLists, fetchPublicFavoritesByList, listPreviewImages, favoriteImageUrl } from '../../utils/favoriteListsApi';
+import { fetchPublicFavoriteLists, fetchPublicFavoritesByList, listPreviewImages, favoriteThumbUrl } from '../../utils/favoriteListsApi';
 import { isCollaboratorFavoriteList } from '../../utils/favoriteListLabels';
 import ColorPickerModal from '../../Components/ColorPickerModal/ColorPickerModal';
 import { apiJoin } from '../../config/apiConfig';
@@ -117,7 +117,7 @@ const Home = ({sidebar, category, selectedCategory, setSelectedCategory}) => {
           );
           if (okOwner && ownerData?.success) {
             ownerImages = (ownerData.favorites || [])
-              .map((f) => favoriteImageUrl(f))
+              .map((f) => favoriteThumbUrl(f))
               .filter(Boolean);
           }
         }
@@ -145,7 +145,7 @@ const Home = ({sidebar, category, selectedCategory, setSelectedCategory}) => {
             const { ok: okFriend, data: friendData } = await fetchPublicFavoritesByList(sub, slug);
             if (!okFriend || !friendData?.success) continue;
             friendImages.push(
-              ...(friendData.favorites || []).map((f) => favoriteImageUrl(f)).filter(Boolean)
+              ...(friendData.favorites || []).map((f) => favoriteThumbUrl(f)).filter(Boolean)
             );
           }
         }
@@ -1258,10 +1258,13 @@ const ProductPage = ({ sidebar }) => {
                           <img
                             className={isApparelCategory ? "product-image-clear" : "product-image-normal"}
                             src={safeUrl + (safeUrl.includes('?') ? '&' : '?') + getStableImageQuery(productData)}
+                            srcSet={product.preview_image_srcset || undefined}
+                            sizes="(max-width: 600px) 50vw, 320px"
                             alt={product.name}
                             loading="lazy"
                             referrerPolicy="no-referrer"
                             onError={(e) => {
+                              e.currentTarget.removeAttribute('srcset');
                               const fallback = getProductImageUrl(product, false);
                               if (fallback && e.currentTarget.src !== fallback) {
                                 const q = getStableImageQuery(productData);
@@ -1241,11 +1241,12 @@ export class AdminService {
   }
 
   /**
-   * Get order processing queue
+   * Get one page of the order processing queue (order summary + assignee per item)
    * @param {string} status - Filter by status ('all', 'pending', 'assigned', 'processing', 'completed')
-   * @returns {Promise<Array>} Queue items
+   * @param {Object} options - { priority: 'all' | 0 | 1 | 2, assignedTo: user id, page: 0-based, limit }
+   * @returns {Promise<{items: Array, total: number}>} Queue items and the number of matching items
    */
-  static async getProcessingQueue(status = 'all') {
+  static async getProcessingQueue(status = 'all', { priority = 'all', assignedTo = null, page = 0, limit = 100 } = {}) {
     try {
       // Get user email for authentication
       const userEmail = await this.getCurrentUserEmail();
@@ -1258,8 +1259,12 @@ export class AdminService {
       if (userEmail) {
         headers['X-User-Email'] = userEmail;
       }
+      const params = new URLSearchParams({ status, priority: String(priority), page: String(page), limit: String(limit) });
+      if (assignedTo) {
+        params.set('assigned_to', assignedTo);
+      }
       
-      const response = await fetch(`${apiUrl}/api/admin/processing-queue?status=${status}`, {
+      const response = await fetch(`${apiUrl}/api/admin/processing-queue?${params.toString()}`, {
         method: 'GET',
         credentials: 'include',
         headers
@@ -1271,13 +1276,43 @@ export class AdminService {
 
       const result = await response.json();
       if (result.success) {
-        return result.data || [];
+        const items = result.data || [];
+        return { items, total: result.total ?? items.length };
       } else {
         throw new Error(result.error || 'Failed to fetch processing queue');
       }
     } catch (error) {
       console.error('Error fetching processing queue:', error);
-      return [];
+      return { items: [], total: 0 };
+    }
+  }
+
+  /**
+   * Get one queue item with its full order (cart, shipping address) for the detail panel
+   * @param {string} queueId - Queue item ID
+   * @returns {Promise<Object|null>} Queue item with `orders`, or null
+   */
+  static async getProcessingQueueItem(queueId) {
+    try {
+      const userEmail = await this.getCurrentUserEmail();
+      const apiUrl = process.env.REACT_APP_API_URL || 'https://screenmerch.fly.dev';
+      const headers = {
+        'Content-Type': 'application/json'
+      };
+      if (userEmail) {
+        headers['X-User-Email'] = userEmail;
+      }
+
+      const response = await fetch(`${apiUrl}/api/admin/processing-queue/${encodeURIComponent(queueId)}`, {
+        method: 'GET',
+        credentials: 'include',
+        headers
+      });
+      const result = await response.json();
+      return result.success ? result.data : null;
+    } catch (error) {
+      console.error('Error fetching queue item:', error);
+      return null;
     }
   }
 
@@ -1981,8 +2016,10 @@ export class AdminService {
 
   /**
    * Clear ALL platform revenue + sales analytics test data (master admin only).
+   * Runs as a background job on the server; polls until it finishes.
+   * @param {Function} onProgress - Optional callback with the job's per-table progress
    */
-  static async resetPlatformRevenueData() {
+  static async resetPlatformRevenueData(onProgress) {
     try {
       const userEmail = await this.getCurrentUserEmail();
       if (!userEmail) {
@@ -1997,7 +2034,7 @@ export class AdminService {
           'Content-Type': 'application/json',
           'X-User-Email': userEmail,
         },
-        body: JSON.stringify({ confirm: true }),
+        body: JSON.stringify({ confirm: true, background: true }),
       });
 
       if (!response.ok) {
@@ -2005,7 +2042,14 @@ export class AdminService {
         throw new Error(errorData.error || `HTTP ${response.status}: ${response.statusText}`);
       }
 
-      const result = await response.json();
+      let result = await response.json();
+      if (result.job_id) {
+        const job = await this.waitForMaintenanceJob(result.job_id, onProgress);
+        if (job.status !== 'completed') {
+          throw new Error(job.error || 'Reset job failed');
+        }
+        result = { success: true, ...job.result };
+      }
       await this.logAdminAction('reset_platform_revenue_data', 'platform', 'all', {
         deleted_sales_count: result.deleted_sales_count,
         deleted_earnings_count: result.deleted_earnings_count,
@@ -2017,6 +2061,37 @@ export class AdminService {
     }
   }
 
+  /**
+   * Get a background maintenance job (master admin only)
+   * @param {string} jobId - Job ID returned by a maintenance endpoint
+   * @returns {Promise<Object>} Job with status, progress and result
+   */
+  static async getMaintenanceJob(jobId) {
+    const userEmail = await this.getCurrentUserEmail();
+    const apiUrl = getAdminApiBase();
+    const response = await fetch(`${apiUrl}/api/admin/maintenance-jobs/${encodeURIComponent(jobId)}`, {
+      credentials: 'include',
+      headers: { 'X-User-Email': userEmail || '' },
+    });
+    const data = await response.json();
+    if (!response.ok || !data.success) {
+      throw new Error(data.error || `HTTP ${response.status}`);
+    }
+    return data.job;
+  }
+
+  /**
+   * Poll a maintenance job until it is no longer running.
+   */
+  static async waitForMaintenanceJob(jobId, onProgress, intervalMs = 1000) {
+    for (;;) {
+      const job = await this.getMaintenanceJob(jobId);
+      if (onProgress) onProgress(job.progress || {});
+      if (job.status !== 'running') return job;
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+  }
+
   /**
    * Get platform revenue analytics (master admin only)
    * @param {string} startDate - Optional start date filter (YYYY-MM-DD)
@@ -0,0 +1,45 @@
+import { supabase } from '../supabaseClient';
+
+/**
+ * Upload an image straight to Supabase Storage with a backend-signed URL so the bytes
+ * never pass through the API server. `fields` are the auth/owner fields the backend
+ * route expects (user_id, email, session_token, ...).
+ *
+ * Returns { storage_path, upload_ticket } to send to the finalize route instead of the
+ * file, or null when direct upload is unavailable (caller falls back to multipart).
+ */
+export async function directUpload(backendUrl, kind, file, fields = {}, headers = {}) {
+  let rejection = null;
+  try {
+    const form = new FormData();
+    form.append('kind', kind);
+    form.append('filename', file.name || 'image.png');
+    form.append('content_type', file.type || 'image/png');
+    form.append('size', String(file.size || 0));
+    Object.entries(fields).forEach(([k, v]) => {
+      if (v !== undefined && v !== null && v !== '') form.append(k, v);
+    });
+    const res = await fetch(`${backendUrl}/api/uploads/sign`, {
+      method: 'POST',
+      credentials: 'include',
+      headers: { Accept: 'application/json', ...headers },
+      body: form,
+    });
+    const signed = await res.json().catch(() => ({}));
+    if (!res.ok || !signed.success) {
+      // Size/type errors are final; anything else falls back to the multipart route.
+      if (res.status === 400 && signed.error) rejection = signed.error;
+      else return null;
+    }
+    if (!rejection) {
+      const { error } = await supabase.storage
+        .from(signed.bucket)
+        .uploadToSignedUrl(signed.path, signed.token, file, { contentType: file.type || 'image/png' });
+      if (error) return null;
+      return { storage_path: signed.path, upload_ticket: signed.upload_ticket };
+    }
+  } catch (_) {
+    return null;
+  }
+  throw new Error(rejection);
+}
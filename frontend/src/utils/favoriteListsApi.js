@@ -65,6 +65,16 @@ export function favoriteImageUrl(favorite) {
   return (favorite.image_url || favorite.thumbnail_url || favorite.thumbnail || '').trim();
 }
 
+// Small image for grids/previews; the full-size favoriteImageUrl is still used for Make Merch.
+export function favoriteThumbUrl(favorite) {
+  if (!favorite) return '';
+  return (favorite.thumbnail_url || favorite.image_url || favorite.thumbnail || '').trim();
+}
+
+export function favoriteSrcSet(favorite) {
+  return (favorite && favorite.image_srcset) || undefined;
+}
+
 export function listPreviewImages(list) {
   if (!list) return [];
   if (Array.isArray(list.preview_images) && list.preview_images.length) {
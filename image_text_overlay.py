@@ -1,5 +1,7 @@
 import os
+import sys
 import base64
+import importlib.util
 import io
 import uuid
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
@@ -9,6 +11,24 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _load_text_render():
+    """The backend's text engine, loaded by file so backend/utils/__init__ (Flask, app helpers) never runs."""
+    for name in ("utils.text_render", "backend.utils.text_render"):
+        if name in sys.modules:
+            return sys.modules[name]
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend", "utils", "text_render.py")
+    spec = importlib.util.spec_from_file_location("text_render", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+text_render = _load_text_render()
+
+# Overlay font preference (file stems): Arial on macOS/Windows, DejaVu Sans Bold on Linux.
+OVERLAY_FONT_CANDIDATES = ("arial", "dejavusans-bold", "calibri")
+
 class ImageTextOverlay:
     """Stylish image text overlay with multiple effects and customization options"""
     
@@ -71,7 +91,6 @@ class ImageTextOverlay:
             
             # Create a copy for drawing
             overlay_image = image.copy()
-            draw = ImageDraw.Draw(overlay_image)
             
             # Set default values
             font_size = font_size or self.default_font_size
@@ -83,9 +102,7 @@ class ImageTextOverlay:
             font = self._get_font(font_size, style)
             
             # Calculate text position
-            text_bbox = draw.textbbox((0, 0), text, font=font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
+            text_width, text_height = text_render.measure(text, font)
             
             # Calculate position
             x, y = self._calculate_position(position, image.size, text_width, text_height)
@@ -109,21 +126,22 @@ class ImageTextOverlay:
                 # Apply rounded corners
                 bg_layer = self._apply_rounded_corners(bg_layer, bg_rect, 10)
                 overlay_image = Image.alpha_composite(overlay_image, bg_layer)
-                draw = ImageDraw.Draw(overlay_image)
             
             # Apply effects
             if shadow:
-                self._add_shadow(draw, text, x, y, font, font_color)
+                self._add_shadow(overlay_image, text, x, y, font, font_color)
             
             if glow:
-                self._add_glow(draw, text, x, y, font, font_color)
+                self._add_glow(overlay_image, text, x, y, font, font_color)
+            
+            # Cached raster of the text; repeated overlays are composited, not redrawn
+            rendered_text = text_render.text_layer(text, font, font_color, stroke_width, stroke_color)
             
             # Draw main text
             if rotation != 0:
                 # Create rotated text
                 text_layer = Image.new('RGBA', image.size, (0, 0, 0, 0))
-                text_draw = ImageDraw.Draw(text_layer)
-                text_draw.text((x, y), text, font=font, fill=font_color, stroke_width=stroke_width, stroke_fill=stroke_color)
+                text_render.composite(text_layer, rendered_text, x, y)
                 
                 # Rotate the text layer
                 rotated_text = text_layer.rotate(rotation, expand=True, fillcolor=(0, 0, 0, 0))
@@ -136,7 +154,7 @@ class ImageTextOverlay:
                 overlay_image.paste(rotated_text, (rot_x, rot_y), rotated_text)
             else:
                 # Draw text with stroke
-                draw.text((x, y), text, font=font, fill=font_color, stroke_width=stroke_width, stroke_fill=stroke_color)
+                text_render.composite(overlay_image, rendered_text, x, y)
             
             # Apply opacity if needed
             if opacity < 1.0:
@@ -181,7 +199,6 @@ class ImageTextOverlay:
             
             # Create a copy for drawing
             overlay_image = image.copy()
-            draw = ImageDraw.Draw(overlay_image)
             
             # Add each text element
             for element in text_elements:
@@ -204,22 +221,24 @@ class ImageTextOverlay:
                 font = self._get_font(font_size, style)
                 
                 # Calculate text position
-                text_bbox = draw.textbbox((0, 0), text, font=font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_height = text_bbox[3] - text_bbox[1]
+                text_width, text_height = text_render.measure(text, font)
                 
                 # Calculate position
                 x, y = self._calculate_position(position, image.size, text_width, text_height)
                 
                 # Apply effects
                 if shadow:
-                    self._add_shadow(draw, text, x, y, font, font_color)
+                    self._add_shadow(overlay_image, text, x, y, font, font_color)
                 
                 if glow:
-                    self._add_glow(draw, text, x, y, font, font_color)
+                    self._add_glow(overlay_image, text, x, y, font, font_color)
                 
                 # Draw text
-                draw.text((x, y), text, font=font, fill=font_color, stroke_width=stroke_width, stroke_fill=stroke_color)
+                text_render.composite(
+                    overlay_image,
+                    text_render.text_layer(text, font, font_color, stroke_width, stroke_color),
+                    x, y,
+                )
             
             # Convert back to base64
             buffer = io.BytesIO()
@@ -234,31 +253,8 @@ class ImageTextOverlay:
             raise
     
     def _get_font(self, font_size: int, style: str) -> ImageFont.FreeTypeFont:
-        """Get font based on style"""
-        try:
-            # Try to load system fonts
-            font_paths = [
-                "/System/Library/Fonts/Arial.ttf",  # macOS
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",  # Linux
-                "C:/Windows/Fonts/arial.ttf",  # Windows
-                "C:/Windows/Fonts/calibri.ttf",  # Windows
-            ]
-            
-            font_path = None
-            for path in font_paths:
-                if os.path.exists(path):
-                    font_path = path
-                    break
-            
-            if font_path:
-                return ImageFont.truetype(font_path, font_size)
-            else:
-                # Fallback to default font
-                return ImageFont.load_default()
-                
-        except Exception as e:
-            logger.warning(f"Could not load custom font: {str(e)}")
-            return ImageFont.load_default()
+        """Get font based on style (fonts are discovered once and cached per size)"""
+        return text_render.get_font(None, font_size, candidates=OVERLAY_FONT_CANDIDATES)
     
     def _calculate_position(self, position: str, image_size: Tuple[int, int], text_width: int, text_height: int) -> Tuple[int, int]:
         """Calculate text position based on position string"""
@@ -292,44 +288,13 @@ class ImageTextOverlay:
         
         return x, y
     
-    def _add_shadow(self, draw: ImageDraw.Draw, text: str, x: int, y: int, font: ImageFont.FreeTypeFont, color: Tuple[int, int, int]):
-        """Add shadow effect to text"""
-        shadow_offset = 3
-        shadow_color = (0, 0, 0, 128)  # Semi-transparent black
-        
-        # Create shadow layer
-        shadow_layer = Image.new('RGBA', draw.im.size, (0, 0, 0, 0))
-        shadow_draw = ImageDraw.Draw(shadow_layer)
-        shadow_draw.text((x + shadow_offset, y + shadow_offset), text, font=font, fill=shadow_color)
-        
-        # Apply blur to shadow
-        shadow_layer = shadow_layer.filter(ImageFilter.GaussianBlur(radius=2))
-        
-        # Composite shadow onto main image
-        draw.im.paste(shadow_layer, (0, 0), shadow_layer)
+    def _add_shadow(self, image: Image.Image, text: str, x: int, y: int, font: ImageFont.FreeTypeFont, color: Tuple[int, int, int]):
+        """Add shadow effect to text (semi-transparent black, offset 3px, blurred)"""
+        text_render.composite(image, text_render.shadow_layer(text, font), x, y)
     
-    def _add_glow(self, draw: ImageDraw.Draw, text: str, x: int, y: int, font: ImageFont.FreeTypeFont, color: Tuple[int, int, int]):
-        """Add glow effect to text"""
-        glow_radius = 5
-        glow_color = color + (128,)  # Semi-transparent version of text color
-        
-        # Create glow layer
-        glow_layer = Image.new('RGBA', draw.im.size, (0, 0, 0, 0))
-        glow_draw = ImageDraw.Draw(glow_layer)
-        
-        # Draw multiple layers for glow effect
-        for i in range(glow_radius):
-            offset = i * 2
-            glow_draw.text((x - offset, y - offset), text, font=font, fill=glow_color)
-            glow_draw.text((x + offset, y - offset), text, font=font, fill=glow_color)
-            glow_draw.text((x - offset, y + offset), text, font=font, fill=glow_color)
-            glow_draw.text((x + offset, y + offset), text, font=font, fill=glow_color)
-        
-        # Apply blur to glow
-        glow_layer = glow_layer.filter(ImageFilter.GaussianBlur(radius=3))
-        
-        # Composite glow onto main image
-        draw.im.paste(glow_layer, (0, 0), glow_layer)
+    def _add_glow(self, image: Image.Image, text: str, x: int, y: int, font: ImageFont.FreeTypeFont, color: Tuple[int, int, int]):
+        """Add glow effect to text (blurred half-opacity copies of the text color)"""
+        text_render.composite(image, text_render.glow_layer(text, font, color), x, y)
     
     def _apply_rounded_corners(self, image: Image.Image, rect: List[int], radius: int) -> Image.Image:
         """Apply rounded corners to a rectangle"""
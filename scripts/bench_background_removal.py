@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark BackgroundRemover batch mode against the one-at-a-time loop.
+
+    python scripts/bench_background_removal.py                 # 10/50/200 images, 640x480
+    python scripts/bench_background_removal.py --sizes 50 --width 1024 --height 1024 --max-memory-mb 64
+    python scripts/bench_background_removal.py --mixed --processes 4
+    python scripts/bench_background_removal.py --compress-level 1   # faster PNG encode for the batch
+
+Prints wall time, images/s and peak traced memory for both paths.
+"""
+import argparse
+import base64
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from background_removal import BackgroundRemover  # noqa: E402
+
+
+def make_image(width, height, seed):
+    rng = np.random.default_rng(seed)
+    arr = rng.integers(230, 256, (height, width, 3), dtype=np.uint8)
+    img = Image.fromarray(arr, "RGB")
+    ImageDraw.Draw(img).ellipse([width // 5, height // 5, width * 3 // 5, height * 4 // 5], fill=(20, 90, 200))
+    out = io.BytesIO()
+    img.save(out, "PNG", compress_level=1)
+    return "data:image/png;base64," + base64.b64encode(out.getvalue()).decode("ascii")
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,50,200", help="comma-separated batch sizes")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--method", default="adaptive")
+    parser.add_argument("--max-memory-mb", type=int, default=256)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--compress-level", type=int, default=6, help="PNG compress level for the batch path")
+    parser.add_argument("--mixed", action="store_true", help="give every image a different size")
+    args = parser.parse_args()
+
+    remover = BackgroundRemover()
+    print(f"{'images':>7} {'path':>7} {'seconds':>8} {'img/s':>7} {'peak MB':>8}")
+    for count in (int(n) for n in args.sizes.split(",")):
+        images = [
+            make_image(args.width + (i if args.mixed else 0), args.height, i) for i in range(count)
+        ]
+
+        def serial():
+            return [remover.remove_white_background_advanced(img, args.method) for img in images]
+
+        def batch():
+            return remover.remove_background_batch(
+                images, args.method,
+                max_memory=args.max_memory_mb * 1024 * 1024, processes=args.processes,
+                png_compress_level=args.compress_level,
+            )
+
+        for label, fn in (("serial", serial), ("batch", batch)):
+            _, elapsed, peak = measure(fn)
+            print(f"{count:>7} {label:>7} {elapsed:>8.2f} {count / elapsed:>7.1f} {peak / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
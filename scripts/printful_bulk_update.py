@@ -1,156 +1,359 @@
 """
-Bulk updater for syncing Printful availability and bumping prices by a fixed amount.
-
-- Reads all products from the Printful Store (sync products)
-- For each product, collects available size/color combinations
-- Updates frontend `frontend/src/data/products.js` entries by:
-  - Replacing the `variables` availability matrix to match Printful
-  - Adding a fixed dollar amount to `price`
-- Optionally updates backend `PRODUCTS` prices (+amount) for display/checkout
+Sync Printful availability (and, with ``--sync-prices``, prices) into the product catalog files.
+
+- Reads all products from the Printful Store (sync products) with a bounded pool of
+  concurrent requests that backs off on Printful's rate-limit headers (X-Ratelimit-Remaining /
+  X-Ratelimit-Reset, Retry-After on 429) and retries transient failures.
+- Keeps an on-disk HTTP cache (ETag / Last-Modified plus a content hash), so unchanged products
+  are revalidated instead of re-downloaded and catalog variant details are fetched only once.
+- Checkpoints finished products; a run that fails part way resumes where it stopped.
+- For each product, collects available size/color combinations (variants Printful marks
+  discontinued or out of stock are unavailable) and the lowest retail price.
+- Writes only what changed: a `frontend/src/data/products.js` entry is re-serialized only when its
+  availability differs, every other byte of the file is left alone.
+- Prices are curated and left alone by default. ``--sync-prices`` sets each price to the Printful
+  retail price (+ ``--markup``) and applies the same difference to the backend `PRODUCTS` entry
+  with the same name; a second run with the same inputs changes nothing.
 
 Requirements:
   - Set environment variable PRINTFUL_API_KEY
-  - Run from repository root:  python scripts/printful_bulk_update.py --price-bump 10
+  - Run from repository root:  python scripts/printful_bulk_update.py [--workers 4]
+    (prices too:  python scripts/printful_bulk_update.py --sync-prices --markup 0)
 
 Safeguards:
-  - Only edits the two files above
+  - Only edits the two files above, and only if something changed
   - Creates a timestamped backup of each file before editing
+  - ``--dry-run`` prints the changes without writing
   - Does not touch any CORS code or other modules
 """
 
 from __future__ import annotations
 
+import argparse
+import hashlib
+import json
 import os
+import random
 import re
-import json
+import tempfile
+import threading
 import time
-import argparse
-from collections import defaultdict
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 
 import requests
 
 
 PRINTFUL_BASE_URL = "https://api.printful.com"
+PAGE_SIZE = 100
+REQUEST_TIMEOUT = (5, 30)
+MAX_ATTEMPTS = 5
+DEFAULT_WORKERS = 4
+CACHE_PATH = os.path.join(".cache", "printful_sync", "http_cache.json")
+CHECKPOINT_PATH = os.path.join(".cache", "printful_sync", "checkpoint.json")
+FRONTEND_PRODUCTS_PATH = os.path.join("frontend", "src", "data", "products.js")
+BACKEND_APP_PATH = os.path.join("backend", "app.py")
+
+UNAVAILABLE_STATUSES = {"discontinued", "out_of_stock", "temporary_out_of_stock"}
+
+# Ordering for sizes, in the forms used in the frontend (XXL not 2XL)
+SIZE_ORDER = ["XXS", "XS", "S", "M", "L", "XL", "XXL", "XXXL", "XXXXL", "XXXXXL"]
+SIZE_ALIASES = {"2XS": "XXS", "2XL": "XXL", "3XL": "XXXL", "4XL": "XXXXL", "5XL": "XXXXXL"}
 
 
 def slug_product_key(product_name: str) -> str:
     """Derive the key used in products.js for a product name.
     Empirically the file uses lowercased names with spaces removed (apostrophes often kept).
-    We will search by the product's "name" field instead of relying on slug alone.
+    Products are matched by their "name" field first and by this key as a fallback.
     """
     return (
         product_name.strip().lower().replace(" ", "")
     )
 
 
-def fetch_store_products(api_key: str) -> List[Dict]:
-    products = []
-    limit = 100
-    offset = 0
-    headers = {"Authorization": f"Bearer {api_key}"}
-    while True:
-        resp = requests.get(
-            f"{PRINTFUL_BASE_URL}/store/products?limit={limit}&offset={offset}", headers=headers
-        )
-        resp.raise_for_status()
-        data = resp.json()["result"]
-        products.extend(data)
-        if len(data) < limit:
-            break
-        offset += limit
+def normalize_size(sz: str) -> str:
+    return SIZE_ALIASES.get(sz.upper(), sz.upper())
+
+
+def _atomic_write_json(path: str, data) -> None:
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _load_json(path: Optional[str], default):
+    if not path or not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+class RateLimiter:
+    """Pause shared by all workers, driven by Printful's rate-limit response headers."""
+
+    def __init__(self, reserve: int = 1, clock=time.monotonic, sleep=time.sleep):
+        self.reserve = reserve
+        self._clock = clock
+        self._sleep = sleep
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        delay = self._resume_at - self._clock()
+        if delay > 0:
+            self._sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._resume_at = max(self._resume_at, self._clock() + seconds)
+
+    def update(self, resp) -> None:
+        headers = resp.headers
+        reset = _header_number(headers, "X-Ratelimit-Reset")
+        if resp.status_code == 429:
+            self.pause(_header_number(headers, "Retry-After") or reset or 60)
+            return
+        remaining = _header_number(headers, "X-Ratelimit-Remaining")
+        if remaining is not None and remaining <= self.reserve:
+            self.pause(reset or 60)
+
+
+def _header_number(headers, name: str) -> Optional[float]:
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpCache:
+    """ETag / Last-Modified / body cache for GET responses, persisted as one JSON file."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.entries: Dict[str, Dict] = _load_json(path, {})
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key: str, etag: Optional[str], last_modified: Optional[str], result) -> bool:
+        """Store ``result``; True when it differs from what was cached."""
+        digest = hashlib.sha256(json.dumps(result, sort_keys=True).encode("utf-8")).hexdigest()
+        with self._lock:
+            old = self.entries.get(key)
+            self.entries[key] = {"etag": etag, "last_modified": last_modified, "hash": digest, "result": result}
+        return old is None or old.get("hash") != digest
+
+    def save(self) -> None:
+        if self.path:
+            with self._lock:
+                snapshot = dict(self.entries)
+            _atomic_write_json(self.path, snapshot)
+
+
+class PrintfulClient:
+    """GET-only Printful client: conditional requests, rate-limit aware, retries with backoff."""
+
+    def __init__(self, api_key: str, cache: HttpCache, workers: int = DEFAULT_WORKERS, session=None,
+                 limiter: Optional[RateLimiter] = None, sleep=time.sleep):
+        self.cache = cache
+        self.limiter = limiter or RateLimiter(reserve=workers, sleep=sleep)
+        self._sleep = sleep
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+            session.mount("https://", adapter)
+        session.headers["Authorization"] = f"Bearer {api_key}"
+        self.session = session
+        self.requests = 0
+        self.not_modified = 0
+
+    def get(self, path: str, immutable: bool = False) -> Tuple[Dict, bool]:
+        """``(payload, changed)`` for ``path``; ``immutable`` paths are served from the cache without a request."""
+        cached = self.cache.get(path)
+        if cached and immutable:
+            return cached["result"], False
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        for attempt in range(MAX_ATTEMPTS):
+            self.limiter.wait()
+            try:
+                resp = self.session.get(f"{PRINTFUL_BASE_URL}{path}", headers=headers, timeout=REQUEST_TIMEOUT)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                self._backoff(attempt)
+                continue
+            self.requests += 1
+            self.limiter.update(resp)
+            if resp.status_code == 304 and cached:
+                self.not_modified += 1
+                return cached["result"], False
+            if resp.status_code == 429 or resp.status_code >= 500:
+                if attempt == MAX_ATTEMPTS - 1:
+                    resp.raise_for_status()
+                if resp.status_code >= 500:
+                    self._backoff(attempt)
+                continue
+            resp.raise_for_status()
+            payload = resp.json()
+            changed = self.cache.put(path, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), payload)
+            return payload, changed
+        raise RuntimeError(f"Printful GET {path} failed after {MAX_ATTEMPTS} attempts")
+
+    def _backoff(self, attempt: int) -> None:
+        self._sleep(0.5 * (2 ** attempt) * (0.5 + random.random()))
+
+
+def fetch_store_products(client: PrintfulClient, pool: ThreadPoolExecutor) -> List[Dict]:
+    """All sync products; pages after the first are fetched concurrently."""
+    first, _ = client.get(f"/store/products?limit={PAGE_SIZE}&offset=0")
+    products = list(first["result"])
+    total = (first.get("paging") or {}).get("total", len(products))
+    offsets = range(PAGE_SIZE, total, PAGE_SIZE)
+    pages = pool.map(lambda off: client.get(f"/store/products?limit={PAGE_SIZE}&offset={off}")[0], offsets)
+    for page in pages:
+        products.extend(page["result"])
     return products
 
 
-def fetch_variant_details(api_key: str, variant_id: int) -> Dict:
-    headers = {"Authorization": f"Bearer {api_key}"}
-    resp = requests.get(f"{PRINTFUL_BASE_URL}/products/variant/{variant_id}", headers=headers)
-    resp.raise_for_status()
-    return resp.json()["result"]
-
+def _variant_size_color(client: PrintfulClient, sv: Dict) -> Tuple[Optional[str], Optional[str]]:
+    size, color = sv.get("size"), sv.get("color")
+    if size and color:
+        return size, color
+    variant_id = sv.get("variant_id")
+    if not variant_id:
+        return None, None
+    # Catalog variants never change, so their details are cached for good.
+    details = client.get(f"/products/variant/{variant_id}", immutable=True)[0]["result"]
+    details = details.get("variant", details)
+    size = size or details.get("size") or details.get("options", {}).get("size")
+    color = color or details.get("color") or details.get("options", {}).get("color")
+    if not size or not color:
+        # Fallback: parse from name if options missing, e.g., "Black / XL"
+        name = details.get("name", "")
+        if "/" in name:
+            parts = [p.strip() for p in name.split("/")]
+            if len(parts) >= 2:
+                color = color or parts[-2]
+                size = size or parts[-1]
+    return size, color
+
+
+def build_availability(variants: List[Tuple[str, str, bool]], existing: Optional[Dict] = None) -> Dict:
+    """
+    ``variables`` block ({sizes, colors, availability}) from (size, color, available) triples.
+    Sizes follow SIZE_ORDER; colors keep the order already in ``existing`` with new ones appended,
+    so an unchanged product produces an identical block.
+    """
+    existing = existing or {}
+    sizes_seen = {normalize_size(s) for s, _, _ in variants}
+    sizes = [s for s in SIZE_ORDER if s in sizes_seen]
+    sizes += [s for s in existing.get("sizes", []) if s in sizes_seen and s not in sizes]
+    sizes += sorted(s for s in sizes_seen if s not in sizes)
+
+    colors_seen = {c for _, c, _ in variants}
+    colors = [c for c in existing.get("colors", []) if c in colors_seen]
+    colors += sorted(c for c in colors_seen if c not in colors)
+
+    available = {(normalize_size(s), c) for s, c, ok in variants if ok}
+    availability = {s: {c: (s, c) in available for c in colors} for s in sizes}
+    return {"sizes": sizes, "colors": colors, "availability": availability}
+
+
+def fetch_product(client: PrintfulClient, sync_product_id: int) -> Dict:
+    """Variants (size, color, available) and lowest retail price of one sync product."""
+    payload, changed = client.get(f"/store/products/{sync_product_id}")
+    result = payload["result"]
+    variants = []
+    prices = []
+    for sv in result.get("sync_variants", []):
+        if sv.get("is_ignored"):
+            continue
+        size, color = _variant_size_color(client, sv)
+        if not size or not color:
+            continue
+        ok = (sv.get("availability_status") or "active") not in UNAVAILABLE_STATUSES
+        variants.append((size, color, ok))
+        try:
+            if ok and sv.get("retail_price") is not None:
+                prices.append(float(sv["retail_price"]))
+        except (TypeError, ValueError):
+            pass
+    return {
+        "name": (result.get("sync_product") or {}).get("name"),
+        "variants": variants,
+        "price": min(prices) if prices else None,
+        "changed": changed,
+    }
 
-def build_availability_for_product(api_key: str, sync_product_id: int) -> Tuple[List[str], List[str], Dict[str, Dict[str, bool]]]:
-    headers = {"Authorization": f"Bearer {api_key}"}
-    resp = requests.get(f"{PRINTFUL_BASE_URL}/store/products/{sync_product_id}", headers=headers)
-    resp.raise_for_status()
-    result = resp.json()["result"]
-    sync_variants = result.get("sync_variants", [])
 
-    # Aggregate
-    size_to_colors: Dict[str, set] = defaultdict(set)
-    all_colors: set = set()
+class Checkpoint:
+    """Finished products of an interrupted run, keyed by sync product id."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.products: Dict[str, Dict] = _load_json(path, {})
+        self._lock = threading.Lock()
+
+    def add(self, sync_product_id, product: Dict) -> None:
+        with self._lock:
+            self.products[str(sync_product_id)] = product
+
+    def save(self) -> None:
+        if self.path:
+            with self._lock:
+                snapshot = dict(self.products)
+            _atomic_write_json(self.path, snapshot)
+
+    def clear(self) -> None:
+        self.products = {}
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def collect_products(client: PrintfulClient, checkpoint: Checkpoint, workers: int = DEFAULT_WORKERS,
+                     save_every: int = 10) -> Tuple[List[Dict], List[Tuple[int, str]]]:
+    """Fetch every store product not already in the checkpoint. Returns (products, failures)."""
+    failures = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="printful-sync") as pool:
+        store_products = fetch_store_products(client, pool)
+        pending = {}
+        for sp in store_products:
+            if sp.get("id") and sp.get("name") and str(sp["id"]) not in checkpoint.products:
+                pending[pool.submit(fetch_product, client, sp["id"])] = sp
+        for n, future in enumerate(as_completed(pending), 1):
+            sp = pending[future]
+            try:
+                product = future.result()
+            except Exception as e:
+                failures.append((sp["id"], str(e)))
+                continue
+            product["name"] = sp["name"]
+            checkpoint.add(sp["id"], product)
+            if n % save_every == 0:
+                checkpoint.save()
+                client.cache.save()
+    checkpoint.save()
+    client.cache.save()
+    wanted = {str(sp["id"]) for sp in store_products if sp.get("id")}
+    return [p for key, p in checkpoint.products.items() if key in wanted], failures
 
-    for sv in sync_variants:
-        variant_id = sv.get("variant_id")
-        if not variant_id:
-            continue
-        details = fetch_variant_details(api_key, variant_id)
-        size = details.get("size") or details.get("options", {}).get("size")
-        color = details.get("color") or details.get("options", {}).get("color")
-        if not size or not color:
-            # Fallback: parse from name if options missing, e.g., "Black / XL"
-            name = details.get("name", "")
-            if "/" in name:
-                parts = [p.strip() for p in name.split("/")]
-                if len(parts) >= 2:
-                    color = color or parts[0]
-                    size = size or parts[1]
-        if size and color:
-            size_to_colors[size].add(color)
-            all_colors.add(color)
-
-    # Ordering for sizes
-    size_order = [
-        "2XS",
-        "XS",
-        "S",
-        "M",
-        "L",
-        "XL",
-        "2XL",
-        "XXL",
-        "3XL",
-        "XXXL",
-        "4XL",
-        "XXXXL",
-        "5XL",
-        "XXXXXL",
-    ]
-
-    # Normalize size keys to the forms used in the frontend (e.g., XXL not 2XL if necessary)
-    def normalize_size(sz: str) -> str:
-        mapping = {
-            "2XS": "XXS",
-            "2XL": "XXL",
-            "3XL": "XXXL",
-            "4XL": "XXXXL",
-            "5XL": "XXXXXL",
-        }
-        return mapping.get(sz.upper(), sz.upper())
-
-    sizes_sorted = []
-    seen = set()
-    for sz in size_order:
-        norm = normalize_size(sz)
-        if sz in size_to_colors or norm in size_to_colors:
-            if norm not in seen:
-                sizes_sorted.append(norm)
-                seen.add(norm)
-    # Also include any sizes not in size_order
-    for sz in list(size_to_colors.keys()):
-        norm = normalize_size(sz)
-        if norm not in seen:
-            sizes_sorted.append(norm)
-
-    colors_sorted = sorted(all_colors)
-
-    availability: Dict[str, Dict[str, bool]] = {}
-    for sz_key, colors in size_to_colors.items():
-        norm = normalize_size(sz_key)
-        availability[norm] = {c: True for c in colors}
-
-    return sizes_sorted, colors_sorted, availability
 
+# ---------------------------------------------------------------------------
+# Diff-only writers
+# ---------------------------------------------------------------------------
 
 def backup_file(path: str) -> None:
     ts = time.strftime("%Y%m%d_%H%M%S")
@@ -159,134 +362,74 @@ def backup_file(path: str) -> None:
         fdst.write(fsrc.read())
 
 
-def add_price_bump_in_products_js(contents: str, product_name: str, bump: float) -> str:
-    # Find the block containing this product by name
-    name_pattern = re.escape(f'"name": "{product_name}"')
-    match = re.search(name_pattern, contents)
-    if not match:
-        return contents
-    # Search backward a bit to find the start of the enclosing object
-    start_idx = contents.rfind("{", 0, match.start())
-    end_idx = contents.find("}\n", match.end())
-    if start_idx == -1 or end_idx == -1:
-        return contents
-    block = contents[start_idx:end_idx]
-
-    # Replace price
-    price_match = re.search(r'"price"\s*:\s*([0-9]+(?:\.[0-9]+)?)', block)
-    if price_match:
-        old_price = float(price_match.group(1))
-        new_price = round(old_price + bump, 2)
-        block = (
-            block[: price_match.start(1)] + f"{new_price}" + block[price_match.end(1) :]
-        )
-
-    # Put the block back
-    return contents[:start_idx] + block + contents[end_idx:]
-
-
-def upsert_variables_in_products_js(
-    contents: str,
-    product_name: str,
-    sizes: List[str],
-    colors: List[str],
-    availability: Dict[str, Dict[str, bool]],
-) -> str:
-    # Locate by name
-    name_pattern = re.escape(f'"name": "{product_name}"')
-    name_match = re.search(name_pattern, contents)
-    if not name_match:
-        return contents
-
-    # Find the "variables": { ... } block boundaries within the product object
-    # Heuristic: search forward from name for '"variables": {' and then match braces.
-    var_start = contents.find('"variables": {', name_match.end())
-    if var_start == -1:
-        return contents
-
-    # Brace matching to find the end of the variables object
-    brace_count = 0
-    i = var_start
-    while i < len(contents):
-        if contents[i] == '{':
-            brace_count += 1
-        elif contents[i] == '}':
-            brace_count -= 1
-            if brace_count == 0:
-                var_end = i + 1
-                break
-        i += 1
-    else:
-        return contents
-
-    # Construct the new variables block JSON-ish string (keep JS formatting simple)
-    variables_obj = {
-        "sizes": sizes,
-        "colors": colors,
-        "availability": availability,
-    }
-    # Pretty-print with sorted keys false to retain order
-    new_block = '"variables": ' + json.dumps(variables_obj, indent=2, ensure_ascii=False)
-
-    updated = contents[:var_start] + new_block + contents[var_end:]
-    return updated
-
-
-def update_frontend_products_js(api_key: str, price_bump: float) -> None:
-    path = os.path.join("frontend", "src", "data", "products.js")
-    backup_file(path)
-    with open(path, "r", encoding="utf-8") as f:
-        contents = f.read()
-
-    store_products = fetch_store_products(api_key)
-
-    # Iterate and update each product found in the frontend file
-    for sp in store_products:
-        product_name = sp.get("name")
-        sync_product_id = sp.get("id")
-        if not product_name or not sync_product_id:
+def _entry_spans(contents: str) -> Dict[str, Tuple[int, int, Dict]]:
+    """key -> (start, end, entry) for each top-level entry of ``export const products = {...}``."""
+    decoder = json.JSONDecoder()
+    ws = re.compile(r"[\s,]*")
+    spans = {}
+    i = ws.match(contents, contents.index("{") + 1).end()
+    while contents[i] == '"':
+        key, i = json.decoder.scanstring(contents, i + 1)
+        start = ws.match(contents, contents.index(":", i) + 1).end()
+        entry, end = decoder.raw_decode(contents, start)
+        spans[key] = (start, end, entry)
+        i = ws.match(contents, end).end()
+    return spans
+
+
+def _serialize_entry(entry: Dict) -> str:
+    # Same layout as the rest of the file: 2-space JSON, nested one level under the products object.
+    return json.dumps(entry, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+
+
+def plan_frontend_changes(contents: str, products: List[Dict], markup: float = 0.0,
+                          sync_prices: bool = False) -> List[Dict]:
+    """One change per products.js entry whose availability or price differs from Printful."""
+    spans = _entry_spans(contents)
+    by_name = {entry.get("name"): key for key, (_, _, entry) in spans.items()}
+    changes = []
+    for product in products:
+        key = by_name.get(product["name"])
+        if key is None and slug_product_key(product["name"]) in spans:
+            key = slug_product_key(product["name"])
+        if key is None or not product["variants"]:
             continue
-        try:
-            sizes, colors, availability = build_availability_for_product(api_key, sync_product_id)
-        except Exception:
-            continue
-
-        contents_after_vars = upsert_variables_in_products_js(
-            contents, product_name, sizes, colors, availability
-        )
-        contents_after_price = add_price_bump_in_products_js(
-            contents_after_vars, product_name, price_bump
-        )
-        contents = contents_after_price
-
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(contents)
-
-
-def update_backend_prices(price_bump: float) -> None:
-    path = os.path.join("backend", "app.py")
-    backup_file(path)
-    with open(path, "r", encoding="utf-8") as f:
-        contents = f.read()
-
-    # Add bump to every "price": number inside the PRODUCTS list only.
-    # Narrow scope between 'PRODUCTS = [' and its matching closing bracket, while
-    # ignoring brackets that appear inside strings.
+        start, end, entry = spans[key]
+        variables = build_availability([tuple(v) for v in product["variants"]], entry.get("variables"))
+        new_entry = dict(entry)
+        new_entry["variables"] = {**(entry.get("variables") or {}), **variables}
+        if sync_prices and product.get("price") is not None:
+            new_entry["price"] = round(product["price"] + markup, 2)
+        if new_entry != entry:
+            changes.append({
+                "key": key,
+                "name": entry.get("name"),
+                "start": start,
+                "end": end,
+                "entry": new_entry,
+                "old_price": entry.get("price"),
+                "new_price": new_entry.get("price"),
+                "availability_changed": new_entry["variables"] != entry.get("variables"),
+            })
+    return changes
+
+
+def apply_frontend_changes(contents: str, changes: List[Dict]) -> str:
+    # Splice from the end so earlier offsets stay valid.
+    for change in sorted(changes, key=lambda c: c["start"], reverse=True):
+        contents = contents[:change["start"]] + _serialize_entry(change["entry"]) + contents[change["end"]:]
+    return contents
+
+
+def _products_block(contents: str) -> Optional[Tuple[int, int]]:
+    """(start, end) of the backend ``PRODUCTS = [...]`` list, ignoring brackets inside strings."""
     products_start = contents.find("PRODUCTS = [")
     if products_start == -1:
-        return
-
-    # Find the first '[' after the PRODUCTS assignment
-    first_bracket = contents.find('[', products_start)
-    if first_bracket == -1:
-        return
-
-    # Find the matching closing ']' for the list while ignoring strings
-    i = first_bracket
+        return None
+    i = contents.find('[', products_start)
     depth = 0
     in_string = False
     string_char = ''
-    end_index = None
     while i < len(contents):
         ch = contents[i]
         if in_string:
@@ -295,57 +438,156 @@ def update_backend_prices(price_bump: float) -> None:
                 continue
             if ch == string_char:
                 in_string = False
-            i += 1
+        elif ch in ('"', "'"):
+            in_string = True
+            string_char = ch
+        elif ch == '#':
+            i = contents.find('\n', i)
+            if i == -1:
+                return None
             continue
-        else:
-            if ch in ('"', "'"):
-                in_string = True
-                string_char = ch
-                i += 1
-                continue
-            if ch == '[':
-                depth += 1
-            elif ch == ']':
-                depth -= 1
-                if depth == 0:
-                    end_index = i + 1
-                    break
+        elif ch == '[':
+            depth += 1
+        elif ch == ']':
+            depth -= 1
+            if depth == 0:
+                return products_start, i + 1
         i += 1
-
-    if end_index is None:
-        return
-
-    products_block = contents[products_start:end_index]
-
-    def bump_price_match(m: re.Match) -> str:
-        old = float(m.group(1))
-        return f'"price": {round(old + price_bump, 2)}'
-
-    products_block = re.sub(r'"price"\s*:\s*([0-9]+(?:\.[0-9]+)?)', bump_price_match, products_block)
-
-    new_contents = contents[:products_start] + products_block + contents[end_index:]
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(new_contents)
+    return None
+
+
+def apply_backend_price_deltas(contents: str, deltas: Dict[str, float]) -> Tuple[str, List[str]]:
+    """Add ``deltas[name]`` to the price of the matching backend PRODUCTS entries; returns (contents, updated names)."""
+    block = _products_block(contents)
+    if block is None or not deltas:
+        return contents, []
+    start, end = block
+    products_block = contents[start:end]
+    updated = []
+    for name, delta in deltas.items():
+        pattern = re.compile(r'("name"\s*:\s*' + re.escape(json.dumps(name)) + r',\s*"price"\s*:\s*)([0-9]+(?:\.[0-9]+)?)')
+        m = pattern.search(products_block)
+        if not m:
+            continue
+        new_price = round(float(m.group(2)) + delta, 2)
+        products_block = products_block[:m.start(2)] + f"{new_price}" + products_block[m.end(2):]
+        updated.append(name)
+    return contents[:start] + products_block + contents[end:], updated
+
+
+def write_changes(changes: List[Dict], update_backend: bool = True, dry_run: bool = False,
+                  frontend_path: str = FRONTEND_PRODUCTS_PATH, backend_path: str = BACKEND_APP_PATH) -> Dict:
+    """Apply planned changes to products.js (and backend prices); files are untouched when nothing changed."""
+    summary = {"frontend": [c["key"] for c in changes], "backend": []}
+    if not changes:
+        return summary
+    with open(frontend_path, "r", encoding="utf-8") as f:
+        contents = f.read()
+    new_contents = apply_frontend_changes(contents, changes)
+    if not dry_run and new_contents != contents:
+        backup_file(frontend_path)
+        with open(frontend_path, "w", encoding="utf-8") as f:
+            f.write(new_contents)
+
+    deltas = {
+        c["name"]: c["new_price"] - c["old_price"]
+        for c in changes
+        if isinstance(c["old_price"], (int, float)) and c["new_price"] != c["old_price"]
+    }
+    if update_backend and deltas and os.path.exists(backend_path):
+        with open(backend_path, "r", encoding="utf-8") as f:
+            contents = f.read()
+        new_contents, summary["backend"] = apply_backend_price_deltas(contents, deltas)
+        if not dry_run and new_contents != contents:
+            backup_file(backend_path)
+            with open(backend_path, "w", encoding="utf-8") as f:
+                f.write(new_contents)
+    return summary
+
+
+def sync(client: PrintfulClient, checkpoint: Checkpoint, workers: int = DEFAULT_WORKERS, markup: float = 0.0,
+         sync_prices: bool = False, update_backend: bool = True, dry_run: bool = False,
+         frontend_path: str = FRONTEND_PRODUCTS_PATH, backend_path: str = BACKEND_APP_PATH) -> Dict:
+    started = time.perf_counter()
+    products, failures = collect_products(client, checkpoint, workers)
+    with open(frontend_path, "r", encoding="utf-8") as f:
+        changes = plan_frontend_changes(f.read(), products, markup, sync_prices)
+    summary = write_changes(changes, update_backend, dry_run, frontend_path, backend_path)
+    if not failures and not dry_run:
+        checkpoint.clear()
+    summary.update({
+        "products": len(products),
+        "unchanged": sum(1 for p in products if not p.get("changed")),
+        "failures": failures,
+        "changes": changes,
+        "requests": client.requests,
+        "not_modified": client.not_modified,
+        "seconds": time.perf_counter() - started,
+    })
+    return summary
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Sync availability from Printful and bump prices")
-    parser.add_argument("--price-bump", type=float, default=10.0, help="Dollar amount to add to each product price")
+    parser = argparse.ArgumentParser(description="Sync availability (and optionally prices) from Printful")
+    parser.add_argument("--sync-prices", action="store_true",
+                        help="Also set prices to the Printful retail price (+ --markup); off by default")
+    parser.add_argument("--markup", type=float, default=0.0, help="With --sync-prices: dollars added to the retail price")
     parser.add_argument("--skip-backend", action="store_true", help="Do not modify backend/app.py prices")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent Printful requests")
+    parser.add_argument("--cache", default=CACHE_PATH, help="HTTP cache file (ETag/Last-Modified)")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="Progress file used to resume a failed run")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of a previous run")
+    parser.add_argument("--dry-run", action="store_true", help="Print changes without writing files")
     args = parser.parse_args()
+    if args.markup and not args.sync_prices:
+        parser.error("--markup only applies with --sync-prices")
 
     api_key = os.getenv("PRINTFUL_API_KEY")
     if not api_key:
         raise SystemExit("PRINTFUL_API_KEY is not set")
 
-    update_frontend_products_js(api_key, args.price_bump)
-    if not args.skip_backend:
-        update_backend_prices(args.price_bump)
+    workers = max(1, args.workers)
+    checkpoint = Checkpoint(args.checkpoint)
+    if args.restart:
+        checkpoint.clear()
+    elif checkpoint.products:
+        print(f"↩️  Resuming: {len(checkpoint.products)} products already fetched")
+    client = PrintfulClient(api_key, HttpCache(args.cache), workers=workers)
+    summary = sync(
+        client,
+        checkpoint,
+        workers=workers,
+        markup=args.markup,
+        sync_prices=args.sync_prices,
+        update_backend=not args.skip_backend,
+        dry_run=args.dry_run,
+    )
 
-    print("✅ Bulk update complete. Review git diff and test the app.")
+    for change in summary["changes"]:
+        parts = []
+        if change["availability_changed"]:
+            parts.append("availability")
+        if change["new_price"] != change["old_price"]:
+            parts.append(f"price {change['old_price']} -> {change['new_price']}")
+        print(f"  • {change['key']}: {', '.join(parts)}")
+    if summary["backend"]:
+        print(f"  backend PRODUCTS prices: {', '.join(summary['backend'])}")
+    print(
+        f"{summary['products']} products ({summary['unchanged']} unchanged upstream), "
+        f"{len(summary['changes'])} entries updated, "
+        f"{summary['requests']} requests ({summary['not_modified']} not modified) in {summary['seconds']:.1f}s"
+    )
+    if summary["failures"]:
+        for product_id, error in summary["failures"]:
+            print(f"❌ {product_id}: {error}")
+        raise SystemExit("Some products failed; run again to resume from the checkpoint.")
+    if args.dry_run:
+        print("Dry run: no files written.")
+    elif summary["changes"]:
+        print("✅ Bulk update complete. Review git diff and test the app.")
+    else:
+        print("✅ Everything already up to date.")
 
 
 if __name__ == "__main__":
     main()
-
-
@@ -0,0 +1,60 @@
+"""Batch background removal must match the one-image path pixel for pixel (run: python -m pytest test_background_removal_batch.py)."""
+import base64
+import io
+import unittest
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from background_removal import BackgroundRemover
+
+
+def _image(size=(120, 90), seed=0, fmt="PNG"):
+    rng = np.random.default_rng(seed)
+    # Near-white noisy background around the thresholds plus a solid shape.
+    arr = rng.integers(225, 256, (size[1], size[0], 3), dtype=np.uint8)
+    img = Image.fromarray(arr, "RGB")
+    ImageDraw.Draw(img).ellipse([10, 10, size[0] // 2, size[1] // 2], fill=(200, 30, 30))
+    out = io.BytesIO()
+    img.save(out, fmt)
+    return "data:image/png;base64," + base64.b64encode(out.getvalue()).decode("ascii")
+
+
+def _pixels(data_url):
+    return np.array(Image.open(io.BytesIO(base64.b64decode(data_url.split(",", 1)[1]))))
+
+
+class TestBatchMatchesSingle(unittest.TestCase):
+    def setUp(self):
+        self.remover = BackgroundRemover()
+        self.images = [_image(seed=i) for i in range(5)] + [_image((64, 48), seed=9), _image((120, 90), 7, "JPEG")]
+
+    def _assert_same(self, method, feather_edges=True, **kwargs):
+        batch = self.remover.remove_background_batch(self.images, method, feather_edges, **kwargs)
+        self.assertEqual(len(batch), len(self.images))
+        for image_data, result in zip(self.images, batch):
+            self.assertTrue(result["success"], result)
+            single = self.remover.remove_white_background_advanced(image_data, method, feather_edges)
+            np.testing.assert_array_equal(_pixels(result["image_data"]), _pixels(single))
+
+    def test_every_method(self):
+        for method in ("adaptive", "threshold", "color_range", "edge_detection", "unknown"):
+            with self.subTest(method=method):
+                self._assert_same(method)
+
+    def test_without_feathering(self):
+        self._assert_same("adaptive", feather_edges=False)
+
+    def test_memory_ceiling_splits_chunks(self):
+        # Room for one 120x90 image per chunk.
+        self._assert_same("adaptive", max_memory=120 * 90 * 25)
+
+    def test_iter_reports_each_index_and_bad_input(self):
+        seen = dict(self.remover.iter_remove_background_batch(["not-base64!", self.images[0]]))
+        self.assertEqual(set(seen), {0, 1})
+        self.assertFalse(seen[0]["success"])
+        self.assertTrue(seen[1]["success"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+"""image_text_overlay must import from the repo root without the backend package (run: python -m pytest test_image_text_overlay_import.py)."""
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestImageTextOverlayImport(unittest.TestCase):
+    def test_imports_standalone(self):
+        # Fresh interpreter: nothing from earlier tests on sys.path or in sys.modules.
+        code = (
+            "import sys, image_text_overlay\n"
+            "assert image_text_overlay.text_render.text_layer\n"
+            "assert 'flask' not in sys.modules, 'pulled in backend/utils/__init__'\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_overlay_renders(self):
+        from image_text_overlay import ImageTextOverlay
+        import base64
+        import io
+        from PIL import Image
+
+        buf = io.BytesIO()
+        Image.new("RGB", (200, 120), (40, 80, 120)).save(buf, "PNG")
+        data = "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+        result = ImageTextOverlay().add_text_overlay(data, "Hello")
+        self.assertTrue(result.startswith("data:image/png;base64,"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,241 @@
+"""Printful bulk sync: rate limiting, conditional GETs, resume and diff-only writes (run: python -m pytest test_printful_bulk_update.py)."""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+
+import printful_bulk_update as sync  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None, headers=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = headers or {}
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    """Serves Printful paths from ``routes`` (path -> payload); supports ETags."""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.headers = {}
+        self.calls = []
+        self.queued = {}
+
+    def get(self, url, headers=None, timeout=None):
+        path = url[len(sync.PRINTFUL_BASE_URL):]
+        self.calls.append(path)
+        if self.queued.get(path):
+            return self.queued[path].pop(0)
+        payload = self.routes[path]
+        etag = '"%s"' % abs(hash(json.dumps(payload, sort_keys=True)))
+        if (headers or {}).get("If-None-Match") == etag:
+            return FakeResponse(304, headers={"ETag": etag})
+        return FakeResponse(200, payload, {"ETag": etag})
+
+
+def _client(session, cache=None, sleeps=None):
+    sleeps = sleeps if sleeps is not None else []
+    return sync.PrintfulClient("key", cache or sync.HttpCache(), workers=2, session=session, sleep=sleeps.append)
+
+
+PRODUCTS_JS = """export const products = {
+  "tee": {
+    "name": "Tee",
+    "price": 20.0,
+    "variables": {
+      "sizes": [
+        "S",
+        "M"
+      ],
+      "colors": [
+        "Black"
+      ],
+      "availability": {
+        "S": {
+          "Black": true
+        },
+        "M": {
+          "Black": true
+        }
+      }
+    }
+  },
+  "mug": {
+    "name": "Mug",
+    "price": 12.0,
+    "variables": {
+  "sizes": [],
+  "colors": [],
+  "availability": {}
+}
+  }
+};
+"""
+
+APP_PY = """PRODUCTS = [
+    {
+        "name": "Tee",
+        "price": 15.0,
+        "filename": "tee.png",
+    },
+    {
+        "name": "Mug",
+        "price": 9.0,
+    },
+]
+"""
+
+
+def _store(tee_status="active", tee_price="20.00"):
+    return {
+        "/store/products?limit=100&offset=0": {"result": [{"id": 1, "name": "Tee"}, {"id": 2, "name": "Mug"}], "paging": {"total": 2}},
+        "/store/products/1": {"result": {"sync_product": {"name": "Tee"}, "sync_variants": [
+            {"variant_id": 11, "size": "S", "color": "Black", "retail_price": tee_price},
+            {"variant_id": 12, "size": "M", "color": "Black", "retail_price": tee_price, "availability_status": tee_status},
+        ]}},
+        "/store/products/2": {"result": {"sync_product": {"name": "Mug"}, "sync_variants": []}},
+    }
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_pauses_on_low_remaining_and_429(self):
+        now = [100.0]
+        sleeps = []
+        limiter = sync.RateLimiter(reserve=2, clock=lambda: now[0], sleep=sleeps.append)
+        limiter.update(FakeResponse(200, headers={"X-Ratelimit-Remaining": "10", "X-Ratelimit-Reset": "30"}))
+        limiter.wait()
+        self.assertEqual(sleeps, [])
+        limiter.update(FakeResponse(200, headers={"X-Ratelimit-Remaining": "2", "X-Ratelimit-Reset": "30"}))
+        limiter.wait()
+        self.assertEqual(sleeps, [30.0])
+        limiter.update(FakeResponse(429, headers={"Retry-After": "45"}))
+        limiter.wait()
+        self.assertEqual(sleeps[-1], 45.0)
+
+    def test_client_retries_429_then_succeeds(self):
+        session = FakeSession(_store())
+        session.queued["/store/products/2"] = [FakeResponse(429, headers={"Retry-After": "1"})]
+        client = _client(session)
+        payload, changed = client.get("/store/products/2")
+        self.assertTrue(changed)
+        self.assertEqual(payload["result"]["sync_product"]["name"], "Mug")
+        self.assertEqual(session.calls, ["/store/products/2", "/store/products/2"])
+
+
+class TestConditionalCache(unittest.TestCase):
+    def test_etag_revalidation_and_disk_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.json")
+            client = _client(FakeSession(_store()), sync.HttpCache(path))
+            self.assertTrue(client.get("/store/products/1")[1])
+            client.cache.save()
+
+            again = _client(FakeSession(_store()), sync.HttpCache(path))
+            payload, changed = again.get("/store/products/1")
+            self.assertFalse(changed)
+            self.assertEqual(again.not_modified, 1)
+            self.assertEqual(payload["result"]["sync_product"]["name"], "Tee")
+
+    def test_immutable_paths_served_from_cache(self):
+        session = FakeSession({"/products/variant/11": {"result": {"variant": {"size": "S", "color": "Black"}}}})
+        client = _client(session)
+        client.get("/products/variant/11", immutable=True)
+        client.get("/products/variant/11", immutable=True)
+        self.assertEqual(session.calls, ["/products/variant/11"])
+
+
+class TestAvailability(unittest.TestCase):
+    def test_sizes_ordered_and_existing_color_order_kept(self):
+        variables = sync.build_availability(
+            [("2XL", "White", True), ("S", "Black", True), ("S", "White", False)],
+            {"colors": ["White", "Black"]},
+        )
+        self.assertEqual(variables["sizes"], ["S", "XXL"])
+        self.assertEqual(variables["colors"], ["White", "Black"])
+        self.assertEqual(variables["availability"], {"S": {"White": False, "Black": True}, "XXL": {"White": True, "Black": False}})
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.frontend = os.path.join(self._dir.name, "products.js")
+        self.backend = os.path.join(self._dir.name, "app.py")
+        with open(self.frontend, "w", encoding="utf-8") as f:
+            f.write(PRODUCTS_JS)
+        with open(self.backend, "w", encoding="utf-8") as f:
+            f.write(APP_PY)
+
+    def _sync(self, session, checkpoint=None, **kwargs):
+        return sync.sync(_client(session), checkpoint or sync.Checkpoint(), workers=2,
+                         frontend_path=self.frontend, backend_path=self.backend, **kwargs)
+
+    def _read(self, path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_unchanged_catalog_writes_nothing(self):
+        summary = self._sync(FakeSession(_store()))
+        self.assertEqual(summary["changes"], [])
+        self.assertEqual(self._read(self.frontend), PRODUCTS_JS)
+        self.assertFalse(any(name.endswith(".bak") for name in os.listdir(self._dir.name)))
+
+    def test_default_run_leaves_prices_alone(self):
+        summary = self._sync(FakeSession(_store(tee_status="discontinued", tee_price="22.50")))
+        self.assertEqual(summary["frontend"], ["tee"])
+        self.assertEqual(summary["backend"], [])
+        contents = self._read(self.frontend)
+        products = json.loads(contents[contents.index("{"):contents.rindex("}") + 1])
+        self.assertEqual(products["tee"]["price"], 20.0)
+        self.assertEqual(products["tee"]["variables"]["availability"]["M"], {"Black": False})
+        self.assertEqual(self._read(self.backend), APP_PY)
+
+    def test_only_changed_entry_is_rewritten(self):
+        summary = self._sync(FakeSession(_store(tee_status="discontinued", tee_price="22.50")),
+                             sync_prices=True, markup=1)
+        self.assertEqual(summary["frontend"], ["tee"])
+        contents = self._read(self.frontend)
+        # The untouched (oddly indented) Mug entry is byte-for-byte the same.
+        self.assertIn(PRODUCTS_JS[PRODUCTS_JS.index('  "mug"'):], contents)
+        products = json.loads(contents[contents.index("{"):contents.rindex("}") + 1])
+        self.assertEqual(products["tee"]["price"], 23.5)
+        self.assertEqual(products["tee"]["variables"]["availability"]["M"], {"Black": False})
+        # Backend gets the same price difference (+3.5) for the entry with the same name.
+        self.assertIn('"name": "Tee",\n        "price": 18.5,', self._read(self.backend))
+        self.assertIn('"price": 9.0', self._read(self.backend))
+
+        # Same inputs again: prices already match, nothing left to change.
+        self.assertEqual(self._sync(FakeSession(_store(tee_status="discontinued", tee_price="22.50")),
+                                    sync_prices=True, markup=1)["changes"], [])
+
+    def test_resume_skips_checkpointed_products(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "checkpoint.json")
+            session = FakeSession(_store())
+            del session.routes["/store/products/2"]
+            summary = self._sync(session, sync.Checkpoint(path))
+            self.assertEqual([pid for pid, _ in summary["failures"]], [2])
+            self.assertIn("1", sync.Checkpoint(path).products)
+
+            session = FakeSession(_store())
+            summary = self._sync(session, sync.Checkpoint(path))
+            self.assertEqual(summary["failures"], [])
+            self.assertNotIn("/store/products/1", session.calls)
+            self.assertIn("/store/products/2", session.calls)
+            self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()